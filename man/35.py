@@ -15,6 +15,174 @@ except ImportError:
     print("Falling back to standard tkinter messagebox for alerts (less pretty).")
     from tkinter import messagebox as CTkMessagebox # Fallback for CTkMessagebox
 
+# --- Collecte des processus (thread d'arrière-plan) et tableau virtualisé ---
+REFRESH_INTERVAL = 1.0 # Secondes entre deux collectes
+DYNAMIC_ATTRS = ['create_time', 'status', 'cpu_percent', 'memory_info'] # Relus à chaque collecte
+STATIC_ATTRS = ['name', 'username', 'exe'] # Lus une seule fois par processus
+PROCESS_HEADER = f"{'PID':<8} {'Status':<10} {'CPU%':<8} {'Mem (MB)':<12} {'Nom':<30} {'Utilisateur':<20}"
+HEADER_LINES = 2 # En-tête et séparateur, en haut du Textbox
+
+class ProcessCollector:
+    """
+    Collecte la liste des processus hors du thread Tk. process_iter(attrs) lit les champs variables de chaque
+    processus en un seul passage (oneshot) ; le nom, l'utilisateur et l'exécutable ne sont lus qu'à la première
+    rencontre d'un processus, identifié par (PID, create_time) pour qu'un PID réutilisé ne reprenne pas l'ancien nom.
+    Le dernier instantané (lignes triées par CPU décroissant) est dans `snapshot`.
+    """
+    def __init__(self, on_snapshot=None, interval=REFRESH_INTERVAL):
+        self.on_snapshot = on_snapshot
+        self.interval = interval
+        self.static_cache = {} # (pid, create_time) -> (nom, utilisateur, exécutable)
+        self.snapshot = []
+        self.collect_ms = 0.0
+        self.lock = threading.Lock() # Une seule collecte à la fois (boucle et bouton "Rafraîchir")
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._collect_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _collect_loop(self):
+        while self.running:
+            started = time.perf_counter()
+            self.collect()
+            if self.running and self.on_snapshot:
+                self.on_snapshot()
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def collect(self):
+        with self.lock:
+            started = time.perf_counter()
+            rows = []
+            seen = set()
+            for p in psutil.process_iter(DYNAMIC_ATTRS, ad_value=None):
+                info = p.info
+                key = (p.pid, info['create_time'])
+                static = self.static_cache.get(key)
+                if static is None:
+                    try:
+                        fields = p.as_dict(STATIC_ATTRS, ad_value=None) # as_dict lit aussi en oneshot
+                    except psutil.NoSuchProcess:
+                        continue
+                    static = self.static_cache[key] = (fields['name'] or "", fields['username'] or "", fields['exe'] or "")
+                seen.add(key)
+                memory = info['memory_info']
+                rows.append((p.pid, info['status'] or "?", info['cpu_percent'] or 0.0,
+                             memory.rss / (1024 * 1024) if memory else 0.0, static[0], static[1], static[2]))
+            for key in self.static_cache.keys() - seen: # Processus terminés
+                del self.static_cache[key]
+            rows.sort(key=lambda row: (-row[2], row[0])) # CPU décroissant, puis PID : ordre stable entre deux collectes
+            self.snapshot = rows
+            self.collect_ms = (time.perf_counter() - started) * 1000
+            return rows
+
+class ProcessTableView:
+    """
+    Tableau de processus virtualisé dans un Textbox : le widget ne contient que l'en-tête et les lignes visibles,
+    et une mise à jour ne réécrit que les lignes dont le texte a changé. Le défilement (molette, barre) déplace la
+    fenêtre affichée dans l'instantané complet.
+    """
+    def __init__(self, textbox, scrollbar=None, visible=40):
+        self.textbox = textbox
+        self.scrollbar = scrollbar
+        self.rows = [] # Instantané complet
+        self.first = 0 # Index de la première ligne affichée
+        self.visible = visible
+        self.lines = [] # Texte affiché dans chaque emplacement
+        self.active = False # False quand le Textbox affiche un message à la place du tableau
+        self.selected_pid = None
+        self.highlighted = None # Emplacement surligné
+        self.render_ms = 0.0
+        self.changed = 0 # Lignes réécrites au dernier rendu
+
+    @staticmethod
+    def format_row(row):
+        pid, status, cpu_percent, mem_usage_mb, name, username, _ = row
+        return f"{pid:<8} {status:<10} {cpu_percent:<8.1f} {mem_usage_mb:<12.1f} {name:<30} {username:<20}"
+
+    def reset(self):
+        """Reconstruit l'en-tête et des emplacements vides (au démarrage, ou quand le nombre de lignes visibles change)."""
+        self.textbox.delete("1.0", ctk.END)
+        self.textbox.insert(ctk.END, PROCESS_HEADER + "\n" + "-" * 100 + "\n" + "\n" * (self.visible - 1))
+        self.lines = [""] * self.visible
+        self.highlighted = None
+        self.active = True
+        self.render()
+
+    def show_message(self, message):
+        self.active = False
+        self.textbox.delete("1.0", ctk.END)
+        self.textbox.insert(ctk.END, message)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        if not self.active:
+            self.reset()
+        else:
+            self.render()
+
+    def render(self):
+        started = time.perf_counter()
+        self.first = max(0, min(self.first, len(self.rows) - self.visible))
+        window = self.rows[self.first:self.first + self.visible]
+        changed = 0
+        highlighted = None
+        for slot in range(self.visible):
+            text = self.format_row(window[slot]) if slot < len(window) else ""
+            if slot < len(window) and window[slot][0] == self.selected_pid:
+                highlighted = slot
+            if text != self.lines[slot]:
+                line = HEADER_LINES + 1 + slot
+                self.textbox.delete(f"{line}.0", f"{line}.end")
+                self.textbox.insert(f"{line}.0", text)
+                self.lines[slot] = text
+                changed += 1
+        if highlighted != self.highlighted or (highlighted is not None and changed):
+            self.textbox.tag_remove("highlight", "1.0", ctk.END)
+            if highlighted is not None:
+                line = HEADER_LINES + 1 + highlighted
+                self.textbox.tag_add("highlight", f"{line}.0", f"{line}.end")
+            self.highlighted = highlighted
+        if self.scrollbar is not None:
+            total = max(1, len(self.rows))
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible) / total))
+        self.changed = changed
+        self.render_ms = (time.perf_counter() - started) * 1000
+
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+
+    def on_scrollbar(self, *args):
+        """Commande de la barre de défilement : ("moveto", fraction) ou ("scroll", n, "units" | "pages")."""
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.rows))
+            self.render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]) * (self.visible if args[2] == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        if getattr(event, "num", None) in (4, 5): # Linux
+            self.scroll(-3 if event.num == 4 else 3)
+        else:
+            self.scroll(-3 if event.delta > 0 else 3)
+        return "break" # Le Textbox ne défile pas lui-même : il ne contient que la fenêtre visible
+
+    def on_resize(self, event):
+        line_height = self.textbox.cget("font").metrics("linespace")
+        visible = max(1, event.height // line_height - HEADER_LINES)
+        if visible != self.visible:
+            self.visible = visible
+            if self.active:
+                self.reset()
+
 class ProcessMonitorApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -47,7 +215,7 @@ class ProcessMonitorApp(ctk.CTk):
 
         self.refresh_button = ctk.CTkButton(self.control_frame,
                                             text="Rafraîchir Maintenant",
-                                            command=self.update_process_list_display,
+                                            command=self.refresh_now,
                                             font=ctk.CTkFont(size=14),
                                             height=40)
         self.refresh_button.grid(row=0, column=2, padx=10, pady=5, sticky="ew")
@@ -108,8 +276,11 @@ class ProcessMonitorApp(ctk.CTk):
         self.tab_view.add("Désassemblage Executable") # New tab for disassembly
 
         # --- Tab 1: Process List Display ---
-        self.process_list_textbox = ctk.CTkTextbox(self.tab_view.tab("Liste des Processus"), wrap="none", font=ctk.CTkFont(family="Consolas", size=12))
-        self.process_list_textbox.pack(fill="both", expand=True)
+        self.process_list_scrollbar = ctk.CTkScrollbar(self.tab_view.tab("Liste des Processus"))
+        self.process_list_scrollbar.pack(side="right", fill="y")
+        self.process_list_textbox = ctk.CTkTextbox(self.tab_view.tab("Liste des Processus"), wrap="none", font=ctk.CTkFont(family="Consolas", size=12),
+                                                   activate_scrollbars=False) # Défilement géré par la vue virtualisée
+        self.process_list_textbox.pack(side="left", fill="both", expand=True)
         self.process_list_textbox.bind("<Button-1>", self.on_process_list_click) # Bind click event
 
         # --- Tab 2: Detailed Process Information ---
@@ -138,10 +309,19 @@ class ProcessMonitorApp(ctk.CTk):
         self.disassembly_textbox.insert(ctk.END, "Assurez-vous que 'objdump' est installé sur votre système (e.g., sudo apt install binutils).")
         self.disassembly_textbox.configure(state="disabled") # Make it read-only initially
 
+        # Tableau virtualisé : seules les lignes visibles sont dans le Textbox
+        self.process_view = ProcessTableView(self.process_list_textbox, self.process_list_scrollbar)
+        self.process_list_scrollbar.configure(command=self.process_view.on_scrollbar)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.process_list_textbox.bind(sequence, self.process_view.on_mousewheel)
+        self.process_list_textbox.bind("<Configure>", self.process_view.on_resize)
+        # Collecte en arrière-plan ; le thread Tk ne fait qu'afficher le dernier instantané
+        self.process_collector = ProcessCollector(on_snapshot=lambda: self.after(0, self.on_process_snapshot))
+
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         # Initial prompt
-        self.process_list_textbox.insert(ctk.END, "Cliquez sur 'Démarrer le Moniteur' pour commencer à lister les processus...")
+        self.process_view.show_message("Cliquez sur 'Démarrer le Moniteur' pour commencer à lister les processus...")
 
     def toggle_monitoring(self):
         if not self.monitoring_active:
@@ -160,17 +340,18 @@ class ProcessMonitorApp(ctk.CTk):
             self.kill_button.configure(state="disabled")
             self.trace_syscalls_button.configure(state="disabled")
             self.disassemble_exe_button.configure(state="disabled") # Disable disassembly button
-            self.process_list_textbox.delete("1.0", ctk.END)
-            self.process_list_textbox.insert(ctk.END, "Moniteur arrêté. Cliquez sur 'Démarrer le Moniteur' pour relancer.")
+            self.process_view.show_message("Moniteur arrêté. Cliquez sur 'Démarrer le Moniteur' pour relancer.")
             print("Moniteur de processus arrêté.")
 
     def start_monitoring(self):
         self.monitoring_active = True
         self.process_refresh_thread = threading.Thread(target=self._refresh_processes_loop, daemon=True)
         self.process_refresh_thread.start()
+        self.process_collector.start() # La liste des processus a son propre thread, voir on_process_snapshot
 
     def stop_monitoring(self):
         self.monitoring_active = False
+        self.process_collector.stop()
         if self.process_refresh_thread and self.process_refresh_thread.is_alive():
             time.sleep(0.1)
         self.stop_syscall_tracing() # Stop any active strace
@@ -178,47 +359,24 @@ class ProcessMonitorApp(ctk.CTk):
 
     def _refresh_processes_loop(self):
         while self.monitoring_active:
-            self.after(0, self.update_process_list_display)
             if self.selected_pid:
                 self.after(0, self.update_selected_process_details)
             time.sleep(1) # Refresh every 1 second
 
     def update_process_list_display(self):
-        """Fetches and updates the list of processes in the textbox."""
-        self.process_list_textbox.delete("1.0", ctk.END)
-        
-        header = f"{'PID':<8} {'Status':<10} {'CPU%':<8} {'Mem (MB)':<12} {'Nom':<30} {'Utilisateur':<20}\n"
-        self.process_list_textbox.insert(ctk.END, header)
-        self.process_list_textbox.insert(ctk.END, "-" * 100 + "\n")
+        """Affiche le dernier instantané du collecteur : seules les lignes visibles qui ont changé sont réécrites."""
+        self.process_view.set_rows(self.process_collector.snapshot)
 
-        processes = []
-        for p in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_info', 'username']):
-            try:
-                cpu_percent = p.cpu_percent(interval=None) # Non-blocking if called repeatedly
-                mem_info = p.memory_info()
-                mem_usage_mb = mem_info.rss / (1024 * 1024) # Resident Set Size (RSS)
-
-                processes.append({
-                    'pid': p.pid,
-                    'name': p.name(),
-                    'status': p.status(),
-                    'cpu_percent': cpu_percent,
-                    'mem_usage_mb': mem_usage_mb,
-                    'username': p.username()
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-            except Exception as e:
-                print(f"Erreur lors de la récupération des infos processus: {e} pour PID {p.pid}")
-                continue
-        
-        processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
+    def on_process_snapshot(self):
+        if self.monitoring_active: # Un instantané arrivé après l'arrêt n'écrase pas le message
+            self.update_process_list_display()
 
-        for proc in processes:
-            line = f"{proc['pid']:<8} {proc['status']:<10} {proc['cpu_percent']:<8.1f} {proc['mem_usage_mb']:<12.1f} {proc['name']:<30} {proc['username']:<20}\n"
-            self.process_list_textbox.insert(ctk.END, line)
-            
-        self.process_list_textbox.yview_moveto(0) # Scroll to top
+    def refresh_now(self):
+        """Collecte immédiate hors du thread Tk (bouton "Rafraîchir", après un arrêt de processus), puis affichage."""
+        def collect():
+            self.process_collector.collect()
+            self.after(0, self.update_process_list_display)
+        threading.Thread(target=collect, daemon=True).start()
 
     def on_process_list_click(self, event):
         """Handles clicks on the process list textbox to select a process."""
@@ -240,6 +398,7 @@ class ProcessMonitorApp(ctk.CTk):
                 return
 
             self.selected_pid = new_selected_pid
+            self.process_view.selected_pid = self.selected_pid # La vue garde le surlignage sur ce PID
             
             try:
                 self.selected_process_obj = psutil.Process(self.selected_pid)
@@ -275,6 +434,8 @@ class ProcessMonitorApp(ctk.CTk):
         self.trace_syscalls_button.configure(state="disabled")
         self.disassemble_exe_button.configure(state="disabled") # Disable disassembly button
         self.process_list_textbox.tag_remove("highlight", "1.0", ctk.END) # Remove highlight
+        self.process_view.selected_pid = None
+        self.process_view.highlighted = None
         self.details_textbox.delete("1.0", ctk.END)
         self.details_textbox.insert(ctk.END, "Sélectionnez un processus dans la liste pour voir les détails.")
         self.stop_syscall_tracing() # Ensure strace is stopped if selection is reset
@@ -359,7 +520,7 @@ class ProcessMonitorApp(ctk.CTk):
             if response == "yes":
                 process.terminate() # or process.kill() for a stronger termination
                 self.status_label.configure(text=f"Tentative d'arrêt de {self.selected_pid}...", text_color="orange")
-                self.after(500, self.update_process_list_display)
+                self.after(500, self.refresh_now)
                 self.reset_selected_process()
             else:
                 self.status_label.configure(text="Opération annulée.", text_color="grey")
@@ -5,7 +5,11 @@ import psutil
 import os
 import sys
 import subprocess
+import csv
 from datetime import datetime
+from tkinter import filedialog
+
+import numpy as np
 
 # Make sure CTkMessagebox is available. Install it with: pip install CTkMessagebox
 try:
@@ -15,6 +19,14 @@ except ImportError:
     print("Falling back to standard tkinter messagebox for alerts (less pretty).")
     from tkinter import messagebox as CTkMessagebox # Fallback for CTkMessagebox
 
+# Export Parquet de l'historique (optionnel ; le CSV ne dépend de rien)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+    print("pyarrow non trouvé : l'export de l'historique se fera en CSV uniquement (pip install pyarrow).")
+
 # --- ptrace related imports (add these) ---
 try:
     PtraceDebugger = None # Set to None to disable ptrace features
@@ -23,6 +35,414 @@ except ImportError:
     print("python-ptrace not found. Syscall tracing via ptrace will be disabled.")
 
 
+# --- Collecte des processus (thread d'arrière-plan) et tableau virtualisé ---
+REFRESH_INTERVAL = 1.0 # Secondes entre deux collectes
+DYNAMIC_ATTRS = ['create_time', 'status', 'cpu_percent', 'memory_info'] # Relus à chaque collecte
+STATIC_ATTRS = ['name', 'username', 'exe'] # Lus une seule fois par processus
+PROCESS_HEADER = f"{'PID':<8} {'Status':<10} {'CPU%':<8} {'Mem (MB)':<12} {'Nom':<30} {'Utilisateur':<20}"
+HEADER_LINES = 2 # En-tête et séparateur, en haut du Textbox
+
+class ProcessCollector:
+    """
+    Collecte la liste des processus hors du thread Tk. process_iter(attrs) lit les champs variables de chaque
+    processus en un seul passage (oneshot) ; le nom, l'utilisateur et l'exécutable ne sont lus qu'à la première
+    rencontre d'un processus, identifié par (PID, create_time) pour qu'un PID réutilisé ne reprenne pas l'ancien nom.
+    Le dernier instantané (lignes triées par CPU décroissant) est dans `snapshot` ; chaque collecte de la boucle est
+    aussi ajoutée à `history` (ProcessHistory) si elle est fournie.
+    """
+    def __init__(self, on_snapshot=None, interval=REFRESH_INTERVAL, history=None):
+        self.on_snapshot = on_snapshot
+        self.history = history
+        self.interval = interval
+        self.static_cache = {} # (pid, create_time) -> (nom, utilisateur, exécutable)
+        self.snapshot = []
+        self.collect_ms = 0.0
+        self.lock = threading.Lock() # Une seule collecte à la fois (boucle et bouton "Rafraîchir")
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._collect_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _collect_loop(self):
+        while self.running:
+            started = time.perf_counter()
+            rows = self.collect()
+            if self.history is not None: # Seulement ici : une collecte par intervalle, pas celles du bouton "Rafraîchir"
+                self.history.record(rows)
+            if self.running and self.on_snapshot:
+                self.on_snapshot()
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def collect(self):
+        with self.lock:
+            started = time.perf_counter()
+            rows = []
+            seen = set()
+            for p in psutil.process_iter(DYNAMIC_ATTRS, ad_value=None):
+                info = p.info
+                key = (p.pid, info['create_time'])
+                static = self.static_cache.get(key)
+                if static is None:
+                    try:
+                        fields = p.as_dict(STATIC_ATTRS, ad_value=None) # as_dict lit aussi en oneshot
+                    except psutil.NoSuchProcess:
+                        continue
+                    static = self.static_cache[key] = (fields['name'] or "", fields['username'] or "", fields['exe'] or "")
+                seen.add(key)
+                memory = info['memory_info']
+                rows.append((p.pid, info['status'] or "?", info['cpu_percent'] or 0.0,
+                             memory.rss / (1024 * 1024) if memory else 0.0, static[0], static[1], static[2], info['create_time']))
+            for key in self.static_cache.keys() - seen: # Processus terminés
+                del self.static_cache[key]
+            rows.sort(key=lambda row: (-row[2], row[0])) # CPU décroissant, puis PID : ordre stable entre deux collectes
+            self.snapshot = rows
+            self.collect_ms = (time.perf_counter() - started) * 1000
+            return rows
+
+class ProcessTableView:
+    """
+    Tableau de processus virtualisé dans un Textbox : le widget ne contient que l'en-tête et les lignes visibles,
+    et une mise à jour ne réécrit que les lignes dont le texte a changé. Le défilement (molette, barre) déplace la
+    fenêtre affichée dans l'instantané complet.
+    """
+    def __init__(self, textbox, scrollbar=None, visible=40):
+        self.textbox = textbox
+        self.scrollbar = scrollbar
+        self.rows = [] # Instantané complet
+        self.first = 0 # Index de la première ligne affichée
+        self.visible = visible
+        self.lines = [] # Texte affiché dans chaque emplacement
+        self.active = False # False quand le Textbox affiche un message à la place du tableau
+        self.selected_pid = None
+        self.highlighted = None # Emplacement surligné
+        self.render_ms = 0.0
+        self.changed = 0 # Lignes réécrites au dernier rendu
+
+    @staticmethod
+    def format_row(row):
+        pid, status, cpu_percent, mem_usage_mb, name, username = row[:6]
+        return f"{pid:<8} {status:<10} {cpu_percent:<8.1f} {mem_usage_mb:<12.1f} {name:<30} {username:<20}"
+
+    def reset(self):
+        """Reconstruit l'en-tête et des emplacements vides (au démarrage, ou quand le nombre de lignes visibles change)."""
+        self.textbox.delete("1.0", ctk.END)
+        self.textbox.insert(ctk.END, PROCESS_HEADER + "\n" + "-" * 100 + "\n" + "\n" * (self.visible - 1))
+        self.lines = [""] * self.visible
+        self.highlighted = None
+        self.active = True
+        self.render()
+
+    def show_message(self, message):
+        self.active = False
+        self.textbox.delete("1.0", ctk.END)
+        self.textbox.insert(ctk.END, message)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        if not self.active:
+            self.reset()
+        else:
+            self.render()
+
+    def render(self):
+        started = time.perf_counter()
+        self.first = max(0, min(self.first, len(self.rows) - self.visible))
+        window = self.rows[self.first:self.first + self.visible]
+        changed = 0
+        highlighted = None
+        for slot in range(self.visible):
+            text = self.format_row(window[slot]) if slot < len(window) else ""
+            if slot < len(window) and window[slot][0] == self.selected_pid:
+                highlighted = slot
+            if text != self.lines[slot]:
+                line = HEADER_LINES + 1 + slot
+                self.textbox.delete(f"{line}.0", f"{line}.end")
+                self.textbox.insert(f"{line}.0", text)
+                self.lines[slot] = text
+                changed += 1
+        if highlighted != self.highlighted or (highlighted is not None and changed):
+            self.textbox.tag_remove("highlight", "1.0", ctk.END)
+            if highlighted is not None:
+                line = HEADER_LINES + 1 + highlighted
+                self.textbox.tag_add("highlight", f"{line}.0", f"{line}.end")
+            self.highlighted = highlighted
+        if self.scrollbar is not None:
+            total = max(1, len(self.rows))
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible) / total))
+        self.changed = changed
+        self.render_ms = (time.perf_counter() - started) * 1000
+
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+
+    def on_scrollbar(self, *args):
+        """Commande de la barre de défilement : ("moveto", fraction) ou ("scroll", n, "units" | "pages")."""
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.rows))
+            self.render()
+        elif args[0] == "scroll":
+            self.scroll(int(args[1]) * (self.visible if args[2] == "pages" else 1))
+
+    def on_mousewheel(self, event):
+        if getattr(event, "num", None) in (4, 5): # Linux
+            self.scroll(-3 if event.num == 4 else 3)
+        else:
+            self.scroll(-3 if event.delta > 0 else 3)
+        return "break" # Le Textbox ne défile pas lui-même : il ne contient que la fenêtre visible
+
+    def on_resize(self, event):
+        line_height = self.textbox.cget("font").metrics("linespace")
+        visible = max(1, event.height // line_height - HEADER_LINES)
+        if visible != self.visible:
+            self.visible = visible
+            if self.active:
+                self.reset()
+
+# --- Historique par processus (anneaux NumPy) ---
+HISTORY_SECONDS = 3600 # Anneau à pleine résolution : 1 h à un point par collecte (1 Hz)
+HISTORY_ROLLUPS = [(60, 24 * 60)] # (secondes par point, nombre de points) : moyennes par minute sur 24 h
+HISTORY_INITIAL_CAPACITY = 64 # Les anneaux doublent jusqu'à leur taille maximale : un processus bref coûte peu
+HISTORY_MAX_PROCESSES = 256 # Au-delà, un nouveau processus actif remplace le processus suivi inactif depuis le plus longtemps
+HISTORY_IDLE_EVICT = 60 # Collectes sans activité CPU avant qu'un processus suivi puisse être remplacé
+HISTORY_METRICS = ['cpu_percent', 'rss_mb', 'read_kbps', 'write_kbps', 'num_fds']
+HISTORY_LABELS = ["CPU %", "RSS (Mo)", "Lecture (Ko/s)", "Écriture (Ko/s)", "Descripteurs"]
+HISTORY_WINDOWS = {"1 min": (60, None), "10 min": (600, None), "1 h": (3600, None), "24 h": (24 * 3600, 60)} # Libellé -> (secondes, agrégat)
+SPARKLINE_CHARS = "▁▂▃▄▅▆▇█"
+SPARKLINE_WIDTH = 60
+
+def sparkline(values, width=SPARKLINE_WIDTH):
+    """Courbe en caractères blocs : les valeurs sont moyennées sur `width` colonnes au plus, un NaN donne un espace."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return ""
+    if len(values) > width:
+        starts = np.linspace(0, len(values), width + 1).astype(int)[:-1]
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid.astype(np.int32), starts)
+        values = np.divide(sums, counts, out=np.full(len(sums), np.nan), where=counts > 0)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return " " * len(values)
+    low, high = values[valid].min(), values[valid].max()
+    levels = np.zeros(len(values), dtype=int)
+    if high > low:
+        levels[valid] = np.rint((values[valid] - low) / (high - low) * (len(SPARKLINE_CHARS) - 1)).astype(int)
+    return "".join(SPARKLINE_CHARS[level] if ok else " " for level, ok in zip(levels, valid))
+
+class SeriesRing:
+    """
+    Anneau de points (une ligne float32 par point, une colonne par métrique). Le tableau commence petit et double
+    jusqu'à `capacity` ; ensuite, chaque nouveau point écrase le plus ancien.
+    """
+    def __init__(self, capacity, width, initial=HISTORY_INITIAL_CAPACITY):
+        self.capacity = capacity
+        self.values = np.empty((min(initial, capacity), width), dtype=np.float32)
+        self.start = 0
+        self.count = 0
+
+    def append(self, row):
+        size = len(self.values)
+        if self.count == size and size < self.capacity:
+            grown = np.empty((min(self.capacity, size * 2), self.values.shape[1]), dtype=np.float32)
+            grown[:size] = self.ordered()
+            self.values, self.start = grown, 0
+            size = len(grown)
+        self.values[(self.start + self.count) % size] = row
+        if self.count < size:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % size
+
+    def ordered(self, last=None):
+        """Copie des `last` derniers points (tous par défaut), du plus ancien au plus récent."""
+        n = self.count if last is None else min(last, self.count)
+        return self.values[(self.start + np.arange(self.count - n, self.count)) % len(self.values)]
+
+class ProcessSeries:
+    """Historique d'un processus : anneau à pleine résolution, anneaux agrégés et cumuls du point agrégé en cours."""
+    def __init__(self, key, name, handle, tick):
+        self.key = key
+        self.name = name
+        self.handle = handle # psutil.Process, pour les E/S et les descripteurs
+        self.first_tick = tick
+        self.last_tick = tick - 1 # Dernière collecte enregistrée
+        self.last_active = tick
+        self.io = None # (lus, écrits, instant) de la mesure précédente
+        self.io_denied = False
+        self.raw = SeriesRing(HISTORY_SECONDS, len(HISTORY_METRICS))
+        self.rollups = [SeriesRing(length, len(HISTORY_METRICS)) for _, length in HISTORY_ROLLUPS]
+        self.sums = np.zeros((len(HISTORY_ROLLUPS), len(HISTORY_METRICS)))
+        self.counts = np.zeros((len(HISTORY_ROLLUPS), len(HISTORY_METRICS)), dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return self.raw.values.nbytes + sum(ring.values.nbytes for ring in self.rollups) + self.sums.nbytes + self.counts.nbytes
+
+class ProcessHistory:
+    """
+    Séries temporelles par processus (CPU, RSS, E/S, descripteurs), alimentées par ProcessCollector à chaque
+    collecte, dans son thread. Les processus sont identifiés par (PID, create_time) ; CPU et RSS viennent de
+    l'instantané, les E/S et les descripteurs ne sont lus que pour les processus suivis. Les horodatages sont
+    communs : un anneau par résolution pour tous les processus, un point de processus n'est qu'une ligne float32.
+    La mémoire est bornée par HISTORY_MAX_PROCESSES x max_bytes_per_process.
+    """
+    def __init__(self, max_processes=HISTORY_MAX_PROCESSES):
+        self.max_processes = max_processes
+        self.series = {} # (pid, create_time) -> ProcessSeries
+        self.tick = -1
+        self.tick_times = np.zeros(HISTORY_SECONDS) # Instant de chaque collecte, indexé par tick % HISTORY_SECONDS
+        self.bucket_times = [np.zeros(length) for _, length in HISTORY_ROLLUPS] # Fin de chaque point agrégé
+        self.pinned = None # PID sélectionné : toujours suivi
+        self.record_ms = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def max_bytes_per_process():
+        points = HISTORY_SECONDS + sum(length for _, length in HISTORY_ROLLUPS)
+        return points * len(HISTORY_METRICS) * 4 + len(HISTORY_ROLLUPS) * len(HISTORY_METRICS) * 12
+
+    def memory_bytes(self):
+        with self.lock:
+            return sum(series.nbytes for series in self.series.values()) + self.tick_times.nbytes + sum(t.nbytes for t in self.bucket_times)
+
+    def pin(self, pid):
+        self.pinned = pid
+
+    def record(self, rows, now=None):
+        """Ajoute une collecte (lignes de ProcessCollector, triées par CPU décroissant)."""
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        with self.lock:
+            self.tick += 1
+            tick = self.tick
+            self.tick_times[tick % HISTORY_SECONDS] = now
+            alive = {(row[0], row[7]): row for row in rows}
+            for key in self.series.keys() - alive.keys(): # Processus terminés
+                del self.series[key]
+            self._admit(rows, tick)
+            for key, series in self.series.items():
+                row = alive[key]
+                values = self._measure(series, row, now)
+                if row[2] > 0:
+                    series.last_active = tick
+                series.raw.append(values)
+                series.last_tick = tick
+                self._roll_up(series, values, tick)
+            for i, (seconds, length) in enumerate(HISTORY_ROLLUPS):
+                if (tick + 1) % seconds == 0:
+                    self.bucket_times[i][(tick // seconds) % length] = now
+        self.record_ms = (time.perf_counter() - started) * 1000
+
+    def _admit(self, rows, tick):
+        """Suit les nouveaux processus, les plus actifs d'abord ; une fois plein, remplace les suivis inactifs."""
+        for row in rows:
+            key = (row[0], row[7])
+            pinned = row[0] == self.pinned
+            if key in self.series:
+                continue
+            if len(self.series) >= self.max_processes:
+                if row[2] <= 0 and not pinned:
+                    continue # Les lignes suivantes sont inactives aussi, sauf éventuellement le PID sélectionné
+                victim = min((s for s in self.series.values() if s.key[0] != self.pinned), key=lambda s: s.last_active, default=None)
+                if victim is None or (tick - victim.last_active < HISTORY_IDLE_EVICT and not pinned):
+                    continue
+                del self.series[victim.key]
+            try:
+                handle = psutil.Process(row[0])
+            except psutil.NoSuchProcess:
+                continue
+            self.series[key] = ProcessSeries(key, row[4], handle, tick)
+
+    @staticmethod
+    def _measure(series, row, now):
+        read_kbps = write_kbps = num_fds = np.nan
+        if not series.io_denied: # Accès refusé une fois (processus d'un autre utilisateur) : plus de tentative
+            try:
+                with series.handle.oneshot():
+                    io = series.handle.io_counters()
+                    num_fds = series.handle.num_fds()
+                if series.io is not None and now > series.io[2]:
+                    elapsed = now - series.io[2]
+                    read_kbps = (io.read_bytes - series.io[0]) / 1024 / elapsed
+                    write_kbps = (io.write_bytes - series.io[1]) / 1024 / elapsed
+                series.io = (io.read_bytes, io.write_bytes, now)
+            except (psutil.AccessDenied, AttributeError): # AttributeError : io_counters absent (macOS)
+                series.io_denied = True
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                pass
+        return (row[2], row[3], read_kbps, write_kbps, num_fds)
+
+    @staticmethod
+    def _roll_up(series, values, tick):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        series.sums[:, valid] += values[valid]
+        series.counts[:, valid] += 1
+        for i, (seconds, _) in enumerate(HISTORY_ROLLUPS):
+            if (tick + 1) % seconds == 0: # Point agrégé complet (le premier peut être partiel)
+                counts = series.counts[i]
+                series.rollups[i].append(np.divide(series.sums[i], counts, out=np.full(len(counts), np.nan), where=counts > 0))
+                series.sums[i] = 0.0
+                series.counts[i] = 0
+
+    def find(self, pid, create_time):
+        return self.series.get((pid, create_time))
+
+    def window(self, series, seconds, rollup=None):
+        """(instants, valeurs) des `seconds` dernières secondes, à pleine résolution ou par points agrégés de `rollup` s."""
+        with self.lock:
+            if rollup is None:
+                values = series.raw.ordered(seconds)
+                ticks = np.arange(series.last_tick - len(values) + 1, series.last_tick + 1)
+                return self.tick_times[ticks % HISTORY_SECONDS], values
+            i = [s for s, _ in HISTORY_ROLLUPS].index(rollup)
+            ring = series.rollups[i]
+            values = ring.ordered(max(1, seconds // rollup))
+            last_bucket = (self.tick + 1) // rollup - 1 # Dernier point agrégé terminé
+            buckets = np.arange(last_bucket - len(values) + 1, last_bucket + 1)
+            return self.bucket_times[i][buckets % HISTORY_ROLLUPS[i][1]], values
+
+    def export(self, path, rollup=None):
+        """Écrit l'historique de tous les processus suivis en CSV, ou en Parquet (extension .parquet, pyarrow requis)."""
+        seconds = HISTORY_SECONDS if rollup is None else rollup * dict(HISTORY_ROLLUPS)[rollup]
+        parts = []
+        with self.lock:
+            tracked = list(self.series.values())
+        for series in tracked:
+            times, values = self.window(series, seconds, rollup)
+            parts.append((series.key[0], series.name, times, values))
+        if path.lower().endswith(".parquet"):
+            if pq is None:
+                raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow).")
+            columns = {
+                'timestamp': pa.array((np.concatenate([t for _, _, t, _ in parts] or [[]]) * 1e6).astype(np.int64)).cast(pa.timestamp('us')),
+                'pid': pa.array(np.concatenate([np.full(len(t), pid) for pid, _, t, _ in parts] or [[]]), pa.int32()),
+                'name': pa.array([name for _, name, t, _ in parts for _ in range(len(t))], pa.string()),
+            }
+            values = np.concatenate([v for _, _, _, v in parts] or [np.empty((0, len(HISTORY_METRICS)), np.float32)])
+            for i, metric in enumerate(HISTORY_METRICS):
+                columns[metric] = pa.array(values[:, i], pa.float32())
+            pq.write_table(pa.table(columns), path)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(['timestamp', 'pid', 'name'] + HISTORY_METRICS)
+                for pid, name, times, values in parts:
+                    for t, row in zip(times, values.tolist()):
+                        writer.writerow([datetime.fromtimestamp(t).isoformat(timespec='seconds'), pid, name]
+                                        + ["" if np.isnan(v) else f"{v:.3f}" for v in row])
+        return sum(len(t) for _, _, t, _ in parts)
+
 class ProcessMonitorApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -66,7 +486,7 @@ class ProcessMonitorApp(ctk.CTk):
 
         self.refresh_button = ctk.CTkButton(self.control_frame,
                                             text="Rafraîchir Maintenant",
-                                            command=self.update_process_list_display,
+                                            command=self.refresh_now,
                                             font=ctk.CTkFont(size=14),
                                             height=40)
         self.refresh_button.grid(row=0, column=2, padx=10, pady=5, sticky="ew")
@@ -128,11 +548,23 @@ class ProcessMonitorApp(ctk.CTk):
         self.tab_view.add("Activité Réseau") 
 
         # --- Tab 1: Process List Display ---
-        self.process_list_textbox = ctk.CTkTextbox(self.tab_view.tab("Liste des Processus"), wrap="none", font=ctk.CTkFont(family="Consolas", size=12))
-        self.process_list_textbox.pack(fill="both", expand=True)
+        self.process_list_scrollbar = ctk.CTkScrollbar(self.tab_view.tab("Liste des Processus"))
+        self.process_list_scrollbar.pack(side="right", fill="y")
+        self.process_list_textbox = ctk.CTkTextbox(self.tab_view.tab("Liste des Processus"), wrap="none", font=ctk.CTkFont(family="Consolas", size=12),
+                                                   activate_scrollbars=False) # Défilement géré par la vue virtualisée
+        self.process_list_textbox.pack(side="left", fill="both", expand=True)
         self.process_list_textbox.bind("<Button-1>", self.on_process_list_click)
 
         # --- Tab 2: Detailed Process Information ---
+        self.details_toolbar = ctk.CTkFrame(self.tab_view.tab("Détails du Processus"))
+        self.details_toolbar.pack(fill="x", padx=5, pady=(5, 0))
+        self.history_window = "10 min" # Fenêtre des courbes ; lue aussi par le thread qui prépare les détails
+        self.history_window_selector = ctk.CTkSegmentedButton(self.details_toolbar, values=list(HISTORY_WINDOWS),
+                                                              command=self.on_history_window_change)
+        self.history_window_selector.set(self.history_window)
+        self.history_window_selector.pack(side="left", padx=5, pady=5)
+        self.export_history_button = ctk.CTkButton(self.details_toolbar, text="Exporter l'historique", command=self.export_history)
+        self.export_history_button.pack(side="right", padx=5, pady=5)
         self.details_textbox = ctk.CTkTextbox(self.tab_view.tab("Détails du Processus"), wrap="word", font=ctk.CTkFont(family="Consolas", size=12))
         self.details_textbox.pack(fill="both", expand=True)
         self.details_textbox.insert(ctk.END, "Sélectionnez un processus dans la liste pour voir les détails ici.")
@@ -212,9 +644,20 @@ class ProcessMonitorApp(ctk.CTk):
         self.network_activity_textbox.insert(ctk.END, "Statistiques réseau et connexions apparaîtront ici.")
         self.network_activity_textbox.configure(state="disabled") 
         
+        # Tableau virtualisé : seules les lignes visibles sont dans le Textbox
+        self.process_view = ProcessTableView(self.process_list_textbox, self.process_list_scrollbar)
+        self.process_list_scrollbar.configure(command=self.process_view.on_scrollbar)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.process_list_textbox.bind(sequence, self.process_view.on_mousewheel)
+        self.process_list_textbox.bind("<Configure>", self.process_view.on_resize)
+        # Collecte en arrière-plan ; le thread Tk ne fait qu'afficher le dernier instantané
+        self.process_history = ProcessHistory() # Séries par processus, alimentées par le collecteur
+        self.process_collector = ProcessCollector(on_snapshot=lambda: self.after(0, self.on_process_snapshot),
+                                                  history=self.process_history)
+
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-        self.process_list_textbox.insert(ctk.END, "Cliquez sur 'Démarrer le Moniteur' pour commencer à lister les processus...")
+        self.process_view.show_message("Cliquez sur 'Démarrer le Moniteur' pour commencer à lister les processus...")
 
     def toggle_monitoring(self):
         if not self.monitoring_active:
@@ -233,17 +676,18 @@ class ProcessMonitorApp(ctk.CTk):
             self.kill_button.configure(state="disabled")
             self.trace_syscalls_button.configure(state="disabled")
             self.disassemble_exe_button.configure(state="disabled")
-            self.process_list_textbox.delete("1.0", ctk.END)
-            self.process_list_textbox.insert(ctk.END, "Moniteur arrêté. Cliquez sur 'Démarrer le Moniteur' pour relancer.")
+            self.process_view.show_message("Moniteur arrêté. Cliquez sur 'Démarrer le Moniteur' pour relancer.")
             print("Moniteur de processus arrêté.")
 
     def start_monitoring(self):
         self.monitoring_active = True
         self.process_refresh_thread = threading.Thread(target=self._refresh_processes_loop, daemon=True)
         self.process_refresh_thread.start()
+        self.process_collector.start() # La liste des processus a son propre thread, voir on_process_snapshot
 
     def stop_monitoring(self):
         self.monitoring_active = False
+        self.process_collector.stop()
         if self.process_refresh_thread and self.process_refresh_thread.is_alive():
             time.sleep(0.1)
         self.stop_syscall_tracing() 
@@ -251,47 +695,27 @@ class ProcessMonitorApp(ctk.CTk):
 
     def _refresh_processes_loop(self):
         while self.monitoring_active:
-            self.after(0, self.update_process_list_display)
-            if self.selected_pid:
-                self.after(0, self.update_selected_process_details)
+            p = self.selected_process_obj
+            if p:
+                details = self.format_process_details(p) # Lu ici, hors du thread Tk
+                self.after(0, self.show_process_details, p, details)
             self.after(0, self.fetch_and_store_network_data) # Fetch and store, then filtering happens
             time.sleep(1)
 
     def update_process_list_display(self):
-        self.process_list_textbox.delete("1.0", ctk.END)
-        
-        header = f"{'PID':<8} {'Status':<10} {'CPU%':<8} {'Mem (MB)':<12} {'Nom':<30} {'Utilisateur':<20}\n"
-        self.process_list_textbox.insert(ctk.END, header)
-        self.process_list_textbox.insert(ctk.END, "-" * 100 + "\n")
+        """Affiche le dernier instantané du collecteur : seules les lignes visibles qui ont changé sont réécrites."""
+        self.process_view.set_rows(self.process_collector.snapshot)
 
-        processes = []
-        for p in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_info', 'username']):
-            try:
-                cpu_percent = p.cpu_percent(interval=None)
-                mem_info = p.memory_info()
-                mem_usage_mb = mem_info.rss / (1024 * 1024)
-
-                processes.append({
-                    'pid': p.pid,
-                    'name': p.name(),
-                    'status': p.status(),
-                    'cpu_percent': cpu_percent,
-                    'mem_usage_mb': mem_usage_mb,
-                    'username': p.username()
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-            except Exception as e:
-                print(f"Erreur lors de la récupération des infos processus: {e} pour PID {p.pid}")
-                continue
-        
-        processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
+    def on_process_snapshot(self):
+        if self.monitoring_active: # Un instantané arrivé après l'arrêt n'écrase pas le message
+            self.update_process_list_display()
 
-        for proc in processes:
-            line = f"{proc['pid']:<8} {proc['status']:<10} {proc['cpu_percent']:<8.1f} {proc['mem_usage_mb']:<12.1f} {proc['name']:<30} {proc['username']:<20}\n"
-            self.process_list_textbox.insert(ctk.END, line)
-            
-        self.process_list_textbox.yview_moveto(0)
+    def refresh_now(self):
+        """Collecte immédiate hors du thread Tk (bouton "Rafraîchir", après un arrêt de processus), puis affichage."""
+        def collect():
+            self.process_collector.collect()
+            self.after(0, self.update_process_list_display)
+        threading.Thread(target=collect, daemon=True).start()
 
     def on_process_list_click(self, event):
         try:
@@ -310,6 +734,8 @@ class ProcessMonitorApp(ctk.CTk):
                 return
 
             self.selected_pid = new_selected_pid
+            self.process_view.selected_pid = self.selected_pid # La vue garde le surlignage sur ce PID
+            self.process_history.pin(self.selected_pid) # Suivi même si l'historique est plein
             
             try:
                 self.selected_process_obj = psutil.Process(self.selected_pid)
@@ -344,6 +770,9 @@ class ProcessMonitorApp(ctk.CTk):
         self.trace_syscalls_button.configure(state="disabled")
         self.disassemble_exe_button.configure(state="disabled")
         self.process_list_textbox.tag_remove("highlight", "1.0", ctk.END)
+        self.process_view.selected_pid = None
+        self.process_view.highlighted = None
+        self.process_history.pin(None)
         self.details_textbox.delete("1.0", ctk.END)
         self.details_textbox.insert(ctk.END, "Sélectionnez un processus dans la liste pour voir les détails.")
         self.stop_syscall_tracing()
@@ -373,15 +802,23 @@ class ProcessMonitorApp(ctk.CTk):
         }
 
     def update_selected_process_details(self):
-        """Populates the details textbox with comprehensive info for the selected process."""
-        if not self.selected_process_obj:
+        """Rafraîchit l'onglet Détails sans bloquer le thread Tk : les informations sont lues dans un thread, puis affichées."""
+        p = self.selected_process_obj
+        if not p:
             self.details_textbox.delete("1.0", ctk.END)
             self.details_textbox.insert(ctk.END, "Sélectionnez un processus pour voir les détails.")
             return
+        threading.Thread(target=lambda: self.after(0, self.show_process_details, p, self.format_process_details(p)), daemon=True).start()
 
+    def show_process_details(self, p, details):
+        if p is not self.selected_process_obj: # Sélection changée pendant la lecture
+            return
         self.details_textbox.delete("1.0", ctk.END)
+        self.details_textbox.insert(ctk.END, details)
+
+    def format_process_details(self, p):
+        """Texte complet de l'onglet Détails pour le processus p (appels psutil : à exécuter hors du thread Tk)."""
         try:
-            p = self.selected_process_obj
             details = []
             
             details.append(f"--- Informations Générales (PID: {p.pid}) ---")
@@ -397,11 +834,17 @@ class ProcessMonitorApp(ctk.CTk):
             details.append(f"Nombre de descripteurs de fichiers: {p.num_fds()}")
             
             details.append(f"\n--- Utilisation des Ressources ---")
-            details.append(f"CPU%: {p.cpu_percent(interval=0.1):.2f}%")
+            series = self.process_history.find(p.pid, p.create_time())
+            latest = self.process_history.window(series, 1)[1] if series else []
+            if len(latest):
+                details.append(f"CPU%: {latest[-1][0]:.2f}% (dernière collecte)")
+            else:
+                details.append("CPU%: N/A (mesuré à la prochaine collecte du moniteur)")
             mem_info = p.memory_info()
             details.append(f"Mémoire RSS: {mem_info.rss / (1024 * 1024):.2f} MB")
             details.append(f"Mémoire VMS: {mem_info.vms / (1024 * 1024):.2f} MB")
             details.append(f"E/S (Lu/Écrit): {p.io_counters().read_bytes / (1024*1024):.2f} MB / {p.io_counters().write_bytes / (1024*1024):.2f} MB")
+            details.extend(self.format_process_history(series))
 
             details.append(f"\n--- Fichiers Ouverts ---")
             open_files = p.open_files()
@@ -425,16 +868,64 @@ class ProcessMonitorApp(ctk.CTk):
             except psutil.AccessDenied:
                 details.append("Accès refusé pour lister les connexions. Exécutez en tant qu'administrateur (sudo).")
 
-
-            self.details_textbox.insert(ctk.END, "\n".join(details))
+            return "\n".join(details)
 
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
-            self.details_textbox.delete("1.0", ctk.END)
-            self.details_textbox.insert(ctk.END, f"Impossible d'obtenir les détails du processus (PID: {self.selected_pid}): {e}\n"
-                                                 "Il a peut-être terminé ou vous n'avez pas les permissions nécessaires.")
+            return (f"Impossible d'obtenir les détails du processus (PID: {p.pid}): {e}\n"
+                    "Il a peut-être terminé ou vous n'avez pas les permissions nécessaires.")
         except Exception as e:
-            self.details_textbox.delete("1.0", ctk.END)
-            self.details_textbox.insert(ctk.END, f"Une erreur inattendue est survenue lors de l'obtention des détails: {e}")
+            return f"Une erreur inattendue est survenue lors de l'obtention des détails: {e}"
+
+    def format_process_history(self, series):
+        """Courbes de la fenêtre choisie, une ligne par métrique, et mémoire occupée par l'historique."""
+        label = self.history_window
+        seconds, rollup = HISTORY_WINDOWS[label]
+        history = self.process_history
+        if series is None:
+            lines = [f"\n--- Historique ({label}) ---",
+                     "Pas encore d'historique : le processus est suivi dès la prochaine collecte (moniteur démarré)."]
+        else:
+            _, values = history.window(series, seconds, rollup)
+            step = "1 point/s" if rollup is None else f"moyennes sur {rollup} s"
+            lines = [f"\n--- Historique ({label}, {step}, {len(values)} points) ---"]
+            for i, name in enumerate(HISTORY_LABELS):
+                column = values[:, i]
+                valid = column[~np.isnan(column)]
+                if len(valid) == 0:
+                    lines.append(f"{name:<16} N/A (aucune mesure ou accès refusé)")
+                    continue
+                lines.append(f"{name:<16} {sparkline(column):<{SPARKLINE_WIDTH}}  min {valid.min():.1f}  moy {valid.mean():.1f}  max {valid.max():.1f}")
+        per_process = history.max_bytes_per_process()
+        lines.append(f"Mémoire de l'historique : {len(history.series)} processus suivis, {history.memory_bytes() / (1024 * 1024):.1f} Mo"
+                     f" (au plus {per_process / 1024:.0f} Ko par processus, {history.max_processes * per_process / (1024 * 1024):.0f} Mo"
+                     f" pour {history.max_processes} processus), dernière mise à jour en {history.record_ms:.1f} ms")
+        return lines
+
+    def on_history_window_change(self, label):
+        self.history_window = label
+        self.update_selected_process_details()
+
+    def export_history(self):
+        """Exporte l'historique de tous les processus suivis : 1 point/s sur 1 h, ou moyennes par minute pour "24 h"."""
+        filetypes = [("CSV", "*.csv")] + ([("Parquet", "*.parquet")] if pq is not None else [])
+        path = filedialog.asksaveasfilename(title="Exporter l'historique", defaultextension=".csv", filetypes=filetypes,
+                                            initialfile=f"historique_processus_{datetime.now():%Y%m%d_%H%M%S}.csv")
+        if not path:
+            return
+        rollup = HISTORY_WINDOWS[self.history_window][1]
+        self.status_label.configure(text="Export de l'historique en cours...", text_color="orange")
+
+        def export():
+            try:
+                count = self.process_history.export(path, rollup)
+                self.after(0, lambda: self.status_label.configure(text=f"Historique exporté : {count} points ({os.path.basename(path)})", text_color="green"))
+            except Exception as e: # Fichier, conversion Parquet... : le statut ne doit pas rester "en cours"
+                self.after(0, lambda error=e: self.on_history_export_failed(error))
+        threading.Thread(target=export, daemon=True).start()
+
+    def on_history_export_failed(self, error):
+        self.status_label.configure(text="Échec de l'export de l'historique.", text_color="red")
+        CTkMessagebox.showerror("Erreur d'export", f"Impossible d'exporter l'historique : {error}")
 
     def kill_selected_process(self):
         if self.selected_pid is None:
@@ -452,7 +943,7 @@ class ProcessMonitorApp(ctk.CTk):
             if response == "yes":
                 process.terminate()
                 self.status_label.configure(text=f"Tentative d'arrêt de {self.selected_pid}...", text_color="orange")
-                self.after(500, self.update_process_list_display)
+                self.after(500, self.refresh_now)
                 self.reset_selected_process()
             else:
                 self.status_label.configure(text="Opération annulée.", text_color="grey")
@@ -1,5 +1,8 @@
 import socket
 import threading
+import struct
+import math
+import time
 import pyaudio
 import numpy as np
 import tkinter as tk
@@ -10,6 +13,249 @@ FORMAT = pyaudio.paFloat32  # Format audio (peut être ajusté : paInt16, paFloa
 CHANNELS = 1                # Nombre de canaux (mono)
 RATE = 44100                # Fréquence d'échantillonnage (Hz)
 CHUNK_SIZE = 1024           # Taille du bloc audio à traiter
+AUDIO_DTYPE = np.float32    # Type NumPy correspondant à FORMAT
+
+# --- Trames audio numérotées et tampon de gigue ---
+# En-tête de chaque trame audio : numéro de séquence, horodatage de capture (time.time() de l'émetteur), longueur
+AUDIO_FRAME_HEADER = struct.Struct("!IdH")
+# Premier message du client sur la connexion audio TCP : transport choisi ('T' ou 'U') + port UDP du client
+AUDIO_HELLO = struct.Struct("!cH")
+AUDIO_TRANSPORT_TCP = b'T'
+AUDIO_TRANSPORT_UDP = b'U'
+AUDIO_FRAME_DURATION = CHUNK_SIZE / RATE
+JITTER_MIN_FRAMES = 2       # Profondeur minimale du tampon de gigue (en trames)
+JITTER_MAX_FRAMES = 20      # Profondeur maximale (~460 ms)
+JITTER_DRIFT_MARGIN = 3     # Trames au-dessus de la cible avant d'en sauter une pour réduire la latence
+PLC_MAX_FRAMES = 3          # Trames perdues masquées par répétition atténuée avant de passer au silence
+AUDIO_STATS_INTERVAL = 5    # Secondes entre deux rapports (latence, profondeur, sous-alimentations)
+
+def recv_exact(sock, size):
+    """Lit exactement size octets sur un socket TCP ; None si la connexion est fermée avant."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return None
+        received += n
+    return bytes(buffer)
+
+def unpack_audio_frame(data):
+    """(séquence, horodatage, données) d'une trame reçue en un bloc (datagramme UDP)."""
+    seq, timestamp, length = AUDIO_FRAME_HEADER.unpack_from(data)
+    return seq, timestamp, data[AUDIO_FRAME_HEADER.size:AUDIO_FRAME_HEADER.size + length]
+
+class AudioTransport:
+    """
+    Envoi et réception des trames audio d'un appel.
+    Par défaut les trames passent sur la connexion TCP (en-tête + données) ; avec l'option UDP, chaque trame
+    est un datagramme, ce qui évite qu'un paquet perdu bloque les suivants (blocage en tête de file de TCP).
+    La connexion TCP reste ouverte dans les deux cas.
+    """
+    def __init__(self, tcp_sock, udp_sock=None, udp_peer=None):
+        self.tcp_sock = tcp_sock
+        self.udp_sock = udp_sock
+        self.udp_peer = udp_peer
+        # Adresse source attendue des datagrammes (nom d'hôte résolu une fois) : les autres sont ignorés
+        self.udp_source = (socket.gethostbyname(udp_peer[0]), udp_peer[1]) if udp_peer else None
+        self.seq = 0
+        self.send_lock = threading.Lock()
+        if udp_sock:
+            udp_sock.settimeout(0.5) # Pour revérifier régulièrement les indicateurs d'arrêt
+
+    @property
+    def name(self):
+        return "UDP" if self.udp_sock else "TCP"
+
+    def send(self, payload):
+        with self.send_lock:
+            frame = AUDIO_FRAME_HEADER.pack(self.seq, time.time(), len(payload)) + payload
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            if self.udp_sock:
+                self.udp_sock.sendto(frame, self.udp_peer)
+            else:
+                self.tcp_sock.sendall(frame)
+
+    def receive(self):
+        """
+        Trame suivante (séquence, horodatage, données), ou None si le pair a fermé la connexion.
+        En UDP, lève socket.timeout quand rien n'arrive pendant 0,5 s ; les datagrammes tronqués ou venus d'une
+        autre adresse que le pair sont ignorés (le tampon de gigue masque la trame manquante).
+        """
+        if self.udp_sock:
+            while True:
+                data, source = self.udp_sock.recvfrom(65535)
+                if source != self.udp_source:
+                    continue
+                try:
+                    return unpack_audio_frame(data)
+                except struct.error:
+                    continue
+        header = recv_exact(self.tcp_sock, AUDIO_FRAME_HEADER.size)
+        if header is None:
+            return None
+        seq, timestamp, length = AUDIO_FRAME_HEADER.unpack(header)
+        payload = recv_exact(self.tcp_sock, length)
+        if payload is None:
+            return None
+        return seq, timestamp, payload
+
+    def close(self):
+        try: self.tcp_sock.shutdown(socket.SHUT_RDWR) # Débloque un recv en cours dans l'autre thread
+        except OSError: pass
+        for sock in (self.udp_sock, self.tcp_sock):
+            if sock:
+                try: sock.close()
+                except OSError: pass
+
+def connect_audio_transport(client_socket, peer_ip, audio_port, use_udp):
+    """Côté client : annonce le transport choisi sur la connexion TCP déjà établie et renvoie l'AudioTransport."""
+    if not use_udp:
+        client_socket.sendall(AUDIO_HELLO.pack(AUDIO_TRANSPORT_TCP, 0))
+        return AudioTransport(client_socket)
+    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_sock.bind(('', 0))
+    client_socket.sendall(AUDIO_HELLO.pack(AUDIO_TRANSPORT_UDP, udp_sock.getsockname()[1]))
+    return AudioTransport(client_socket, udp_sock, (peer_ip, audio_port))
+
+def accept_audio_transport(conn, addr, audio_port):
+    """Côté serveur : lit l'annonce du client et renvoie l'AudioTransport correspondant (UDP sur le même numéro de port)."""
+    hello = recv_exact(conn, AUDIO_HELLO.size)
+    if hello is None:
+        return None
+    transport, udp_port = AUDIO_HELLO.unpack(hello)
+    if transport != AUDIO_TRANSPORT_UDP:
+        return AudioTransport(conn)
+    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    udp_sock.bind(('', audio_port))
+    return AudioTransport(conn, udp_sock, (addr[0], udp_port))
+
+class AudioJitterBuffer:
+    """
+    Tampon de gigue adaptatif côté réception.
+    Les trames sont rangées par numéro de séquence et jouées dans l'ordre. La profondeur cible suit la gigue
+    mesurée (estimateur de la RFC 3550) entre JITTER_MIN_FRAMES et JITTER_MAX_FRAMES. Une trame manquante est
+    masquée par la précédente atténuée, une trame arrivée trop tard est ignorée, et au-delà de la cible
+    + JITTER_DRIFT_MARGIN une trame est sautée pour ne pas laisser la latence grandir.
+    La latence mesurée (lecture - capture) suppose des horloges synchronisées entre les deux machines (NTP).
+    """
+    def __init__(self, frame_bytes, dtype):
+        self.frame_bytes = frame_bytes
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self.frames = {}        # séquence -> (horodatage, données)
+        self.next_seq = None
+        self.playing = False    # False pendant le pré-remplissage
+        self.jitter = 0.0       # Gigue estimée, en secondes
+        self.last_transit = None
+        self.last_frame = None
+        self.concealed_run = 0
+        self.counters = {"played": 0, "underruns": 0, "concealed": 0, "late": 0, "skipped": 0}
+        self.latency = None     # Latence capture -> lecture (moyenne glissante), en secondes
+
+    def target_frames(self):
+        return min(JITTER_MAX_FRAMES, max(JITTER_MIN_FRAMES, math.ceil(3 * self.jitter / AUDIO_FRAME_DURATION) + 1))
+
+    def push(self, seq, timestamp, payload):
+        arrival = time.time()
+        with self.lock:
+            transit = arrival - timestamp
+            if self.last_transit is not None:
+                self.jitter += (abs(transit - self.last_transit) - self.jitter) / 16
+            self.last_transit = transit
+            if len(payload) != self.frame_bytes:
+                return
+            if self.next_seq is not None and seq < self.next_seq:
+                self.counters["late"] += 1
+                return
+            self.frames[seq] = (timestamp, payload)
+            if len(self.frames) > 2 * JITTER_MAX_FRAMES: # Lecture arrêtée ou rafale : on borne la mémoire
+                del self.frames[min(self.frames)]
+                self.counters["skipped"] += 1
+
+    def pop(self):
+        """Données de la prochaine trame à jouer, ou None pendant le pré-remplissage."""
+        with self.lock:
+            if not self.playing:
+                if len(self.frames) < self.target_frames():
+                    return None
+                self.playing = True
+                self.next_seq = min(self.frames)
+            if not self.frames:
+                # Sous-alimentation : on masque cette trame puis on re-remplit jusqu'à la cible
+                self.counters["underruns"] += 1
+                self.playing = False
+                return self._conceal()
+            oldest = min(self.frames)
+            if oldest - self.next_seq > JITTER_MAX_FRAMES: # Saut de séquence (émetteur redémarré...)
+                self.next_seq = oldest
+            if len(self.frames) > self.target_frames() + JITTER_DRIFT_MARGIN:
+                self.frames.pop(self.next_seq, None)
+                self.next_seq += 1
+                self.counters["skipped"] += 1
+            entry = self.frames.pop(self.next_seq, None)
+            self.next_seq += 1
+            if entry is None:
+                return self._conceal()
+            timestamp, payload = entry
+            latency = time.time() - timestamp
+            self.latency = latency if self.latency is None else self.latency + (latency - self.latency) / 16
+            self.last_frame = payload
+            self.concealed_run = 0
+            self.counters["played"] += 1
+            return payload
+
+    def _conceal(self):
+        self.counters["concealed"] += 1
+        self.concealed_run += 1
+        if self.last_frame is None or self.concealed_run > PLC_MAX_FRAMES:
+            return bytes(self.frame_bytes) # Silence
+        samples = np.frombuffer(self.last_frame, dtype=self.dtype) * (0.5 ** self.concealed_run)
+        return samples.astype(self.dtype).tobytes()
+
+    def stats(self):
+        """Latence, profondeur, gigue et compteurs (lecture seule, appelable depuis n'importe quel thread)."""
+        with self.lock:
+            latency_ms = (self.latency or 0.0) * 1000
+            return dict(self.counters, latency_ms=latency_ms, depth=len(self.frames),
+                        target=self.target_frames(), jitter_ms=self.jitter * 1000)
+
+def format_audio_stats(stats):
+    return (f"latence {stats['latency_ms']:.0f} ms | tampon {stats['depth']}/{stats['target']} trames | "
+            f"gigue {stats['jitter_ms']:.1f} ms | sous-alim. {stats['underruns']} | masquées {stats['concealed']} | "
+            f"en retard {stats['late']}")
+
+def play_from_jitter_buffer(transport, jitter_buffer, write, is_active, label):
+    """
+    Réception et lecture d'un flux audio : un thread lit les trames du réseau vers le tampon de gigue,
+    cette fonction les joue au rythme du périphérique de sortie (write bloque jusqu'à ce qu'il y ait de la place).
+    """
+    def network_reader():
+        while is_active():
+            try:
+                frame = transport.receive()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if frame is None:
+                print(f"{label}: fin du flux audio.")
+                break
+            jitter_buffer.push(*frame)
+    reader = threading.Thread(target=network_reader, daemon=True)
+    reader.start()
+    last_report = time.time()
+    while is_active() and (reader.is_alive() or jitter_buffer.frames):
+        payload = jitter_buffer.pop()
+        if payload is None:
+            time.sleep(AUDIO_FRAME_DURATION / 4)
+            continue
+        write(payload)
+        if time.time() - last_report >= AUDIO_STATS_INTERVAL:
+            last_report = time.time()
+            print(f"{label} [{transport.name}]: {format_audio_stats(jitter_buffer.stats())}")
 
 # --- Variables globales ---
 calling = False
@@ -21,7 +267,7 @@ peer_ip = ""
 peer_port = 12345 # Port par défaut
 
 # --- Fonction d'envoi audio ---
-def send_audio(client_socket):
+def send_audio(transport):
     global calling, p_audio, stream_in
     try:
         # Initialiser PyAudio si ce n'est pas déjà fait
@@ -33,10 +279,10 @@ def send_audio(client_socket):
                                  rate=RATE,
                                  input=True,
                                  frames_per_buffer=CHUNK_SIZE)
-        print("Enregistrement et envoi audio...")
+        print(f"Enregistrement et envoi audio ({transport.name})...")
         while calling:
             data = stream_in.read(CHUNK_SIZE, exception_on_overflow=False)
-            client_socket.sendall(data)
+            transport.send(data) # Trame numérotée et horodatée
     except Exception as e:
         print(f"Erreur lors de l'envoi audio: {e}")
         stop_call()
@@ -49,7 +295,7 @@ def send_audio(client_socket):
         # La fermeture se fera dans stop_call()
 
 # --- Fonction de réception audio ---
-def receive_audio(conn, addr):
+def receive_audio(transport, addr):
     global receiving, p_audio, stream_out
     try:
         # Initialiser PyAudio si ce n'est pas déjà fait
@@ -61,12 +307,9 @@ def receive_audio(conn, addr):
                                   rate=RATE,
                                   output=True,
                                   frames_per_buffer=CHUNK_SIZE)
-        print(f"Réception audio de {addr}...")
-        while receiving:
-            data = conn.recv(CHUNK_SIZE * p_audio.get_sample_size(FORMAT))
-            if not data:
-                break
-            stream_out.write(data)
+        print(f"Réception audio de {addr} ({transport.name})...")
+        jitter_buffer = AudioJitterBuffer(CHUNK_SIZE * p_audio.get_sample_size(FORMAT), AUDIO_DTYPE)
+        play_from_jitter_buffer(transport, jitter_buffer, stream_out.write, lambda: receiving, f"Audio {addr[0]}")
     except Exception as e:
         print(f"Erreur lors de la réception audio: {e}")
         stop_call()
@@ -75,13 +318,12 @@ def receive_audio(conn, addr):
             stream_out.stop_stream()
             stream_out.close()
             stream_out = None
-        if conn:
-            conn.close()
+        transport.close()
         # Ne fermez pas p_audio ici
 
 # --- Fonction de démarrage d'appel (client) ---
 def start_call_client():
-    global calling, peer_ip, peer_port, p_audio
+    global calling, receiving, peer_ip, peer_port, p_audio
     peer_ip = entry_peer_ip.get()
     try:
         peer_port = int(entry_peer_port.get())
@@ -97,6 +339,7 @@ def start_call_client():
     try:
         print(f"Tentative de connexion à {peer_ip}:{peer_port}...")
         client_socket.connect((peer_ip, peer_port))
+        transport = connect_audio_transport(client_socket, peer_ip, peer_port, use_udp_var.get())
         messagebox.showinfo("Connexion établie", f"Connecté à {peer_ip}:{peer_port}")
         calling = True
         receiving = True
@@ -105,8 +348,8 @@ def start_call_client():
         if p_audio is None:
             p_audio = pyaudio.PyAudio()
 
-        threading.Thread(target=send_audio, args=(client_socket,)).start()
-        threading.Thread(target=receive_audio, args=(client_socket, ("client", 0))).start() # (client, 0) pour simuler addr
+        threading.Thread(target=send_audio, args=(transport,)).start()
+        threading.Thread(target=receive_audio, args=(transport, (peer_ip, peer_port))).start()
         btn_call.config(state=tk.DISABLED)
         btn_listen.config(state=tk.DISABLED)
         btn_stop.config(state=tk.NORMAL)
@@ -147,11 +390,14 @@ def start_listen_server():
             try:
                 conn, addr = server_socket.accept()
                 print(f"Connexion acceptée de {addr}")
+                transport = accept_audio_transport(conn, addr, peer_port)
+                if transport is None:
+                    raise ConnectionError("le pair s'est déconnecté avant d'annoncer son transport audio")
                 messagebox.showinfo("Connexion acceptée", f"Connexion entrante de {addr[0]}")
                 calling = True
                 receiving = True
-                threading.Thread(target=send_audio, args=(conn,)).start()
-                threading.Thread(target=receive_audio, args=(conn, addr)).start()
+                threading.Thread(target=send_audio, args=(transport,)).start()
+                threading.Thread(target=receive_audio, args=(transport, addr)).start()
             except Exception as e:
                 messagebox.showerror("Erreur serveur", f"Erreur lors de l'acceptation de la connexion: {e}")
                 stop_call()
@@ -211,6 +457,9 @@ entry_peer_port.insert(0, str(peer_port))
 btn_call = tk.Button(frame_client, text="Appeler", command=start_call_client)
 btn_call.pack(side=tk.RIGHT, padx=5, pady=5)
 
+use_udp_var = tk.BooleanVar(value=False) # Audio en UDP : pas de blocage en tête de file, les pertes sont masquées
+tk.Checkbutton(frame_client, text="UDP", variable=use_udp_var).pack(side=tk.RIGHT, padx=5, pady=5)
+
 # Cadre pour l'écoute serveur
 frame_server = tk.LabelFrame(root, text="Attendre un appel")
 frame_server.pack(padx=10, pady=10, fill="x")
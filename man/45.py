@@ -1,5 +1,7 @@
 import socket
 import threading
+import struct
+import math
 import cv2
 import numpy as np
 import customtkinter as ctk # Pour l'interface graphique moderne
@@ -7,6 +9,7 @@ import tkinter as tk        # Pour PhotoImage (utilisé pour l'affichage sans PI
 from tkinter import messagebox
 import time
 import io # Nécessaire pour gérer les données binaires en mémoire pour PhotoImage
+from collections import deque
 
 # --- Paramètres Audio (PyAudio) ---
 import pyaudio
@@ -14,6 +17,249 @@ FORMAT = pyaudio.paInt16    # Format des échantillons audio (16-bit entiers)
 CHANNELS = 1                # Nombre de canaux (Mono)
 RATE = 44100                # Fréquence d'échantillonnage (44.1 kHz, qualité CD)
 CHUNK_SIZE = 1024           # Taille des échantillons audio à traiter à la fois
+AUDIO_DTYPE = np.int16      # Type NumPy correspondant à FORMAT
+
+# --- Trames audio numérotées et tampon de gigue ---
+# En-tête de chaque trame audio : numéro de séquence, horodatage de capture (time.time() de l'émetteur), longueur
+AUDIO_FRAME_HEADER = struct.Struct("!IdH")
+# Premier message du client sur la connexion audio TCP : transport choisi ('T' ou 'U') + port UDP du client
+AUDIO_HELLO = struct.Struct("!cH")
+AUDIO_TRANSPORT_TCP = b'T'
+AUDIO_TRANSPORT_UDP = b'U'
+AUDIO_FRAME_DURATION = CHUNK_SIZE / RATE
+JITTER_MIN_FRAMES = 2       # Profondeur minimale du tampon de gigue (en trames)
+JITTER_MAX_FRAMES = 20      # Profondeur maximale (~460 ms)
+JITTER_DRIFT_MARGIN = 3     # Trames au-dessus de la cible avant d'en sauter une pour réduire la latence
+PLC_MAX_FRAMES = 3          # Trames perdues masquées par répétition atténuée avant de passer au silence
+AUDIO_STATS_INTERVAL = 5    # Secondes entre deux rapports (latence, profondeur, sous-alimentations)
+
+def recv_exact(sock, size):
+    """Lit exactement size octets sur un socket TCP ; None si la connexion est fermée avant."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return None
+        received += n
+    return bytes(buffer)
+
+def unpack_audio_frame(data):
+    """(séquence, horodatage, données) d'une trame reçue en un bloc (datagramme UDP)."""
+    seq, timestamp, length = AUDIO_FRAME_HEADER.unpack_from(data)
+    return seq, timestamp, data[AUDIO_FRAME_HEADER.size:AUDIO_FRAME_HEADER.size + length]
+
+class AudioTransport:
+    """
+    Envoi et réception des trames audio d'un appel.
+    Par défaut les trames passent sur la connexion TCP (en-tête + données) ; avec l'option UDP, chaque trame
+    est un datagramme, ce qui évite qu'un paquet perdu bloque les suivants (blocage en tête de file de TCP).
+    La connexion TCP reste ouverte dans les deux cas.
+    """
+    def __init__(self, tcp_sock, udp_sock=None, udp_peer=None):
+        self.tcp_sock = tcp_sock
+        self.udp_sock = udp_sock
+        self.udp_peer = udp_peer
+        # Adresse source attendue des datagrammes (nom d'hôte résolu une fois) : les autres sont ignorés
+        self.udp_source = (socket.gethostbyname(udp_peer[0]), udp_peer[1]) if udp_peer else None
+        self.seq = 0
+        self.send_lock = threading.Lock()
+        if udp_sock:
+            udp_sock.settimeout(0.5) # Pour revérifier régulièrement les indicateurs d'arrêt
+
+    @property
+    def name(self):
+        return "UDP" if self.udp_sock else "TCP"
+
+    def send(self, payload):
+        with self.send_lock:
+            frame = AUDIO_FRAME_HEADER.pack(self.seq, time.time(), len(payload)) + payload
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            if self.udp_sock:
+                self.udp_sock.sendto(frame, self.udp_peer)
+            else:
+                self.tcp_sock.sendall(frame)
+
+    def receive(self):
+        """
+        Trame suivante (séquence, horodatage, données), ou None si le pair a fermé la connexion.
+        En UDP, lève socket.timeout quand rien n'arrive pendant 0,5 s ; les datagrammes tronqués ou venus d'une
+        autre adresse que le pair sont ignorés (le tampon de gigue masque la trame manquante).
+        """
+        if self.udp_sock:
+            while True:
+                data, source = self.udp_sock.recvfrom(65535)
+                if source != self.udp_source:
+                    continue
+                try:
+                    return unpack_audio_frame(data)
+                except struct.error:
+                    continue
+        header = recv_exact(self.tcp_sock, AUDIO_FRAME_HEADER.size)
+        if header is None:
+            return None
+        seq, timestamp, length = AUDIO_FRAME_HEADER.unpack(header)
+        payload = recv_exact(self.tcp_sock, length)
+        if payload is None:
+            return None
+        return seq, timestamp, payload
+
+    def close(self):
+        try: self.tcp_sock.shutdown(socket.SHUT_RDWR) # Débloque un recv en cours dans l'autre thread
+        except OSError: pass
+        for sock in (self.udp_sock, self.tcp_sock):
+            if sock:
+                try: sock.close()
+                except OSError: pass
+
+def connect_audio_transport(client_socket, peer_ip, audio_port, use_udp):
+    """Côté client : annonce le transport choisi sur la connexion TCP déjà établie et renvoie l'AudioTransport."""
+    if not use_udp:
+        client_socket.sendall(AUDIO_HELLO.pack(AUDIO_TRANSPORT_TCP, 0))
+        return AudioTransport(client_socket)
+    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_sock.bind(('', 0))
+    client_socket.sendall(AUDIO_HELLO.pack(AUDIO_TRANSPORT_UDP, udp_sock.getsockname()[1]))
+    return AudioTransport(client_socket, udp_sock, (peer_ip, audio_port))
+
+def accept_audio_transport(conn, addr, audio_port):
+    """Côté serveur : lit l'annonce du client et renvoie l'AudioTransport correspondant (UDP sur le même numéro de port)."""
+    hello = recv_exact(conn, AUDIO_HELLO.size)
+    if hello is None:
+        return None
+    transport, udp_port = AUDIO_HELLO.unpack(hello)
+    if transport != AUDIO_TRANSPORT_UDP:
+        return AudioTransport(conn)
+    udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    udp_sock.bind(('', audio_port))
+    return AudioTransport(conn, udp_sock, (addr[0], udp_port))
+
+class AudioJitterBuffer:
+    """
+    Tampon de gigue adaptatif côté réception.
+    Les trames sont rangées par numéro de séquence et jouées dans l'ordre. La profondeur cible suit la gigue
+    mesurée (estimateur de la RFC 3550) entre JITTER_MIN_FRAMES et JITTER_MAX_FRAMES. Une trame manquante est
+    masquée par la précédente atténuée, une trame arrivée trop tard est ignorée, et au-delà de la cible
+    + JITTER_DRIFT_MARGIN une trame est sautée pour ne pas laisser la latence grandir.
+    La latence mesurée (lecture - capture) suppose des horloges synchronisées entre les deux machines (NTP).
+    """
+    def __init__(self, frame_bytes, dtype):
+        self.frame_bytes = frame_bytes
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self.frames = {}        # séquence -> (horodatage, données)
+        self.next_seq = None
+        self.playing = False    # False pendant le pré-remplissage
+        self.jitter = 0.0       # Gigue estimée, en secondes
+        self.last_transit = None
+        self.last_frame = None
+        self.concealed_run = 0
+        self.counters = {"played": 0, "underruns": 0, "concealed": 0, "late": 0, "skipped": 0}
+        self.latency = None     # Latence capture -> lecture (moyenne glissante), en secondes
+
+    def target_frames(self):
+        return min(JITTER_MAX_FRAMES, max(JITTER_MIN_FRAMES, math.ceil(3 * self.jitter / AUDIO_FRAME_DURATION) + 1))
+
+    def push(self, seq, timestamp, payload):
+        arrival = time.time()
+        with self.lock:
+            transit = arrival - timestamp
+            if self.last_transit is not None:
+                self.jitter += (abs(transit - self.last_transit) - self.jitter) / 16
+            self.last_transit = transit
+            if len(payload) != self.frame_bytes:
+                return
+            if self.next_seq is not None and seq < self.next_seq:
+                self.counters["late"] += 1
+                return
+            self.frames[seq] = (timestamp, payload)
+            if len(self.frames) > 2 * JITTER_MAX_FRAMES: # Lecture arrêtée ou rafale : on borne la mémoire
+                del self.frames[min(self.frames)]
+                self.counters["skipped"] += 1
+
+    def pop(self):
+        """Données de la prochaine trame à jouer, ou None pendant le pré-remplissage."""
+        with self.lock:
+            if not self.playing:
+                if len(self.frames) < self.target_frames():
+                    return None
+                self.playing = True
+                self.next_seq = min(self.frames)
+            if not self.frames:
+                # Sous-alimentation : on masque cette trame puis on re-remplit jusqu'à la cible
+                self.counters["underruns"] += 1
+                self.playing = False
+                return self._conceal()
+            oldest = min(self.frames)
+            if oldest - self.next_seq > JITTER_MAX_FRAMES: # Saut de séquence (émetteur redémarré...)
+                self.next_seq = oldest
+            if len(self.frames) > self.target_frames() + JITTER_DRIFT_MARGIN:
+                self.frames.pop(self.next_seq, None)
+                self.next_seq += 1
+                self.counters["skipped"] += 1
+            entry = self.frames.pop(self.next_seq, None)
+            self.next_seq += 1
+            if entry is None:
+                return self._conceal()
+            timestamp, payload = entry
+            latency = time.time() - timestamp
+            self.latency = latency if self.latency is None else self.latency + (latency - self.latency) / 16
+            self.last_frame = payload
+            self.concealed_run = 0
+            self.counters["played"] += 1
+            return payload
+
+    def _conceal(self):
+        self.counters["concealed"] += 1
+        self.concealed_run += 1
+        if self.last_frame is None or self.concealed_run > PLC_MAX_FRAMES:
+            return bytes(self.frame_bytes) # Silence
+        samples = np.frombuffer(self.last_frame, dtype=self.dtype) * (0.5 ** self.concealed_run)
+        return samples.astype(self.dtype).tobytes()
+
+    def stats(self):
+        """Latence, profondeur, gigue et compteurs (lecture seule, appelable depuis n'importe quel thread)."""
+        with self.lock:
+            latency_ms = (self.latency or 0.0) * 1000
+            return dict(self.counters, latency_ms=latency_ms, depth=len(self.frames),
+                        target=self.target_frames(), jitter_ms=self.jitter * 1000)
+
+def format_audio_stats(stats):
+    return (f"latence {stats['latency_ms']:.0f} ms | tampon {stats['depth']}/{stats['target']} trames | "
+            f"gigue {stats['jitter_ms']:.1f} ms | sous-alim. {stats['underruns']} | masquées {stats['concealed']} | "
+            f"en retard {stats['late']}")
+
+def play_from_jitter_buffer(transport, jitter_buffer, write, is_active, label):
+    """
+    Réception et lecture d'un flux audio : un thread lit les trames du réseau vers le tampon de gigue,
+    cette fonction les joue au rythme du périphérique de sortie (write bloque jusqu'à ce qu'il y ait de la place).
+    """
+    def network_reader():
+        while is_active():
+            try:
+                frame = transport.receive()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if frame is None:
+                print(f"{label}: fin du flux audio.")
+                break
+            jitter_buffer.push(*frame)
+    reader = threading.Thread(target=network_reader, daemon=True)
+    reader.start()
+    last_report = time.time()
+    while is_active() and (reader.is_alive() or jitter_buffer.frames):
+        payload = jitter_buffer.pop()
+        if payload is None:
+            time.sleep(AUDIO_FRAME_DURATION / 4)
+            continue
+        write(payload)
+        if time.time() - last_report >= AUDIO_STATS_INTERVAL:
+            last_report = time.time()
+            print(f"{label} [{transport.name}]: {format_audio_stats(jitter_buffer.stats())}")
 
 # --- Paramètres Vidéo (OpenCV) ---
 FRAME_WIDTH = 640
@@ -46,6 +292,12 @@ cap = None # Objet de capture vidéo OpenCV (webcam)
 label_local_video = None    # Label pour afficher la vidéo locale
 label_remote_video = None   # Label pour afficher la vidéo du pair
 audio_status_label = None   # Label pour afficher le statut de l'audio
+audio_stats_label = None    # Label des statistiques de réception audio (latence, tampon de gigue)
+audio_jitter_buffer = None  # Tampon de gigue de l'appel en cours
+local_view = None           # VideoView de la vidéo locale
+remote_view = None          # VideoView de la vidéo du pair
+video_stats_label = None    # Label des statistiques d'affichage vidéo (i/s, décodage, rendu)
+video_stats_last_update = 0.0
 
 # --- Fonctions Audio (PyAudio) ---
 
@@ -101,9 +353,9 @@ def find_and_display_audio_devices():
 
     return selected_input_device_index, selected_output_device_index
 
-def send_audio_stream(client_socket_audio):
+def send_audio_stream(transport):
     """
-    Capture l'audio du microphone et l'envoie via le socket.
+    Capture l'audio du microphone et l'envoie en trames numérotées et horodatées (AudioTransport).
     """
     global audio_sending, p_audio, stream_in, selected_input_device_index
     if p_audio is None:
@@ -117,26 +369,28 @@ def send_audio_stream(client_socket_audio):
                                  input=True,
                                  frames_per_buffer=CHUNK_SIZE,
                                  input_device_index=selected_input_device_index)
-        print("Envoi audio démarré...")
+        print(f"Envoi audio démarré ({transport.name})...")
         while audio_sending:
+            # Lire les données audio du microphone (bloque au rythme du périphérique)
             data = stream_in.read(CHUNK_SIZE, exception_on_overflow=False)
-            client_socket_audio.sendall(data)
-            time.sleep(0.001)
+            transport.send(data)
     except Exception as e:
         print(f"Erreur lors de l'envoi audio: {e}")
         messagebox.showerror("Erreur Audio", f"Erreur lors de l'envoi audio: {e}")
     finally:
+        # Nettoyage des ressources audio d'entrée
         if stream_in:
             stream_in.stop_stream()
             stream_in.close()
             stream_in = None
-        stop_audio_call()
+        stop_audio_call() # Signale l'arrêt de l'audio
 
-def receive_audio_stream(conn_audio, addr):
+def receive_audio_stream(transport, addr):
     """
-    Reçoit le flux audio via le socket et le joue sur les haut-parleurs.
+    Reçoit les trames audio dans un tampon de gigue et les joue sur les haut-parleurs
+    (trames perdues masquées, trames en retard ignorées).
     """
-    global audio_receiving, p_audio, stream_out, selected_output_device_index
+    global audio_receiving, p_audio, stream_out, selected_output_device_index, audio_jitter_buffer
     if p_audio is None:
         print("PyAudio non initialisé pour la réception audio.")
         return
@@ -148,43 +402,179 @@ def receive_audio_stream(conn_audio, addr):
                                   output=True,
                                   frames_per_buffer=CHUNK_SIZE,
                                   output_device_index=selected_output_device_index)
-        print(f"Réception audio de {addr} démarrée...")
-        while audio_receiving:
-            data = conn_audio.recv(CHUNK_SIZE * p_audio.get_sample_size(FORMAT))
-            if not data:
-                print("Pair audio déconnecté ou fin de flux.")
-                break
-            stream_out.write(data)
-            time.sleep(0.001)
+        print(f"Réception audio de {addr} démarrée ({transport.name})...")
+        audio_jitter_buffer = AudioJitterBuffer(CHUNK_SIZE * p_audio.get_sample_size(FORMAT), AUDIO_DTYPE)
+        play_from_jitter_buffer(transport, audio_jitter_buffer, stream_out.write, lambda: audio_receiving, f"Audio {addr[0]}")
     except Exception as e:
         print(f"Erreur lors de la réception audio: {e}")
         messagebox.showerror("Erreur Audio", f"Erreur lors de la réception audio: {e}")
     finally:
+        # Nettoyage des ressources audio de sortie
         if stream_out:
             stream_out.stop_stream()
             stream_out.close()
             stream_out = None
-        if conn_audio:
-            conn_audio.close()
-        stop_audio_call()
+        transport.close() # Ferme la connexion (et le socket UDP éventuel)
+        stop_audio_call() # Signale l'arrêt de l'audio
+
+def refresh_audio_stats():
+    """Met à jour les statistiques de réception audio ; exécuté dans le thread Tk via root.after."""
+    if audio_receiving and audio_jitter_buffer is not None:
+        audio_stats_label.configure(text=format_audio_stats(audio_jitter_buffer.stats()))
+    else:
+        audio_stats_label.configure(text="")
+    root.after(1000, refresh_audio_stats)
 
 # --- Fonctions Vidéo (OpenCV et Tkinter pour l'affichage) ---
 
-def convert_opencv_to_ppm(frame):
+# Affichage : le thread Tk dépile au plus une image par vue toutes les RENDER_INTERVAL_MS
+RENDER_INTERVAL_MS = 10
+VIDEO_STATS_INTERVAL_MS = 1000
+
+class VideoView:
     """
-    Convertit une image OpenCV (NumPy array BGR) en données PPM P6 (brutes)
-    pour une utilisation directe avec tk.PhotoImage.
+    Affiche un flux vidéo dans un label en réutilisant un seul tk.PhotoImage.
+    Les threads réseau et de capture déposent la dernière image reçue (JPEG ou image BGR) dans un emplacement
+    unique : une image pas encore traitée est remplacée par la suivante (comptée comme sautée) au lieu de
+    s'accumuler. Un thread de décodage la décode une seule fois et prépare les données PPM ; seul le thread Tk
+    (render(), appelé par root.after) touche au PhotoImage, via put.
     """
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    header = f"P6\n{frame_rgb.shape[1]} {frame_rgb.shape[0]}\n255\n".encode('ascii')
-    return header + frame_rgb.tobytes()
+    def __init__(self, label, width, height):
+        self.width = width
+        self.height = height
+        self.photo = tk.PhotoImage(width=width, height=height)
+        self.photo.put("black", to=(0, 0, width, height))
+        label.configure(image=self.photo)
+        label.image = self.photo # Garder une référence forte
+        self.header = f"P6\n{width} {height}\n255\n".encode('ascii')
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8) # Tampon RGB réutilisé pour chaque image
+        self.condition = threading.Condition()
+        self.pending = None # (données, compressée) en attente de décodage
+        self.ready = None   # Données PPM prêtes à afficher
+        self.running = True
+        self.received = 0
+        self.skipped = 0
+        self.rendered = 0
+        self.decode_ms = 0.0
+        self.render_ms = 0.0
+        self.render_times = deque(maxlen=240)
+        threading.Thread(target=self._decode_loop, daemon=True).start()
+
+    def submit_jpeg(self, data):
+        """Dépose une image JPEG reçue ; appelé depuis un thread réseau, sans décodage."""
+        self._submit(data, True)
+
+    def submit_frame(self, frame):
+        """Dépose une image BGR déjà décodée (capture locale)."""
+        self._submit(frame, False)
+
+    def _submit(self, item, compressed):
+        with self.condition:
+            if self.pending is not None:
+                self.skipped += 1
+            self.pending = (item, compressed)
+            self.received += 1
+            self.condition.notify()
+
+    def _decode_loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                item, compressed = self.pending
+                self.pending = None
+            start = time.perf_counter()
+            if compressed:
+                frame = cv2.imdecode(np.frombuffer(item, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    print("Erreur de décodage de l'image.")
+                    continue
+            else:
+                frame = item
+            if frame.shape[1] != self.width or frame.shape[0] != self.height:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            ppm_data = b"".join((self.header, self.rgb.data)) # Une seule copie : Tk attend des bytes
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.condition:
+                if self.ready is not None:
+                    self.skipped += 1
+                self.ready = ppm_data
+                self.decode_ms = elapsed_ms if self.decode_ms == 0 else 0.9 * self.decode_ms + 0.1 * elapsed_ms
+
+    def render(self):
+        """Copie la dernière image prête dans le PhotoImage ; à appeler uniquement depuis le thread Tk."""
+        with self.condition:
+            ppm_data, self.ready = self.ready, None
+        if ppm_data is None:
+            return
+        start = time.perf_counter()
+        try:
+            self.photo.tk.call(self.photo.name, 'put', ppm_data, '-format', 'ppm')
+        except tk.TclError as e:
+            print(f"Erreur d'affichage vidéo (PPM): {e}")
+            return
+        now = time.perf_counter()
+        elapsed_ms = (now - start) * 1000
+        self.render_ms = elapsed_ms if self.render_ms == 0 else 0.9 * self.render_ms + 0.1 * elapsed_ms
+        self.rendered += 1
+        self.render_times.append(now)
+
+    def clear(self):
+        """Oublie les images en attente et remet la vue au noir (thread Tk)."""
+        with self.condition:
+            self.pending = None
+            self.ready = None
+        self.photo.put("black", to=(0, 0, self.width, self.height))
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def stats(self):
+        now = time.perf_counter()
+        recent = [t for t in self.render_times if now - t <= 1.0]
+        return {
+            "fps": len(recent),
+            "decode_ms": self.decode_ms,
+            "render_ms": self.render_ms,
+            "received": self.received,
+            "skipped": self.skipped,
+            "rendered": self.rendered,
+        }
+
+def format_video_stats(name, stats):
+    return (f"{name}: {stats['fps']} i/s | décodage {stats['decode_ms']:.1f} ms | "
+            f"rendu {stats['render_ms']:.1f} ms | sautées {stats['skipped']}")
+
+def render_video_views():
+    """Boucle d'affichage vidéo dans le thread Tk : au plus une image par vue et par passage, jamais de file."""
+    global video_stats_last_update
+    for view in (local_view, remote_view):
+        if view:
+            view.render()
+    now = time.perf_counter()
+    if now - video_stats_last_update >= VIDEO_STATS_INTERVAL_MS / 1000:
+        video_stats_last_update = now
+        parts = [format_video_stats(name, view.stats()) for name, view in (("Locale", local_view), ("Distante", remote_view))
+                 if view and view.received]
+        video_stats_label.configure(text="   ".join(parts))
+    root.after(RENDER_INTERVAL_MS, render_video_views)
+
+def clear_video_views():
+    for view in (local_view, remote_view):
+        if view:
+            view.clear()
 
 def send_video_stream(video_socket):
     """
-    Capture le flux vidéo de la webcam, le prévisualise localement (via PPM),
+    Capture le flux vidéo de la webcam, le transmet à la vue locale (sans conversion dans ce thread),
     le compresse en JPEG et l'envoie via le socket.
     """
-    global video_sending, cap, label_local_video
+    global video_sending, cap
 
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
@@ -204,16 +594,9 @@ def send_video_stream(video_socket):
             print("Erreur lors de la lecture de la frame.")
             break
 
-        # --- Affichage local (via PPM pour CustomTkinter sans PIL) ---
-        try:
-            ppm_data = convert_opencv_to_ppm(frame)
-            imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-
-            if label_local_video:
-                label_local_video.configure(image=imgtk)
-                label_local_video.image = imgtk
-        except Exception as e:
-            print(f"Erreur d'affichage local vidéo (PPM): {e}")
+        # --- Affichage local : la vue convertit et affiche la dernière image hors de ce thread ---
+        if local_view:
+            local_view.submit_frame(frame)
 
         # --- Envoi via socket (utilise JPEG pour la compression réseau) ---
         encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY_NETWORK]
@@ -240,9 +623,9 @@ def send_video_stream(video_socket):
 
 def receive_video_stream(video_conn, addr):
     """
-    Reçoit le flux vidéo, le décompresse (JPEG) et l'affiche (via PPM).
+    Reçoit le flux vidéo et transmet chaque image JPEG à la vue distante, qui ne décode que celles affichées.
     """
-    global video_receiving, label_remote_video
+    global video_receiving
 
     print(f"Démarrage de la réception vidéo de {addr}...")
     while video_receiving:
@@ -254,34 +637,14 @@ def receive_video_stream(video_conn, addr):
             
             frame_size = int.from_bytes(size_data, 'big')
             
-            data = b''
-            while len(data) < frame_size:
-                packet = video_conn.recv(min(frame_size - len(data), BUFFER_SIZE))
-                if not packet:
-                    print("Données vidéo incomplètes ou pair déconnecté.")
-                    break
-                data += packet
-            
-            if len(data) < frame_size:
-                continue
-
-            np_data = np.frombuffer(data, dtype=np.uint8)
-            frame = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-
-            if frame is None:
-                print("Erreur de décodage de l'image.")
-                continue
+            data = recv_exact(video_conn, frame_size)
+            if data is None:
+                print("Données vidéo incomplètes ou pair déconnecté.")
+                break
 
-            # --- Affichage distant (via PPM pour CustomTkinter sans PIL) ---
-            try:
-                ppm_data = convert_opencv_to_ppm(frame)
-                imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-                
-                if label_remote_video:
-                    label_remote_video.configure(image=imgtk)
-                    label_remote_video.image = imgtk
-            except Exception as e:
-                print(f"Erreur d'affichage distant vidéo (PPM): {e}")
+            # Le décodage se fait une seule fois, dans le thread de la vue, et seulement pour l'image affichée
+            if remote_view:
+                remote_view.submit_jpeg(data)
 
         except (BrokenPipeError, ConnectionResetError):
             print("Connexion vidéo rompue côté réception.")
@@ -329,11 +692,12 @@ def start_call():
     try:
         print(f"Tentative de connexion audio à {peer_ip}:{audio_port}...")
         client_socket_audio.connect((peer_ip, audio_port))
+        audio_transport = connect_audio_transport(client_socket_audio, peer_ip, audio_port, use_udp_var.get())
         print("Connexion audio établie.")
         audio_sending = True
         audio_receiving = True
-        threading.Thread(target=send_audio_stream, args=(client_socket_audio,)).start()
-        threading.Thread(target=receive_audio_stream, args=(client_socket_audio, (peer_ip, audio_port))).start()
+        threading.Thread(target=send_audio_stream, args=(audio_transport,)).start()
+        threading.Thread(target=receive_audio_stream, args=(audio_transport, (peer_ip, audio_port))).start()
     except Exception as e:
         messagebox.showerror("Erreur Connexion Audio", f"Impossible de se connecter pour l'audio: {e}")
         print(f"Erreur connexion audio client: {e}")
@@ -405,10 +769,13 @@ def start_listen():
             try:
                 conn_audio, addr_audio = server_socket_audio.accept()
                 print(f"Connexion audio acceptée de {addr_audio}")
+                audio_transport = accept_audio_transport(conn_audio, addr_audio, audio_port) # Le client annonce TCP ou UDP
+                if audio_transport is None:
+                    raise ConnectionError("le pair s'est déconnecté avant d'annoncer son transport audio")
                 audio_sending = True
                 audio_receiving = True
-                threading.Thread(target=send_audio_stream, args=(conn_audio,)).start()
-                threading.Thread(target=receive_audio_stream, args=(conn_audio, addr_audio)).start()
+                threading.Thread(target=send_audio_stream, args=(audio_transport,)).start()
+                threading.Thread(target=receive_audio_stream, args=(audio_transport, addr_audio)).start()
             except Exception as e:
                 messagebox.showerror("Erreur Serveur Audio", f"Erreur lors de l'acceptation audio: {e}")
                 print(f"Erreur accept_audio_connection: {e}")
@@ -500,16 +867,7 @@ def stop_call():
         except Exception as e: print(f"Erreur lors de la libération de la webcam: {e}")
         cap = None
     
-    black_img = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
-    black_ppm_data = convert_opencv_to_ppm(black_img)
-    black_photo_image = tk.PhotoImage(data=black_ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-
-    if label_local_video:
-        label_local_video.configure(image=black_photo_image)
-        label_local_video.image = black_photo_image
-    if label_remote_video:
-        label_remote_video.configure(image=black_photo_image)
-        label_remote_video.image = black_photo_image
+    clear_video_views()
 
     messagebox.showinfo("Appel Terminé", "L'appel vidéo et audio a été arrêté.")
     
@@ -537,7 +895,7 @@ ctk.set_default_color_theme("blue")
 # --- Interface Graphique CustomTkinter ---
 root = ctk.CTk()
 root.title("Appel Vidéo P2P (CustomTkinter - Sans PIL)")
-root.geometry(f"{FRAME_WIDTH * 2 + 60}x{FRAME_HEIGHT + 380}") # Ajusté la taille pour le nouveau champ
+root.geometry(f"{FRAME_WIDTH * 2 + 60}x{FRAME_HEIGHT + 435}") # Ajusté la taille pour le nouveau champ et les statistiques audio
 root.resizable(False, False)
 
 # --- Cadres pour les vidéos ---
@@ -586,6 +944,10 @@ entry_video_port.insert(0, str(VIDEO_PORT))
 btn_call = ctk.CTkButton(frame_controls, text="Appeler", command=start_call)
 btn_call.grid(row=0, column=6, padx=10, pady=5)
 
+# Audio en UDP : pas de blocage en tête de file, les trames perdues sont masquées par le tampon de gigue
+use_udp_var = tk.BooleanVar(value=False)
+ctk.CTkCheckBox(frame_controls, text="Audio UDP", variable=use_udp_var).grid(row=0, column=7, padx=5, pady=5)
+
 
 # Labels et entrées pour l'écoute (mode serveur)
 ctk.CTkLabel(frame_controls, text="IP d'écoute:", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=5, pady=5, sticky="w") # NOUVEAU
@@ -612,6 +974,11 @@ btn_stop.grid(row=2, column=0, columnspan=7, pady=10)
 
 audio_status_label = ctk.CTkLabel(root, text="Statut Audio: Inactif", font=ctk.CTkFont(size=14))
 audio_status_label.grid(row=2, column=0, columnspan=2, pady=5)
+audio_stats_label = ctk.CTkLabel(root, text="", font=ctk.CTkFont(size=12))
+audio_stats_label.grid(row=3, column=0, columnspan=2, pady=(0, 5))
+root.after(1000, refresh_audio_stats)
+video_stats_label = ctk.CTkLabel(root, text="", font=ctk.CTkFont(size=12))
+video_stats_label.grid(row=4, column=0, columnspan=2, pady=(0, 5))
 
 
 def on_closing_ctk():
@@ -621,16 +988,9 @@ def on_closing_ctk():
 
 root.protocol("WM_DELETE_WINDOW", on_closing_ctk)
 
-# --- Initialisation des images noires au démarrage ---
-black_img = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
-black_ppm_data = convert_opencv_to_ppm(black_img)
-black_photo_image = tk.PhotoImage(data=black_ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-
-if label_local_video:
-    label_local_video.configure(image=black_photo_image)
-    label_local_video.image = black_photo_image
-if label_remote_video:
-    label_remote_video.configure(image=black_photo_image)
-    label_remote_video.image = black_photo_image
+# --- Vues vidéo : un PhotoImage par label, mis à jour par put dans le thread Tk ---
+local_view = VideoView(label_local_video, FRAME_WIDTH, FRAME_HEIGHT)
+remote_view = VideoView(label_remote_video, FRAME_WIDTH, FRAME_HEIGHT)
+root.after(RENDER_INTERVAL_MS, render_video_views)
 
 root.mainloop()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import socket
 import threading
+import struct
+import math
 import cv2
 import numpy as np
 import customtkinter as ctk
@@ -7,24 +9,891 @@ import tkinter as tk
 from tkinter import messagebox
 import time
 import io
+import itertools
+from collections import deque
+import queue
+import warnings
+
+try:
+    import opuslib # Codec Opus : pip install opuslib (nécessite aussi la bibliothèque libopus)
+    OPUS_AVAILABLE = True
+except Exception as e: # opuslib lève une Exception générique quand libopus est introuvable
+    opuslib = None
+    OPUS_AVAILABLE = False
+    print(f"INFO: Opus indisponible ({e}). Repli sur IMA-ADPCM / μ-law pour l'audio.")
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop # Accélère l'IMA-ADPCM (module C de la bibliothèque standard, retiré en Python 3.13)
+    except ImportError:
+        audioop = None
 
 # --- Paramètres Audio (PyAudio) ---
 import pyaudio
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 44100
-CHUNK_SIZE = 1024
+CHUNK_SIZE = 882 # Trames de 20 ms : 320 échantillons à 16 kHz, 960 à 48 kHz (tailles acceptées par Opus)
+AUDIO_DTYPE = np.int16
+
+# --- Trames audio numérotées et tampon de gigue ---
+# En-tête de chaque trame audio : numéro de séquence, horodatage de capture (horloge média), longueur
+AUDIO_FRAME_HEADER = struct.Struct("!IdH")
+AUDIO_TRANSPORT_TCP = b'T'
+AUDIO_TRANSPORT_UDP = b'U'
+AUDIO_FRAME_DURATION = CHUNK_SIZE / RATE
+JITTER_MIN_FRAMES = 2       # Profondeur minimale du tampon de gigue (en trames)
+JITTER_MAX_FRAMES = 20      # Profondeur maximale (400 ms)
+JITTER_DRIFT_MARGIN = 3     # Trames au-dessus de la cible avant d'en sauter une pour réduire la latence
+PLC_MAX_FRAMES = 3          # Trames perdues masquées par répétition atténuée avant de passer au silence
+AUDIO_STATS_INTERVAL = 5    # Secondes entre deux rapports (latence, profondeur, sous-alimentations)
+
+# --- Connexion multiplexée (audio, vidéo et contrôle sur un seul socket TCP) ---
+# Chaque trame de la connexion : type, longueur, puis les données (trame audio, paquet vidéo ou message de contrôle)
+MEDIA_FRAME_HEADER = struct.Struct("!BI")
+MEDIA_AUDIO = 1       # Trame audio (AUDIO_FRAME_HEADER + données du codec)
+MEDIA_VIDEO = 2       # Paquet vidéo (VIDEO_PACKET_HEADER + données), ou son dernier fragment
+MEDIA_VIDEO_PART = 3  # Fragment d'un paquet vidéo, d'autres suivent
+MEDIA_CONTROL = 4     # Message de contrôle, premier octet CONTROL_*
+MEDIA_VIDEO_FRAGMENT = 8 * 1024 # Une trame audio n'attend jamais plus d'un fragment vidéo, quelle que soit la taille de l'image
+MEDIA_SEND_BUFFER = 16 * 1024   # Tampon d'envoi du noyau réduit : la priorité de l'audio se joue dans l'application, pas derrière lui
+MEDIA_PACING_FACTOR = 2.5       # Les fragments vidéo partent au plus à ce multiple du débit visé par le contrôleur
+MEDIA_AUDIO_QUEUE = 50          # Trames audio reçues en attente (1 s) ; au-delà les plus anciennes sont jetées
+MEDIA_VIDEO_QUEUE = 8           # Paquets vidéo reçus en attente ; au-delà les plus anciens sont jetés
+MEDIA_MAX_FRAME = 64 * 1024     # Trame la plus longue acceptée du pair (la vidéo est fragmentée à MEDIA_VIDEO_FRAGMENT) ; au-delà la connexion est fermée
+MEDIA_MAX_VIDEO_PACKET = 8 * 1024 * 1024 # Paquet vidéo reconstitué le plus gros accepté ; au-delà la connexion est fermée
+# Messages de contrôle. Poignée de main unique à la connexion : le client envoie HELLO (transport audio 'T' ou 'U',
+# son port UDP, son heure t0, puis la liste des codecs qu'il sait décoder "opus48,adpcm16,...") ; le serveur répond
+# WELCOME (t0 renvoyé, son heure t1, puis le codec retenu). CLOCK_REQUEST / CLOCK_REPLY remesurent ensuite l'horloge.
+CONTROL_HELLO = 1
+CONTROL_WELCOME = 2
+CONTROL_CLOCK_REQUEST = 3
+CONTROL_CLOCK_REPLY = 4
+MEDIA_HELLO = struct.Struct("!BcHdB")
+MEDIA_WELCOME = struct.Struct("!BddB")
+MEDIA_CLOCK = struct.Struct("!Bdd")
+MEDIA_CLOCK_INTERVAL = 5.0  # Secondes entre deux mesures de l'horloge du serveur par le client
+MEDIA_CLOCK_SAMPLES = 8     # Mesures gardées ; celle de plus petit aller-retour donne le décalage
+# Synchronisation labiale : la vidéo attend que la lecture audio atteigne son horodatage de capture
+VIDEO_SYNC_MAX_FRAMES = 15  # Images décodées retenues au plus en attendant l'audio
+VIDEO_SYNC_MAX_HOLD = 1.0   # Une image plus en avance que cela sur l'audio (s) est affichée sans attendre
+AUDIO_SYNC_TIMEOUT = 0.5    # Sans lecture audio depuis ce délai (s), la vidéo n'est plus retenue
+
+def recv_into_exact(sock, view):
+    """Remplit entièrement view (memoryview) avec recv_into ; False si la connexion est fermée avant."""
+    received = 0
+    size = len(view)
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return False
+        received += n
+    return True
+
+def recv_exact(sock, size):
+    """Lit exactement size octets sur un socket TCP ; None si la connexion est fermée avant."""
+    buffer = bytearray(size)
+    if not recv_into_exact(sock, memoryview(buffer)):
+        return None
+    return bytes(buffer)
+
+def unpack_audio_frame(data):
+    """(séquence, horodatage, données) d'une trame reçue en un bloc (datagramme UDP ou trame de la connexion multiplexée)."""
+    seq, timestamp, length = AUDIO_FRAME_HEADER.unpack_from(data)
+    return seq, timestamp, data[AUDIO_FRAME_HEADER.size:AUDIO_FRAME_HEADER.size + length]
+
+class MediaClock:
+    """
+    Horloge média d'un appel : celle du serveur. Les horodatages de capture audio et vidéo sont tous pris sur
+    cette horloge, ce qui rend comparables des flux venus de machines différentes (synchronisation labiale,
+    mix du serveur, latences mesurées). Le client estime son décalage comme NTP : la requête part à t0, le
+    serveur répond avec son heure t1, la réponse arrive à t2 ; décalage = t1 - (t0 + t2) / 2, exact à la moitié
+    de l'aller-retour près, d'où la mesure de plus petit aller-retour parmi les MEDIA_CLOCK_SAMPLES dernières.
+    Sur le serveur, le décalage reste nul.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=MEDIA_CLOCK_SAMPLES) # (aller-retour, décalage)
+        self.offset = 0.0
+        self.rtt = None
+
+    def now(self):
+        return time.time() + self.offset
+
+    def update(self, t0, t1, t2):
+        """t0 et t2 : time.time() local à l'envoi de la requête et à la réception de la réponse ; t1 : heure du serveur."""
+        with self.lock:
+            self.samples.append((t2 - t0, t1 - (t0 + t2) / 2))
+            self.rtt, self.offset = min(self.samples)
+
+def send_media_frame(sock, kind, payload):
+    """Envoie une trame directement sur le socket (poignée de main, avant le démarrage de la MediaConnection)."""
+    sock.sendall(MEDIA_FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+def recv_media_frame(sock):
+    """
+    (type, données) de la trame suivante, ou (None, None) si la connexion est fermée.
+    Lève ConnectionError pour une longueur annoncée au-delà de MEDIA_MAX_FRAME, avant de la lire.
+    """
+    header = recv_exact(sock, MEDIA_FRAME_HEADER.size)
+    if header is None:
+        return None, None
+    kind, length = MEDIA_FRAME_HEADER.unpack(header)
+    if length > MEDIA_MAX_FRAME:
+        raise ConnectionError(f"trame de {length} octets annoncée (maximum {MEDIA_MAX_FRAME})")
+    payload = recv_exact(sock, length) if length else b""
+    if payload is None:
+        return None, None
+    return kind, payload
+
+class MediaConnection:
+    """
+    Connexion d'un participant : audio, vidéo et contrôle multiplexés sur un seul socket TCP, en trames typées
+    (MEDIA_FRAME_HEADER). Un seul thread écrit : il sert toujours l'audio et le contrôle avant la vidéo, et les
+    paquets vidéo partent en fragments de MEDIA_VIDEO_FRAGMENT octets, si bien qu'une trame audio n'attend
+    jamais plus d'un fragment derrière une image. Un seul thread lit : il range les trames audio et les paquets
+    vidéo reconstitués dans des files bornées (les plus anciens sont jetés) et répond lui-même au contrôle,
+    sans jamais bloquer, pour qu'une vidéo traitée lentement ne retarde pas l'audio.
+    pacing (fonction renvoyant des kbit/s, ou None) espace les fragments vidéo : une image ne part plus d'un bloc
+    dans la file du lien le plus lent, où l'audio devrait l'attendre, mais reste dans la file de l'application,
+    où l'audio passe devant.
+    prioritize_audio=False envoie tout dans l'ordre d'arrivée (comparaison dans bench_media_sync.py).
+    """
+    def __init__(self, sock, name, clock_sync=False, prioritize_audio=True, pacing=None):
+        self.sock = sock
+        self.name = name
+        self.prioritize_audio = prioritize_audio
+        self.pacing = pacing
+        self.condition = threading.Condition()
+        self.urgent = deque()   # (vidéo ?, trame) : audio et contrôle, et tout le reste si prioritize_audio est faux
+        self.video = deque()    # Fragments du paquet vidéo en cours d'envoi
+        self.video_fragments = 0 # Fragments vidéo pas encore écrits
+        self.running = True
+        self.closed = threading.Event()
+        self.audio_frames = queue.Queue(maxsize=MEDIA_AUDIO_QUEUE)
+        self.video_packets = queue.Queue(maxsize=MEDIA_VIDEO_QUEUE)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.dropped = 0
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, MEDIA_SEND_BUFFER)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Petites trames audio : pas d'attente de Nagle
+        if hasattr(socket, "TCP_NOTSENT_LOWAT"): # Linux, macOS : le noyau ne garde pas plus d'un fragment en attente d'envoi
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NOTSENT_LOWAT, MEDIA_VIDEO_FRAGMENT)
+        threading.Thread(target=self._writer, daemon=True).start()
+        threading.Thread(target=self._reader, daemon=True).start()
+        if clock_sync:
+            threading.Thread(target=self._clock_sync, daemon=True).start()
+
+    def send(self, kind, payload):
+        """Trame audio ou de contrôle, envoyée avant toute vidéo en attente ; ne bloque pas."""
+        frame = MEDIA_FRAME_HEADER.pack(kind, len(payload)) + payload
+        with self.condition:
+            if not self.running:
+                raise ConnectionError(f"connexion {self.name} fermée")
+            self.urgent.append((False, frame))
+            self.condition.notify_all()
+
+    def send_video(self, packet):
+        """
+        Confie un paquet vidéo au thread d'envoi, en fragments. Bloque tant que le paquet précédent n'est pas
+        entièrement écrit : les images en attente restent dans la file du VideoSubscriber appelant, qui décide
+        lesquelles abandonner.
+        """
+        view = memoryview(packet)
+        fragments = []
+        for start in range(0, len(view), MEDIA_VIDEO_FRAGMENT):
+            chunk = view[start:start + MEDIA_VIDEO_FRAGMENT]
+            kind = MEDIA_VIDEO if start + MEDIA_VIDEO_FRAGMENT >= len(view) else MEDIA_VIDEO_PART
+            fragments.append((True, MEDIA_FRAME_HEADER.pack(kind, len(chunk)) + chunk))
+        with self.condition:
+            while self.video_fragments and self.running:
+                self.condition.wait()
+            if not self.running:
+                raise ConnectionError(f"connexion {self.name} fermée")
+            (self.video if self.prioritize_audio else self.urgent).extend(fragments)
+            self.video_fragments = len(fragments)
+            self.condition.notify_all()
+
+    def receive_audio(self, timeout=0.5):
+        """Trame audio suivante (AUDIO_FRAME_HEADER + données), None si la connexion est fermée ; lève socket.timeout."""
+        try:
+            return self.audio_frames.get(timeout=timeout)
+        except queue.Empty:
+            if self.closed.is_set():
+                return None
+            raise socket.timeout
+
+    def receive_video(self):
+        """(paquet vidéo, arrivée de son premier fragment sur l'horloge média), ou None si la connexion est fermée."""
+        while True:
+            try:
+                return self.video_packets.get(timeout=0.5)
+            except queue.Empty:
+                if self.closed.is_set():
+                    return None
+
+    def _writer(self):
+        next_video = 0.0 # Instant (perf_counter) où le rythme d'envoi autorise le fragment vidéo suivant
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    frames = self.urgent or self.video
+                    if not frames:
+                        self.condition.wait()
+                        continue
+                    wait = next_video - time.perf_counter() if frames[0][0] else 0.0
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait) # Réveillé plus tôt si une trame audio arrive
+                is_video, frame = frames.popleft()
+            try:
+                self.sock.sendall(frame)
+            except OSError as e:
+                print(f"Connexion {self.name}: erreur d'envoi: {e}")
+                self.close()
+                return
+            rate_kbps = self.pacing() if is_video and self.pacing else None
+            if rate_kbps:
+                next_video = max(next_video, time.perf_counter()) + len(frame) * 8 / (rate_kbps * 1000)
+            with self.condition:
+                self.bytes_sent += len(frame)
+                if is_video:
+                    self.video_fragments -= 1
+                    if not self.video_fragments:
+                        self.condition.notify_all() # send_video peut confier le paquet suivant
+
+    def _reader(self):
+        partial = bytearray() # Paquet vidéo en cours de reconstitution
+        arrival = None
+        try:
+            while True:
+                kind, payload = recv_media_frame(self.sock)
+                if kind is None:
+                    break
+                self.bytes_received += MEDIA_FRAME_HEADER.size + len(payload)
+                if kind == MEDIA_AUDIO:
+                    self._put_latest(self.audio_frames, payload)
+                elif kind in (MEDIA_VIDEO, MEDIA_VIDEO_PART):
+                    if not partial:
+                        arrival = media_clock.now()
+                    if len(partial) + len(payload) > MEDIA_MAX_VIDEO_PACKET:
+                        raise ConnectionError(f"paquet vidéo de plus de {MEDIA_MAX_VIDEO_PACKET} octets")
+                    partial += payload
+                    if kind == MEDIA_VIDEO:
+                        self._put_latest(self.video_packets, (partial, arrival))
+                        partial = bytearray()
+                elif kind == MEDIA_CONTROL and payload:
+                    self._on_control(payload)
+        except (OSError, struct.error) as e: # ConnectionError (limite dépassée) est un OSError
+            if self.running:
+                print(f"Connexion {self.name}: lecture interrompue: {e}")
+        finally:
+            self.close()
+
+    def _on_control(self, payload):
+        if len(payload) != MEDIA_CLOCK.size: # Seuls les messages d'horloge circulent après la poignée de main
+            return
+        if payload[0] == CONTROL_CLOCK_REQUEST:
+            _, t0, _ = MEDIA_CLOCK.unpack(payload)
+            self.send(MEDIA_CONTROL, MEDIA_CLOCK.pack(CONTROL_CLOCK_REPLY, t0, media_clock.now()))
+        elif payload[0] == CONTROL_CLOCK_REPLY:
+            _, t0, t1 = MEDIA_CLOCK.unpack(payload)
+            media_clock.update(t0, t1, time.time())
+
+    def _clock_sync(self):
+        """Côté client : remesure régulièrement l'horloge du serveur (dérive des horloges, aller-retour plus court)."""
+        while not self.closed.wait(MEDIA_CLOCK_INTERVAL):
+            try:
+                self.send(MEDIA_CONTROL, MEDIA_CLOCK.pack(CONTROL_CLOCK_REQUEST, time.time(), 0.0))
+            except ConnectionError:
+                return
+
+    def _put_latest(self, frames, item):
+        while True:
+            try:
+                frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.urgent.clear()
+            self.video.clear()
+            self.condition.notify_all()
+        self.closed.set()
+        try: self.sock.shutdown(socket.SHUT_RDWR) # Débloque le recv du thread de lecture
+        except OSError: pass
+        try: self.sock.close()
+        except OSError: pass
+
+    def stats(self):
+        return {"sent_kbytes": self.bytes_sent / 1000, "received_kbytes": self.bytes_received / 1000, "dropped": self.dropped}
+
+class AudioTransport:
+    """
+    Envoi et réception des trames audio d'un appel.
+    Par défaut les trames passent sur la connexion multiplexée (MediaConnection), avant la vidéo ; avec l'option
+    UDP, chaque trame est un datagramme, ce qui évite qu'un paquet perdu bloque les suivants (blocage en tête de
+    file de TCP). La connexion reste ouverte dans les deux cas (vidéo, contrôle, détection du départ).
+    """
+    def __init__(self, connection, udp_sock=None, udp_peer=None, codec=None):
+        self.connection = connection
+        self.codec = codec or AudioCodec() # Compresse à l'envoi, décompresse à la réception
+        self.udp_sock = udp_sock
+        self.udp_peer = udp_peer
+        # Adresse source attendue des datagrammes (nom d'hôte résolu une fois) : les autres sont ignorés
+        self.udp_source = (socket.gethostbyname(udp_peer[0]), udp_peer[1]) if udp_peer else None
+        self.seq = 0
+        self.send_lock = threading.Lock()
+        if udp_sock:
+            udp_sock.settimeout(0.5) # Pour revérifier régulièrement les indicateurs d'arrêt
+
+    @property
+    def name(self):
+        return "UDP" if self.udp_sock else "TCP"
+
+    def send(self, payload, timestamp=None):
+        """timestamp : horodatage de capture sur l'horloge média (par défaut maintenant ; le mixeur passe celui des voix mixées)."""
+        payload = self.codec.encode(payload)
+        with self.send_lock:
+            frame = AUDIO_FRAME_HEADER.pack(self.seq, media_clock.now() if timestamp is None else timestamp, len(payload)) + payload
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+            if self.udp_sock:
+                self.udp_sock.sendto(frame, self.udp_peer)
+            else:
+                self.connection.send(MEDIA_AUDIO, frame)
+
+    def receive(self):
+        """
+        Trame suivante (séquence, horodatage, données), ou None si le pair a fermé la connexion.
+        Lève socket.timeout quand rien n'arrive pendant 0,5 s. Les trames tronquées ou indécodables et les
+        datagrammes venus d'une autre adresse que le pair sont ignorés : une trame perdue est masquée par le
+        tampon de gigue, alors qu'une exception arrêterait l'audio de l'appel.
+        """
+        while True:
+            if self.udp_sock:
+                if self.connection.closed.is_set():
+                    return None
+                data, source = self.udp_sock.recvfrom(65535)
+                if source != self.udp_source:
+                    continue
+            else:
+                data = self.connection.receive_audio()
+                if data is None:
+                    return None
+            try:
+                seq, timestamp, payload = unpack_audio_frame(data)
+                return seq, timestamp, self.codec.decode(payload)
+            except AUDIO_DECODE_ERRORS:
+                continue
+
+    def close(self):
+        self.connection.close()
+        if self.udp_sock:
+            try: self.udp_sock.close()
+            except OSError: pass
+
+def connect_media(sock, peer_ip, port, use_udp):
+    """
+    Côté client : poignée de main unique sur le socket déjà connecté. Annonce le transport audio et les codecs,
+    reçoit le codec retenu et l'heure du serveur (première mesure de l'horloge média), puis démarre la
+    connexion multiplexée. Renvoie (MediaConnection, AudioTransport).
+    """
+    udp_sock = None
+    if use_udp:
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_sock.bind(('', 0))
+    offered = ",".join(available_audio_codecs()).encode('ascii')
+    t0 = time.time()
+    send_media_frame(sock, MEDIA_CONTROL, MEDIA_HELLO.pack(CONTROL_HELLO, AUDIO_TRANSPORT_UDP if use_udp else AUDIO_TRANSPORT_TCP,
+                                                           udp_sock.getsockname()[1] if udp_sock else 0, t0, len(offered)) + offered)
+    kind, welcome = recv_media_frame(sock)
+    t2 = time.time()
+    if kind != MEDIA_CONTROL or not welcome or welcome[0] != CONTROL_WELCOME:
+        raise ConnectionError("le serveur a fermé la connexion pendant la poignée de main")
+    _, echoed_t0, t1, name_length = MEDIA_WELCOME.unpack_from(welcome)
+    media_clock.update(echoed_t0, t1, t2)
+    codec = AUDIO_CODECS[welcome[MEDIA_WELCOME.size:MEDIA_WELCOME.size + name_length].decode('ascii')]()
+    print(f"Codec audio négocié: {codec.label} ; horloge du serveur {media_clock.offset * 1000:+.1f} ms"
+          f" (aller-retour {media_clock.rtt * 1000:.1f} ms)")
+    connection = MediaConnection(sock, (peer_ip, port), clock_sync=True)
+    if udp_sock:
+        return connection, AudioTransport(connection, udp_sock, (peer_ip, port), codec)
+    return connection, AudioTransport(connection, codec=codec)
+
+def accept_media(sock):
+    """
+    Côté serveur : lit le HELLO du client, choisit le codec et répond WELCOME avec l'heure de l'horloge média.
+    Renvoie (transport audio, port UDP du client, codec), ou None si le client s'est déconnecté ou si son HELLO
+    est trop long, tronqué ou illisible.
+    """
+    try:
+        kind, hello = recv_media_frame(sock)
+        if kind != MEDIA_CONTROL or not hello or hello[0] != CONTROL_HELLO:
+            return None
+        _, transport, udp_port, t0, offered_length = MEDIA_HELLO.unpack_from(hello)
+        offered = hello[MEDIA_HELLO.size:MEDIA_HELLO.size + offered_length].decode('ascii')
+    except (OSError, struct.error, ValueError) as e:
+        print(f"Serveur: poignée de main refusée: {e}")
+        return None
+    codec = choose_audio_codec(offered.split(","))
+    name = codec.name.encode('ascii')
+    send_media_frame(sock, MEDIA_CONTROL, MEDIA_WELCOME.pack(CONTROL_WELCOME, t0, media_clock.now(), len(name)) + name)
+    return transport, udp_port, codec
+
+class AudioJitterBuffer:
+    """
+    Tampon de gigue adaptatif côté réception.
+    Les trames sont rangées par numéro de séquence et jouées dans l'ordre. La profondeur cible suit la gigue
+    mesurée (estimateur de la RFC 3550) entre JITTER_MIN_FRAMES et JITTER_MAX_FRAMES. Une trame manquante est
+    masquée par la précédente atténuée, une trame arrivée trop tard est ignorée, et au-delà de la cible
+    + JITTER_DRIFT_MARGIN une trame est sautée pour ne pas laisser la latence grandir.
+    Les horodatages de capture sont sur l'horloge média commune (MediaClock) : la latence mesurée (lecture -
+    capture) est donc valable d'une machine à l'autre, et played_timestamp (capture de la dernière trame rendue
+    par pop, None si elle a été masquée) sert de référence à la synchronisation de la vidéo.
+    """
+    def __init__(self, frame_bytes, dtype):
+        self.frame_bytes = frame_bytes
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self.frames = {}        # séquence -> (horodatage, données)
+        self.next_seq = None
+        self.playing = False    # False pendant le pré-remplissage
+        self.jitter = 0.0       # Gigue estimée, en secondes
+        self.last_transit = None
+        self.last_frame = None
+        self.concealed_run = 0
+        self.counters = {"played": 0, "underruns": 0, "concealed": 0, "late": 0, "skipped": 0}
+        self.latency = None     # Latence capture -> lecture (moyenne glissante), en secondes
+        self.played_timestamp = None
+
+    def target_frames(self):
+        return min(JITTER_MAX_FRAMES, max(JITTER_MIN_FRAMES, math.ceil(3 * self.jitter / AUDIO_FRAME_DURATION) + 1))
+
+    def push(self, seq, timestamp, payload):
+        arrival = media_clock.now()
+        with self.lock:
+            transit = arrival - timestamp
+            if self.last_transit is not None:
+                self.jitter += (abs(transit - self.last_transit) - self.jitter) / 16
+            self.last_transit = transit
+            if len(payload) != self.frame_bytes:
+                return
+            if self.next_seq is not None and seq < self.next_seq:
+                self.counters["late"] += 1
+                return
+            self.frames[seq] = (timestamp, payload)
+            if len(self.frames) > 2 * JITTER_MAX_FRAMES: # Lecture arrêtée ou rafale : on borne la mémoire
+                del self.frames[min(self.frames)]
+                self.counters["skipped"] += 1
+
+    def pop(self):
+        """Données de la prochaine trame à jouer, ou None pendant le pré-remplissage."""
+        with self.lock:
+            if not self.playing:
+                if len(self.frames) < self.target_frames():
+                    return None
+                self.playing = True
+                self.next_seq = min(self.frames)
+            self.played_timestamp = None
+            if not self.frames:
+                # Sous-alimentation : on masque cette trame puis on re-remplit jusqu'à la cible
+                self.counters["underruns"] += 1
+                self.playing = False
+                return self._conceal()
+            oldest = min(self.frames)
+            if oldest - self.next_seq > JITTER_MAX_FRAMES: # Saut de séquence (émetteur redémarré...)
+                self.next_seq = oldest
+            if len(self.frames) > self.target_frames() + JITTER_DRIFT_MARGIN:
+                self.frames.pop(self.next_seq, None)
+                self.next_seq += 1
+                self.counters["skipped"] += 1
+            entry = self.frames.pop(self.next_seq, None)
+            self.next_seq += 1
+            if entry is None:
+                return self._conceal()
+            timestamp, payload = entry
+            self.played_timestamp = timestamp
+            latency = media_clock.now() - timestamp
+            self.latency = latency if self.latency is None else self.latency + (latency - self.latency) / 16
+            self.last_frame = payload
+            self.concealed_run = 0
+            self.counters["played"] += 1
+            return payload
+
+    def _conceal(self):
+        self.counters["concealed"] += 1
+        self.concealed_run += 1
+        if self.last_frame is None or self.concealed_run > PLC_MAX_FRAMES:
+            return bytes(self.frame_bytes) # Silence
+        samples = np.frombuffer(self.last_frame, dtype=self.dtype) * (0.5 ** self.concealed_run)
+        return samples.astype(self.dtype).tobytes()
+
+    def stats(self):
+        """Latence, profondeur, gigue et compteurs (lecture seule, appelable depuis n'importe quel thread)."""
+        with self.lock:
+            latency_ms = (self.latency or 0.0) * 1000
+            return dict(self.counters, latency_ms=latency_ms, depth=len(self.frames),
+                        target=self.target_frames(), jitter_ms=self.jitter * 1000)
+
+def format_audio_stats(stats):
+    return (f"latence {stats['latency_ms']:.0f} ms | tampon {stats['depth']}/{stats['target']} trames | "
+            f"gigue {stats['jitter_ms']:.1f} ms | sous-alim. {stats['underruns']} | masquées {stats['concealed']} | "
+            f"en retard {stats['late']}")
+
+def play_from_jitter_buffer(transport, jitter_buffer, write, is_active, label, on_played=None):
+    """
+    Réception et lecture d'un flux audio : un thread lit les trames du réseau vers le tampon de gigue,
+    cette fonction les joue au rythme du périphérique de sortie (write bloque jusqu'à ce qu'il y ait de la place).
+    on_played(horodatage de capture) est appelé après chaque trame écrite (MediaSync.on_audio_played).
+    """
+    def network_reader():
+        while is_active():
+            try:
+                frame = transport.receive()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if frame is None:
+                print(f"{label}: fin du flux audio.")
+                break
+            jitter_buffer.push(*frame)
+    reader = threading.Thread(target=network_reader, daemon=True)
+    reader.start()
+    last_report = time.time()
+    while is_active() and (reader.is_alive() or jitter_buffer.frames):
+        payload = jitter_buffer.pop()
+        if payload is None:
+            time.sleep(AUDIO_FRAME_DURATION / 4)
+            continue
+        write(payload)
+        if on_played:
+            on_played(jitter_buffer.played_timestamp)
+        if time.time() - last_report >= AUDIO_STATS_INTERVAL:
+            last_report = time.time()
+            print(f"{label} [{transport.name}]: {format_audio_stats(jitter_buffer.stats())}")
+
+# --- Codecs audio (négociés à la connexion) ---
+# Les trames restent en PCM int16 à RATE dans l'application (capture, tampon de gigue, mixeur) ;
+# le codec de la connexion rééchantillonne à sa propre fréquence et compresse juste avant l'envoi.
+OPUS_BITRATE = 32000          # bit/s visés par l'encodeur Opus
+RESAMPLER_TAPS = 47           # Longueur du filtre anti-repliement pour les codecs à 16 kHz
+# Préférence du serveur : le premier codec proposé par le client dans cet ordre est retenu
+AUDIO_CODEC_PREFERENCE = ["opus48", "adpcm16", "ulaw16", "pcm"]
+
+def lowpass_taps(cutoff, n_taps=RESAMPLER_TAPS):
+    """Filtre passe-bas à fenêtre de Hamming ; cutoff en fraction de la fréquence d'échantillonnage."""
+    n = np.arange(n_taps) - (n_taps - 1) / 2
+    taps = np.sinc(2 * cutoff * n) * np.hamming(n_taps)
+    return (taps / taps.sum()).astype(np.float32)
+
+class StreamingFIR:
+    """Filtre FIR appliqué trame par trame, en gardant la fin de la trame précédente pour la continuité."""
+    def __init__(self, taps):
+        self.taps = taps
+        self.history = np.zeros(len(taps) - 1, dtype=np.float32)
+
+    def process(self, samples):
+        extended = np.concatenate((self.history, samples))
+        self.history = extended[len(extended) - len(self.history):]
+        return np.convolve(extended, self.taps, mode='valid')
+
+class FrameResampler:
+    """
+    Rééchantillonnage linéaire de trames de taille fixe (n_in -> n_out échantillons).
+    Le dernier échantillon de la trame précédente sert de point d'ancrage : l'espacement reste régulier
+    d'une trame à l'autre.
+    """
+    def __init__(self, n_in, n_out):
+        self.positions = np.arange(1, n_out + 1) * (n_in / n_out) - 1
+        self.grid = np.arange(-1, n_in)
+        self.previous = np.float32(0)
+
+    def process(self, samples):
+        resampled = np.interp(self.positions, self.grid, np.concatenate(([self.previous], samples)))
+        self.previous = samples[-1]
+        return resampled
+
+class AudioCodec:
+    """
+    Codec audio d'une connexion (PCM brut pour la classe de base).
+    encode() reçoit une trame PCM int16 de CHUNK_SIZE échantillons à RATE et renvoie les octets à envoyer ;
+    decode() fait l'inverse. Chaque sens a son propre état (filtres, prédicteurs) : une instance par connexion.
+    """
+    name = "pcm"
+    label = "PCM 44,1 kHz"
+    rate = RATE
+
+    def __init__(self):
+        self.samples = CHUNK_SIZE * self.rate // RATE # 320 à 16 kHz, 960 à 48 kHz (trames de 20 ms)
+        self.resampled = self.rate != RATE
+        if self.resampled:
+            self.down = FrameResampler(CHUNK_SIZE, self.samples)
+            self.up = FrameResampler(self.samples, CHUNK_SIZE)
+        if self.rate < RATE: # Anti-repliement avant décimation, et lissage après interpolation
+            taps = lowpass_taps(0.45 * self.rate / RATE)
+            self.down_filter = StreamingFIR(taps)
+            self.up_filter = StreamingFIR(taps)
+        else:
+            self.down_filter = self.up_filter = None
+        self.bytes_encoded = 0
+        self.frames_encoded = 0
+
+    def encode(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if self.resampled:
+            samples = samples.astype(np.float32)
+            if self.down_filter:
+                samples = self.down_filter.process(samples)
+            samples = np.clip(np.rint(self.down.process(samples)), -32768, 32767).astype(np.int16)
+        data = self.encode_samples(samples)
+        self.bytes_encoded += len(data)
+        self.frames_encoded += 1
+        return data
+
+    def decode(self, data):
+        samples = self.decode_samples(data)
+        if self.resampled:
+            samples = self.up.process(samples.astype(np.float32))
+            if self.up_filter:
+                samples = self.up_filter.process(samples)
+            samples = np.clip(np.rint(samples), -32768, 32767)
+        return samples.astype(np.int16).tobytes()
+
+    def encode_samples(self, samples):
+        return samples.tobytes()
+
+    def decode_samples(self, data):
+        return np.frombuffer(data, dtype=np.int16)
+
+    def bitrate_kbps(self):
+        """Débit réellement produit par l'encodeur (données seules, sans en-têtes de trame)."""
+        if not self.frames_encoded:
+            return 0.0
+        return self.bytes_encoded * 8 / self.frames_encoded / AUDIO_FRAME_DURATION / 1000
+
+    def describe(self):
+        return f"{self.label}, {self.bitrate_kbps():.0f} kbit/s"
+
+class MuLawCodec(AudioCodec):
+    """G.711 μ-law à 16 kHz : 8 bits par échantillon (128 kbit/s), entièrement vectorisé avec NumPy."""
+    name = "ulaw16"
+    label = "μ-law 16 kHz"
+    rate = 16000
+    BIAS = 0x84
+    SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]) # Sur 14 bits, comme la G.711 de référence
+
+    def encode_samples(self, samples):
+        value = samples.astype(np.int32) >> 2
+        negative = value < 0
+        value = np.minimum(np.abs(value), 8159) + (self.BIAS >> 2)
+        segment = np.searchsorted(self.SEGMENT_ENDS, value)
+        code = np.where(segment > 7, 0x7F, (np.minimum(segment, 7) << 4) | ((value >> (np.minimum(segment, 7) + 1)) & 0x0F))
+        return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8).tobytes()
+
+    def decode_samples(self, data):
+        u = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+        exponent = (u >> 4) & 0x07
+        magnitude = ((((u & 0x0F) << 3) + self.BIAS) << exponent) - self.BIAS
+        return np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+IMA_INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8] * 2
+IMA_STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45, 50, 55, 60, 66, 73, 80, 88, 97,
+    107, 118, 130, 143, 157, 173, 190, 209, 230, 253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724,
+    796, 876, 963, 1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327, 3660, 4026,
+    4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442, 11487, 12635, 13899, 15289, 16818, 18500,
+    20350, 22385, 24623, 27086, 29794, 32767]
+ADPCM_STATE = struct.Struct("!hB") # Prédicteur et index de pas en tête de chaque trame
+
+class ImaAdpcmCodec(AudioCodec):
+    """
+    IMA-ADPCM à 16 kHz : 4 bits par échantillon (~65 kbit/s avec l'état en tête de trame).
+    L'état du codeur (prédicteur, index de pas) est répété au début de chaque trame, de sorte qu'une trame
+    perdue ou en retard n'empêche pas de décoder les suivantes. Le module audioop de la bibliothèque
+    standard est utilisé s'il est présent ; sinon la version Python ci-dessous produit le même flux.
+    """
+    name = "adpcm16"
+    label = "IMA-ADPCM 16 kHz"
+    rate = 16000
+
+    def __init__(self):
+        super().__init__()
+        self.state = (0, 0)
+
+    def encode_samples(self, samples):
+        header = ADPCM_STATE.pack(*self.state)
+        if audioop:
+            data, self.state = audioop.lin2adpcm(samples.tobytes(), 2, self.state)
+            return header + data
+        valpred, index = self.state
+        step = IMA_STEP_TABLE[index]
+        codes = []
+        for value in samples.tolist():
+            diff = value - valpred
+            sign = 8 if diff < 0 else 0
+            if sign:
+                diff = -diff
+            delta = 0
+            vpdiff = step >> 3
+            if diff >= step:
+                delta = 4
+                diff -= step
+                vpdiff += step
+            step >>= 1
+            if diff >= step:
+                delta |= 2
+                diff -= step
+                vpdiff += step
+            step >>= 1
+            if diff >= step:
+                delta |= 1
+                vpdiff += step
+            valpred = max(-32768, valpred - vpdiff) if sign else min(32767, valpred + vpdiff)
+            delta |= sign
+            index = min(88, max(0, index + IMA_INDEX_TABLE[delta]))
+            step = IMA_STEP_TABLE[index]
+            codes.append(delta)
+        self.state = (valpred, index)
+        codes = np.array(codes, dtype=np.uint8)
+        return header + ((codes[0::2] << 4) | codes[1::2]).tobytes() # Premier échantillon dans les 4 bits de poids fort
+
+    def decode_samples(self, data):
+        state = ADPCM_STATE.unpack_from(data)
+        payload = data[ADPCM_STATE.size:]
+        if audioop:
+            pcm, _ = audioop.adpcm2lin(payload, 2, state)
+            return np.frombuffer(pcm, dtype=np.int16)
+        packed = np.frombuffer(payload, dtype=np.uint8)
+        codes = np.empty(len(packed) * 2, dtype=np.uint8)
+        codes[0::2] = packed >> 4
+        codes[1::2] = packed & 0x0F
+        valpred, index = state
+        step = IMA_STEP_TABLE[index]
+        samples = []
+        for delta in codes.tolist():
+            index = min(88, max(0, index + IMA_INDEX_TABLE[delta]))
+            vpdiff = step >> 3
+            if delta & 4:
+                vpdiff += step
+            if delta & 2:
+                vpdiff += step >> 1
+            if delta & 1:
+                vpdiff += step >> 2
+            valpred = max(-32768, valpred - vpdiff) if delta & 8 else min(32767, valpred + vpdiff)
+            step = IMA_STEP_TABLE[index]
+            samples.append(valpred)
+        return np.array(samples, dtype=np.int16)
+
+class OpusCodec(AudioCodec):
+    """Opus à 48 kHz, OPUS_BITRATE bit/s (profil VoIP) ; disponible seulement si opuslib et libopus sont installés."""
+    name = "opus48"
+    label = "Opus 48 kHz"
+    rate = 48000
+
+    def __init__(self):
+        super().__init__()
+        self.encoder = opuslib.Encoder(self.rate, CHANNELS, opuslib.APPLICATION_VOIP)
+        self.encoder.bitrate = OPUS_BITRATE
+        self.decoder = opuslib.Decoder(self.rate, CHANNELS)
+
+    def encode_samples(self, samples):
+        return self.encoder.encode(samples.tobytes(), self.samples)
+
+    def decode_samples(self, data):
+        return np.frombuffer(self.decoder.decode(data, self.samples), dtype=np.int16)
+
+AUDIO_CODECS = {codec.name: codec for codec in (OpusCodec, ImaAdpcmCodec, MuLawCodec, AudioCodec)}
+# Erreurs levées par unpack_audio_frame et les décodeurs sur une trame tronquée ou corrompue
+AUDIO_DECODE_ERRORS = ((struct.error, ValueError) + ((audioop.error,) if audioop else ())
+                       + ((opuslib.OpusError,) if opuslib else ()))
+
+def available_audio_codecs():
+    """Noms des codecs utilisables sur cette machine, dans l'ordre de préférence."""
+    return [name for name in AUDIO_CODEC_PREFERENCE if name != "opus48" or opuslib]
+
+def choose_audio_codec(offered):
+    """Côté serveur : premier codec de notre préférence que le client propose (PCM en dernier recours)."""
+    for name in available_audio_codecs():
+        if name in offered:
+            return AUDIO_CODECS[name]()
+    return AudioCodec()
 
 # --- Paramètres Vidéo (OpenCV) ---
-FRAME_WIDTH = 640
+FRAME_WIDTH = 640  # Résolution de capture et d'affichage ; la résolution envoyée dépend du contrôleur de débit
 FRAME_HEIGHT = 480
-FPS = 20
-JPEG_QUALITY_NETWORK = 50
+FPS = 25           # Cadence maximale de capture
+
+# --- Contrôle de débit vidéo ---
+# Paliers (largeur, hauteur, images/s, qualité JPEG), du plus léger au plus lourd
+VIDEO_QUALITY_LADDER = [
+    (160, 120, 10, 40),
+    (240, 180, 10, 45),
+    (320, 240, 10, 45),
+    (320, 240, 15, 50),
+    (480, 360, 10, 50),
+    (480, 360, 15, 55),
+    (640, 480, 12, 60),
+    (640, 480, 15, 65),
+    (640, 480, 20, 70),
+    (640, 480, 25, 80),
+]
+VIDEO_START_LEVEL = 6
+VIDEO_MIN_KBPS = 80
+VIDEO_MAX_KBPS = 12000
+VIDEO_CONTROL_INTERVAL = 0.5 # Secondes entre deux décisions du contrôleur
+VIDEO_DELAY_HIGH_MS = 120    # Délai de file signalé par le récepteur au-delà duquel on réduit le débit
+VIDEO_DELAY_LOW_MS = 40      # En dessous (et file d'envoi vide), on peut augmenter
+VIDEO_QUEUE_HIGH = 1.5       # Profondeur moyenne de la file d'envoi signalant une congestion
+VIDEO_DECREASE = 0.85        # Réduction multiplicative de la cible en cas de congestion
+VIDEO_INCREASE = 1.15        # Augmentation de la cible quand le réseau suit
+VIDEO_REPORT_INTERVAL = 0.2  # Période des rapports du récepteur
+VIDEO_DELAY_BASE_WINDOW = 10 # Fenêtre (s) du délai minimal servant de référence (les horloges ne sont pas synchronisées)
 
 # --- Paramètres Réseau ---
 BUFFER_SIZE = 65536
-AUDIO_PORT = 12345
-VIDEO_PORT = 12346
+MEDIA_PORT = 12345 # Une seule connexion TCP par participant (audio, vidéo, contrôle) ; l'audio UDP utilise le même numéro
+
+# --- Paramètres du mixeur audio (mode Serveur de groupe) ---
+MIX_FRAME_BYTES = CHUNK_SIZE * 2 # Une trame = CHUNK_SIZE échantillons int16 mono
+MIX_TICK = CHUNK_SIZE / RATE     # Cadence fixe du mixeur (~23 ms)
+MIX_OUTPUT_MAX_FRAMES = 8        # Trames en attente d'envoi par auditeur ; un client lent perd des trames sans bloquer les autres
+LOCAL_PARTICIPANT = "local"      # Micro et haut-parleur du serveur lui-même
+
+# --- Paquets vidéo et relais (mode Serveur de groupe) ---
+# En-tête de chaque paquet vidéo : taille des données, type, source, numéro de séquence, horodatage de capture (horloge média)
+# La source vaut 0 à l'émission ; le serveur y inscrit l'identifiant de l'émetteur avant de relayer le paquet
+VIDEO_PACKET_HEADER = struct.Struct("!IBBId")
+VIDEO_PACKET_SOURCE_OFFSET = 5 # Position de l'octet source dans l'en-tête
+VIDEO_PACKET_FRAME = 0  # Image JPEG complète (image clé)
+VIDEO_PACKET_REPORT = 1 # Rapport du récepteur vers l'émetteur, sur la même connexion
+VIDEO_PACKET_TILES = 2  # Tuiles modifiées depuis l'image précédente (dépend des paquets précédents de la même source)
+# Rapport : dernière séquence reçue, délai de file mesuré (ms), débit reçu (kbit/s)
+VIDEO_REPORT = struct.Struct("!Iff")
+VIDEO_SUBSCRIBER_MAX_FRAMES = 3      # Images en attente d'envoi par abonné ; au-delà l'abonné est en retard
+
+# --- Codage par tuiles (mode "Vidéo delta") ---
+# Paquet TILES : largeur, hauteur, taille des tuiles, nombre de tuiles, puis (colonne, ligne) de chaque tuile sur
+# deux octets et une seule image JPEG (mosaïque) regroupant les tuiles dans cet ordre, TILE_MOSAIC_COLUMNS par ligne
+VIDEO_TILE_HEADER = struct.Struct("!HHBH")
+TILE_SIZE = 32               # Multiple de 16 : les blocs JPEG d'une tuile ne débordent pas sur ses voisines
+TILE_MOSAIC_COLUMNS = 16
+TILE_DIFF_THRESHOLD = 3.0    # Écart moyen (niveaux de gris) au-delà duquel une tuile est renvoyée
+TILE_KEYFRAME_RATIO = 0.6    # Au-delà de cette part de tuiles modifiées, une image complète coûte moins cher
+VIDEO_KEYFRAME_INTERVAL = 2.0 # Secondes entre deux images complètes (rattrapage des abonnés et des pertes)
+VIDEO_SOURCE_TIMEOUT = 2.0   # Sans image de la source affichée pendant ce délai, le client passe à une autre
 
 # --- Variables Globales d'État ---
 audio_sending = False
@@ -46,12 +915,26 @@ cap = None
 label_local_video = None
 label_remote_video = None
 audio_status_label = None
+audio_stats_label = None
+audio_jitter_buffer = None  # Tampon de gigue du client de groupe
+client_audio_transport = None # AudioTransport vers le serveur (codec négocié) en mode client
+client_connection = None    # MediaConnection vers le serveur en mode client
+media_clock = MediaClock()  # Horloge média de l'appel (celle du serveur, estimée côté client)
+media_sync = None           # MediaSync de la vue distante pendant un appel
+local_view = None           # VideoView de la vidéo locale
+remote_view = None          # VideoView de la vidéo distante (pair, serveur ou source principale)
+video_stats_label = None
+video_stats_last_update = 0.0
 
 # --- Variables pour l'appel de groupe (Mode Serveur) ---
-connected_audio_clients = [] # Liste des sockets clients audio connectés
-connected_video_clients = [] # Liste des sockets clients vidéo connectés
-client_audio_threads = {}    # Threads de gestion de la réception audio par client
-client_video_threads = {}    # Threads de gestion de la réception vidéo par client
+connected_clients = []       # MediaConnection des clients connectés (audio, vidéo et contrôle sur chacune)
+video_relay = None           # VideoRelay du serveur de groupe (une file et un thread d'envoi par abonné)
+video_rate_controller = None # VideoRateController de notre flux vidéo sortant
+video_source_ids = itertools.count() # Numéros de source attribués aux clients vidéo (mode Serveur)
+audio_mixer = None           # AudioMixer du serveur de groupe
+server_udp_audio_socket = None # Socket UDP partagé par les clients audio en UDP (mode Serveur)
+audio_client_codecs = {}    # Adresse d'un client -> codec négocié (mode Serveur)
+udp_audio_participants = {} # Adresse UDP d'un client -> (son adresse TCP, identifiant dans le mixeur ; son AudioTransport)
 
 # --- Fonctions Audio (PyAudio) ---
 
@@ -102,10 +985,10 @@ def find_and_display_audio_devices():
 
     return selected_input_device_index, selected_output_device_index
 
-def send_audio_stream(target_sockets):
+def send_audio_stream(target):
     """
-    Capture l'audio du microphone et l'envoie via les sockets fournis.
-    target_sockets peut être un socket unique (mode P2P) ou une liste de sockets (mode serveur/groupe).
+    Capture l'audio du microphone et l'envoie.
+    target est l'AudioMixer en mode serveur de groupe, ou l'AudioTransport vers le pair/serveur en mode client.
     """
     global audio_sending, p_audio, stream_in, selected_input_device_index
     if p_audio is None:
@@ -122,28 +1005,18 @@ def send_audio_stream(target_sockets):
         print("Envoi audio démarré...")
         while audio_sending:
             data = stream_in.read(CHUNK_SIZE, exception_on_overflow=False)
-            
-            if isinstance(target_sockets, list): # Server mode: send to all connected clients
-                for sock in list(target_sockets): # Iterate over a copy to avoid issues if clients disconnect
-                    try:
-                        sock.sendall(data)
-                    except (BrokenPipeError, ConnectionResetError) as e:
-                        print(f"Client audio déconnecté lors de l'envoi: {sock.getpeername()} - {e}")
-                        if sock in target_sockets: # Remove if still in list
-                            target_sockets.remove(sock)
-                        sock.close()
-                    except Exception as e:
-                        print(f"Erreur d'envoi audio à un client: {sock.getpeername()} - {e}")
-            else: # Client mode: send to single peer/server
+
+            if isinstance(target, AudioMixer): # Server mode: the mixer sends one mix to each client
+                target.push_frame(LOCAL_PARTICIPANT, data)
+            else: # Client mode: numbered, timestamped frame to the peer/server
                 try:
-                    target_sockets.sendall(data)
+                    target.send(data)
                 except (BrokenPipeError, ConnectionResetError):
                     print("Connexion audio rompue.")
                     break
                 except Exception as e:
                     print(f"Erreur lors de l'envoi audio: {e}")
                     break
-            time.sleep(0.001)
     except Exception as e:
         print(f"Erreur lors de l'envoi audio: {e}")
         messagebox.showerror("Erreur Audio", f"Erreur lors de l'envoi audio: {e}")
@@ -154,11 +1027,11 @@ def send_audio_stream(target_sockets):
             stream_in = None
         stop_audio_call()
 
-def receive_audio_stream_p2p(conn_audio, addr):
+def receive_audio_stream_p2p(transport, addr):
     """
-    Reçoit le flux audio via le socket et le joue sur les haut-parleurs (mode P2P).
+    Reçoit les trames audio du pair dans un tampon de gigue et les joue sur les haut-parleurs (mode P2P).
     """
-    global audio_receiving, p_audio, stream_out, selected_output_device_index
+    global audio_receiving, p_audio, stream_out, selected_output_device_index, audio_jitter_buffer
     if p_audio is None:
         print("PyAudio non initialisé pour la réception audio.")
         return
@@ -170,14 +1043,13 @@ def receive_audio_stream_p2p(conn_audio, addr):
                                   output=True,
                                   frames_per_buffer=CHUNK_SIZE,
                                   output_device_index=selected_output_device_index)
-        print(f"Réception audio de {addr} démarrée...")
-        while audio_receiving:
-            data = conn_audio.recv(CHUNK_SIZE * p_audio.get_sample_size(FORMAT))
-            if not data:
-                print("Pair audio déconnecté ou fin de flux.")
-                break
-            stream_out.write(data)
-            time.sleep(0.001)
+        print(f"Réception audio de {addr} démarrée ({transport.name})...")
+        audio_jitter_buffer = AudioJitterBuffer(CHUNK_SIZE * p_audio.get_sample_size(FORMAT), AUDIO_DTYPE)
+        sync = media_sync
+        if sync:
+            sync.output_latency = stream_out.get_output_latency()
+        play_from_jitter_buffer(transport, audio_jitter_buffer, stream_out.write, lambda: audio_receiving, f"Audio {addr[0]}",
+                                sync.on_audio_played if sync else None)
     except Exception as e:
         print(f"Erreur lors de la réception audio: {e}")
         messagebox.showerror("Erreur Audio", f"Erreur lors de la réception audio: {e}")
@@ -186,15 +1058,14 @@ def receive_audio_stream_p2p(conn_audio, addr):
             stream_out.stop_stream()
             stream_out.close()
             stream_out = None
-        if conn_audio:
-            conn_audio.close()
+        transport.close()
         stop_audio_call()
 
-def receive_audio_stream_from_server(client_socket_audio):
+def receive_audio_stream_from_server(transport):
     """
-    Reçoit le flux audio du serveur relayé et le joue sur les haut-parleurs (mode Client de groupe).
+    Reçoit le mix audio du serveur dans un tampon de gigue et le joue sur les haut-parleurs (mode Client de groupe).
     """
-    global audio_receiving, p_audio, stream_out, selected_output_device_index
+    global audio_receiving, p_audio, stream_out, selected_output_device_index, audio_jitter_buffer
     if p_audio is None:
         print("PyAudio non initialisé pour la réception audio (client de groupe).")
         return
@@ -206,14 +1077,13 @@ def receive_audio_stream_from_server(client_socket_audio):
                                   output=True,
                                   frames_per_buffer=CHUNK_SIZE,
                                   output_device_index=selected_output_device_index)
-        print("Réception audio du serveur démarrée...")
-        while audio_receiving:
-            data = client_socket_audio.recv(CHUNK_SIZE * p_audio.get_sample_size(FORMAT))
-            if not data:
-                print("Serveur audio déconnecté ou fin de flux.")
-                break
-            stream_out.write(data)
-            time.sleep(0.001)
+        print(f"Réception audio du serveur démarrée ({transport.name})...")
+        audio_jitter_buffer = AudioJitterBuffer(CHUNK_SIZE * p_audio.get_sample_size(FORMAT), AUDIO_DTYPE)
+        sync = media_sync
+        if sync:
+            sync.output_latency = stream_out.get_output_latency()
+        play_from_jitter_buffer(transport, audio_jitter_buffer, stream_out.write, lambda: audio_receiving, "Audio serveur",
+                                sync.on_audio_played if sync else None)
     except Exception as e:
         print(f"Erreur lors de la réception audio du serveur: {e}")
         messagebox.showerror("Erreur Audio", f"Erreur lors de la réception audio du serveur: {e}")
@@ -222,65 +1092,912 @@ def receive_audio_stream_from_server(client_socket_audio):
             stream_out.stop_stream()
             stream_out.close()
             stream_out = None
-        if client_socket_audio:
-            client_socket_audio.close()
+        transport.close()
         stop_audio_call()
 
-def handle_server_incoming_audio(conn, addr):
+def handle_server_incoming_audio(transport, addr):
     """
-    Gère la réception audio d'UN client sur le serveur et la diffuse aux AUTRES clients.
+    Gère la réception audio d'UN client sur le serveur : chaque trame est remise au tampon de gigue de ce
+    participant dans le mixeur, qui se charge d'envoyer à chaque participant le mix des autres.
+    Pour un client en UDP, ses trames arrivent par receive_server_udp_audio ; ce thread surveille alors
+    seulement la connexion multiplexée pour détecter son départ.
     """
-    global audio_receiving, connected_audio_clients, stream_out
-    print(f"Serveur: Traitement audio pour le client {addr}")
+    global audio_receiving
+    print(f"Serveur: Traitement audio pour le client {addr} ({transport.name})")
+    connection = transport.connection
     try:
         while audio_receiving: # Utilise le même flag que la réception audio globale
-            data = conn.recv(CHUNK_SIZE * p_audio.get_sample_size(FORMAT))
-            if not data:
-                print(f"Serveur: Client {addr} déconnecté de l'audio.")
+            if transport.udp_sock:
+                if connection.closed.wait(0.5):
+                    break
+                continue
+            try:
+                frame = transport.receive()
+            except socket.timeout:
+                continue
+            if frame is None:
                 break
-            
-            # Joue l'audio localement sur le serveur (si un périphérique de sortie est configuré)
-            if stream_out and audio_receiving: # Vérifie si le stream_out est toujours actif
-                try:
-                    stream_out.write(data)
-                except Exception as e:
-                    print(f"Serveur: Erreur d'écriture sur le flux audio local: {e}")
-
-            # Diffuse aux autres clients
-            for client_sock in list(connected_audio_clients): # Itérer sur une copie
-                if client_sock != conn: # Ne pas renvoyer à l'expéditeur
-                    try:
-                        client_sock.sendall(data)
-                    except (BrokenPipeError, ConnectionResetError):
-                        print(f"Serveur: Client {client_sock.getpeername()} déconnecté lors de la diffusion audio.")
-                        # Gérer la déconnexion d'un client de manière plus robuste (ex: retirer de la liste)
-                        if client_sock in connected_audio_clients:
-                            connected_audio_clients.remove(client_sock)
-                            client_sock.close()
-                    except Exception as e:
-                        print(f"Serveur: Erreur de diffusion audio à {client_sock.getpeername()}: {e}")
+            if audio_mixer:
+                audio_mixer.push_frame(addr, frame[2], seq=frame[0], timestamp=frame[1])
+        print(f"Serveur: Client {addr} déconnecté de l'audio.")
     except Exception as e:
         print(f"Serveur: Erreur générale lors de la gestion de l'audio de {addr}: {e}")
     finally:
-        if conn in connected_audio_clients:
-            connected_audio_clients.remove(conn)
-            conn.close()
+        if audio_mixer:
+            audio_mixer.remove_participant(addr)
+        if transport.udp_peer:
+            udp_audio_participants.pop(transport.udp_peer, None)
+        audio_client_codecs.pop(addr, None)
+        connection.close() # Pas transport.close() : le socket UDP du serveur est partagé
         print(f"Serveur: Thread de gestion audio pour {addr} terminé.")
 
+def receive_server_udp_audio(udp_sock):
+    """Serveur de groupe : distribue les datagrammes audio UDP au participant correspondant à leur adresse source."""
+    while audio_receiving:
+        try:
+            data, source = udp_sock.recvfrom(65535)
+        except socket.timeout:
+            continue
+        except OSError:
+            break
+        client = udp_audio_participants.get(source)
+        if client is not None and audio_mixer:
+            participant, transport = client
+            try:
+                seq, timestamp, payload = unpack_audio_frame(data)
+                pcm = transport.codec.decode(payload)
+            except AUDIO_DECODE_ERRORS: # Datagramme tronqué ou mal formé : ignoré, le thread sert tout le monde
+                continue
+            audio_mixer.push_frame(participant, pcm, seq=seq, timestamp=timestamp)
+
+class AudioMixer:
+    """
+    Mixeur audio (MCU) du serveur de groupe.
+    À chaque tick (cadence fixe MIX_TICK), prend une trame dans le tampon de gigue de chaque participant
+    (trames remises dans l'ordre, pertes masquées), calcule la somme de tous
+    et donne à chaque participant le mix "tout le monde sauf moi", écrêté sur 16 bits.
+    Chaque mix porte l'horodatage de capture (horloge média) de la plus récente des voix qu'il contient : exact
+    dans un appel à deux, approché au-delà, il permet à l'auditeur de caler la vidéo sur ce qu'il entend.
+    Chaque auditeur reçoit un seul flux via sa propre file et son propre thread d'envoi :
+    le trafic sortant est en O(N) et un client lent ne ralentit pas les autres.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inputs = {}  # participant -> AudioJitterBuffer des trames reçues
+        self.local_seqs = {} # participant -> dernier numéro attribué aux trames sans séquence (micro local)
+        self.outputs = {} # participant -> file des mix à envoyer
+        self.running = False
+        self.ticks = 0
+        self.late_ticks = 0
+        self.dropped_frames = 0
+        self.bytes_sent = 0
+
+    def add_participant(self, participant, send):
+        """send(data, horodatage) envoie un mix au participant (transport.send pour un client, la sortie audio pour le serveur)."""
+        output_queue = queue.Queue(maxsize=MIX_OUTPUT_MAX_FRAMES)
+        with self.lock:
+            self.inputs[participant] = AudioJitterBuffer(MIX_FRAME_BYTES, AUDIO_DTYPE)
+            self.outputs[participant] = output_queue
+        threading.Thread(target=self._output_writer, args=(participant, send, output_queue), daemon=True).start()
+
+    def remove_participant(self, participant):
+        with self.lock:
+            self.inputs.pop(participant, None)
+            self.local_seqs.pop(participant, None)
+            output_queue = self.outputs.pop(participant, None)
+        if output_queue is not None:
+            self._close_output(output_queue)
+
+    def push_frame(self, participant, data, seq=None, timestamp=None):
+        """Trame d'un participant ; sans numéro de séquence (micro local), elle est numérotée à l'arrivée."""
+        jitter_buffer = self.inputs.get(participant)
+        if jitter_buffer is None:
+            return
+        if seq is None:
+            seq = self.local_seqs[participant] = self.local_seqs.get(participant, -1) + 1
+            timestamp = media_clock.now()
+        jitter_buffer.push(seq, timestamp, data)
+
+    def mix_tick(self):
+        with self.lock:
+            participants = list(self.inputs.items())
+            outputs = dict(self.outputs)
+        if not participants:
+            return
+        frames = np.zeros((len(participants), CHUNK_SIZE), dtype=np.int32)
+        active = np.zeros(len(participants), dtype=bool)
+        captured = np.full(len(participants), -np.inf) # Horodatage de capture de chaque trame (-inf : masquée ou absente)
+        for i, (participant, jitter_buffer) in enumerate(participants):
+            payload = jitter_buffer.pop()
+            if payload is not None:
+                frames[i] = np.frombuffer(payload, dtype=np.int16)
+                active[i] = True
+                if jitter_buffer.played_timestamp is not None:
+                    captured[i] = jitter_buffer.played_timestamp
+        n_active = int(active.sum())
+        if n_active == 0:
+            return
+        total = frames.sum(axis=0)
+        # Mix de chaque auditeur = somme de tous - sa propre voix, écrêté pour éviter le repliement en int16
+        mixes = np.clip(total - frames, -32768, 32767).astype(np.int16)
+        now = media_clock.now()
+        for i, (participant, _) in enumerate(participants):
+            if n_active - int(active[i]) == 0: # Personne d'autre n'a parlé pendant ce tick
+                continue
+            output_queue = outputs.get(participant)
+            if output_queue is None:
+                continue
+            latest = np.delete(captured, i).max()
+            try:
+                output_queue.put_nowait((mixes[i].tobytes(), latest if latest > -np.inf else now))
+            except queue.Full:
+                self.dropped_frames += 1
+
+    def stats(self):
+        """Résumé pour l'interface : participants, ticks en retard, trames jetées et état des tampons de gigue."""
+        with self.lock:
+            buffers = list(self.inputs.values())
+        buffer_stats = [jitter_buffer.stats() for jitter_buffer in buffers]
+        return {
+            "participants": len(buffers),
+            "late_ticks": self.late_ticks,
+            "dropped": self.dropped_frames,
+            "underruns": sum(s["underruns"] for s in buffer_stats),
+            "concealed": sum(s["concealed"] for s in buffer_stats),
+            "max_depth": max((s["depth"] for s in buffer_stats), default=0),
+        }
+
+    def run(self):
+        self.running = True
+        next_tick = time.perf_counter()
+        while self.running:
+            self.mix_tick()
+            self.ticks += 1
+            next_tick += MIX_TICK
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.late_ticks += 1
+                if delay < -4 * MIX_TICK: # Gros retard (machine chargée) : on repart de maintenant
+                    next_tick = time.perf_counter()
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            output_queues = list(self.outputs.values())
+            self.inputs.clear()
+            self.outputs.clear()
+        for output_queue in output_queues:
+            self._close_output(output_queue)
+
+    def _close_output(self, output_queue):
+        while True:
+            try:
+                output_queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    output_queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _output_writer(self, participant, send, output_queue):
+        while True:
+            item = output_queue.get()
+            if item is None:
+                break
+            data, timestamp = item
+            try:
+                send(data, timestamp)
+                self.bytes_sent += len(data)
+            except Exception as e:
+                print(f"Serveur: Erreur d'envoi du mix audio à {participant}: {e}")
+                self.remove_participant(participant)
+                break
+
+def refresh_audio_stats():
+    """Met à jour les statistiques audio (mixeur en mode serveur, tampon de gigue en mode client) ; exécuté dans le thread Tk."""
+    if audio_mixer is not None:
+        codecs = {}
+        for codec in list(audio_client_codecs.values()):
+            codecs.setdefault(codec.label, []).append(codec.bitrate_kbps())
+        summary = ", ".join(f"{label} x{len(rates)} ({sum(rates) / len(rates):.0f} kbit/s)" for label, rates in codecs.items())
+        audio_status_label.configure(text=f"Statut Audio: Serveur, {len(audio_client_codecs)} client(s)" + (f" | {summary}" if summary else ""))
+        s = audio_mixer.stats()
+        audio_stats_label.configure(text=f"Mixeur: {s['participants']} participants | tampon max {s['max_depth']} trames | "
+                                         f"sous-alim. {s['underruns']} | masquées {s['concealed']} | "
+                                         f"ticks en retard {s['late_ticks']} | trames jetées {s['dropped']}")
+    elif audio_receiving and audio_jitter_buffer is not None:
+        if client_audio_transport is not None:
+            audio_status_label.configure(text=f"Statut Audio: En appel ({client_audio_transport.name}, {client_audio_transport.codec.describe()})")
+        audio_stats_label.configure(text=format_audio_stats(audio_jitter_buffer.stats()))
+    else:
+        audio_stats_label.configure(text="")
+    root.after(1000, refresh_audio_stats)
+
 # --- Fonctions Vidéo (OpenCV et Tkinter pour l'affichage) ---
 
-def convert_opencv_to_ppm(frame):
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    header = f"P6\n{frame_rgb.shape[1]} {frame_rgb.shape[0]}\n255\n".encode('ascii')
-    return header + frame_rgb.tobytes()
+# Affichage : le thread Tk dépile au plus une image par vue toutes les RENDER_INTERVAL_MS
+RENDER_INTERVAL_MS = 10
+VIDEO_STATS_INTERVAL_MS = 1000
 
-def send_video_stream(target_sockets):
+class MediaSync:
     """
-    Capture le flux vidéo de la webcam, le prévisualise localement,
-    le compresse en JPEG et l'envoie via les sockets fournis.
-    target_sockets peut être un socket unique (mode P2P) ou une liste de sockets (mode serveur/groupe).
+    Synchronisation labiale côté réception. L'audio sert d'horloge de lecture (il ne peut ni attendre ni sauter
+    sans que cela s'entende) et la vidéo s'y cale : après chaque trame audio écrite sur la sortie, on note son
+    horodatage de capture (horloge média) ; la position audio courante est cet horodatage, plus le temps écoulé
+    depuis, moins la latence de sortie du périphérique. La vue distante ne montre une image qu'une fois cette
+    position atteinte. L'erreur de synchronisation est l'écart (capture de l'image - position audio) au moment
+    où l'image s'affiche : positive si la vidéo est en avance sur le son, négative si elle est en retard.
+    hold=False garde la mesure sans retenir les images (comparaison dans bench_media_sync.py).
     """
-    global video_sending, cap, label_local_video
+    def __init__(self, output_latency=0.0, hold=True):
+        self.output_latency = output_latency
+        self.hold = hold
+        self.lock = threading.Lock()
+        self.played_timestamp = None
+        self.played_at = 0.0
+        self.errors = deque(maxlen=250) # Erreurs des dernières images affichées (s)
+
+    def on_audio_played(self, timestamp):
+        if timestamp is None: # Trame masquée : la position continue d'avancer depuis la précédente
+            return
+        with self.lock:
+            self.played_timestamp = timestamp
+            self.played_at = time.perf_counter()
+
+    def audio_position(self):
+        """Horodatage de capture de l'audio entendu en ce moment, ou None si aucun audio n'est joué."""
+        with self.lock:
+            if self.played_timestamp is None:
+                return None
+            elapsed = time.perf_counter() - self.played_at
+            if elapsed > AUDIO_SYNC_TIMEOUT:
+                return None
+            return self.played_timestamp + elapsed - self.output_latency
+
+    def record(self, error):
+        with self.lock:
+            self.errors.append(error)
+
+    def stats(self):
+        with self.lock:
+            errors = np.array(self.errors) * 1000
+        if not len(errors):
+            return None
+        return {"mean_ms": float(errors.mean()), "abs_ms": float(np.abs(errors).mean()),
+                "p95_ms": float(np.percentile(np.abs(errors), 95))}
+
+def format_sync_stats(stats):
+    return f"Sync A/V: écart moyen {stats['mean_ms']:+.0f} ms | |écart| {stats['abs_ms']:.0f} ms (p95 {stats['p95_ms']:.0f} ms)"
+
+class VideoView:
+    """
+    Affiche un flux vidéo dans un label en réutilisant un seul tk.PhotoImage.
+    Les threads réseau et de capture déposent les images reçues (paquets vidéo ou images BGR) dans une liste
+    d'attente : une image complète remplace tout ce qui n'a pas encore été traité (compté comme sauté) au lieu
+    de s'accumuler, alors que les paquets de tuiles s'y ajoutent, car chacun complète le précédent. Un thread
+    de décodage les applique dans l'ordre et ne convertit en PPM que la dernière image obtenue ; seul le thread
+    Tk (render(), appelé par root.after) touche au PhotoImage, via put.
+    Une seule source est affichée : la première reçue, jusqu'à ce qu'elle se taise VIDEO_SOURCE_TIMEOUT secondes.
+    Avec une MediaSync (attribut sync), les images prêtes attendent que l'audio ait atteint leur horodatage
+    de capture (au plus VIDEO_SYNC_MAX_FRAMES images) et l'écart au moment de l'affichage est mesuré.
+    """
+    def __init__(self, label, width, height):
+        self.width = width
+        self.height = height
+        self.photo = tk.PhotoImage(width=width, height=height)
+        self.photo.put("black", to=(0, 0, width, height))
+        label.configure(image=self.photo)
+        label.image = self.photo # Garder une référence forte
+        self.header = f"P6\n{width} {height}\n255\n".encode('ascii')
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8) # Tampon RGB réutilisé pour chaque image
+        self.condition = threading.Condition()
+        self.pending = []   # Paquets (type, source, séquence, données) ou (None, image BGR) en attente de décodage
+        self.decoders = {}  # Source -> TileDeltaDecoder (thread de décodage uniquement)
+        self.source = None  # Source affichée
+        self.source_seen = 0.0
+        self.ready = deque() # (horodatage de capture, données PPM) prêtes à afficher
+        self.sync = None     # MediaSync de l'appel en cours (vue distante)
+        self.running = True
+        self.received = 0
+        self.skipped = 0
+        self.rendered = 0
+        self.decode_ms = 0.0
+        self.render_ms = 0.0
+        self.render_times = deque(maxlen=240)
+        threading.Thread(target=self._decode_loop, daemon=True).start()
+
+    def submit_packet(self, kind, source, seq, payload, timestamp=None):
+        """Dépose un paquet vidéo reçu (image clé ou tuiles) ; appelé depuis un thread réseau, sans décodage."""
+        now = time.perf_counter()
+        with self.condition:
+            if source != self.source:
+                if self.source is not None and now - self.source_seen < VIDEO_SOURCE_TIMEOUT:
+                    return # Une autre source est affichée
+                self.source = source
+            self.source_seen = now
+            self._submit((kind, source, seq, payload, timestamp), kind != VIDEO_PACKET_TILES)
+
+    def submit_frame(self, frame):
+        """Dépose une image BGR déjà décodée (capture locale)."""
+        with self.condition:
+            self._submit((None, frame, None), True)
+
+    def _submit(self, item, replaces):
+        if replaces and self.pending:
+            self.skipped += len(self.pending)
+            self.pending.clear()
+        self.pending.append(item)
+        self.received += 1
+        self.condition.notify()
+
+    def _decode_loop(self):
+        while True:
+            with self.condition:
+                while not self.pending and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                items, self.pending = self.pending, []
+            start = time.perf_counter()
+            frame = timestamp = None
+            for item in items:
+                if item[0] is None:
+                    frame, timestamp = item[1], None
+                    continue
+                kind, source, seq, payload, packet_timestamp = item
+                decoder = self.decoders.get(source)
+                if decoder is None:
+                    decoder = self.decoders[source] = TileDeltaDecoder()
+                try:
+                    decoded = decoder.decode(kind, seq, payload)
+                except (ValueError, struct.error, cv2.error) as e: # Paquet tronqué ou mal formé
+                    print(f"Erreur de décodage du paquet vidéo: {e}")
+                    decoder.last_seq = None
+                    decoded = None
+                if decoded is not None:
+                    frame, timestamp = decoded, packet_timestamp
+            if frame is None: # Tuiles en attente d'une image clé
+                continue
+            if frame.shape[1] != self.width or frame.shape[0] != self.height:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            ppm_data = b"".join((self.header, self.rgb.data)) # Une seule copie : Tk attend des bytes
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self.condition:
+                self.ready.append((timestamp, ppm_data))
+                if len(self.ready) > VIDEO_SYNC_MAX_FRAMES:
+                    self.ready.popleft()
+                    self.skipped += 1
+                self.decode_ms = elapsed_ms if self.decode_ms == 0 else 0.9 * self.decode_ms + 0.1 * elapsed_ms
+
+    def render(self):
+        """
+        Copie dans le PhotoImage la plus récente des images prêtes dont l'heure est venue (toutes sans MediaSync,
+        sinon celles que l'audio a rattrapées) ; à appeler uniquement depuis le thread Tk.
+        """
+        sync = self.sync
+        position = sync.audio_position() if sync else None
+        ppm_data = timestamp = None
+        with self.condition:
+            while self.ready:
+                ready_timestamp = self.ready[0][0]
+                if (sync and sync.hold and position is not None and ready_timestamp is not None
+                        and 0 < ready_timestamp - position < VIDEO_SYNC_MAX_HOLD):
+                    break # En avance sur le son : attend le prochain passage
+                if ppm_data is not None:
+                    self.skipped += 1
+                timestamp, ppm_data = self.ready.popleft()
+        if ppm_data is None:
+            return
+        if position is not None and timestamp is not None:
+            sync.record(timestamp - position)
+        start = time.perf_counter()
+        try:
+            self.photo.tk.call(self.photo.name, 'put', ppm_data, '-format', 'ppm')
+        except tk.TclError as e:
+            print(f"Erreur d'affichage vidéo (PPM): {e}")
+            return
+        now = time.perf_counter()
+        elapsed_ms = (now - start) * 1000
+        self.render_ms = elapsed_ms if self.render_ms == 0 else 0.9 * self.render_ms + 0.1 * elapsed_ms
+        self.rendered += 1
+        self.render_times.append(now)
+
+    def clear(self):
+        """Oublie les images en attente et remet la vue au noir (thread Tk)."""
+        with self.condition:
+            self.pending = []
+            self.ready.clear()
+            self.source = None
+        self.photo.put("black", to=(0, 0, self.width, self.height))
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def stats(self):
+        now = time.perf_counter()
+        recent = [t for t in self.render_times if now - t <= 1.0]
+        return {
+            "fps": len(recent),
+            "decode_ms": self.decode_ms,
+            "render_ms": self.render_ms,
+            "received": self.received,
+            "skipped": self.skipped,
+            "rendered": self.rendered,
+        }
+
+def format_video_stats(name, stats):
+    return (f"{name}: {stats['fps']} i/s | décodage {stats['decode_ms']:.1f} ms | "
+            f"rendu {stats['render_ms']:.1f} ms | sautées {stats['skipped']}")
+
+def render_video_views():
+    """Boucle d'affichage vidéo dans le thread Tk : au plus une image par vue et par passage, jamais de file."""
+    global video_stats_last_update
+    for view in (local_view, remote_view):
+        if view:
+            view.render()
+    now = time.perf_counter()
+    if now - video_stats_last_update >= VIDEO_STATS_INTERVAL_MS / 1000:
+        video_stats_last_update = now
+        parts = [format_video_stats(name, view.stats()) for name, view in (("Locale", local_view), ("Distante", remote_view))
+                 if view and view.received]
+        if video_relay:
+            parts.append(format_relay_stats(video_relay.stats()))
+        if video_rate_controller and video_sending:
+            parts.append(format_rate_stats(video_rate_controller.stats()))
+        sync_stats = media_sync.stats() if media_sync else None
+        if sync_stats:
+            parts.append(format_sync_stats(sync_stats))
+        video_stats_label.configure(text="   ".join(parts))
+    root.after(RENDER_INTERVAL_MS, render_video_views)
+
+def clear_video_views():
+    for view in (local_view, remote_view):
+        if view:
+            view.clear()
+
+def pack_video_packet(kind, seq, timestamp, data):
+    """En-tête + données en un seul objet bytes (data peut être un tableau NumPy, comme la sortie de cv2.imencode)."""
+    return b"".join((VIDEO_PACKET_HEADER.pack(len(data), kind, 0, seq, timestamp), memoryview(data)))
+
+def pad_to_tiles(frame):
+    """Complète l'image (en répétant son bord) pour que ses dimensions soient des multiples de TILE_SIZE."""
+    pad_bottom = -frame.shape[0] % TILE_SIZE
+    pad_right = -frame.shape[1] % TILE_SIZE
+    if pad_bottom or pad_right:
+        return cv2.copyMakeBorder(frame, 0, pad_bottom, 0, pad_right, cv2.BORDER_REPLICATE)
+    return frame
+
+def tile_view(image):
+    """Vue (lignes, colonnes, TILE_SIZE, TILE_SIZE[, canaux]) d'une image complétée, sans copie."""
+    rows, columns = image.shape[0] // TILE_SIZE, image.shape[1] // TILE_SIZE
+    return image.reshape(rows, TILE_SIZE, columns, TILE_SIZE, *image.shape[2:]).swapaxes(1, 2)
+
+def mosaic_shape(count):
+    columns = min(count, TILE_MOSAIC_COLUMNS)
+    return -(-count // columns), columns
+
+def build_mosaic(tiles):
+    """Range les tuiles (n, TILE_SIZE, TILE_SIZE, 3) ligne par ligne dans une seule image ; les places libres restent noires."""
+    rows, columns = mosaic_shape(len(tiles))
+    mosaic = np.zeros((rows * columns, TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+    mosaic[:len(tiles)] = tiles
+    return mosaic.reshape(rows, columns, TILE_SIZE, TILE_SIZE, 3).swapaxes(1, 2).reshape(rows * TILE_SIZE, columns * TILE_SIZE, 3)
+
+def split_mosaic(mosaic, count):
+    rows, columns = mosaic_shape(count)
+    if mosaic.shape[:2] != (rows * TILE_SIZE, columns * TILE_SIZE):
+        return None
+    return tile_view(mosaic).reshape(rows * columns, TILE_SIZE, TILE_SIZE, 3)[:count]
+
+class TileDeltaEncoder:
+    """
+    Codage "Vidéo delta" côté émetteur : l'image est découpée en tuiles de TILE_SIZE pixels, comparées (écart
+    moyen en niveaux de gris) à la dernière version ENVOYÉE de chaque tuile, et seules celles qui ont changé
+    partent, regroupées dans une seule image JPEG (paquet TILES). Comparer à la version envoyée plutôt qu'à
+    l'image précédente évite qu'une dérive lente (éclairage) s'accumule sans jamais être transmise.
+    Une image complète (paquet FRAME) part à la première image, à chaque changement de résolution, toutes les
+    VIDEO_KEYFRAME_INTERVAL secondes, et quand trop de tuiles ont changé pour que le découpage soit rentable.
+    """
+    def __init__(self):
+        self.reference = None # Niveaux de gris (complétés) de la dernière version envoyée de chaque tuile
+        self.last_keyframe = 0.0
+        self.keyframes = 0
+        self.deltas = 0
+        self.tiles_sent = 0
+
+    def encode(self, frame, quality, now=None):
+        """(type de paquet, données) pour l'image BGR frame ; les données valent None si la compression a échoué."""
+        now = time.perf_counter() if now is None else now
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        padded = pad_to_tiles(frame)
+        gray = cv2.cvtColor(padded, cv2.COLOR_BGR2GRAY)
+        if (self.reference is not None and self.reference.shape == gray.shape
+                and now - self.last_keyframe < VIDEO_KEYFRAME_INTERVAL):
+            changed = tile_view(cv2.absdiff(gray, self.reference)).mean(axis=(2, 3)) > TILE_DIFF_THRESHOLD
+            count = int(changed.sum())
+            if count <= TILE_KEYFRAME_RATIO * changed.size:
+                rows, columns = np.nonzero(changed)
+                header = VIDEO_TILE_HEADER.pack(frame.shape[1], frame.shape[0], TILE_SIZE, count)
+                positions = np.column_stack((columns, rows)).astype(np.uint8)
+                mosaic = b""
+                if count:
+                    ok, mosaic = cv2.imencode('.jpg', build_mosaic(tile_view(padded)[changed]), params)
+                    if not ok:
+                        return VIDEO_PACKET_TILES, None
+                    tile_view(self.reference)[changed] = tile_view(gray)[changed]
+                self.deltas += 1
+                self.tiles_sent += count
+                return VIDEO_PACKET_TILES, b"".join((header, positions.data, memoryview(mosaic)))
+
+        ok, encoded = cv2.imencode('.jpg', frame, params)
+        if not ok:
+            return VIDEO_PACKET_FRAME, None
+        self.reference = gray
+        self.last_keyframe = now
+        self.keyframes += 1
+        return VIDEO_PACKET_FRAME, encoded
+
+class TileDeltaDecoder:
+    """
+    Reconstitue les images d'UNE source : une image complète remplace la référence, un paquet TILES y colle ses
+    tuiles. Un paquet TILES n'est appliqué que s'il suit directement le paquet précédent de la source (numéro de
+    séquence) : après une perte ou une image sautée par le relais, l'image reste figée jusqu'à l'image clé suivante.
+    """
+    def __init__(self):
+        self.reference = None # Dernière image reconstituée (BGR, complétée aux multiples de TILE_SIZE)
+        self.size = None
+        self.last_seq = None  # None : en attente d'une image clé
+
+    def decode(self, kind, seq, payload):
+        """
+        Image BGR reconstituée (partagée avec le décodeur : ne pas la modifier), ou None.
+        Lève ValueError ou struct.error pour un paquet TILES tronqué ou dont une tuile sort de l'image.
+        """
+        if kind == VIDEO_PACKET_FRAME:
+            frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                print("Erreur de décodage de l'image.")
+                self.last_seq = None
+                return None
+            self.reference = pad_to_tiles(frame)
+            self.size = frame.shape[:2]
+            self.last_seq = seq
+            return frame
+        if kind != VIDEO_PACKET_TILES or self.last_seq is None or seq != (self.last_seq + 1) & 0xFFFFFFFF:
+            self.last_seq = None
+            return None
+
+        width, height, tile_size, count = VIDEO_TILE_HEADER.unpack_from(payload)
+        if (height, width) != self.size or tile_size != TILE_SIZE:
+            self.last_seq = None
+            return None
+        if count:
+            offset = VIDEO_TILE_HEADER.size
+            positions = np.frombuffer(payload, dtype=np.uint8, count=2 * count, offset=offset).reshape(count, 2)
+            mosaic = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8, offset=offset + 2 * count), cv2.IMREAD_COLOR)
+            tiles = split_mosaic(mosaic, count) if mosaic is not None else None
+            if tiles is None:
+                print("Erreur de décodage des tuiles.")
+                self.last_seq = None
+                return None
+            grid = tile_view(self.reference)
+            if (positions[:, 1] >= grid.shape[0]).any() or (positions[:, 0] >= grid.shape[1]).any():
+                raise ValueError(f"position de tuile hors de la grille {grid.shape[1]}x{grid.shape[0]}")
+            grid[positions[:, 1], positions[:, 0]] = tiles
+        self.last_seq = seq
+        return self.reference[:height, :width]
+
+class VideoSubscriber:
+    """
+    Un abonné du relais vidéo : une file bornée et un thread d'envoi qui lui sont propres.
+    Quand la file déborde (client lent), les images en attente, devenues périmées, sont jetées et l'abonné ne
+    reçoit plus que la prochaine image clé, les paquets de tuiles qui la suivent n'ayant de sens qu'à partir
+    d'elle : il reçoit moins d'images, mais toujours décodables, sans jamais ralentir l'émetteur ni les autres
+    abonnés. Un nouvel abonné commence de même par une image clé.
+    """
+    def __init__(self, relay, connection, name):
+        self.relay = relay
+        self.connection = connection
+        self.name = name
+        self.frames = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.keyframes_only = True # En attente d'une image clé
+        self.sent_frames = 0
+        self.dropped_frames = 0
+        self.bytes_sent = 0
+        threading.Thread(target=self._writer, daemon=True).start()
+
+    def offer(self, packet, keyframe):
+        with self.condition:
+            if not self.running:
+                return
+            if len(self.frames) >= VIDEO_SUBSCRIBER_MAX_FRAMES:
+                self.dropped_frames += len(self.frames)
+                self.frames.clear()
+                self.keyframes_only = True
+            if self.keyframes_only and not keyframe:
+                self.dropped_frames += 1
+                return
+            self.keyframes_only = False # Les paquets suivants complètent cette image clé
+            self.frames.append(packet)
+            self.condition.notify()
+
+    def offer_report(self, packet):
+        """Un rapport passe devant les images en attente et n'est jamais jeté."""
+        with self.condition:
+            if self.running:
+                self.frames.appendleft(packet)
+                self.condition.notify()
+
+    def queue_depth(self):
+        return len(self.frames)
+
+    def _writer(self):
+        while True:
+            with self.condition:
+                while not self.frames and self.running:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                packet = self.frames.popleft()
+            try:
+                self.connection.send_video(packet) # Fragmenté, après l'audio en attente
+            except OSError as e:
+                print(f"Serveur: Abonné vidéo {self.name} injoignable: {e}")
+                self.relay.remove_subscriber(self.connection)
+                return
+            with self.condition:
+                self.sent_frames += 1
+                self.bytes_sent += len(packet)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.frames.clear()
+            self.condition.notify()
+
+class VideoRelay:
+    """
+    Relais vidéo sélectif (SFU) du serveur de groupe : chaque image reçue est transmise telle quelle
+    (jamais décodée) à tous les abonnés sauf son émetteur, sur leur MediaConnection. Le paquet (en-tête de
+    taille compris) est un seul objet partagé par toutes les files, sans copie par abonné.
+    Les images JPEG complètes sont indépendantes (images clés) ; les paquets de tuiles du mode "Vidéo delta"
+    dépendent des précédents et sont publiés avec keyframe=False.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {} # MediaConnection -> VideoSubscriber
+        self.frames_in = 0
+        self.bytes_in = 0
+
+    def add_subscriber(self, connection, name):
+        with self.lock:
+            self.subscribers[connection] = VideoSubscriber(self, connection, name)
+
+    def remove_subscriber(self, connection):
+        with self.lock:
+            subscriber = self.subscribers.pop(connection, None)
+        if subscriber is not None:
+            subscriber.stop()
+
+    def publish(self, packet, keyframe=True, source=None):
+        """Met le paquet dans la file de chaque abonné (sauf source) ; ne bloque jamais sur le réseau."""
+        with self.lock:
+            subscribers = [subscriber for connection, subscriber in self.subscribers.items() if connection is not source]
+            self.frames_in += 1
+            self.bytes_in += len(packet)
+        for subscriber in subscribers:
+            subscriber.offer(packet, keyframe)
+
+    def send_report(self, connection, packet):
+        """Envoie un rapport de réception à l'émetteur de cette connexion, devant les images en attente."""
+        with self.lock:
+            subscriber = self.subscribers.get(connection)
+        if subscriber is not None:
+            subscriber.offer_report(packet)
+
+    def queue_depth(self):
+        """Profondeur médiane des files d'envoi : un seul abonné lent ne fait pas baisser la qualité de tous."""
+        with self.lock:
+            depths = sorted(subscriber.queue_depth() for subscriber in self.subscribers.values())
+        return depths[len(depths) // 2] if depths else 0
+
+    def stats(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        return {
+            "subscribers": len(subscribers),
+            "frames_in": self.frames_in,
+            "sent": sum(s.sent_frames for s in subscribers),
+            "dropped": sum(s.dropped_frames for s in subscribers),
+            "lagging": sum(1 for s in subscribers if s.keyframes_only),
+        }
+
+    def stop(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.stop()
+
+def format_relay_stats(stats):
+    return (f"Relais: {stats['subscribers']} abonnés | reçues {stats['frames_in']} | envoyées {stats['sent']} | "
+            f"sautées {stats['dropped']} | en retard {stats['lagging']}")
+
+class FrameDelayMonitor:
+    """
+    Côté récepteur : mesure le délai de file d'un flux vidéo et produit les rapports renvoyés à l'émetteur.
+    Les horloges des deux machines ne sont pas synchronisées : le délai de file est (arrivée de l'en-tête -
+    horodatage de capture) moins le minimum observé sur VIDEO_DELAY_BASE_WINDOW secondes, ce qui élimine le
+    décalage d'horloge.
+    """
+    def __init__(self):
+        self.base = deque() # (arrivée, délai brut) croissants en délai : minimum glissant
+        self.last_seq = 0
+        self.max_delay_ms = 0.0
+        self.bytes_received = 0
+        self.last_report = time.perf_counter()
+
+    def on_packet(self, seq, timestamp, arrival, size):
+        """Enregistre un paquet reçu ; retourne un rapport à envoyer quand la période est écoulée, sinon None."""
+        now = time.perf_counter()
+        raw_delay = arrival - timestamp
+        while self.base and self.base[-1][1] >= raw_delay:
+            self.base.pop()
+        self.base.append((now, raw_delay))
+        while now - self.base[0][0] > VIDEO_DELAY_BASE_WINDOW:
+            self.base.popleft()
+        queuing_ms = (raw_delay - self.base[0][1]) * 1000
+        self.max_delay_ms = max(self.max_delay_ms, queuing_ms)
+        self.last_seq = seq
+        self.bytes_received += size
+        elapsed = now - self.last_report
+        if elapsed < VIDEO_REPORT_INTERVAL:
+            return None
+        report = VIDEO_REPORT.pack(self.last_seq, self.max_delay_ms, self.bytes_received * 8 / elapsed / 1000)
+        self.last_report = now
+        self.max_delay_ms = 0.0
+        self.bytes_received = 0
+        return pack_video_packet(VIDEO_PACKET_REPORT, self.last_seq, media_clock.now(), report)
+
+class VideoRateController:
+    """
+    Contrôle de débit de l'émetteur vidéo, à partir de la profondeur de sa file d'envoi et du délai de file
+    signalé par le récepteur. La cible de débit suit une loi AIMD : réduction multiplicative (à partir du plus
+    petit des débits cible, atteint et reçu par le récepteur) dès qu'une congestion apparaît, augmentation progressive quand le réseau suit et que
+    le débit atteint colle à la cible. Le palier (résolution, cadence, qualité JPEG) est le plus lourd dont le
+    débit estimé tient dans la cible ; on ne monte que d'un palier à la fois. Sans congestion, la cible ne
+    dépasse pas de plus de 25 % le débit atteint ou celui du palier suivant : elle sonde le palier d'au-dessus
+    sans s'envoler quand la source produit moins que la cible.
+    """
+    def __init__(self, level=VIDEO_START_LEVEL):
+        self.lock = threading.Lock()
+        self.level = level
+        self.frame_bytes = {} # palier -> taille moyenne d'une image (octets)
+        self.target_kbps = None
+        self.sent = deque()   # (instant, octets) sur la dernière seconde
+        self.queue_depth = 0.0
+        self.delay_ms = 0.0
+        self.receive_kbps = None
+        self.last_report = 0.0
+        self.last_decision = time.perf_counter()
+        self.decision_delay_ms = 0.0 # Délai signalé lors de la décision précédente
+
+    def settings(self):
+        """(largeur, hauteur, images/s, qualité JPEG) du palier courant."""
+        return VIDEO_QUALITY_LADDER[self.level]
+
+    def estimate_kbps(self, level):
+        """Débit d'un palier : mesuré s'il a déjà servi, sinon extrapolé du palier courant (pixels et qualité)."""
+        width, height, fps, quality = VIDEO_QUALITY_LADDER[level]
+        if level in self.frame_bytes:
+            return self.frame_bytes[level] * fps * 8 / 1000
+        ref_width, ref_height, _, ref_quality = VIDEO_QUALITY_LADDER[self.level]
+        ref_bytes = self.frame_bytes.get(self.level, ref_width * ref_height * 0.15)
+        frame_bytes = ref_bytes * (width * height) / (ref_width * ref_height) * (quality + 20) / (ref_quality + 20)
+        return frame_bytes * fps * 8 / 1000
+
+    def achieved_kbps(self):
+        with self.lock:
+            if len(self.sent) < 2:
+                return 0.0
+            span = max(self.sent[-1][0] - self.sent[0][0], 1e-3)
+            return sum(size for _, size in list(self.sent)[1:]) * 8 / span / 1000
+
+    def on_frame_sent(self, size, queue_depth):
+        """Appelé après chaque image publiée ; peut changer de palier (pris en compte à l'image suivante)."""
+        now = time.perf_counter()
+        with self.lock:
+            previous = self.frame_bytes.get(self.level)
+            self.frame_bytes[self.level] = size if previous is None else 0.8 * previous + 0.2 * size
+            self.sent.append((now, size))
+            while now - self.sent[0][0] > 1.0:
+                self.sent.popleft()
+            self.queue_depth = 0.7 * self.queue_depth + 0.3 * queue_depth
+            if self.target_kbps is None:
+                self.target_kbps = self.estimate_kbps(self.level)
+        if now - self.last_decision >= VIDEO_CONTROL_INTERVAL:
+            self.last_decision = now
+            self._decide(now)
+
+    def on_report(self, seq, delay_ms, receive_kbps):
+        with self.lock:
+            self.delay_ms = delay_ms
+            self.receive_kbps = receive_kbps
+            self.last_report = time.perf_counter()
+
+    def _decide(self, now):
+        achieved = self.achieved_kbps()
+        with self.lock:
+            fresh_report = now - self.last_report < 1.0 # Sans rapport récent, seule la file d'envoi compte
+            delay_ms = self.delay_ms if fresh_report else 0.0
+            # Un délai élevé mais en baisse est une file qui se vide après une réduction : on attend sans réduire encore
+            draining = delay_ms < 0.9 * self.decision_delay_ms
+            self.decision_delay_ms = delay_ms
+            congested = self.queue_depth >= VIDEO_QUEUE_HIGH or (delay_ms > VIDEO_DELAY_HIGH_MS and not draining)
+            if congested:
+                # Le débit reçu par le récepteur est celui que le lien écoule réellement
+                rates = [self.target_kbps, achieved or self.target_kbps]
+                if fresh_report and self.receive_kbps:
+                    rates.append(self.receive_kbps)
+                self.target_kbps = max(VIDEO_MIN_KBPS, VIDEO_DECREASE * min(rates))
+            elif delay_ms < VIDEO_DELAY_LOW_MS and self.queue_depth < 0.5:
+                next_kbps = self.estimate_kbps(self.level + 1) if self.level + 1 < len(VIDEO_QUALITY_LADDER) else 0.0
+                ceiling = min(VIDEO_MAX_KBPS, 1.25 * max(achieved, next_kbps))
+                if self.target_kbps < ceiling:
+                    self.target_kbps = min(ceiling, self.target_kbps * VIDEO_INCREASE)
+            target = self.target_kbps
+            best = 0
+            for level in range(len(VIDEO_QUALITY_LADDER)):
+                if self.estimate_kbps(level) <= target:
+                    best = level
+            if best < self.level:
+                self.level = best
+            elif best > self.level and self.estimate_kbps(self.level + 1) <= 0.9 * target:
+                self.level += 1
+
+    def stats(self):
+        width, height, fps, quality = self.settings()
+        return {
+            "target_kbps": self.target_kbps or 0.0,
+            "achieved_kbps": self.achieved_kbps(),
+            "receive_kbps": self.receive_kbps,
+            "delay_ms": self.delay_ms,
+            "queue_depth": self.queue_depth,
+            "settings": f"{width}x{height} {fps} i/s q{quality}",
+        }
+
+def format_rate_stats(stats):
+    text = (f"Débit: cible {stats['target_kbps']:.0f} kbit/s | atteint {stats['achieved_kbps']:.0f} kbit/s | "
+            f"{stats['settings']} | file {stats['queue_depth']:.1f}")
+    if stats["receive_kbps"] is not None:
+        text += f" | délai {stats['delay_ms']:.0f} ms"
+    return text
+
+def video_pacing_kbps():
+    """Rythme d'envoi des fragments vidéo vers le serveur (MediaConnection.pacing) : un multiple du débit visé."""
+    controller = video_rate_controller
+    if controller is None or controller.target_kbps is None:
+        return None
+    return controller.target_kbps * MEDIA_PACING_FACTOR
+
+def send_video_stream(outgoing, delta=False):
+    """
+    Capture le flux vidéo de la webcam et le publie dans outgoing (VideoRelay : celui du serveur de groupe, ou
+    en mode client un relais à un seul abonné, le socket vers le serveur). Voir video_send_loop ; delta active
+    le codage par tuiles (TileDeltaEncoder).
+    """
+    global video_sending, cap
 
     if cap is None: # Assurez-vous que la webcam est ouverte une seule fois
         cap = cv2.VideoCapture(0)
@@ -293,51 +2010,10 @@ def send_video_stream(target_sockets):
         cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
         cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
         cap.set(cv2.CAP_PROP_FPS, FPS)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Toujours l'image la plus récente, pas une image en attente
 
     print("Démarrage de l'envoi vidéo...")
-    while video_sending:
-        ret, frame = cap.read()
-        if not ret:
-            print("Erreur lors de la lecture de la frame.")
-            break
-
-        # --- Affichage local ---
-        try:
-            ppm_data = convert_opencv_to_ppm(frame)
-            imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-            if label_local_video:
-                label_local_video.configure(image=imgtk)
-                label_local_video.image = imgtk
-        except Exception as e:
-            print(f"Erreur d'affichage local vidéo (PPM): {e}")
-
-        # --- Envoi via socket ---
-        encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY_NETWORK]
-        _, encoded_image = cv2.imencode('.jpg', frame, encode_param)
-        data = encoded_image.tobytes()
-
-        try:
-            if isinstance(target_sockets, list): # Server mode: send to all connected clients
-                for sock in list(target_sockets):
-                    try:
-                        sock.sendall(len(data).to_bytes(4, 'big') + data)
-                    except (BrokenPipeError, ConnectionResetError) as e:
-                        print(f"Client vidéo déconnecté lors de l'envoi: {sock.getpeername()} - {e}")
-                        if sock in target_sockets:
-                            target_sockets.remove(sock)
-                        sock.close()
-                    except Exception as e:
-                        print(f"Erreur d'envoi vidéo à un client: {sock.getpeername()} - {e}")
-            else: # Client mode: send to single peer/server
-                target_sockets.sendall(len(data).to_bytes(4, 'big') + data)
-        except (BrokenPipeError, ConnectionResetError):
-            print("Connexion vidéo rompue.")
-            break
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de la frame vidéo: {e}")
-            break
-        
-        time.sleep(1 / FPS)
+    video_send_loop(cap.read, outgoing, video_rate_controller or VideoRateController(), delta)
 
     print("Arrêt de l'envoi vidéo.")
     if cap:
@@ -345,53 +2021,81 @@ def send_video_stream(target_sockets):
         cap = None
     stop_video_call()
 
-def receive_video_stream_p2p(video_conn, addr):
+def video_send_loop(read_frame, outgoing, controller, delta=False):
     """
-    Reçoit le flux vidéo, le décompresse (JPEG) et l'affiche (mode P2P).
+    Capture à cadence fixe : chaque image est prévue à next_capture += 1 / fps (fps du palier courant) au lieu
+    d'attendre 1 / FPS après le travail ; en cas de retard de plus d'une image, la cadence repart de maintenant
+    plutôt que d'enchaîner les captures. L'image est mise à l'échelle du palier, compressée en JPEG à sa qualité
+    (en entier, ou seulement ses tuiles modifiées avec delta) et publiée sans attendre le réseau (files des
+    abonnés) ; la profondeur de ces files et les rapports du récepteur alimentent le contrôleur de débit.
     """
-    global video_receiving, label_remote_video
+    seq = 0
+    encoder = TileDeltaEncoder() if delta else None
+    next_capture = time.perf_counter()
+    while video_sending:
+        width, height, fps, quality = controller.settings()
+        ret, frame = read_frame()
+        if not ret:
+            print("Erreur lors de la lecture de la frame.")
+            break
+
+        # --- Affichage local ---
+        if local_view:
+            local_view.submit_frame(frame)
+
+        # --- Envoi : résolution et qualité du palier courant ---
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        if encoder:
+            kind, encoded_image = encoder.encode(frame, quality)
+        else:
+            ok, encoded_image = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+            kind = VIDEO_PACKET_FRAME
+            if not ok:
+                encoded_image = None
+        if encoded_image is not None:
+            packet = pack_video_packet(kind, seq, media_clock.now(), encoded_image)
+            queue_depth = outgoing.queue_depth() # Images précédentes pas encore parties
+            outgoing.publish(packet, keyframe=kind == VIDEO_PACKET_FRAME)
+            controller.on_frame_sent(len(packet), queue_depth)
+            seq += 1
+
+        next_capture += 1 / fps
+        delay = next_capture - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -1 / fps:
+            next_capture = time.perf_counter()
+
+def receive_video_stream_p2p(connection, addr, outgoing=None):
+    """
+    Reçoit le flux vidéo et transmet chaque paquet à la vue distante, qui ne décode que ce qui est affiché (mode P2P).
+    Les rapports du pair alimentent le contrôleur de débit ; nos propres rapports lui sont renvoyés par outgoing.
+    """
+    global video_receiving
 
     print(f"Démarrage de la réception vidéo de {addr} (P2P)...")
+    delay_monitor = FrameDelayMonitor()
     while video_receiving:
         try:
-            size_data = video_conn.recv(4)
-            if not size_data:
+            received = connection.receive_video()
+            if received is None:
                 print("Pair vidéo déconnecté.")
                 break
-            
-            frame_size = int.from_bytes(size_data, 'big')
-            
-            data = b''
-            while len(data) < frame_size:
-                packet = video_conn.recv(min(frame_size - len(data), BUFFER_SIZE))
-                if not packet:
-                    print("Données vidéo incomplètes ou pair déconnecté.")
-                    break
-                data += packet
-            
-            if len(data) < frame_size:
-                continue
-
-            np_data = np.frombuffer(data, dtype=np.uint8)
-            frame = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-
-            if frame is None:
-                print("Erreur de décodage de l'image.")
+            packet, arrival = received
+            _, kind, source, seq, timestamp = VIDEO_PACKET_HEADER.unpack_from(packet)
+            payload = memoryview(packet)[VIDEO_PACKET_HEADER.size:]
+            if kind == VIDEO_PACKET_REPORT:
+                if video_rate_controller:
+                    video_rate_controller.on_report(*VIDEO_REPORT.unpack(payload))
                 continue
 
-            try:
-                ppm_data = convert_opencv_to_ppm(frame)
-                imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-                
-                if label_remote_video:
-                    label_remote_video.configure(image=imgtk)
-                    label_remote_video.image = imgtk
-            except Exception as e:
-                print(f"Erreur d'affichage distant vidéo (PPM): {e}")
+            if remote_view:
+                remote_view.submit_packet(kind, source, seq, payload, timestamp)
+            report = delay_monitor.on_packet(seq, timestamp, arrival, len(packet))
+            if report and outgoing:
+                outgoing.send_report(connection, report)
 
-        except (BrokenPipeError, ConnectionResetError):
-            print("Connexion vidéo rompue côté réception.")
-            break
         except Exception as e:
             print(f"Erreur lors de la réception de la frame vidéo: {e}")
             break
@@ -399,146 +2103,107 @@ def receive_video_stream_p2p(video_conn, addr):
     print("Arrêt de la réception vidéo (P2P).")
     stop_video_call()
 
-def receive_video_stream_from_server(client_socket_video):
+def receive_video_stream_from_server(connection):
     """
     Reçoit le flux vidéo du serveur relayé et l'affiche (mode Client de groupe).
-    Le client n'affiche qu'un seul flux vidéo entrant (celui que le serveur relaye en "principal").
+    Le client n'affiche qu'un seul flux vidéo entrant : la vue distante retient une source (numéro inscrit par le
+    serveur dans chaque paquet) et ignore les autres ; elle cale ses images sur l'audio (MediaSync).
+    Les rapports du serveur sur notre propre flux alimentent le contrôleur de débit. Le client n'en renvoie pas :
+    les images relayées viennent d'autres émetteurs, dont le serveur mesure déjà les flux à l'arrivée.
     """
-    global video_receiving, label_remote_video
+    global video_receiving
 
     print("Démarrage de la réception vidéo du serveur...")
     while video_receiving:
         try:
-            size_data = client_socket_video.recv(4)
-            if not size_data:
-                print("Serveur vidéo déconnecté.")
+            received = connection.receive_video()
+            if received is None:
+                print("Serveur déconnecté (vidéo).")
                 break
-            
-            frame_size = int.from_bytes(size_data, 'big')
-            
-            data = b''
-            while len(data) < frame_size:
-                packet = client_socket_video.recv(min(frame_size - len(data), BUFFER_SIZE))
-                if not packet:
-                    print("Données vidéo incomplètes du serveur.")
-                    break
-                data += packet
-            
-            if len(data) < frame_size:
-                continue
-
-            np_data = np.frombuffer(data, dtype=np.uint8)
-            frame = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-
-            if frame is None:
-                print("Erreur de décodage de l'image du serveur.")
-                continue
-
-            try:
-                ppm_data = convert_opencv_to_ppm(frame)
-                imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-                
-                if label_remote_video:
-                    label_remote_video.configure(image=imgtk)
-                    label_remote_video.image = imgtk
-            except Exception as e:
-                print(f"Erreur d'affichage vidéo du serveur (PPM): {e}")
+            packet, _ = received
+            _, kind, source, seq, timestamp = VIDEO_PACKET_HEADER.unpack_from(packet)
+            payload = memoryview(packet)[VIDEO_PACKET_HEADER.size:]
+            if kind == VIDEO_PACKET_REPORT:
+                if video_rate_controller:
+                    video_rate_controller.on_report(*VIDEO_REPORT.unpack(payload))
+            elif remote_view:
+                remote_view.submit_packet(kind, source, seq, payload, timestamp)
 
-        except (BrokenPipeError, ConnectionResetError):
-            print("Connexion vidéo au serveur rompue.")
-            break
         except Exception as e:
             print(f"Erreur lors de la réception de la frame vidéo du serveur: {e}")
             break
 
     print("Arrêt de la réception vidéo du serveur.")
-    if client_socket_video:
-        client_socket_video.close()
+    connection.close()
     stop_video_call()
 
-def handle_server_incoming_video(conn, addr):
+def handle_server_incoming_video(connection, addr):
     """
-    Gère la réception vidéo d'UN client sur le serveur et la diffuse aux AUTRES clients.
-    Le serveur n'affiche qu'une seule vidéo entrante (la première connectée) sur son propre écran distant.
+    Gère la réception vidéo d'UN client sur le serveur et la confie au relais, qui la transmet aux AUTRES clients
+    sans la décoder. Le serveur inscrit dans chaque paquet le numéro de source du client, pour que les récepteurs
+    appliquent les tuiles à la bonne image ; les paquets de tuiles sont relayés comme images non clés.
+    Le serveur n'affiche qu'une seule vidéo entrante (celle du premier client connecté) sur son propre écran distant.
+    Le délai de file de ce flux est renvoyé au client dans des rapports, pour son contrôleur de débit.
     """
-    global video_receiving, connected_video_clients, label_remote_video
-    
+    global video_receiving
+
     print(f"Serveur: Traitement vidéo pour le client {addr}")
+    source_id = next(video_source_ids) % 255 + 1 # 0 est la caméra du serveur
     # Déterminer si ce client est la source principale de vidéo pour l'affichage local du serveur
-    is_main_video_source = False
-    if len(connected_video_clients) == 1 and connected_video_clients[0] == conn: # Le premier client ajouté
-        is_main_video_source = True
+    is_main_video_source = bool(connected_clients) and connected_clients[0] is connection
 
+    delay_monitor = FrameDelayMonitor()
     try:
         while video_receiving: # Utilise le même flag que la réception vidéo globale
-            size_data = conn.recv(4)
-            if not size_data:
-                print(f"Serveur: Client {addr} déconnecté de la vidéo.")
+            received = connection.receive_video()
+            if received is None:
+                print(f"Serveur: Client {addr} déconnecté.")
                 break
-            
-            frame_size = int.from_bytes(size_data, 'big')
-            
-            data = b''
-            while len(data) < frame_size:
-                packet = conn.recv(min(frame_size - len(data), BUFFER_SIZE))
-                if not packet:
-                    print(f"Serveur: Données vidéo incomplètes de {addr}.")
-                    break
-                data += packet
-            
-            if len(data) < frame_size:
-                continue
 
-            # Si ce client est la source principale, affiche sa vidéo sur l'écran du serveur
-            if is_main_video_source and video_receiving:
-                np_data = np.frombuffer(data, dtype=np.uint8)
-                frame = cv2.imdecode(np_data, cv2.IMREAD_COLOR)
-                if frame is not None:
-                    try:
-                        ppm_data = convert_opencv_to_ppm(frame)
-                        imgtk = tk.PhotoImage(data=ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-                        if label_remote_video:
-                            label_remote_video.configure(image=imgtk)
-                            label_remote_video.image = imgtk
-                    except Exception as e:
-                        print(f"Serveur: Erreur d'affichage vidéo locale (PPM) de {addr}: {e}")
-
-            # Diffuse aux autres clients
-            for client_sock in list(connected_video_clients):
-                if client_sock != conn: # Ne pas renvoyer à l'expéditeur
-                    try:
-                        client_sock.sendall(len(data).to_bytes(4, 'big') + data)
-                    except (BrokenPipeError, ConnectionResetError):
-                        print(f"Serveur: Client {client_sock.getpeername()} déconnecté lors de la diffusion vidéo.")
-                        if client_sock in connected_video_clients:
-                            connected_video_clients.remove(client_sock)
-                            client_sock.close()
-                    except Exception as e:
-                        print(f"Serveur: Erreur de diffusion vidéo à {client_sock.getpeername()}: {e}")
+            # Paquet reconstitué par la connexion : partagé tel quel par les files de tous les abonnés
+            packet, arrival = received
+            _, kind, _, seq, timestamp = VIDEO_PACKET_HEADER.unpack_from(packet)
+            if kind not in (VIDEO_PACKET_FRAME, VIDEO_PACKET_TILES):
+                continue
+            packet[VIDEO_PACKET_SOURCE_OFFSET] = source_id
+            relay = video_relay
+            if relay:
+                relay.publish(packet, keyframe=kind == VIDEO_PACKET_FRAME, source=connection)
+                report = delay_monitor.on_packet(seq, timestamp, arrival, len(packet))
+                if report:
+                    relay.send_report(connection, report)
+
+            # Si ce client est la source principale, affiche sa vidéo sur l'écran du serveur ;
+            # le décodage a lieu dans le thread de la vue, ce thread ne fait que relayer
+            if is_main_video_source and video_receiving and remote_view:
+                remote_view.submit_packet(kind, source_id, seq, memoryview(packet)[VIDEO_PACKET_HEADER.size:], timestamp)
     except Exception as e:
         print(f"Serveur: Erreur générale lors de la gestion de la vidéo de {addr}: {e}")
     finally:
-        if conn in connected_video_clients:
-            connected_video_clients.remove(conn)
-            conn.close()
+        if video_relay:
+            video_relay.remove_subscriber(connection)
+        if connection in connected_clients:
+            connected_clients.remove(connection)
+        connection.close()
         print(f"Serveur: Thread de gestion vidéo pour {addr} terminé.")
 
 # --- Fonctions de Contrôle des Appels (Audio + Vidéo) ---
 
 def start_call():
     """
-    Démarre un appel P2P complet (audio et vidéo) en mode client.
-    Se connecte au pair spécifié (qui peut être un serveur de groupe).
+    Démarre un appel complet (audio et vidéo) en mode client.
+    Une seule connexion vers le pair/serveur : poignée de main (codec audio, horloge média), puis audio, vidéo
+    et contrôle multiplexés dessus.
     """
     global audio_sending, audio_receiving, video_sending, video_receiving
-    global p_audio, selected_input_device_index, selected_output_device_index
+    global p_audio, selected_input_device_index, selected_output_device_index, client_audio_transport
+    global video_rate_controller, client_connection, media_clock, media_sync
 
     peer_ip = entry_peer_ip.get()
     try:
-        audio_port = int(entry_audio_port.get())
-        video_port = int(entry_video_port.get())
+        port = int(entry_port.get())
     except ValueError:
-        messagebox.showerror("Erreur", "Les ports doivent être des nombres entiers.")
+        messagebox.showerror("Erreur", "Le port doit être un nombre entier.")
         return
 
     if not peer_ip:
@@ -554,69 +2219,69 @@ def start_call():
     selected_input_device_index = _input_idx
     selected_output_device_index = _output_idx
 
-    # 2. Tenter de se connecter pour l'AUDIO
-    client_socket_audio = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # 2. Se connecter : une seule poignée de main pour l'audio, la vidéo et l'horloge
+    media_clock = MediaClock()
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        print(f"Tentative de connexion audio à {peer_ip}:{audio_port}...")
-        client_socket_audio.connect((peer_ip, audio_port))
-        print("Connexion audio établie.")
-        audio_sending = True
-        audio_receiving = True
-        # Envoie son propre audio au pair/serveur
-        threading.Thread(target=send_audio_stream, args=(client_socket_audio,)).start()
-        # Reçoit l'audio du pair (P2P) ou du serveur (groupe)
-        threading.Thread(target=receive_audio_stream_from_server, args=(client_socket_audio,)).start()
+        print(f"Tentative de connexion à {peer_ip}:{port}...")
+        client_socket.connect((peer_ip, port))
+        connection, audio_transport = connect_media(client_socket, peer_ip, port, use_udp_var.get())
+        print(f"Connexion établie (audio {audio_transport.name}).")
     except Exception as e:
-        messagebox.showerror("Erreur Connexion Audio", f"Impossible de se connecter pour l'audio: {e}")
-        print(f"Erreur connexion audio client: {e}")
-        client_socket_audio.close()
+        messagebox.showerror("Erreur Connexion", f"Impossible de se connecter au pair/serveur: {e}")
+        print(f"Erreur connexion client: {e}")
+        client_socket.close()
         stop_call()
         return
+    client_connection = connection
+    client_audio_transport = audio_transport
+    media_sync = MediaSync()
+    if remote_view:
+        remote_view.sync = media_sync
+
+    # 3. Audio : envoie son propre audio et reçoit celui du pair (P2P) ou le mix du serveur (groupe)
+    audio_sending = True
+    audio_receiving = True
+    threading.Thread(target=send_audio_stream, args=(audio_transport,)).start()
+    threading.Thread(target=receive_audio_stream_from_server, args=(audio_transport,)).start()
+
+    # 4. Vidéo : envoie sa propre vidéo via une file d'envoi dont la profondeur guide le contrôleur de débit
+    video_sending = True
+    video_receiving = True
+    outgoing_video = VideoRelay()
+    outgoing_video.add_subscriber(connection, (peer_ip, port))
+    video_rate_controller = VideoRateController()
+    connection.pacing = video_pacing_kbps
+    threading.Thread(target=send_video_stream, args=(outgoing_video, use_delta_var.get())).start()
+    threading.Thread(target=receive_video_stream_from_server, args=(connection,)).start()
 
-    # 3. Tenter de se connecter pour la VIDEO
-    client_socket_video = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    try:
-        print(f"Tentative de connexion vidéo à {peer_ip}:{video_port}...")
-        client_socket_video.connect((peer_ip, video_port))
-        print("Connexion vidéo établie.")
-        video_sending = True
-        video_receiving = True
-        # Envoie sa propre vidéo au pair/serveur
-        threading.Thread(target=send_video_stream, args=(client_socket_video,)).start()
-        # Reçoit la vidéo du pair (P2P) ou du serveur (groupe)
-        threading.Thread(target=receive_video_stream_from_server, args=(client_socket_video,)).start()
-    except Exception as e:
-        messagebox.showerror("Erreur Connexion Vidéo", f"Impossible de se connecter pour la vidéo: {e}")
-        print(f"Erreur connexion vidéo client: {e}")
-        client_socket_video.close()
-        video_sending = False
-        video_receiving = False
-    
     messagebox.showinfo("Appel Démarré", f"Appel vers {peer_ip} démarré. (Vérifiez les erreurs individuelles si besoin)")
     btn_call.configure(state="disabled")
     btn_listen.configure(state="disabled")
     btn_stop.configure(state="normal")
-    audio_status_label.configure(text="Statut Audio: En appel...")
+    audio_status_label.configure(text=f"Statut Audio: En appel... ({client_audio_transport.codec.label})")
 
 
 def start_listen():
     """
-    Démarre l'écoute pour un appel P2P complet (audio et vidéo) en mode serveur.
-    Peut agir comme serveur pour un appel de groupe.
+    Démarre l'écoute pour un appel complet (audio et vidéo) en mode serveur.
+    Peut agir comme serveur pour un appel de groupe : chaque client ouvre une seule connexion, sur laquelle
+    le serveur reçoit son audio (vers le mixeur) et sa vidéo (vers le relais) et lui renvoie le mix et les vidéos
+    des autres. L'horloge du serveur est l'horloge média de l'appel.
     """
     global audio_sending, audio_receiving, video_sending, video_receiving
     global p_audio, selected_input_device_index, selected_output_device_index
-    global connected_audio_clients, connected_video_clients
+    global stream_out, audio_mixer, server_udp_audio_socket, video_relay
+    global video_rate_controller, media_clock, media_sync
 
     listen_ip = entry_listen_ip.get()
     if not listen_ip:
         listen_ip = '0.0.0.0' # Par défaut, écouter sur toutes les interfaces
 
     try:
-        audio_port = int(entry_audio_port_listen.get())
-        video_port = int(entry_video_port_listen.get())
+        port = int(entry_port_listen.get())
     except ValueError:
-        messagebox.showerror("Erreur", "Les ports doivent être des nombres entiers.")
+        messagebox.showerror("Erreur", "Le port doit être un nombre entier.")
         return
 
     # 1. Initialiser PyAudio et détecter les périphériques audio
@@ -628,86 +2293,98 @@ def start_listen():
     selected_input_device_index = _input_idx
     selected_output_device_index = _output_idx
 
-    # 2. Démarrer le serveur AUDIO
-    server_socket_audio = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket_audio.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    media_clock = MediaClock() # Référence de l'appel : décalage nul
+    media_sync = MediaSync()
+    if remote_view:
+        remote_view.sync = media_sync
+
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     try:
-        server_socket_audio.bind((listen_ip, audio_port))
-        server_socket_audio.listen(5) # Permettre 5 connexions en attente
-        print(f"Serveur audio en attente sur {listen_ip}:{audio_port} pour multiples clients...")
-        
-        # Le serveur lui-même commence à envoyer son audio à tous les clients connectés
-        audio_sending = True
-        threading.Thread(target=send_audio_stream, args=(connected_audio_clients,)).start() # Noter la liste passée
-        
-        # Le serveur lui-même reçoit l'audio des clients et le diffuse
+        server_socket.bind((listen_ip, port))
+        server_socket.listen(5) # Permettre 5 connexions en attente
+        print(f"Serveur en attente sur {listen_ip}:{port} pour multiples clients...")
+
+        # 2. Audio. Mixeur : chaque participant (clients + le serveur lui-même) reçoit le mix des autres
+        audio_mixer = AudioMixer()
         audio_receiving = True
         if p_audio: # Ouvre le stream de sortie pour le serveur pour qu'il entende les autres
-             stream_out = p_audio.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True, frames_per_buffer=CHUNK_SIZE, output_device_index=selected_output_device_index)
-
-        def accept_audio_connections():
-            while True:
-                try:
-                    conn_audio, addr_audio = server_socket_audio.accept()
-                    print(f"Serveur: Connexion audio acceptée de {addr_audio}")
-                    connected_audio_clients.append(conn_audio)
-                    # Lance un thread pour gérer les données audio entrantes de ce client et les relayer
-                    threading.Thread(target=handle_server_incoming_audio, args=(conn_audio, addr_audio)).start()
-                except Exception as e:
-                    print(f"Serveur: Erreur lors de l'acceptation de nouvelle connexion audio: {e}")
-                    break
-            server_socket_audio.close() # S'assure que le socket serveur est fermé si la boucle s'arrête
-        
-        threading.Thread(target=accept_audio_connections, daemon=True).start()
-
-    except OSError as e:
-        if e.errno == 98:
-             messagebox.showerror("Erreur Port Audio", f"Le port audio {audio_port} sur {listen_ip} est déjà utilisé. Veuillez en choisir un autre.")
-        else:
-            messagebox.showerror("Erreur Serveur Audio", f"Impossible de démarrer le serveur audio sur {listen_ip}:{audio_port}: {e}")
-        print(f"Erreur serveur audio: {e}")
-        server_socket_audio.close()
-        stop_call()
-        return
-
-    # 3. Démarrer le serveur VIDEO
-    server_socket_video = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket_video.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    try:
-        server_socket_video.bind((listen_ip, video_port))
-        server_socket_video.listen(5)
-        print(f"Serveur vidéo en attente sur {listen_ip}:{video_port} pour multiples clients...")
+            stream_out = p_audio.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True, frames_per_buffer=CHUNK_SIZE, output_device_index=selected_output_device_index)
+            media_sync.output_latency = stream_out.get_output_latency()
+            sync = media_sync
+
+            def play_local_mix(data, timestamp):
+                stream_out.write(data)
+                sync.on_audio_played(timestamp)
+            audio_mixer.add_participant(LOCAL_PARTICIPANT, play_local_mix)
+        audio_mixer.start()
+
+        # Socket UDP partagé (même numéro de port) pour les clients qui envoient leur audio en UDP
+        server_udp_audio_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server_udp_audio_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_udp_audio_socket.bind((listen_ip, port))
+        server_udp_audio_socket.settimeout(0.5)
+        threading.Thread(target=receive_server_udp_audio, args=(server_udp_audio_socket,), daemon=True).start()
+
+        # Le micro du serveur est un participant du mixeur
+        audio_sending = True
+        threading.Thread(target=send_audio_stream, args=(audio_mixer,)).start()
 
-        # Le serveur lui-même commence à envoyer sa vidéo à tous les clients connectés
+        # 3. Vidéo. Le serveur lui-même publie sa vidéo dans le relais, qui la transmet à tous les clients connectés
+        video_relay = VideoRelay()
+        video_rate_controller = VideoRateController()
         video_sending = True
-        threading.Thread(target=send_video_stream, args=(connected_video_clients,)).start() # Noter la liste passée
+        video_receiving = True
+        threading.Thread(target=send_video_stream, args=(video_relay, use_delta_var.get())).start()
 
-        def accept_video_connections():
+        def accept_connections():
             while True:
                 try:
-                    conn_video, addr_video = server_socket_video.accept()
-                    print(f"Serveur: Connexion vidéo acceptée de {addr_video}")
-                    connected_video_clients.append(conn_video)
-                    # Lance un thread pour gérer les données vidéo entrantes de ce client et les relayer
-                    threading.Thread(target=handle_server_incoming_video, args=(conn_video, addr_video)).start()
+                    conn, addr = server_socket.accept()
+                    print(f"Serveur: Connexion acceptée de {addr}")
+                    threading.Thread(target=register_client, args=(conn, addr), daemon=True).start()
                 except Exception as e:
-                    print(f"Serveur: Erreur lors de l'acceptation de nouvelle connexion vidéo: {e}")
+                    print(f"Serveur: Erreur lors de l'acceptation de nouvelle connexion: {e}")
                     break
-            server_socket_video.close() # S'assure que le socket serveur est fermé si la boucle s'arrête
-        
-        threading.Thread(target=accept_video_connections, daemon=True).start()
+            server_socket.close() # S'assure que le socket serveur est fermé si la boucle s'arrête
+
+        def register_client(conn, addr):
+            # Poignée de main (transport audio, codec, horloge) hors de la boucle d'acceptation
+            negotiated = accept_media(conn)
+            if negotiated is None:
+                conn.close()
+                return
+            transport_type, udp_port, codec = negotiated
+            print(f"Serveur: Client {addr} en {codec.label}")
+            connection = MediaConnection(conn, addr)
+            audio_client_codecs[addr] = codec
+            if transport_type == AUDIO_TRANSPORT_UDP:
+                transport = AudioTransport(connection, server_udp_audio_socket, (addr[0], udp_port), codec)
+                udp_audio_participants[transport.udp_peer] = (addr, transport)
+            else:
+                transport = AudioTransport(connection, codec=codec)
+            connected_clients.append(connection)
+            if audio_mixer:
+                audio_mixer.add_participant(addr, transport.send)
+            if video_relay:
+                video_relay.add_subscriber(connection, addr)
+            # Vidéo entrante de ce client (relayée aux autres) dans son propre thread, audio (vers le mixeur) dans celui-ci
+            threading.Thread(target=handle_server_incoming_video, args=(connection, addr)).start()
+            handle_server_incoming_audio(transport, addr)
+
+        threading.Thread(target=accept_connections, daemon=True).start()
 
     except OSError as e:
         if e.errno == 98:
-             messagebox.showerror("Erreur Port Vidéo", f"Le port vidéo {video_port} sur {listen_ip} est déjà utilisé. Veuillez en choisir un autre.")
+             messagebox.showerror("Erreur Port", f"Le port {port} sur {listen_ip} est déjà utilisé. Veuillez en choisir un autre.")
         else:
-            messagebox.showerror("Erreur Serveur Vidéo", f"Impossible de démarrer le serveur vidéo sur {listen_ip}:{video_port}: {e}")
-        print(f"Erreur serveur vidéo: {e}")
-        server_socket_video.close()
+            messagebox.showerror("Erreur Serveur", f"Impossible de démarrer le serveur sur {listen_ip}:{port}: {e}")
+        print(f"Erreur serveur: {e}")
+        server_socket.close()
         stop_call()
         return
 
-    messagebox.showinfo("En attente d'Appel", f"En attente d'appels sur {listen_ip}: {audio_port} (audio) et {video_port} (vidéo)...")
+    messagebox.showinfo("En attente d'Appel", f"En attente d'appels sur {listen_ip}:{port} (audio, vidéo et contrôle sur une seule connexion)...")
     btn_call.configure(state="disabled")
     btn_listen.configure(state="disabled")
     btn_stop.configure(state="normal")
@@ -720,7 +2397,8 @@ def stop_call():
     """
     global audio_sending, audio_receiving, video_sending, video_receiving
     global p_audio, stream_in, stream_out, cap
-    global connected_audio_clients, connected_video_clients
+    global audio_mixer, server_udp_audio_socket, video_relay
+    global video_rate_controller, client_connection, media_sync
 
     print("Demande d'arrêt de l'appel complet...")
     audio_sending = False
@@ -728,16 +2406,29 @@ def stop_call():
     video_sending = False
     video_receiving = False
 
-    # Fermer tous les sockets clients connectés au serveur
-    for sock in list(connected_audio_clients):
-        try: sock.close()
-        except Exception as e: print(f"Erreur fermeture socket audio client: {e}")
-    connected_audio_clients.clear()
-
-    for sock in list(connected_video_clients):
-        try: sock.close()
-        except Exception as e: print(f"Erreur fermeture socket vidéo client: {e}")
-    connected_video_clients.clear()
+    if audio_mixer:
+        audio_mixer.stop()
+        audio_mixer = None
+    if server_udp_audio_socket:
+        server_udp_audio_socket.close()
+        server_udp_audio_socket = None
+    udp_audio_participants.clear()
+    audio_client_codecs.clear()
+    if video_relay:
+        video_relay.stop()
+        video_relay = None
+    video_rate_controller = None
+    media_sync = None
+    if remote_view:
+        remote_view.sync = None
+
+    # Fermer la connexion vers le serveur et celles des clients connectés au serveur
+    if client_connection:
+        client_connection.close()
+        client_connection = None
+    for connection in list(connected_clients):
+        connection.close()
+    connected_clients.clear()
 
     # Arrêter les flux PyAudio
     if stream_in:
@@ -760,16 +2451,7 @@ def stop_call():
         cap = None
     
     # Afficher des images noires
-    black_img = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
-    black_ppm_data = convert_opencv_to_ppm(black_img)
-    black_photo_image = tk.PhotoImage(data=black_ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-
-    if label_local_video:
-        label_local_video.configure(image=black_photo_image)
-        label_local_video.image = black_photo_image
-    if label_remote_video:
-        label_remote_video.configure(image=black_photo_image)
-        label_remote_video.image = black_photo_image
+    clear_video_views()
 
     messagebox.showinfo("Appel Terminé", "L'appel vidéo et audio a été arrêté.")
     
@@ -790,107 +2472,102 @@ def stop_video_call():
     video_receiving = False
 
 
-# --- Configuration de CustomTkinter ---
-ctk.set_appearance_mode("System")
-ctk.set_default_color_theme("blue")
-
-# --- Interface Graphique CustomTkinter ---
-root = ctk.CTk()
-root.title("Appel Vidéo P2P/Groupe (CustomTkinter)")
-root.geometry(f"{FRAME_WIDTH * 2 + 60}x{FRAME_HEIGHT + 380}")
-root.resizable(False, False)
-
-# --- Cadres pour les vidéos ---
-frame_local_video = ctk.CTkFrame(root, width=FRAME_WIDTH + 20, height=FRAME_HEIGHT + 20)
-frame_local_video.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-frame_local_video.grid_propagate(False)
-
-label_local_title = ctk.CTkLabel(frame_local_video, text="Ma Vidéo", font=ctk.CTkFont(size=16, weight="bold"))
-label_local_title.pack(pady=5)
-label_local_video = ctk.CTkLabel(frame_local_video, text="", width=FRAME_WIDTH, height=FRAME_HEIGHT, bg_color="black")
-label_local_video.pack(pady=5)
-
-frame_remote_video = ctk.CTkFrame(root, width=FRAME_WIDTH + 20, height=FRAME_HEIGHT + 20)
-frame_remote_video.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
-frame_remote_video.grid_propagate(False)
-
-label_remote_title = ctk.CTkLabel(frame_remote_video, text="Vidéo du Pair/Groupe", font=ctk.CTkFont(size=16, weight="bold"))
-label_remote_title.pack(pady=5)
-label_remote_video = ctk.CTkLabel(frame_remote_video, text="", width=FRAME_WIDTH, height=FRAME_HEIGHT, bg_color="black")
-label_remote_video.pack(pady=5)
-
-# --- Cadre pour les contrôles ---
-frame_controls = ctk.CTkFrame(root)
-frame_controls.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
-frame_controls.grid_columnconfigure(1, weight=1)
-frame_controls.grid_columnconfigure(3, weight=1)
-frame_controls.grid_columnconfigure(5, weight=1)
-
-
-# Labels et entrées pour l'appel (mode client)
-ctk.CTkLabel(frame_controls, text="IP du pair/serveur:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-entry_peer_ip = ctk.CTkEntry(frame_controls)
-entry_peer_ip.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
-entry_peer_ip.insert(0, "127.0.0.1")
-
-ctk.CTkLabel(frame_controls, text="Port Audio:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=5, pady=5, sticky="w")
-entry_audio_port = ctk.CTkEntry(frame_controls, width=80)
-entry_audio_port.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
-entry_audio_port.insert(0, str(AUDIO_PORT))
-
-ctk.CTkLabel(frame_controls, text="Port Vidéo:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=4, padx=5, pady=5, sticky="w")
-entry_video_port = ctk.CTkEntry(frame_controls, width=80)
-entry_video_port.grid(row=0, column=5, padx=5, pady=5, sticky="ew")
-entry_video_port.insert(0, str(VIDEO_PORT))
-
-btn_call = ctk.CTkButton(frame_controls, text="Appeler (Client)", command=start_call)
-btn_call.grid(row=0, column=6, padx=10, pady=5)
-
-
-# Labels et entrées pour l'écoute (mode serveur)
-ctk.CTkLabel(frame_controls, text="IP d'écoute (Serveur):", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=5, pady=5, sticky="w")
-entry_listen_ip = ctk.CTkEntry(frame_controls)
-entry_listen_ip.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
-entry_listen_ip.insert(0, "0.0.0.0") # Par défaut, écouter sur toutes les interfaces
-
-ctk.CTkLabel(frame_controls, text="Audio:", font=ctk.CTkFont(weight="normal")).grid(row=1, column=2, padx=5, pady=5, sticky="w")
-entry_audio_port_listen = ctk.CTkEntry(frame_controls, width=80)
-entry_audio_port_listen.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
-entry_audio_port_listen.insert(0, str(AUDIO_PORT))
-
-ctk.CTkLabel(frame_controls, text="Vidéo:", font=ctk.CTkFont(weight="normal")).grid(row=1, column=4, padx=5, pady=5, sticky="w")
-entry_video_port_listen = ctk.CTkEntry(frame_controls, width=80)
-entry_video_port_listen.grid(row=1, column=5, padx=5, pady=5, sticky="ew")
-entry_video_port_listen.insert(0, str(VIDEO_PORT))
-
-btn_listen = ctk.CTkButton(frame_controls, text="Écouter (Serveur)", command=start_listen)
-btn_listen.grid(row=1, column=6, padx=10, pady=5)
-
-# Bouton d'arrêt général de l'appel
-btn_stop = ctk.CTkButton(frame_controls, text="Arrêter l'Appel", command=stop_call, state="disabled", fg_color="red", hover_color="darkred")
-btn_stop.grid(row=2, column=0, columnspan=7, pady=10)
-
-audio_status_label = ctk.CTkLabel(root, text="Statut Audio: Inactif", font=ctk.CTkFont(size=14))
-audio_status_label.grid(row=2, column=0, columnspan=2, pady=5)
-
-
-def on_closing_ctk():
-    if messagebox.askokcancel("Quitter l'application", "Voulez-vous vraiment quitter? L'appel sera arrêté et les ressources libérées."):
-        stop_call()
-        root.destroy()
-
-root.protocol("WM_DELETE_WINDOW", on_closing_ctk)
-
-# --- Initialisation des images noires au démarrage ---
-black_img = np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
-black_ppm_data = convert_opencv_to_ppm(black_img)
-black_photo_image = tk.PhotoImage(data=black_ppm_data, format='ppm', width=FRAME_WIDTH, height=FRAME_HEIGHT)
-
-if label_local_video:
-    label_local_video.configure(image=black_photo_image)
-    label_local_video.image = black_photo_image
-if label_remote_video:
-    label_remote_video.configure(image=black_photo_image)
-    label_remote_video.image = black_photo_image
-
-root.mainloop()
\ No newline at end of file
+if __name__ == "__main__":
+    # --- Configuration de CustomTkinter ---
+    ctk.set_appearance_mode("System")
+    ctk.set_default_color_theme("blue")
+
+    # --- Interface Graphique CustomTkinter ---
+    root = ctk.CTk()
+    root.title("Appel Vidéo P2P/Groupe (CustomTkinter)")
+    root.geometry(f"{FRAME_WIDTH * 2 + 60}x{FRAME_HEIGHT + 435}")
+    root.resizable(False, False)
+
+    # --- Cadres pour les vidéos ---
+    frame_local_video = ctk.CTkFrame(root, width=FRAME_WIDTH + 20, height=FRAME_HEIGHT + 20)
+    frame_local_video.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+    frame_local_video.grid_propagate(False)
+
+    label_local_title = ctk.CTkLabel(frame_local_video, text="Ma Vidéo", font=ctk.CTkFont(size=16, weight="bold"))
+    label_local_title.pack(pady=5)
+    label_local_video = ctk.CTkLabel(frame_local_video, text="", width=FRAME_WIDTH, height=FRAME_HEIGHT, bg_color="black")
+    label_local_video.pack(pady=5)
+
+    frame_remote_video = ctk.CTkFrame(root, width=FRAME_WIDTH + 20, height=FRAME_HEIGHT + 20)
+    frame_remote_video.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
+    frame_remote_video.grid_propagate(False)
+
+    label_remote_title = ctk.CTkLabel(frame_remote_video, text="Vidéo du Pair/Groupe", font=ctk.CTkFont(size=16, weight="bold"))
+    label_remote_title.pack(pady=5)
+    label_remote_video = ctk.CTkLabel(frame_remote_video, text="", width=FRAME_WIDTH, height=FRAME_HEIGHT, bg_color="black")
+    label_remote_video.pack(pady=5)
+
+    # --- Cadre pour les contrôles ---
+    frame_controls = ctk.CTkFrame(root)
+    frame_controls.grid(row=1, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+    frame_controls.grid_columnconfigure(1, weight=1)
+    frame_controls.grid_columnconfigure(3, weight=1)
+
+
+    # Labels et entrées pour l'appel (mode client)
+    ctk.CTkLabel(frame_controls, text="IP du pair/serveur:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    entry_peer_ip = ctk.CTkEntry(frame_controls)
+    entry_peer_ip.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+    entry_peer_ip.insert(0, "127.0.0.1")
+
+    ctk.CTkLabel(frame_controls, text="Port:", font=ctk.CTkFont(weight="bold")).grid(row=0, column=2, padx=5, pady=5, sticky="w")
+    entry_port = ctk.CTkEntry(frame_controls, width=80)
+    entry_port.grid(row=0, column=3, padx=5, pady=5, sticky="ew")
+    entry_port.insert(0, str(MEDIA_PORT))
+
+    btn_call = ctk.CTkButton(frame_controls, text="Appeler (Client)", command=start_call)
+    btn_call.grid(row=0, column=4, padx=10, pady=5)
+
+    # Audio en UDP : pas de blocage en tête de file, les trames perdues sont masquées par le tampon de gigue
+    use_udp_var = tk.BooleanVar(value=False)
+    ctk.CTkCheckBox(frame_controls, text="Audio UDP", variable=use_udp_var).grid(row=0, column=5, padx=5, pady=5)
+    # Vidéo delta : seules les tuiles modifiées sont envoyées entre deux images complètes (plans fixes, visioconférence)
+    use_delta_var = tk.BooleanVar(value=False)
+    ctk.CTkCheckBox(frame_controls, text="Vidéo delta", variable=use_delta_var).grid(row=1, column=5, padx=5, pady=5)
+
+
+    # Labels et entrées pour l'écoute (mode serveur)
+    ctk.CTkLabel(frame_controls, text="IP d'écoute (Serveur):", font=ctk.CTkFont(weight="bold")).grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    entry_listen_ip = ctk.CTkEntry(frame_controls)
+    entry_listen_ip.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+    entry_listen_ip.insert(0, "0.0.0.0") # Par défaut, écouter sur toutes les interfaces
+
+    ctk.CTkLabel(frame_controls, text="Port:", font=ctk.CTkFont(weight="normal")).grid(row=1, column=2, padx=5, pady=5, sticky="w")
+    entry_port_listen = ctk.CTkEntry(frame_controls, width=80)
+    entry_port_listen.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+    entry_port_listen.insert(0, str(MEDIA_PORT))
+
+    btn_listen = ctk.CTkButton(frame_controls, text="Écouter (Serveur)", command=start_listen)
+    btn_listen.grid(row=1, column=4, padx=10, pady=5)
+
+    # Bouton d'arrêt général de l'appel
+    btn_stop = ctk.CTkButton(frame_controls, text="Arrêter l'Appel", command=stop_call, state="disabled", fg_color="red", hover_color="darkred")
+    btn_stop.grid(row=2, column=0, columnspan=6, pady=10)
+
+    audio_status_label = ctk.CTkLabel(root, text="Statut Audio: Inactif", font=ctk.CTkFont(size=14))
+    audio_status_label.grid(row=2, column=0, columnspan=2, pady=5)
+    audio_stats_label = ctk.CTkLabel(root, text="", font=ctk.CTkFont(size=12))
+    audio_stats_label.grid(row=3, column=0, columnspan=2, pady=(0, 5))
+    root.after(1000, refresh_audio_stats)
+    video_stats_label = ctk.CTkLabel(root, text="", font=ctk.CTkFont(size=12))
+    video_stats_label.grid(row=4, column=0, columnspan=2, pady=(0, 5))
+
+
+    def on_closing_ctk():
+        if messagebox.askokcancel("Quitter l'application", "Voulez-vous vraiment quitter? L'appel sera arrêté et les ressources libérées."):
+            stop_call()
+            root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_closing_ctk)
+
+    # --- Vues vidéo : un PhotoImage par label, mis à jour par put dans le thread Tk ---
+    local_view = VideoView(label_local_video, FRAME_WIDTH, FRAME_HEIGHT)
+    remote_view = VideoView(label_remote_video, FRAME_WIDTH, FRAME_HEIGHT)
+    root.after(RENDER_INTERVAL_MS, render_video_views)
+
+    root.mainloop()
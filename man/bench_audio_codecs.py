@@ -0,0 +1,110 @@
+"""
+Benchmark: audio codecs of the voice call app (AudioCodec subclasses from 46.py).
+
+Encodes and decodes a few seconds of a synthetic voice-like signal (a gliding harmonic series with a syllabic
+envelope and some noise) in 20 ms frames, the way a call does. For every codec usable on this machine it reports
+the bitrate (codec payload, and on the wire with the 14-byte frame header), the reduction against raw 44.1 kHz
+PCM, the encode/decode cost per frame, the CPU share of one core needed for one stream in both directions, and
+the round-trip SNR. IMA-ADPCM is measured with the audioop fast path and with the pure Python fallback.
+
+Usage: python bench_audio_codecs.py [--seconds 10]
+"""
+import argparse
+import importlib.util
+import os
+import time
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def voice_like_signal(app, seconds):
+    rng = np.random.default_rng(1)
+    t = np.arange(int(seconds * app.RATE)) / app.RATE
+    f0 = 140 + 40 * np.sin(2 * np.pi * 0.7 * t) # Gliding pitch
+    phase = 2 * np.pi * np.cumsum(f0) / app.RATE
+    signal = sum(np.sin(k * phase) / k for k in range(1, 25) if k * 200 < app.RATE / 2)
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t)) ** 2 # About four syllables per second
+    signal = signal * envelope + 0.02 * rng.standard_normal(len(t))
+    signal = signal / np.abs(signal).max() * 12000
+    n_frames = len(signal) // app.CHUNK_SIZE
+    return signal[:n_frames * app.CHUNK_SIZE].astype(np.int16)
+
+
+def snr_db(reference, decoded, max_lag=600):
+    """SNR after aligning the decoded signal (resampling filters and the Opus lookahead add a few ms of delay)."""
+    reference = reference.astype(np.float64)
+    decoded = decoded.astype(np.float64)
+    best = -np.inf
+    for lag in range(max_lag):
+        ref = reference[:len(reference) - lag]
+        dec = decoded[lag:]
+        noise = np.sum((ref - dec) ** 2)
+        best = max(best, 10 * np.log10(np.sum(ref ** 2) / max(noise, 1e-9)))
+    return best
+
+
+def run_codec(app, codec_class, signal):
+    encoder = codec_class()
+    decoder = codec_class()
+    frames = signal.reshape(-1, app.CHUNK_SIZE)
+    packets = []
+    start = time.perf_counter()
+    for frame in frames:
+        packets.append(encoder.encode(frame.tobytes()))
+    encode_s = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [decoder.decode(packet) for packet in packets]
+    decode_s = time.perf_counter() - start
+    decoded = np.frombuffer(b"".join(decoded), dtype=np.int16)
+
+    n = len(frames)
+    payload_kbps = encoder.bitrate_kbps()
+    wire_kbps = (encoder.bytes_encoded + n * app.AUDIO_FRAME_HEADER.size) * 8 / (n * app.AUDIO_FRAME_DURATION) / 1000
+    return {
+        "payload_kbps": payload_kbps,
+        "wire_kbps": wire_kbps,
+        "encode_us": encode_s / n * 1e6,
+        "decode_us": decode_s / n * 1e6,
+        "cpu_percent": (encode_s + decode_s) / (n * app.AUDIO_FRAME_DURATION) * 100,
+        "snr": snr_db(signal, decoded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+    app = load_call_app()
+    signal = voice_like_signal(app, args.seconds)
+
+    runs = []
+    for name in app.available_audio_codecs():
+        runs.append((app.AUDIO_CODECS[name].label, app.AUDIO_CODECS[name]))
+        if name == "adpcm16" and app.audioop:
+            runs.append(("IMA-ADPCM 16 kHz (Python)", app.ImaAdpcmCodec))
+    pcm_kbps = app.RATE * 16 / 1000
+    print(f"{'codec':<28}{'kbit/s':>8}{'on wire':>9}{'vs PCM':>8}{'enc us':>9}{'dec us':>9}{'CPU %':>8}{'SNR dB':>8}")
+    for label, codec_class in runs:
+        fast_path = app.audioop
+        if label.endswith("(Python)"):
+            app.audioop = None # Pure Python IMA-ADPCM
+        r = run_codec(app, codec_class, signal)
+        app.audioop = fast_path
+        print(f"{label:<28}{r['payload_kbps']:>8.1f}{r['wire_kbps']:>9.1f}{pcm_kbps / r['payload_kbps']:>7.1f}x"
+              f"{r['encode_us']:>9.0f}{r['decode_us']:>9.0f}{r['cpu_percent']:>8.2f}{r['snr']:>8.1f}")
+    if not app.OPUS_AVAILABLE:
+        print("Opus not measured: install opuslib and libopus to include it.")
+
+
+if __name__ == "__main__":
+    main()
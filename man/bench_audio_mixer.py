@@ -0,0 +1,125 @@
+"""
+Benchmark: server-side audio mixing (AudioMixer from 46.py) against the previous N x N raw PCM fan-out.
+
+For 2, 8 and 32 synthetic participants connected over loopback socket pairs, every participant sends one
+int16 frame per tick (a tone) for a few seconds while the mixer runs at its fixed cadence. The benchmark reports
+the server CPU used, the egress bandwidth of the mixer (one stream per listener) and the egress the old
+fan-out would have needed (every frame forwarded to every other client), plus late ticks and dropped frames.
+
+Usage: python bench_audio_mixer.py [--seconds 5] [--participants 2 8 32]
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_scenario(app, n_participants, seconds):
+    mixer = app.AudioMixer()
+    stop = threading.Event()
+    received = [0] * n_participants
+    client_sockets = []
+    for i in range(n_participants):
+        server_side, client_side = socket.socketpair()
+        client_sockets.append((server_side, client_side))
+        mixer.add_participant(i, lambda data, timestamp, sock=server_side: sock.sendall(data))
+
+    def synthetic_client(i, sock):
+        # Sends one frame per tick (like stream_in.read) and drains what the server sends back
+        t = np.arange(app.CHUNK_SIZE)
+        frame = (8000 * np.sin(2 * np.pi * (220 + 40 * i) * t / app.RATE)).astype(np.int16).tobytes()
+        sock.setblocking(False)
+        next_tick = time.perf_counter()
+        while not stop.is_set():
+            mixer.push_frame(i, frame) # The server's receive thread would do this after reading a full frame
+            try:
+                while True:
+                    data = sock.recv(65536)
+                    if not data:
+                        return
+                    received[i] += len(data)
+            except BlockingIOError:
+                pass
+            next_tick += app.MIX_TICK
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    threads = [threading.Thread(target=synthetic_client, args=(i, client_side), daemon=True)
+               for i, (_, client_side) in enumerate(client_sockets)]
+    for thread in threads:
+        thread.start()
+
+    # CPU of the mixing itself, measured on the tick thread
+    tick_cpu = [0.0]
+
+    def timed_run():
+        mixer.running = True
+        next_tick = time.perf_counter()
+        while mixer.running:
+            cpu_start = time.thread_time()
+            mixer.mix_tick()
+            tick_cpu[0] += time.thread_time() - cpu_start
+            mixer.ticks += 1
+            next_tick += app.MIX_TICK
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                mixer.late_ticks += 1
+
+    mixer_thread = threading.Thread(target=timed_run, daemon=True)
+    start = time.perf_counter()
+    mixer_thread.start()
+    time.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    mixer.stop()
+    stop.set()
+    mixer_thread.join()
+    for thread in threads:
+        thread.join()
+    for server_side, client_side in client_sockets:
+        server_side.close()
+        client_side.close()
+
+    frame_rate = 1 / app.MIX_TICK
+    mixer_kbps = mixer.bytes_sent * 8 / elapsed / 1000
+    fanout_kbps = n_participants * (n_participants - 1) * app.MIX_FRAME_BYTES * frame_rate * 8 / 1000
+    return {
+        "cpu_percent": tick_cpu[0] / elapsed * 100,
+        "tick_ms": tick_cpu[0] / max(1, mixer.ticks) * 1000,
+        "mixer_kbps": mixer_kbps,
+        "fanout_kbps": fanout_kbps,
+        "late": mixer.late_ticks,
+        "dropped": mixer.dropped_frames,
+        "ticks": mixer.ticks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--participants", type=int, nargs="+", default=[2, 8, 32])
+    args = parser.parse_args()
+    app = load_call_app()
+
+    print(f"{'participants':>12}{'mix CPU %':>11}{'ms/tick':>9}{'mixer kbit/s':>14}{'fan-out kbit/s':>16}{'late':>6}{'dropped':>9}")
+    for n in args.participants:
+        r = run_scenario(app, n, args.seconds)
+        print(f"{n:>12}{r['cpu_percent']:>11.2f}{r['tick_ms']:>9.3f}{r['mixer_kbps']:>14.0f}{r['fanout_kbps']:>16.0f}{r['late']:>6}{r['dropped']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Loopback test: multiplexed media connection of the call app (MediaConnection, MediaSync and VideoView from 46.py).
+
+A sender captures 20 ms audio frames and 640x480 JPEG frames (synthetic camera) on the media clock and sends both
+over ONE loopback MediaConnection, as start_call does. The link in between is the ThrottledLink of
+bench_video_adaptation.py (token bucket + one-way delay). The receiver plays the audio through the jitter buffer
+(play_from_jitter_buffer, with a stand-in output device that consumes one frame every 20 ms and reports
+--output-latency-ms) and shows the video in the remote VideoView, rendered every RENDER_INTERVAL_MS as the Tk loop
+would. Sender and receiver share this process, so they also share the media clock: timestamps are exact here.
+
+Four runs:
+  fifo       audio and video fragments written in arrival order on the connection (no priority), video paced
+  unpaced    audio and control frames written before any pending video fragment, video not paced
+  priority   audio first and video fragments paced at MEDIA_PACING_FACTOR x the video bitrate, as start_call does
+  sync       priority, and the view holds each image until the audio played has reached its capture time
+Only the last one uses lip sync; the others still measure the error the view would have shown.
+
+For each run it prints the one-way delay of the audio frames (capture to arrival), the frames the jitter buffer
+had to conceal, the video frame rate shown and the audio/video synchronization error at display time (positive:
+video ahead of the sound).
+
+Usage: python bench_media_sync.py [--seconds 10] [--link-kbps 4000] [--delay-ms 20] [--fps 15] [--quality 60]
+       [--output-latency-ms 80]
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from bench_video_adaptation import ThrottledLink, socket_pair, synthetic_camera
+from bench_video_render import StandInLabel, StandInPhotoImage
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+LINK_BUFFER = 32 * 1024
+# name -> (prioritize_audio, paced, MediaSync.hold)
+RUNS = {"fifo": (False, True, False), "unpaced": (True, False, False), "priority": (True, True, False), "sync": (True, True, True)}
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ArrivalProbe:
+    """Wraps the receiving AudioTransport and records the capture-to-arrival delay of every audio frame."""
+    def __init__(self, app, transport):
+        self.app = app
+        self.transport = transport
+        self.name = transport.name
+        self.delays = []
+
+    def receive(self):
+        frame = self.transport.receive()
+        if frame is not None:
+            self.delays.append(self.app.media_clock.now() - frame[1])
+        return frame
+
+
+class StandInOutput:
+    """Audio device stand-in: write blocks until the previous frame has been played, like a full PyAudio buffer."""
+    def __init__(self, frame_duration):
+        self.frame_duration = frame_duration
+        self.next_free = None
+
+    def write(self, data):
+        now = time.perf_counter()
+        if self.next_free is None or self.next_free < now: # Device idle (underrun): the frame plays at once
+            self.next_free = now
+        time.sleep(self.next_free - now)
+        self.next_free += self.frame_duration
+
+
+def run(app, name, args, jpeg_frames, video_kbps):
+    prioritize_audio, paced, hold = RUNS[name]
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(2)
+    sender_sock, proxy_in = socket_pair(listener, LINK_BUFFER)
+    proxy_out, receiver_sock = socket_pair(listener, LINK_BUFFER)
+    for sock in (proxy_in, proxy_out, receiver_sock): # Small audio frames: no Nagle delay inside the emulated link
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    link = ThrottledLink(proxy_in, proxy_out, args.link_kbps, args.delay_ms)
+
+    pacing = (lambda: video_kbps * app.MEDIA_PACING_FACTOR) if paced else None
+    sender = app.MediaConnection(sender_sock, "receiver", prioritize_audio=prioritize_audio, pacing=pacing)
+    receiver = app.MediaConnection(receiver_sock, "sender")
+    sync = app.MediaSync(output_latency=args.output_latency_ms / 1000, hold=hold)
+    view = app.remote_view = app.VideoView(StandInLabel(), app.FRAME_WIDTH, app.FRAME_HEIGHT)
+    view.sync = sync
+    app.video_receiving = True
+    running = threading.Event()
+    running.set()
+
+    # Receiver, as receive_audio_stream_from_server and receive_video_stream_from_server do
+    probe = ArrivalProbe(app, app.AudioTransport(receiver))
+    jitter_buffer = app.AudioJitterBuffer(app.MIX_FRAME_BYTES, app.AUDIO_DTYPE)
+    output = StandInOutput(app.AUDIO_FRAME_DURATION)
+    threads = [threading.Thread(target=app.play_from_jitter_buffer, daemon=True,
+                                args=(probe, jitter_buffer, output.write, running.is_set, "bench", sync.on_audio_played)),
+               threading.Thread(target=app.receive_video_stream_from_server, args=(receiver,), daemon=True)]
+
+    # Sender: microphone every 20 ms, camera at --fps, both stamped on the media clock at capture
+    audio = app.AudioTransport(sender)
+    tone = (6000 * np.sin(2 * np.pi * 440 * np.arange(app.CHUNK_SIZE) / app.RATE)).astype(np.int16).tobytes()
+
+    def microphone():
+        next_frame = time.perf_counter()
+        while running.is_set():
+            try:
+                audio.send(tone)
+            except ConnectionError:
+                return
+            next_frame += app.AUDIO_FRAME_DURATION
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+    def camera():
+        next_frame = time.perf_counter()
+        seq = 0
+        while running.is_set():
+            packet = app.pack_video_packet(app.VIDEO_PACKET_FRAME, seq, app.media_clock.now(), jpeg_frames[seq % len(jpeg_frames)])
+            try:
+                sender.send_video(packet) # Blocks while the previous image is still being written, as VideoSubscriber does
+            except ConnectionError:
+                return
+            seq += 1
+            next_frame = max(next_frame + 1 / args.fps, time.perf_counter() - 1 / args.fps)
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+    threads += [threading.Thread(target=target, daemon=True) for target in (microphone, camera)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    while time.perf_counter() - start < args.seconds: # Plays the part of root.after(RENDER_INTERVAL_MS, render_video_views)
+        view.render()
+        time.sleep(app.RENDER_INTERVAL_MS / 1000)
+    elapsed = time.perf_counter() - start
+
+    running.clear()
+    app.video_receiving = False
+    link.running = False
+    sender.close()
+    receiver.close()
+    view.close()
+    for sock in (proxy_in, proxy_out, listener):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+    for thread in threads: # The next run starts from a clean slate
+        thread.join()
+
+    delays = np.array(probe.delays[len(probe.delays) // 5:]) * 1000 # First second(s) ignored: link queue filling up
+    return {
+        "audio_p50": np.percentile(delays, 50) if len(delays) else float("nan"),
+        "audio_p95": np.percentile(delays, 95) if len(delays) else float("nan"),
+        "audio_max": delays.max() if len(delays) else float("nan"),
+        "concealed": jitter_buffer.stats()["concealed"],
+        "video_fps": view.stats()["rendered"] / elapsed,
+        "sync": sync.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--link-kbps", type=float, default=4000.0)
+    parser.add_argument("--delay-ms", type=float, default=20.0)
+    parser.add_argument("--fps", type=float, default=15.0)
+    parser.add_argument("--quality", type=int, default=60)
+    parser.add_argument("--output-latency-ms", type=float, default=80.0, help="latency reported by the audio device")
+    args = parser.parse_args()
+    app = load_call_app()
+    app.tk.PhotoImage = StandInPhotoImage # No display needed: only the pacing of the view is measured
+
+    read_frame = synthetic_camera(app)
+    jpeg_frames = [cv2.imencode('.jpg', read_frame()[1], [int(cv2.IMWRITE_JPEG_QUALITY), args.quality])[1] for _ in range(50)]
+    video_kbps = np.mean([len(j) for j in jpeg_frames]) * 8 * args.fps / 1000
+    print(f"link {args.link_kbps:.0f} kbit/s + {args.delay_ms:.0f} ms, video {video_kbps:.0f} kbit/s ({args.fps:.0f} fps),"
+          f" audio {app.AudioCodec().label}, output latency {args.output_latency_ms:.0f} ms")
+    print(f"{'run':<10}{'audio p50':>10}{'p95':>8}{'max':>8}{'concealed':>11}{'video fps':>11}"
+          f"{'sync mean':>11}{'|sync|':>8}{'p95':>8}")
+    for name in RUNS:
+        r = run(app, name, args, jpeg_frames, video_kbps)
+        s = r["sync"] or {"mean_ms": float("nan"), "abs_ms": float("nan"), "p95_ms": float("nan")}
+        print(f"{name:<10}{r['audio_p50']:>10.1f}{r['audio_p95']:>8.1f}{r['audio_max']:>8.1f}{r['concealed']:>11}"
+              f"{r['video_fps']:>11.1f}{s['mean_ms']:>+11.0f}{s['abs_ms']:>8.0f}{s['p95_ms']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: per-process history of the process monitor (ProcessHistory, fed by ProcessCollector, from 37.py).
+
+--spawn idle child processes (sleep) are started so that more processes exist than HISTORY_MAX_PROCESSES. One
+real collection is made, then --ticks collections are recorded as ProcessCollector's loop does, with a simulated
+clock one second apart (so one hour of history takes seconds, not an hour). The CPU and RSS columns come from that
+snapshot; IO and file descriptors are really read for every tracked process at each tick.
+
+It prints:
+  record     the time ProcessHistory.record adds to each collection (in the collector thread)
+  memory     the memory used by the history after the run, against the bound HISTORY_MAX_PROCESSES x max per process
+  details    the Details tab: the previous refresh, which called cpu_percent(interval=0.1) on the Tk thread, against the
+             new one, prepared in a thread (format_process_details) and only written to the textbox on the Tk thread
+  export     CSV export of the full-resolution history and of the per-minute rollups
+
+Usage: python bench_process_history.py [--spawn 400] [--ticks 3600]
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import tempfile
+import time
+import types
+
+import numpy as np
+import psutil
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "37.py")
+
+
+def load_monitor_app():
+    """Imports 37.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("monitor_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def details_stand_in(app, history):
+    """Just enough of ProcessMonitorApp to call its format_process_details without a display."""
+    monitor = types.SimpleNamespace(process_history=history, history_window="10 min")
+    monitor.format_process_history = lambda series: app.ProcessMonitorApp.format_process_history(monitor, series)
+    return monitor
+
+
+def timed_ms(function, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return np.array(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spawn", type=int, default=400, help="idle child processes started for the test")
+    parser.add_argument("--ticks", type=int, default=3600, help="collections recorded (3600 = one hour at 1 Hz)")
+    args = parser.parse_args()
+    app = load_monitor_app()
+
+    children = []
+    try:
+        for _ in range(args.spawn):
+            children.append(subprocess.Popen(["sleep", "3600"]))
+        collector = app.ProcessCollector()
+        history = app.ProcessHistory()
+        collector.collect()
+        time.sleep(0.5) # cpu_percent needs a previous reading
+        rows = collector.collect()
+        print(f"{len(rows)} processes ({len(children)} spawned), {args.ticks} collections recorded,"
+              f" tracking at most {history.max_processes}")
+
+        record_ms = []
+        clock = time.time() - args.ticks
+        for tick in range(args.ticks):
+            history.record(rows, now=clock + tick)
+            record_ms.append(history.record_ms)
+        record_ms = np.array(record_ms)
+        print(f"\nrecord: {np.median(record_ms):.2f} ms p50, {np.percentile(record_ms, 95):.2f} ms p95 per collection"
+              f" ({len(history.series)} processes tracked; the collection itself took {collector.collect_ms:.1f} ms)")
+
+        per_process = history.max_bytes_per_process()
+        used = history.memory_bytes()
+        print(f"memory: {used / 2**20:.1f} MB for {len(history.series)} processes ({used / max(1, len(history.series)) / 1024:.0f} KB each),"
+              f" bound {history.max_processes * per_process / 2**20:.1f} MB ({per_process / 1024:.0f} KB per process)")
+
+        me = psutil.Process()
+        monitor = details_stand_in(app, history)
+        previous = timed_ms(lambda: me.cpu_percent(interval=0.1), 5)
+        prepared = timed_ms(lambda: app.ProcessMonitorApp.format_process_details(monitor, me), 20)
+        series = history.find(me.pid, me.create_time())
+        curves = {label: timed_ms(lambda: app.ProcessMonitorApp.format_process_history(
+            types.SimpleNamespace(process_history=history, history_window=label), series), 20) for label in app.HISTORY_WINDOWS}
+        print(f"\ndetails, previous: {np.median(previous):.1f} ms on the Tk thread for cpu_percent(interval=0.1) alone")
+        print(f"details, new: {np.median(prepared):.2f} ms to prepare in a thread (all psutil calls, curves included);"
+              f" the Tk thread only replaces the text")
+        print("curves per window: " + ", ".join(f"{label} {np.median(t):.2f} ms" for label, t in curves.items()))
+        text = app.ProcessMonitorApp.format_process_details(monitor, me)
+        print("\n" + text[text.index("--- Historique"):text.index("--- Fichiers")].rstrip())
+
+        with tempfile.TemporaryDirectory() as directory:
+            for label, rollup in (("1 point/s", None), ("1 min rollups", 60)):
+                path = os.path.join(directory, "history.csv")
+                started = time.perf_counter()
+                count = history.export(path, rollup)
+                print(f"export {label}: {count} rows, {os.path.getsize(path) / 2**20:.1f} MB CSV in {time.perf_counter() - started:.2f} s")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+
+if __name__ == "__main__":
+    main()
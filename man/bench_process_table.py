@@ -0,0 +1,150 @@
+"""
+Benchmark: process list of the process monitor (ProcessCollector and ProcessTableView from 37.py) against the
+previous update_process_list_display, which ran entirely on the Tk thread.
+
+To get a realistic table size, --spawn idle child processes (sleep) are started first, and killed at the end.
+Then, for --refreshes refreshes spaced by --interval seconds:
+  previous  process_iter, then name(), status(), cpu_percent(), memory_info() and username() called one by one for
+            every process, the textbox emptied and one line inserted per process, all on the Tk thread
+  collector ProcessCollector.collect(): process_iter(attrs) in oneshot mode, name/username/exe cached per
+            (PID, create_time); runs in the background thread in the app, so it does not count against the frame
+  view      ProcessTableView.set_rows on the new snapshot: the only work left on the Tk thread
+It prints the time per refresh (median, p95, max) and the number of text lines written.
+
+Without a display, Tk cannot create the text widget: the rows then go to a stand-in that only counts the edits,
+so the textbox cost is not measured (only the Python side of the view and the collection are).
+
+Usage: python bench_process_table.py [--spawn 2000] [--refreshes 10] [--interval 1.0]
+"""
+import argparse
+import importlib.util
+import os
+import subprocess
+import time
+import tkinter as tk
+
+import numpy as np
+import psutil
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "37.py")
+FRAME_MS = 16.0
+
+
+def load_monitor_app():
+    """Imports 37.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("monitor_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StandInText:
+    """Counts the edits when no display is available (tk.Text needs one)."""
+    def __init__(self):
+        self.lines_written = 0
+
+    def delete(self, start, end=None):
+        pass
+
+    def insert(self, index, text):
+        self.lines_written += max(1, text.count("\n"))
+
+    def tag_add(self, *args):
+        pass
+
+    def tag_remove(self, *args):
+        pass
+
+
+def previous_refresh(text):
+    """update_process_list_display as it was in 37.py."""
+    text.delete("1.0", "end")
+    header = f"{'PID':<8} {'Status':<10} {'CPU%':<8} {'Mem (MB)':<12} {'Nom':<30} {'Utilisateur':<20}\n"
+    text.insert("end", header)
+    text.insert("end", "-" * 100 + "\n")
+    processes = []
+    for p in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_info', 'username']):
+        try:
+            cpu_percent = p.cpu_percent(interval=None)
+            mem_usage_mb = p.memory_info().rss / (1024 * 1024)
+            processes.append({'pid': p.pid, 'name': p.name(), 'status': p.status(), 'cpu_percent': cpu_percent,
+                              'mem_usage_mb': mem_usage_mb, 'username': p.username()})
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
+    for proc in processes:
+        line = f"{proc['pid']:<8} {proc['status']:<10} {proc['cpu_percent']:<8.1f} {proc['mem_usage_mb']:<12.1f} {proc['name']:<30} {proc['username']:<20}\n"
+        text.insert("end", line)
+    return len(processes)
+
+
+def percentiles(values):
+    values = np.array(values)
+    return f"{np.median(values):>9.2f}{np.percentile(values, 95):>9.2f}{values.max():>9.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spawn", type=int, default=2000, help="idle child processes started for the test")
+    parser.add_argument("--refreshes", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+    app = load_monitor_app()
+
+    try:
+        root = tk.Tk()
+        root.withdraw()
+        make_text = lambda: tk.Text(root, wrap="none", width=120, height=40)
+    except tk.TclError:
+        root = None
+        make_text = StandInText
+        print("No display: the text widget is replaced by a stand-in, textbox times are not measured.")
+
+    children = []
+    try:
+        for _ in range(args.spawn):
+            children.append(subprocess.Popen(["sleep", "3600"]))
+        print(f"{len(psutil.pids())} processes ({len(children)} spawned), {args.refreshes} refreshes every {args.interval:.1f} s")
+
+        previous_text = make_text()
+        view = app.ProcessTableView(make_text(), visible=40)
+        view.reset()
+        collector = app.ProcessCollector()
+        previous_ms, collect_ms, render_ms, changed = [], [], [], []
+        first_collect = None
+        for _ in range(args.refreshes):
+            started = time.perf_counter()
+            count = previous_refresh(previous_text)
+            if root is not None:
+                root.update_idletasks()
+            previous_ms.append((time.perf_counter() - started) * 1000)
+
+            rows = collector.collect()
+            if first_collect is None:
+                first_collect = collector.collect_ms # Static fields read for every process
+            else:
+                collect_ms.append(collector.collect_ms)
+            started = time.perf_counter()
+            view.set_rows(rows)
+            if root is not None:
+                root.update_idletasks()
+            render_ms.append((time.perf_counter() - started) * 1000)
+            changed.append(view.changed)
+            time.sleep(args.interval)
+
+        print(f"\n{'path (ms per refresh)':<34}{'p50':>9}{'p95':>9}{'max':>9}  lines written")
+        print(f"{'previous, on the Tk thread':<34}{percentiles(previous_ms)}  {count + 2} per refresh")
+        print(f"{'collector, background thread':<34}{percentiles(collect_ms or [first_collect])}  (first collection {first_collect:.1f})")
+        print(f"{'view, on the Tk thread':<34}{percentiles(render_ms)}  {np.mean(changed[1:] or changed):.1f} per refresh"
+              f" (of {view.visible} visible rows)")
+        worst = max(render_ms[1:] or render_ms)
+        print(f"\nTk thread per refresh: {worst:.2f} ms at worst with the view, against a {FRAME_MS:.0f} ms frame budget")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Loopback test: adaptive video bitrate of the call app (video_send_loop and VideoRateController from 46.py).
+
+The sender runs video_send_loop on a synthetic 640x480 camera and publishes through its send queue, as start_call
+does. It sends over a loopback MediaConnection to handle_server_incoming_video, which returns receiver reports on the same
+connection. The link in between is a Python proxy playing the part of `tc tbf` + `netem`: a token bucket at the
+current link rate (changed on a schedule) with small socket buffers, followed by a fixed one-way delay. Reports
+travel back unthrottled.
+
+Every second it prints the link rate, the controller's target, the achieved and received bitrate, the current
+step of the quality ladder, the send queue depth and the reported queuing delay. At the end it prints a summary
+per phase: link utilisation and delay once the controller has had a few seconds to settle.
+
+With --delta the sender uses the tile encoding ("Vidéo delta") instead of a full JPEG per frame.
+
+Usage: python bench_video_adaptation.py [--phases 6000:15 1500:15 400:15 3000:15] [--delay-ms 20] [--delta]
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+LINK_BUFFER = 32 * 1024 # Socket buffers around the bottleneck (the "router queue")
+SETTLE_SECONDS = 4      # Samples ignored at the start of each phase in the summary
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ThrottledLink:
+    """One-way token bucket (rate changed on the fly) and delay line between two sockets; the reverse path is direct."""
+    def __init__(self, upstream, downstream, rate_kbps, delay_ms):
+        self.upstream = upstream
+        self.downstream = downstream
+        self.rate_kbps = rate_kbps
+        self.delay = delay_ms / 1000
+        self.line = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        for target in (self._throttle, self._deliver, self._reverse):
+            threading.Thread(target=target, daemon=True).start()
+
+    def _throttle(self):
+        next_free = time.perf_counter()
+        while self.running:
+            try:
+                data = self.upstream.recv(4096)
+            except OSError:
+                break
+            if not data:
+                break
+            now = time.perf_counter()
+            next_free = max(next_free, now) + len(data) * 8 / (self.rate_kbps * 1000)
+            time.sleep(max(0.0, next_free - now)) # The proxy stops reading: the sender's buffers fill up
+            with self.condition:
+                self.line.append((time.perf_counter() + self.delay, data))
+                self.condition.notify()
+
+    def _deliver(self):
+        while self.running:
+            with self.condition:
+                while not self.line and self.running:
+                    self.condition.wait(0.1)
+                if not self.line:
+                    continue
+                due, data = self.line[0]
+            time.sleep(max(0.0, due - time.perf_counter()))
+            with self.condition:
+                self.line.popleft()
+            try:
+                self.downstream.sendall(data)
+            except OSError:
+                break
+
+    def _reverse(self):
+        while self.running:
+            try:
+                data = self.downstream.recv(4096)
+                if not data:
+                    break
+                self.upstream.sendall(data)
+            except OSError:
+                break
+
+
+def synthetic_camera(app, count=50):
+    """Textured 640x480 scene with moving shapes: JPEG sizes close to a webcam's."""
+    rng = np.random.default_rng(0)
+    texture = cv2.GaussianBlur(rng.integers(0, 255, (app.FRAME_HEIGHT, app.FRAME_WIDTH, 3), dtype=np.uint8), (15, 15), 0)
+    frames = []
+    for i in range(count):
+        frame = texture.copy()
+        cv2.circle(frame, (100 + 8 * i, 240), 80, (40, 180, 220), -1)
+        cv2.rectangle(frame, (350, 60 + 5 * i), (520, 200 + 5 * i), (200, 60, 60), -1)
+        frames.append(frame)
+    state = {"i": 0}
+
+    def read_frame():
+        state["i"] += 1
+        return True, frames[state["i"] % count]
+    return read_frame
+
+
+def socket_pair(listener, buffer_size=None):
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if buffer_size:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, buffer_size)
+    client.connect(listener.getsockname())
+    server_side, _ = listener.accept()
+    if buffer_size:
+        server_side.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer_size)
+    return client, server_side
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phases", nargs="+", default=["6000:15", "1500:15", "400:15", "3000:15"],
+                        help="link rate in kbit/s and duration in seconds, e.g. 1500:10")
+    parser.add_argument("--delay-ms", type=float, default=20.0)
+    parser.add_argument("--delta", action="store_true", help="send changed tiles between full frames")
+    args = parser.parse_args()
+    phases = [(float(rate), float(seconds)) for rate, seconds in (p.split(":") for p in args.phases)]
+    app = load_call_app()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(2)
+    sender_sock, proxy_in = socket_pair(listener, LINK_BUFFER)
+    proxy_out, server_conn = socket_pair(listener, LINK_BUFFER)
+    link = ThrottledLink(proxy_in, proxy_out, phases[0][0], args.delay_ms)
+
+    # Receiving side, as in start_listen: the relay carries the reports back to the sender
+    app.video_receiving = True
+    app.video_relay = app.VideoRelay()
+    server_connection = app.MediaConnection(server_conn, "sender")
+    app.video_relay.add_subscriber(server_connection, "sender")
+    app.connected_clients = [server_connection]
+    threading.Thread(target=app.handle_server_incoming_video, args=(server_connection, "sender"), daemon=True).start()
+
+    # Sending side, as in start_call
+    sender_connection = app.MediaConnection(sender_sock, "receiver")
+    outgoing = app.VideoRelay()
+    outgoing.add_subscriber(sender_connection, "receiver")
+    controller = app.video_rate_controller = app.VideoRateController()
+    app.video_sending = True
+    threading.Thread(target=app.receive_video_stream_from_server, args=(sender_connection,), daemon=True).start()
+    threading.Thread(target=app.video_send_loop, args=(synthetic_camera(app), outgoing, controller, args.delta), daemon=True).start()
+
+    print(f"{'t':>4}{'link':>8}{'target':>8}{'achieved':>10}{'received':>10}  {'settings':<22}{'queue':>7}{'delay ms':>10}")
+    samples = []
+    t = 0
+    for phase, (rate, seconds) in enumerate(phases):
+        link.rate_kbps = rate
+        for second in range(int(seconds)):
+            time.sleep(1.0)
+            t += 1
+            s = controller.stats()
+            received = s["receive_kbps"] or 0.0
+            samples.append((phase, second, rate, s))
+            print(f"{t:>4}{rate:>8.0f}{s['target_kbps']:>8.0f}{s['achieved_kbps']:>10.0f}{received:>10.0f}  "
+                  f"{s['settings']:<22}{s['queue_depth']:>7.1f}{s['delay_ms']:>10.0f}")
+
+    app.video_sending = False
+    app.video_receiving = False
+    link.running = False
+    sender_connection.close()
+    server_connection.close()
+    for sock in (sender_sock, proxy_in, proxy_out, server_conn, listener):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    print(f"\nSummary (after {SETTLE_SECONDS} s of each phase):")
+    print(f"{'link kbit/s':>12}{'received':>10}{'utilisation':>13}{'mean delay':>12}{'max delay':>11}")
+    for phase, (rate, _) in enumerate(phases):
+        settled = [s for p, second, _, s in samples if p == phase and second >= SETTLE_SECONDS]
+        if not settled:
+            continue
+        received = np.mean([s["receive_kbps"] or 0.0 for s in settled])
+        delays = [s["delay_ms"] for s in settled]
+        print(f"{rate:>12.0f}{received:>10.0f}{received / rate * 100:>12.0f}%{np.mean(delays):>12.0f}{max(delays):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
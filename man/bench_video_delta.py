@@ -0,0 +1,147 @@
+"""
+Benchmark: bytes per frame of the "Vidéo delta" tile encoding of the call app (TileDeltaEncoder from 46.py)
+against the full-JPEG path.
+
+Each clip is encoded twice at the same JPEG quality: one cv2.imencode per frame, as video_send_loop does without
+delta, then TileDeltaEncoder (changed tiles only, full refresh every VIDEO_KEYFRAME_INTERVAL seconds of clip time).
+The tile stream is decoded back with TileDeltaDecoder, as a receiver would, so the PSNR column compares what each
+path actually displays against the source frames.
+
+Built-in clips (synthetic, 640x480 by default):
+  static  talking head: fixed textured background, a head that sways slightly, a moving mouth and sensor noise
+  moving  camera panning over a textured scene with moving shapes (the worst case for tiles)
+A recorded clip can be given with --clip (any file cv2.VideoCapture reads); it is resized to --width x --height.
+
+Usage: python bench_video_delta.py [--frames 150] [--fps 12] [--quality 60] [--width 640] [--height 480] [--clip video.mp4]
+"""
+import argparse
+import importlib.util
+import os
+import time
+
+import cv2
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def textured(rng, height, width):
+    return cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (21, 21), 0)
+
+
+def static_clip(width, height, count):
+    rng = np.random.default_rng(0)
+    background = textured(rng, height, width)
+    cv2.rectangle(background, (width // 10, height // 8), (width // 3, height // 2), (90, 140, 170), -1) # Shelf, window...
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        sway = int(round(4 * np.sin(i / 15)))
+        center = (width // 2 + sway, height // 2)
+        cv2.ellipse(frame, center, (width // 8, height // 4), 0, 0, 360, (140, 170, 215), -1)                   # Head
+        cv2.rectangle(frame, (center[0] - width // 5, height * 3 // 4), (center[0] + width // 5, height), (60, 60, 120), -1) # Shoulders
+        mouth = 2 + int(6 * abs(np.sin(i / 2)))
+        cv2.ellipse(frame, (center[0], center[1] + height // 10), (width // 30, mouth), 0, 0, 360, (40, 40, 110), -1)
+        noise = rng.normal(0, 2, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def moving_clip(width, height, count):
+    rng = np.random.default_rng(1)
+    scene = textured(rng, height, width * 3)
+    frames = []
+    for i in range(count):
+        x = (6 * i) % (2 * width)
+        frame = scene[:, x:x + width].copy()
+        cv2.circle(frame, ((40 + 9 * i) % width, height // 3), height // 8, (40, 180, 220), -1)
+        cv2.rectangle(frame, (width // 2, (5 * i) % height), (width // 2 + width // 5, (5 * i) % height + height // 4), (200, 60, 60), -1)
+        frames.append(frame)
+    return frames
+
+
+def recorded_clip(path, width, height, count):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+    capture.release()
+    return frames
+
+
+def full_jpeg(frames, quality):
+    sizes, psnr = [], []
+    start = time.perf_counter()
+    for frame in frames:
+        encoded = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])[1]
+        sizes.append(len(encoded))
+    elapsed = time.perf_counter() - start
+    for frame in frames: # Decoded outside the timed loop, like the receiver would
+        encoded = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])[1]
+        psnr.append(cv2.PSNR(frame, cv2.imdecode(encoded, cv2.IMREAD_COLOR)))
+    return {"bytes": np.mean(sizes), "encode_ms": elapsed / len(frames) * 1000, "psnr": np.mean(psnr)}
+
+
+def tile_delta(app, frames, quality, fps):
+    encoder = app.TileDeltaEncoder()
+    decoder = app.TileDeltaDecoder()
+    sizes, psnr, encode_time = [], [], 0.0
+    for seq, frame in enumerate(frames):
+        start = time.perf_counter()
+        kind, payload = encoder.encode(frame, quality, now=seq / fps) # Clip time, not wall time
+        encode_time += time.perf_counter() - start
+        sizes.append(len(payload))
+        shown = decoder.decode(kind, seq, bytes(payload))
+        psnr.append(cv2.PSNR(frame, shown))
+    tiles_per_delta = encoder.tiles_sent / encoder.deltas if encoder.deltas else 0.0
+    return {"bytes": np.mean(sizes), "encode_ms": encode_time / len(frames) * 1000, "psnr": np.mean(psnr),
+            "keyframes": encoder.keyframes, "tiles": tiles_per_delta}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--fps", type=float, default=12.0)
+    parser.add_argument("--quality", type=int, default=60)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--clip", help="recorded clip to use instead of the synthetic ones")
+    args = parser.parse_args()
+    app = load_call_app()
+
+    if args.clip:
+        clips = {os.path.basename(args.clip): recorded_clip(args.clip, args.width, args.height, args.frames)}
+    else:
+        clips = {"static": static_clip(args.width, args.height, args.frames),
+                 "moving": moving_clip(args.width, args.height, args.frames)}
+
+    tiles_per_frame = -(-args.width // app.TILE_SIZE) * -(-args.height // app.TILE_SIZE)
+    print(f"{args.width}x{args.height} at {args.fps:.0f} fps, JPEG quality {args.quality}, {app.TILE_SIZE}px tiles"
+          f" ({tiles_per_frame} per frame), full refresh every {app.VIDEO_KEYFRAME_INTERVAL:.0f} s")
+    print(f"{'clip':<10}{'path':<12}{'bytes/frame':>12}{'kbit/s':>9}{'ratio':>7}{'encode ms':>11}{'PSNR dB':>9}"
+          f"{'keyframes':>11}{'tiles/delta':>13}")
+    for name, frames in clips.items():
+        if not frames:
+            print(f"{name:<10}no frames read")
+            continue
+        full = full_jpeg(frames, args.quality)
+        delta = tile_delta(app, frames, args.quality, args.fps)
+        for path, r in (("full JPEG", full), ("tiles", delta)):
+            extra = f"{r['keyframes']:>11}{r['tiles']:>13.1f}" if "keyframes" in r else ""
+            print(f"{name:<10}{path:<12}{r['bytes']:>12.0f}{r['bytes'] * 8 * args.fps / 1000:>9.0f}"
+                  f"{r['bytes'] / full['bytes']:>7.2f}{r['encode_ms']:>11.2f}{r['psnr']:>9.1f}{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark: group video relay of the call server (VideoRelay from 46.py) against the previous inline relay.
+
+One publisher sends video packets (synthetic payloads of a 720p JPEG size, stamped with their send time)
+at a fixed rate to the server over loopback TCP; 20 subscribers are connected over loopback too, one of them
+artificially slow (small receive buffer, reads throttled to a fraction of the stream bitrate). The server side is
+handle_server_incoming_video with the VideoRelay (over MediaConnection, as in the app), or the previous loop that called sendall on every subscriber
+inline before reading the next frame. The benchmark reports the frame rate the publisher achieved, the frames and
+latency seen by the fast subscribers, what the slow one received and the CPU of the whole process (relay,
+publisher and subscriber readers together).
+
+Usage: python bench_video_relay.py [--seconds 5] [--subscribers 20] [--fps 30] [--frame-kb 60] [--slow-kbps 2000]
+"""
+import argparse
+import importlib.util
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+SLOW_RCVBUF = 32 * 1024
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def previous_relay(app, conn, subscribers, running):
+    """The relay loop as it was: quadratic reassembly, then a blocking sendall on each subscriber in turn."""
+    while running.is_set():
+        header = app.recv_exact(conn, app.VIDEO_PACKET_HEADER.size)
+        if not header:
+            break
+        frame_size = app.VIDEO_PACKET_HEADER.unpack(header)[0]
+        data = b''
+        while len(data) < frame_size:
+            packet = conn.recv(min(frame_size - len(data), app.BUFFER_SIZE))
+            if not packet:
+                return
+            data += packet
+        for client_sock in list(subscribers):
+            try:
+                client_sock.sendall(header + data)
+            except OSError:
+                subscribers.remove(client_sock)
+
+
+def connected_pair(listener, rcvbuf=None):
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if rcvbuf:
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    client.connect(listener.getsockname())
+    server_side, _ = listener.accept()
+    if rcvbuf:
+        server_side.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, rcvbuf)
+    return server_side, client
+
+
+def raw_subscriber(app, sock):
+    """Reads the bare video packets the previous relay forwarded: (packet, length), or None at the end."""
+    while True:
+        try:
+            header = app.recv_exact(sock, app.VIDEO_PACKET_HEADER.size)
+            if not header:
+                return
+            data = app.recv_exact(sock, app.VIDEO_PACKET_HEADER.unpack(header)[0])
+        except OSError:
+            return
+        if data is None:
+            return
+        yield header + data
+
+
+def media_subscriber(app, sock):
+    """
+    Reassembles the video packets of the multiplexed connection straight from the socket (what MediaConnection's
+    reader does), so that a slow reader really leaves the data in the kernel buffers.
+    """
+    packet = bytearray()
+    while True:
+        try:
+            kind, payload = app.recv_media_frame(sock)
+        except OSError:
+            return
+        if kind is None:
+            return
+        if kind in (app.MEDIA_VIDEO, app.MEDIA_VIDEO_PART):
+            packet += payload
+            if kind == app.MEDIA_VIDEO:
+                yield packet
+                packet = bytearray()
+
+
+def subscriber_reader(app, packets, result, slow_bytes_per_s=None):
+    start = time.perf_counter()
+    received_bytes = 0
+    for packet in packets:
+        now = time.perf_counter()
+        sent_at = app.VIDEO_PACKET_HEADER.unpack_from(packet)[4]
+        result["latencies"].append(time.time() - sent_at)
+        result["frames"] += 1
+        received_bytes += len(packet)
+        if slow_bytes_per_s: # Slow client: never reads faster than its bitrate
+            time.sleep(max(0.0, start + received_bytes / slow_bytes_per_s - now))
+
+
+def run_scenario(app, mode, args):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(args.subscribers + 1)
+    running = threading.Event()
+    running.set()
+
+    publisher_server_side, publisher = connected_pair(listener)
+    subscribers = []
+    results = []
+    for i in range(args.subscribers):
+        slow = i == args.subscribers - 1
+        server_side, client = connected_pair(listener, SLOW_RCVBUF if slow else None)
+        subscribers.append((server_side, client, slow))
+        results.append({"frames": 0, "latencies": [], "slow": slow})
+
+    if mode == "VideoRelay":
+        # As in start_listen: one MediaConnection per client, the publisher's video goes through the relay
+        app.video_receiving = True
+        app.video_relay = app.VideoRelay()
+        publisher_connection = app.MediaConnection(publisher_server_side, "publisher")
+        app.connected_clients = [publisher_connection]
+        for server_side, _, _ in subscribers:
+            connection = app.MediaConnection(server_side, server_side.getpeername())
+            app.connected_clients.append(connection)
+            app.video_relay.add_subscriber(connection, server_side.getpeername())
+        relay_thread = threading.Thread(target=app.handle_server_incoming_video, args=(publisher_connection, "publisher"), daemon=True)
+        publish = app.MediaConnection(publisher, "server").send_video
+        read = media_subscriber
+    else:
+        relay_thread = threading.Thread(target=previous_relay, args=(app, publisher_server_side, [s for s, _, _ in subscribers], running), daemon=True)
+        publish = publisher.sendall
+        read = raw_subscriber
+
+    readers = [threading.Thread(target=subscriber_reader, daemon=True,
+                                args=(app, read(app, client), result, args.slow_kbps * 1000 / 8 if slow else None))
+               for (_, client, slow), result in zip(subscribers, results)]
+    for thread in readers:
+        thread.start()
+
+    cpu_start = time.process_time()
+    relay_thread.start()
+    payload = np.random.default_rng(0).integers(0, 256, args.frame_kb * 1000, dtype=np.uint8)
+    sent = 0
+    start = time.perf_counter()
+    next_frame = start
+    while time.perf_counter() - start < args.seconds:
+        packet = app.pack_video_packet(app.VIDEO_PACKET_FRAME, sent, time.time(), payload)
+        publish(packet) # Blocks when the relay stops reading
+        sent += 1
+        next_frame += 1 / args.fps
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5) # Let the fast subscribers drain their queues
+    cpu = time.process_time() - cpu_start
+
+    running.clear()
+    app.video_receiving = False
+    relay_stats = app.video_relay.stats() if mode == "VideoRelay" else None
+    if mode == "VideoRelay":
+        app.video_relay.stop()
+        app.video_relay = None
+        for connection in app.connected_clients:
+            connection.close()
+    for sock in [publisher, publisher_server_side] + [s for pair in subscribers for s in pair[:2]]:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+    listener.close()
+
+    fast = [r for r in results if not r["slow"]]
+    slow = [r for r in results if r["slow"]][0]
+    latencies = np.array([lat for r in fast for lat in r["latencies"]]) * 1000
+    return {
+        "publisher_fps": sent / elapsed,
+        "fast_fps": np.mean([r["frames"] for r in fast]) / elapsed,
+        "p50": np.percentile(latencies, 50) if len(latencies) else float("nan"),
+        "p95": np.percentile(latencies, 95) if len(latencies) else float("nan"),
+        "slow_fps": slow["frames"] / elapsed,
+        "cpu_percent": cpu / elapsed * 100,
+        "dropped": relay_stats["dropped"] if relay_stats else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--subscribers", type=int, default=20)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--frame-kb", type=int, default=60)
+    parser.add_argument("--slow-kbps", type=float, default=2000.0)
+    args = parser.parse_args()
+    app = load_call_app()
+    app.remote_view = None # No display: only the relay is measured
+
+    stream_kbps = args.fps * args.frame_kb * 8
+    print(f"1 publisher at {args.fps:.0f} fps x {args.frame_kb} kB ({stream_kbps:.0f} kbit/s), {args.subscribers} subscribers,"
+          f" one limited to {args.slow_kbps:.0f} kbit/s")
+    print(f"{'relay':<16}{'publisher fps':>14}{'fast fps':>10}{'p50 ms':>9}{'p95 ms':>9}{'slow fps':>10}{'dropped':>9}{'CPU %':>8}")
+    for mode in ("previous", "VideoRelay"):
+        r = run_scenario(app, mode, args)
+        print(f"{mode:<16}{r['publisher_fps']:>14.1f}{r['fast_fps']:>10.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}"
+              f"{r['slow_fps']:>10.1f}{r['dropped']:>9}{r['cpu_percent']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
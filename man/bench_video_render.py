@@ -0,0 +1,152 @@
+"""
+Benchmark: video display path of the call apps (VideoView from 46.py) against the previous per-frame PPM path.
+
+A synthetic 720p scene (moving gradient and shapes) is JPEG-encoded like a received stream. The previous path,
+run once per frame in the network thread, is imdecode, cvtColor, header + tobytes() and a new tk.PhotoImage. The
+new path feeds a VideoView at a fixed rate (30 fps by default) from a producer thread while the main thread plays
+the Tk loop, rendering at most one frame per RENDER_INTERVAL_MS; it reports the rendered fps, decode and render
+times and the frames skipped instead of queued.
+
+Without a display, Tk cannot create images: rendering then goes to a stand-in PhotoImage that only records the put
+calls, so the render column measures nothing and only the decode side and the frame pacing are meaningful.
+
+Usage: python bench_video_render.py [--seconds 5] [--fps 30] [--width 1280] [--height 720] [--quality 50]
+"""
+import argparse
+import importlib.util
+import os
+import threading
+import time
+import tkinter as tk
+
+import cv2
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "46.py")
+
+
+def load_call_app():
+    """Imports 46.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("call_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StandInPhotoImage:
+    """Records put calls when no display is available (tk.PhotoImage needs one)."""
+    def __init__(self, width, height):
+        self.name = "stand_in"
+        self.tk = self
+        self.puts = 0
+
+    def call(self, *args):
+        self.puts += 1
+
+    def put(self, data, to=None):
+        pass
+
+
+class StandInLabel:
+    def configure(self, **kwargs):
+        pass
+
+
+def synthetic_jpegs(width, height, count, quality):
+    y, x = np.mgrid[0:height, 0:width]
+    frames = []
+    for i in range(count):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + 4 * i) % 256
+        frame[..., 1] = (y + 2 * i) % 256
+        frame[..., 2] = ((x + y) // 4 + 8 * i) % 256
+        cv2.circle(frame, (width // 4 + 10 * i, height // 2), height // 6, (30, 200, 240), -1)
+        cv2.rectangle(frame, (width // 2, height // 4 + 5 * i), (width // 2 + 200, height // 4 + 150 + 5 * i), (240, 40, 40), -1)
+        frames.append(cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])[1].tobytes())
+    return frames
+
+
+def previous_path(jpegs, width, height, root, repeat):
+    """imdecode + convert_opencv_to_ppm + tk.PhotoImage(data=...) per frame, as before."""
+    times = {"decode": 0.0, "ppm": 0.0, "photo": 0.0}
+    for i in range(repeat):
+        start = time.perf_counter()
+        frame = cv2.imdecode(np.frombuffer(jpegs[i % len(jpegs)], dtype=np.uint8), cv2.IMREAD_COLOR)
+        decoded = time.perf_counter()
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        ppm_data = f"P6\n{frame_rgb.shape[1]} {frame_rgb.shape[0]}\n255\n".encode('ascii') + frame_rgb.tobytes()
+        converted = time.perf_counter()
+        if root is not None:
+            tk.PhotoImage(master=root, data=ppm_data, format='ppm', width=width, height=height)
+        done = time.perf_counter()
+        times["decode"] += decoded - start
+        times["ppm"] += converted - decoded
+        times["photo"] += done - converted
+    return {name: total / repeat * 1000 for name, total in times.items()}
+
+
+def run_view(app, jpegs, width, height, root, fps, seconds):
+    label = tk.Label(root) if root is not None else StandInLabel()
+    view = app.VideoView(label, width, height)
+    stop = threading.Event()
+
+    def producer():
+        next_frame = time.perf_counter()
+        i = 0
+        while not stop.is_set():
+            view.submit_packet(app.VIDEO_PACKET_FRAME, 0, i, jpegs[i % len(jpegs)])
+            i += 1
+            next_frame += 1 / fps
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+
+    thread = threading.Thread(target=producer, daemon=True)
+    start = time.perf_counter()
+    thread.start()
+    while time.perf_counter() - start < seconds: # Plays the part of root.after(RENDER_INTERVAL_MS, render_video_views)
+        view.render()
+        if root is not None:
+            root.update()
+        time.sleep(app.RENDER_INTERVAL_MS / 1000)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    view.close()
+    stats = view.stats()
+    stats["avg_fps"] = stats["rendered"] / elapsed
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--quality", type=int, default=50)
+    args = parser.parse_args()
+    app = load_call_app()
+
+    try:
+        root = tk.Tk()
+        root.withdraw()
+    except tk.TclError:
+        root = None
+        app.tk.PhotoImage = StandInPhotoImage
+        print("No display: Tk rendering replaced by a stand-in, render times are not measured.")
+
+    jpegs = synthetic_jpegs(args.width, args.height, 30, args.quality)
+    print(f"{args.width}x{args.height}, JPEG quality {args.quality}, {np.mean([len(j) for j in jpegs]) / 1000:.0f} kB/frame")
+
+    old = previous_path(jpegs, args.width, args.height, root, repeat=60)
+    total = sum(old.values())
+    print(f"previous path, per frame in the network thread: decode {old['decode']:.2f} ms + PPM string {old['ppm']:.2f} ms"
+          f" + new PhotoImage {old['photo']:.2f} ms = {total:.2f} ms (max {1000 / total:.0f} fps)")
+
+    r = run_view(app, jpegs, args.width, args.height, root, args.fps, args.seconds)
+    print(f"VideoView at {args.fps:.0f} fps offered: rendered {r['avg_fps']:.1f} fps, decode+convert {r['decode_ms']:.2f} ms"
+          f" (decode thread), render {r['render_ms']:.2f} ms (Tk thread), received {r['received']},"
+          f" rendered {r['rendered']}, skipped {r['skipped']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,30 +6,155 @@ from datetime import datetime
 import tkinter.messagebox as mbox
 import re
 import datetime
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from decimal import Decimal, ROUND_HALF_UP
 
+# Montants stockés en centimes (entiers) : 1 XAF = 100 unités
+MINOR_UNITS = 100
+DB_BUSY_TIMEOUT = 30 # Secondes d'attente quand un autre poste écrit dans la base
+WRITER_MAX_BATCH = 256 # Opérations regroupées dans un seul commit par le thread d'écriture
+HISTORY_PAGE_SIZE = 200 # Transactions affichées par page dans l'historique
+MOIS = ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+
+def to_minor(montant):
+    return int((Decimal(str(montant)) * MINOR_UNITS).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+def from_minor(centimes):
+    return (Decimal(centimes or 0) / MINOR_UNITS).quantize(Decimal('0.01'))
+def fee_minor(montant, taux):
+    # Frais en centimes pour un montant en centimes et un taux en pourcentage
+    return int((Decimal(montant) * Decimal(str(taux)) / 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+def format_date(epoch):
+    return datetime.datetime.fromtimestamp(epoch).strftime('%Y-%m-%d %H:%M:%S')
+def day_of(epoch):
+    return datetime.datetime.fromtimestamp(epoch).strftime('%Y-%m-%d')
+def date_range(year, month=None, day=None, hour=None, minute=None, second=None):
+    """
+    Intervalle [début, fin[ en secondes epoch (heure locale) couvrant la période sélectionnée.
+    Seuls les champs renseignés à la suite depuis l'année comptent (ex. année + mois, sans jour = le mois entier).
+    Lève ValueError pour une date impossible (31 février...).
+    """
+    fields = [year, month, day, hour, minute, second]
+    depth = 0
+    while depth < len(fields) and fields[depth] is not None:
+        depth += 1
+    if depth == 0:
+        return None
+    values = [int(v) for v in fields[:depth]] + [1, 1, 0, 0, 0][depth - 1:]
+    start = datetime.datetime(*values)
+    if depth == 1:
+        end = start.replace(year=start.year + 1)
+    elif depth == 2:
+        end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    else:
+        end = start + [datetime.timedelta(days=1), datetime.timedelta(hours=1), datetime.timedelta(minutes=1), datetime.timedelta(seconds=1)][depth - 3]
+    return int(start.timestamp()), int(end.timestamp())
+def connect_db(db_path):
+    conn = sqlite3.connect(db_path, timeout=DB_BUSY_TIMEOUT)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=FULL')
+    return conn
+
+class MicrofinWriter:
+    """
+    Thread d'écriture des opérations financières.
+    Les opérations en attente sont exécutées ensemble dans une seule transaction BEGIN IMMEDIATE
+    (un seul commit), chacune dans son propre SAVEPOINT pour qu'un échec n'annule pas les autres.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True, name='MicrofinWriter')
+        self.thread.start()
+    def submit(self, operation):
+        # operation(conn) -> résultat ; renvoie un Future
+        future = Future()
+        self.queue.put((operation, future))
+        return future
+    def execute(self, operation):
+        return self.submit(operation).result()
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+    def run(self):
+        conn = connect_db(self.db_path)
+        conn.isolation_level = None # Transactions gérées explicitement
+        running = True
+        while running:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < WRITER_MAX_BATCH:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self.run_batch(conn, batch)
+        conn.close()
+    def run_batch(self, conn, batch):
+        results = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, future in batch:
+                conn.execute('SAVEPOINT operation')
+                try:
+                    results.append((future, operation(conn), None))
+                    conn.execute('RELEASE operation')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO operation')
+                    conn.execute('RELEASE operation')
+                    results.append((future, None, e))
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for operation, future in batch:
+                future.set_exception(e)
+            return
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
 class MicrofinDB:
     def __init__(self, db_name='microfin.db'):
-        import os
-        db_path = os.path.join(os.path.dirname(__file__), db_name)
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = os.path.join(os.path.dirname(__file__), db_name)
+        self.conn = connect_db(self.db_path)
         self.c = self.conn.cursor()
         self.create_tables()
         self.ensure_solde_column()
         self.create_connexion_table()
+        self.ensure_frais_column()
+        self.migrate_to_minor_units()
+        self.migrate_dates_to_epoch()
+        self.create_indexes()
+        self.create_summary_table()
+        self.create_client_search()
+        self.writer = MicrofinWriter(self.db_path)
     def create_tables(self):
         self.c.execute('''CREATE TABLE IF NOT EXISTS clients (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nom TEXT NOT NULL,
             prenom TEXT NOT NULL,
-            telephone TEXT UNIQUE NOT NULL
+            telephone TEXT UNIQUE NOT NULL,
+            solde INTEGER NOT NULL DEFAULT 0
         )''')
         self.c.execute('''CREATE TABLE IF NOT EXISTS transactions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             client_id INTEGER,
-            montant REAL,
+            montant INTEGER,
             type TEXT,
-            date TEXT,
+            date INTEGER,
+            frais INTEGER DEFAULT 0,
             FOREIGN KEY(client_id) REFERENCES clients(id)
         )''')
         self.c.execute('''CREATE TABLE IF NOT EXISTS parametres (
@@ -56,6 +181,135 @@ class MicrofinDB:
         if 'solde' not in columns:
             self.c.execute('ALTER TABLE clients ADD COLUMN solde REAL DEFAULT 0')
             self.conn.commit()
+    def ensure_frais_column(self):
+        # Frais réellement prélevés, enregistrés au moment de la transaction
+        self.c.execute("PRAGMA table_info(transactions)")
+        columns = [col[1] for col in self.c.fetchall()]
+        if 'frais' not in columns:
+            self.c.execute('ALTER TABLE transactions ADD COLUMN frais REAL DEFAULT 0')
+            # Anciennes transactions : mêmes frais que ceux affichés jusqu'ici (recalculés avec les taux actuels)
+            trans_fee, retrait_fee, versement_fee = self.get_fees()
+            fees_by_type = {'Transfert sortant': trans_fee, 'Retirer': retrait_fee, 'Ajouter': versement_fee, 'Versement': versement_fee}
+            for type_, fee in fees_by_type.items():
+                self.c.execute('UPDATE transactions SET frais = ROUND(montant * ? / (100 + ?), 2) WHERE type = ?', (fee, fee, type_))
+            self.conn.commit()
+    def migrate_to_minor_units(self):
+        # Anciennes bases : montants en REAL (XAF) convertis une seule fois en centimes INTEGER
+        self.c.execute("PRAGMA table_info(clients)")
+        if {col[1]: col[2] for col in self.c.fetchall()}.get('solde') == 'INTEGER':
+            return
+        self.conn.commit()
+        self.c.executescript('''BEGIN IMMEDIATE;
+            CREATE TABLE clients_centimes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nom TEXT NOT NULL,
+                prenom TEXT NOT NULL,
+                telephone TEXT UNIQUE NOT NULL,
+                solde INTEGER NOT NULL DEFAULT 0
+            );
+            INSERT INTO clients_centimes (id, nom, prenom, telephone, solde)
+                SELECT id, nom, prenom, telephone, CAST(ROUND(COALESCE(solde, 0) * 100) AS INTEGER) FROM clients;
+            DROP TABLE clients;
+            ALTER TABLE clients_centimes RENAME TO clients;
+            CREATE TABLE transactions_centimes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER,
+                montant INTEGER,
+                type TEXT,
+                date TEXT,
+                frais INTEGER DEFAULT 0,
+                FOREIGN KEY(client_id) REFERENCES clients(id)
+            );
+            INSERT INTO transactions_centimes (id, client_id, montant, type, date, frais)
+                SELECT id, client_id, CAST(ROUND(montant * 100) AS INTEGER), type, date, CAST(ROUND(COALESCE(frais, 0) * 100) AS INTEGER) FROM transactions;
+            DROP TABLE transactions;
+            ALTER TABLE transactions_centimes RENAME TO transactions;
+            DROP TABLE IF EXISTS transactions_resume;
+            COMMIT;''')
+    def migrate_dates_to_epoch(self):
+        # Dates texte 'AAAA-MM-JJ HH:MM:SS' (heure locale) converties en secondes epoch triables
+        self.c.execute("PRAGMA table_info(transactions)")
+        if {col[1]: col[2] for col in self.c.fetchall()}.get('date') == 'INTEGER':
+            return
+        self.conn.commit()
+        self.c.executescript('''BEGIN IMMEDIATE;
+            CREATE TABLE transactions_epoch (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id INTEGER,
+                montant INTEGER,
+                type TEXT,
+                date INTEGER,
+                frais INTEGER DEFAULT 0,
+                FOREIGN KEY(client_id) REFERENCES clients(id)
+            );
+            INSERT INTO transactions_epoch (id, client_id, montant, type, date, frais)
+                SELECT id, client_id, montant, type, CAST(strftime('%s', date, 'utc') AS INTEGER), frais FROM transactions;
+            DROP TABLE transactions;
+            ALTER TABLE transactions_epoch RENAME TO transactions;
+            COMMIT;''')
+    def create_indexes(self):
+        self.c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)')
+        self.c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_client_date ON transactions(client_id, date)')
+        self.c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions(type, date)')
+        self.conn.commit()
+    def create_client_search(self):
+        # Index plein texte (trigrammes) sur nom, prénom et téléphone, synchronisé par triggers
+        try:
+            self.c.execute("CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(nom, prenom, telephone, content='clients', content_rowid='id', tokenize='trigram')")
+        except sqlite3.OperationalError:
+            self.fts_enabled = False # SQLite sans FTS5 / trigram : recherche par LIKE
+            return
+        self.fts_enabled = True
+        self.c.executescript('''
+            CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+                INSERT INTO clients_fts (rowid, nom, prenom, telephone) VALUES (new.id, new.nom, new.prenom, new.telephone);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+                INSERT INTO clients_fts (clients_fts, rowid, nom, prenom, telephone) VALUES ('delete', old.id, old.nom, old.prenom, old.telephone);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF nom, prenom, telephone ON clients BEGIN
+                INSERT INTO clients_fts (clients_fts, rowid, nom, prenom, telephone) VALUES ('delete', old.id, old.nom, old.prenom, old.telephone);
+                INSERT INTO clients_fts (rowid, nom, prenom, telephone) VALUES (new.id, new.nom, new.prenom, new.telephone);
+            END;
+        ''')
+        self.c.execute("SELECT COUNT(*) FROM clients_fts_docsize")
+        if self.c.fetchone()[0] == 0:
+            self.c.execute("INSERT INTO clients_fts (clients_fts) VALUES ('rebuild')")
+        self.conn.commit()
+    def create_summary_table(self):
+        # Totaux par jour et par type, tenus à jour à chaque transaction (jour '*' = depuis le début)
+        self.c.execute('''CREATE TABLE IF NOT EXISTS transactions_resume (
+            jour TEXT NOT NULL,
+            type TEXT NOT NULL,
+            nombre INTEGER NOT NULL DEFAULT 0,
+            total_montant INTEGER NOT NULL DEFAULT 0,
+            total_frais INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (jour, type)
+        )''')
+        self.c.execute('SELECT COUNT(*) FROM transactions_resume')
+        if self.c.fetchone()[0] == 0:
+            self.rebuild_summary()
+        self.conn.commit()
+    def rebuild_summary(self):
+        self.c.execute('DELETE FROM transactions_resume')
+        self.c.execute('''INSERT INTO transactions_resume (jour, type, nombre, total_montant, total_frais)
+            SELECT date(date, 'unixepoch', 'localtime'), type, COUNT(*), SUM(montant), SUM(frais) FROM transactions GROUP BY 1, 2''')
+        self.c.execute('''INSERT INTO transactions_resume (jour, type, nombre, total_montant, total_frais)
+            SELECT '*', type, COUNT(*), SUM(montant), SUM(frais) FROM transactions GROUP BY type''')
+        self.conn.commit()
+    def add_ledger_row(self, conn, client_id, montant, type_, date, frais):
+        # Ligne du journal + totaux du résumé, dans la transaction ouverte par le thread d'écriture
+        conn.execute('INSERT INTO transactions (client_id, montant, type, date, frais) VALUES (?, ?, ?, ?, ?)', (client_id, montant, type_, date, frais))
+        for jour in (day_of(date), '*'):
+            conn.execute('''INSERT INTO transactions_resume (jour, type, nombre, total_montant, total_frais) VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT(jour, type) DO UPDATE SET nombre = nombre + 1, total_montant = total_montant + excluded.total_montant, total_frais = total_frais + excluded.total_frais''',
+                (jour, type_, montant, frais))
+    def get_total_fees(self):
+        self.c.execute("SELECT COALESCE(SUM(total_frais), 0) FROM transactions_resume WHERE jour='*'")
+        return self.c.fetchone()[0]
+    def get_day_summary(self, jour):
+        self.c.execute('SELECT type, nombre, total_montant, total_frais FROM transactions_resume WHERE jour=? ORDER BY type', (jour,))
+        return self.c.fetchall()
     def add_client(self, nom, prenom, telephone):
         try:
             self.c.execute('INSERT INTO clients (nom, prenom, telephone, solde) VALUES (?, ?, ?, ?)', (nom, prenom, telephone, 0))
@@ -70,7 +324,11 @@ class MicrofinDB:
         self.c.execute('DELETE FROM clients WHERE id=?', (id,))
         self.conn.commit()
     def get_clients(self, search=None):
-        if search:
+        if search and self.fts_enabled and len(search) >= 3:
+            # Le tokenizer trigram trouve les sous-chaînes d'au moins 3 caractères, comme LIKE '%...%'
+            terme = '"' + search.replace('"', '""') + '"'
+            self.c.execute('SELECT c.id, c.nom, c.prenom, c.telephone, c.solde FROM clients_fts f JOIN clients c ON c.id = f.rowid WHERE clients_fts MATCH ? ORDER BY c.nom', ('{nom telephone}: ' + terme,))
+        elif search:
             self.c.execute('SELECT id, nom, prenom, telephone, solde FROM clients WHERE nom LIKE ? OR telephone LIKE ?', (f'%{search}%', f'%{search}%'))
         else:
             self.c.execute('SELECT id, nom, prenom, telephone, solde FROM clients ORDER BY nom')
@@ -79,40 +337,71 @@ class MicrofinDB:
         self.c.execute('SELECT id, nom, prenom, telephone, solde FROM clients WHERE id=?', (id,))
         return self.c.fetchone()
     def add_transaction(self, client_id, montant, type_):
-        client = self.get_client(client_id)
-        if not client:
-            return False, 'Client introuvable !'
-        solde = Decimal(str(client[4]))
-        trans_fee, retrait_fee, versement_fee = self.get_fees()
-        trans_fee = Decimal(str(trans_fee))
-        retrait_fee = Decimal(str(retrait_fee))
-        versement_fee = Decimal(str(versement_fee))
-        montant = Decimal(str(montant))
-        frais = Decimal('0')
-        montant_net = montant
-        if type_ == 'Ajouter':
-            frais = (montant * versement_fee / Decimal('100')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            montant_net = (montant - frais).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            nouveau_solde = solde + montant_net
-        elif type_ == 'Retirer':
-            frais = (montant * retrait_fee / Decimal('100')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            montant_net = (montant - frais).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            if montant > solde:
-                return False, 'Solde insuffisant !'
-            nouveau_solde = solde - montant
-        else:
+        if type_ not in ('Ajouter', 'Retirer'):
             return False, 'Type de transaction invalide !'
-        now = datetime.datetime.now()
-        date = now.strftime('%Y-%m-%d %H:%M:%S')
-        self.c.execute('UPDATE clients SET solde=? WHERE id=?', (float(nouveau_solde), client_id))
-        self.c.execute('INSERT INTO transactions (client_id, montant, type, date) VALUES (?, ?, ?, ?)', (client_id, float(montant_net), type_, date))
-        self.conn.commit()
-        return True, f'Transaction enregistrée ({date}) ! Frais déduits : {frais} XAF'
-    def get_transactions(self, client_id=None):
+        montant = to_minor(montant)
+        def operation(conn):
+            if not conn.execute('SELECT 1 FROM clients WHERE id=?', (client_id,)).fetchone():
+                return False, 'Client introuvable !'
+            trans_fee, retrait_fee, versement_fee = conn.execute('SELECT transfert, retrait, versement FROM parametres WHERE id=1').fetchone()
+            date = int(time.time())
+            if type_ == 'Ajouter':
+                frais = fee_minor(montant, versement_fee)
+                conn.execute('UPDATE clients SET solde = solde + ? WHERE id=?', (montant - frais, client_id))
+            else:
+                frais = fee_minor(montant, retrait_fee)
+                # Débit conditionnel : le contrôle du solde et la mise à jour sont une seule instruction
+                if conn.execute('UPDATE clients SET solde = solde - ? WHERE id=? AND solde >= ?', (montant, client_id, montant)).rowcount == 0:
+                    return False, 'Solde insuffisant !'
+            self.add_ledger_row(conn, client_id, montant - frais, type_, date, frais)
+            return True, f'Transaction enregistrée ({format_date(date)}) ! Frais déduits : {from_minor(frais)} XAF'
+        return self.writer.execute(operation)
+    def transfer(self, emetteur_id, beneficiaire_id, montant):
+        """
+        Transfert atomique : débit de l'émetteur (montant + frais), crédit du bénéficiaire et les deux lignes
+        du journal sont écrits dans la même transaction, ou rien n'est écrit.
+        """
+        if str(emetteur_id) == str(beneficiaire_id):
+            return False, 'Impossible de transférer à soi-même !'
+        montant = to_minor(montant)
+        def operation(conn):
+            if conn.execute('SELECT COUNT(*) FROM clients WHERE id IN (?, ?)', (emetteur_id, beneficiaire_id)).fetchone()[0] != 2:
+                return False, 'Client ou bénéficiaire introuvable !'
+            trans_fee = conn.execute('SELECT transfert FROM parametres WHERE id=1').fetchone()[0]
+            frais = fee_minor(montant, trans_fee)
+            montant_total = montant + frais
+            if conn.execute('UPDATE clients SET solde = solde - ? WHERE id=? AND solde >= ?', (montant_total, emetteur_id, montant_total)).rowcount == 0:
+                return False, 'Solde insuffisant pour le transfert !'
+            conn.execute('UPDATE clients SET solde = solde + ? WHERE id=?', (montant, beneficiaire_id))
+            date = int(time.time())
+            self.add_ledger_row(conn, emetteur_id, montant_total, 'Transfert sortant', date, frais)
+            self.add_ledger_row(conn, beneficiaire_id, montant, 'Transfert entrant', date, 0)
+            return True, f'Transfert de {from_minor(montant)} XAF effectué ! (frais {from_minor(frais)} XAF)'
+        return self.writer.execute(operation)
+    def get_transactions(self, client_id=None, avant=None, limit=HISTORY_PAGE_SIZE):
+        return self.get_history_page(client_id=client_id, avant=avant, limit=limit)
+    def get_history_page(self, client_id=None, type_=None, periode=None, avant=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Une page de l'historique, de la plus récente à la plus ancienne.
+        periode : (début, fin) en epoch, intervalle semi-ouvert. avant : (date, id) de la dernière ligne de la page précédente.
+        """
+        query = "SELECT t.id, c.nom, c.prenom, t.montant, t.type, t.date, t.frais FROM transactions t JOIN clients c ON t.client_id = c.id WHERE 1=1"
+        params = []
         if client_id:
-            self.c.execute('SELECT t.id, c.nom, c.prenom, t.montant, t.type, t.date FROM transactions t JOIN clients c ON t.client_id = c.id WHERE c.id=? ORDER BY t.date DESC', (client_id,))
-        else:
-            self.c.execute('SELECT t.id, c.nom, c.prenom, t.montant, t.type, t.date FROM transactions t JOIN clients c ON t.client_id = c.id ORDER BY t.date DESC')
+            query += " AND t.client_id=?"
+            params.append(client_id)
+        if type_:
+            query += " AND t.type=?"
+            params.append(type_)
+        if periode:
+            query += " AND t.date >= ? AND t.date < ?"
+            params.extend(periode)
+        if avant:
+            query += " AND (t.date < ? OR (t.date = ? AND t.id < ?))"
+            params.extend((avant[0], avant[0], avant[1]))
+        query += " ORDER BY t.date DESC, t.id DESC LIMIT ?"
+        params.append(limit)
+        self.c.execute(query, tuple(params))
         return self.c.fetchall()
     def save_connexion(self):
         from datetime import datetime
@@ -133,6 +422,9 @@ class MicrofinDB:
     def set_fees(self, transfert, retrait, versement):
         self.c.execute('UPDATE parametres SET transfert=?, retrait=?, versement=? WHERE id=1', (transfert, retrait, versement))
         self.conn.commit()
+    def close(self):
+        self.writer.close()
+        self.conn.close()
 
 class MicrofinApp(ctk.CTk):
     def __init__(self):
@@ -251,10 +543,21 @@ class MicrofinApp(ctk.CTk):
         self.trans_status.pack(pady=5)
         self.trans_list = ctk.CTkTextbox(self.trans_frame, width=650, height=200, fg_color="#263826", text_color="#c8e6c9")
         self.trans_list.pack(fill='both', expand=True, pady=10)
+        # Navigation par pages : chaque page commence après la dernière ligne (date, id) de la précédente
+        self.trans_nav_frame = ctk.CTkFrame(self.trans_frame, fg_color="transparent")
+        self.trans_newer_btn = ctk.CTkButton(self.trans_nav_frame, text='< Plus récentes', width=140, fg_color="#388e3c", hover_color="#2e7d32", text_color="white", state='disabled', command=self.show_newer_transactions)
+        self.trans_newer_btn.pack(side='left')
+        self.trans_older_btn = ctk.CTkButton(self.trans_nav_frame, text='Plus anciennes >', width=140, fg_color="#388e3c", hover_color="#2e7d32", text_color="white", state='disabled', command=self.show_older_transactions)
+        self.trans_older_btn.pack(side='right')
+        self.trans_page_label = ctk.CTkLabel(self.trans_nav_frame, text='')
+        self.trans_page_label.pack(side='left', expand=True)
+        self.trans_nav_frame.pack(side='bottom', fill='x', pady=2, before=self.trans_list)
+        self.trans_pages = [None] # Curseur de début de chaque page déjà parcourue ; la dernière est la page affichée
+        self.trans_next_cursor = None # Curseur de la page suivante, None si la page affichée est la dernière
         # Onglet Historique
         # Listes préétablies pour jour, mois (lettres), année
         years = ['None'] + [str(y) for y in range(2025, 2036)]
-        months = ['None'] + ['Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+        months = ['None'] + MOIS
         days = ['None'] + [f'{d:02d}' for d in range(1, 32)]
         hours = ['None'] + [f'{h:02d}' for h in range(0, 24)]
         minutes = ['None'] + [f'{m:02d}' for m in range(0, 60)]
@@ -306,6 +609,9 @@ class MicrofinApp(ctk.CTk):
         self.filter_btn.pack(fill='x', pady=2)
         self.history_list = ctk.CTkTextbox(self.history_frame, width=650, height=250, fg_color="#263826", text_color="#c8e6c9")
         self.history_list.pack(fill='both', expand=True, pady=10)
+        self.history_more_btn = ctk.CTkButton(self.history_frame, text='Afficher plus', fg_color="#388e3c", hover_color="#2e7d32", text_color="white", command=self.load_more_history)
+        self.history_filters = None
+        self.history_cursor = None
         # Onglet Etat Système
         self.state_tab = self.tabview.add('Etat Système')
         self.state_frame = ctk.CTkFrame(self.state_tab, fg_color="#223322")
@@ -377,27 +683,20 @@ class MicrofinApp(ctk.CTk):
         self.fees_total_label.pack(pady=10)
         self.fees_total_value = ctk.CTkLabel(self.admin_frame, text='', font=("Arial", 20), text_color="#d32f2f")
         self.fees_total_value.pack(pady=10)
+        self.fees_today_label = ctk.CTkLabel(self.admin_frame, text="Aujourd'hui par type :", font=("Arial", 16), text_color="#388e3c")
+        self.fees_today_label.pack(pady=10)
+        self.fees_today_value = ctk.CTkLabel(self.admin_frame, text='', justify='left')
+        self.fees_today_value.pack(pady=5)
         self.update_admin_tab()
     def update_admin_tab(self):
-        # Calcul des frais récoltés
-        total_fees = 0.0
-        self.db.c.execute("SELECT montant, type, date, client_id FROM transactions")
-        rows = self.db.c.fetchall()
-        trans_fee, retrait_fee, versement_fee = self.db.get_fees()
-        for row in rows:
-            montant, ttype, date, client_id = row
-            # On récupère le client pour le solde initial si besoin
-            if ttype == 'Transfert sortant':
-                # Frais sur le montant transféré
-                frais = round((montant * trans_fee) / (100 + trans_fee), 2)
-                total_fees += frais
-            elif ttype == 'Retirer':
-                frais = round((montant * retrait_fee) / (100 + retrait_fee), 2)
-                total_fees += frais
-            elif ttype in ['Ajouter', 'Versement']:
-                frais = round((montant * versement_fee) / (100 + versement_fee), 2)
-                total_fees += frais
-        self.fees_total_value.configure(text=f"{total_fees:.2f} XAF")
+        # Frais récoltés : lus dans la table de résumé, sans parcourir les transactions
+        total_fees = self.db.get_total_fees()
+        self.fees_total_value.configure(text=f"{from_minor(total_fees)} XAF")
+        jour = datetime.datetime.now().strftime('%Y-%m-%d')
+        lignes = [f"{ttype} : {nombre} op. | {from_minor(montant)} XAF | frais {from_minor(frais)} XAF" for ttype, nombre, montant, frais in self.db.get_day_summary(jour)]
+        self.fees_today_value.configure(text="\n".join(lignes) if lignes else "Aucune transaction aujourd'hui.")
+    def format_transaction_row(self, row):
+        return f'ID:{row[0]} | {row[1]} {row[2]} | {from_minor(row[3])} XAF | {row[4]} | Frais:{from_minor(row[6])} XAF | {format_date(row[5])}\n'
     def load_fees(self):
         trans, retrait, versement = self.db.get_fees()
         self.fee_trans_entry.delete(0, 'end')
@@ -449,14 +748,13 @@ class MicrofinApp(ctk.CTk):
         self.client_list.delete('0.0', 'end')
         rows = self.db.get_clients()
         for row in rows:
-            solde = Decimal(str(row[4])).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            self.client_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | Tel:{row[3]} | Solde:{solde:.2f} XAF\n')
+            self.client_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | Tel:{row[3]} | Solde:{from_minor(row[4])} XAF\n')
     def search_client(self):
         query = self.search_entry.get()
         self.client_list.delete('0.0', 'end')
         rows = self.db.get_clients(search=query)
         for row in rows:
-            self.client_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | Tel:{row[3]} | Solde:{row[4]} XAF\n')
+            self.client_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | Tel:{row[3]} | Solde:{from_minor(row[4])} XAF\n')
     def delete_client(self):
         client_id = self.delete_client_id_entry.get().strip()
         if not client_id:
@@ -522,19 +820,19 @@ class MicrofinApp(ctk.CTk):
             if not emetteur or not beneficiaire:
                 self.trans_status.configure(text='Client ou bénéficiaire introuvable !')
                 return
-            if montant_total > emetteur[4]:
+            if to_minor(montant_total) > emetteur[4]:
                 self.trans_status.configure(text='Solde insuffisant pour le transfert !')
                 return
-            self.db.add_transaction(client_id, montant_total, 'Transfert sortant')
-            self.db.add_transaction(benef_id, montant, 'Transfert entrant')
-            self.trans_status.configure(text=f'Transfert de {montant} XAF effectué ! (frais {frais} XAF)')
-            self.show_transactions()
+            ok, msg = self.run_db_operation(self.db.transfer, client_id, benef_id, montant)
+            self.trans_status.configure(text=msg)
+            if ok:
+                self.show_transactions()
             return
         if type_ == 'Retirer':
             if not mbox.askyesno('Validation', f'Confirmer le retrait de {montant} XAF (+{frais} XAF frais) pour le client ID {client_id} ?'):
                 self.trans_status.configure(text='Retrait annulé.')
                 return
-            ok, msg = self.db.add_transaction(client_id, montant_total, type_)
+            ok, msg = self.run_db_operation(self.db.add_transaction, client_id, montant_total, type_)
             self.trans_status.configure(text=f'{msg} (frais {frais} XAF)')
             if ok:
                 self.show_transactions()
@@ -545,7 +843,7 @@ class MicrofinApp(ctk.CTk):
             if not mbox.askyesno('Validation', f'Confirmer l\'opération de {montant} XAF (+{frais} XAF frais) pour le client ID {client_id} ?'):
                 self.trans_status.configure(text='Opération annulée.')
                 return
-            ok, msg = self.db.add_transaction(client_id, montant_total, type_)
+            ok, msg = self.run_db_operation(self.db.add_transaction, client_id, montant_total, type_)
             self.trans_status.configure(text=f'{msg} (frais {frais} XAF)')
             if ok:
                 self.show_transactions()
@@ -555,31 +853,44 @@ class MicrofinApp(ctk.CTk):
         if not mbox.askyesno('Validation', f'Confirmer la transaction {type_} de {montant} XAF pour le client ID {client_id} ?'):
             self.trans_status.configure(text='Transaction annulée.')
             return
-        ok, msg = self.db.add_transaction(client_id, montant, type_)
+        ok, msg = self.run_db_operation(self.db.add_transaction, client_id, montant, type_)
         self.trans_status.configure(text=msg)
         if ok:
             self.show_transactions()
+    def run_db_operation(self, operation, *args):
+        # Opération passée au thread d'écriture : ses erreurs (base occupée, transaction échouée) sont montrées à l'utilisateur
+        try:
+            return operation(*args)
+        except Exception as e:
+            mbox.showerror('Erreur', f'Opération non enregistrée : {e}')
+            return False, f'Opération non enregistrée : {e}'
     def show_transactions(self):
-        self.trans_list.delete('0.0', 'end')
-        rows = self.db.get_transactions()
-        trans_fee, retrait_fee, versement_fee = self.db.get_fees()
-        trans_fee = Decimal(str(trans_fee))
-        retrait_fee = Decimal(str(retrait_fee))
-        versement_fee = Decimal(str(versement_fee))
-        for row in rows:
-            montant = Decimal(str(row[3]))
-            ttype = row[4]
-            frais = Decimal('0')
-            if ttype == 'Transfert sortant':
-                frais = (montant * trans_fee / (Decimal('100') + trans_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype == 'Retirer':
-                frais = (montant * retrait_fee / (Decimal('100') + retrait_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype in ['Ajouter', 'Versement']:
-                frais = (montant * versement_fee / (Decimal('100') + versement_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            self.trans_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | {montant:.2f} XAF | {ttype} | Frais:{frais:.2f} XAF | {row[5]}\n')
+        # Revient à la page la plus récente, qui contient l'opération qui vient d'être enregistrée
+        self.trans_pages = [None]
+        self.show_transactions_page()
         # Mise à jour automatique de l'onglet Admin
         if hasattr(self, 'update_admin_tab'):
             self.update_admin_tab()
+    def show_transactions_page(self):
+        # Une ligne de plus que la page : indique s'il reste des transactions plus anciennes
+        rows = self.db.get_transactions(avant=self.trans_pages[-1], limit=HISTORY_PAGE_SIZE + 1)
+        more = len(rows) > HISTORY_PAGE_SIZE
+        rows = rows[:HISTORY_PAGE_SIZE]
+        self.trans_list.delete('0.0', 'end')
+        self.trans_list.insert('end', ''.join(self.format_transaction_row(row) for row in rows))
+        self.trans_next_cursor = (rows[-1][5], rows[-1][0]) if more else None
+        self.trans_newer_btn.configure(state='normal' if len(self.trans_pages) > 1 else 'disabled')
+        self.trans_older_btn.configure(state='normal' if more else 'disabled')
+        suite = 'transactions plus anciennes disponibles' if more else "début de l'historique"
+        self.trans_page_label.configure(text=f'Page {len(self.trans_pages)} : {len(rows)} transactions, {suite}')
+    def show_older_transactions(self):
+        if self.trans_next_cursor is not None:
+            self.trans_pages.append(self.trans_next_cursor)
+            self.show_transactions_page()
+    def show_newer_transactions(self):
+        if len(self.trans_pages) > 1:
+            self.trans_pages.pop()
+            self.show_transactions_page()
     def modify_client(self):
         id = self.modify_id_entry.get().strip()
         nom = self.modify_nom_entry.get().strip()
@@ -611,86 +922,50 @@ class MicrofinApp(ctk.CTk):
             self.modify_status.configure(text=f'Erreur modification : {e}')
     def show_history(self):
         self.history_list.delete('0.0', 'end')
-        rows = self.db.get_transactions()
-        trans_fee, retrait_fee, versement_fee = self.db.get_fees()
-        trans_fee = Decimal(str(trans_fee))
-        retrait_fee = Decimal(str(retrait_fee))
-        versement_fee = Decimal(str(versement_fee))
-        for row in rows:
-            montant = Decimal(str(row[3]))
-            ttype = row[4]
-            frais = Decimal('0')
-            if ttype == 'Transfert sortant':
-                frais = (montant * trans_fee / (Decimal('100') + trans_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype == 'Retirer':
-                frais = (montant * retrait_fee / (Decimal('100') + retrait_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype in ['Ajouter', 'Versement']:
-                frais = (montant * versement_fee / (Decimal('100') + versement_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            self.history_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | {montant:.2f} XAF | {ttype} | Frais:{frais:.2f} XAF | {row[5]}\n')
+        self.history_filters = {'client_id': None, 'type_': None, 'periode': None}
+        self.history_cursor = None
+        self.show_history_page()
     def filter_history(self):
         self.history_list.delete('0.0', 'end')
         # Récupération des valeurs des filtres
         id_val = self.filter_id_entry.get().strip()
-        year_val = self.filter_year_option.get()
-        month_val = self.filter_month_option.get()
-        day_val = self.filter_day_option.get()
-        hour_val = self.filter_hour_option.get()
-        minute_val = self.filter_minute_option.get()
-        second_val = self.filter_second_option.get()
         type_val = self.filter_type_option.get()
-        # Conversion mois lettre -> chiffre
-        mois_map = {'Janvier':'01','Février':'02','Mars':'03','Avril':'04','Mai':'05','Juin':'06','Juillet':'07','Août':'08','Septembre':'09','Octobre':'10','Novembre':'11','Décembre':'12'}
-        month_num = mois_map.get(month_val, '01')
-        # Construction de la requête SQL
-        query = "SELECT t.id, c.nom, c.prenom, t.montant, t.type, t.date FROM transactions t JOIN clients c ON t.client_id = c.id WHERE 1=1"
-        params = []
-        if id_val:
-            query += " AND c.id=?"
-            params.append(id_val)
-        if type_val and type_val != 'None' and type_val != 'Tous':
-            query += " AND t.type=?"
-            params.append(type_val)
-        # Filtre date
-        date_filter = None
-        time_filter = None
-        if year_val != 'None' and month_val != 'None' and day_val != 'None':
-            date_filter = f'{year_val}-{mois_map.get(month_val, "01")}-{day_val}'
-        elif year_val != 'None' and month_val != 'None':
-            date_filter = f'{year_val}-{mois_map.get(month_val, "01")}'
-        elif year_val != 'None':
-            date_filter = f'{year_val}'
-        if hour_val != 'None' and minute_val != 'None' and second_val != 'None':
-            time_filter = f'{hour_val}:{minute_val}:{second_val}'
-        # Application des filtres
-        if date_filter and time_filter:
-            query += " AND t.date LIKE ?"
-            params.append(f'{date_filter} {time_filter}%')
-        elif date_filter:
-            query += " AND t.date LIKE ?"
-            params.append(f'{date_filter}%')
-        query += " ORDER BY t.type, t.date DESC"
-        self.db.c.execute(query, tuple(params))
-        rows = self.db.c.fetchall()
-        self.history_list.delete('0.0', 'end')
-        if not rows:
-            self.history_list.delete('0.0', 'end')
-            self.history_list.insert('end', 'Aucune transaction trouvée avec ces filtres.\n')
+        selection = [self.filter_year_option.get(), self.filter_month_option.get(), self.filter_day_option.get(),
+                     self.filter_hour_option.get(), self.filter_minute_option.get(), self.filter_second_option.get()]
+        selection = [None if v == 'None' else v for v in selection]
+        if selection[1] is not None:
+            selection[1] = MOIS.index(selection[1]) + 1
+        # Intervalle [début, fin[ sur la colonne date indexée
+        try:
+            periode = date_range(*selection)
+        except ValueError:
+            self.history_list.insert('end', 'Date invalide.\n')
             return
-        trans_fee, retrait_fee, versement_fee = self.db.get_fees()
-        trans_fee = Decimal(str(trans_fee))
-        retrait_fee = Decimal(str(retrait_fee))
-        versement_fee = Decimal(str(versement_fee))
-        for row in rows:
-            montant = Decimal(str(row[3]))
-            ttype = row[4]
-            frais = Decimal('0')
-            if ttype == 'Transfert sortant':
-                frais = (montant * trans_fee / (Decimal('100') + trans_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype == 'Retirer':
-                frais = (montant * retrait_fee / (Decimal('100') + retrait_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            elif ttype in ['Ajouter', 'Versement']:
-                frais = (montant * versement_fee / (Decimal('100') + versement_fee)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            self.history_list.insert('end', f'ID:{row[0]} | {row[1]} {row[2]} | {montant:.2f} XAF | {ttype} | Frais:{frais:.2f} XAF | {row[5]}\n')
+        if id_val and not id_val.isdigit():
+            self.history_list.insert('end', 'ID client invalide !\n')
+            return
+        self.history_filters = {
+            'client_id': int(id_val) if id_val else None,
+            'type_': type_val if type_val not in ('None', 'Tous') else None,
+            'periode': periode,
+        }
+        self.history_cursor = None
+        if not self.show_history_page():
+            self.history_list.insert('end', 'Aucune transaction trouvée avec ces filtres.\n')
+    def show_history_page(self):
+        # Ajoute la page suivante de résultats à la fin de la liste ; renvoie le nombre de lignes affichées
+        rows = self.db.get_history_page(avant=self.history_cursor, **self.history_filters)
+        self.history_list.insert('end', ''.join(self.format_transaction_row(row) for row in rows))
+        if rows:
+            self.history_cursor = (rows[-1][5], rows[-1][0])
+        if len(rows) == HISTORY_PAGE_SIZE:
+            self.history_more_btn.pack(fill='x', pady=2)
+        else:
+            self.history_more_btn.pack_forget()
+        return len(rows)
+    def load_more_history(self):
+        if self.history_filters is not None:
+            self.show_history_page()
     def show_history_filters(self):
         # Réafficher les champs de filtre
         self.filter_id_label.pack(anchor='w')
@@ -723,6 +998,8 @@ class MicrofinApp(ctk.CTk):
         self.filter_second_option.set('None')
         self.filter_type_option.set('None')
         self.history_list.delete('0.0', 'end')
+        self.history_more_btn.pack_forget()
+        self.history_filters = None
         self.show_history_filters()
     def toggle_benef_field(self, value):
         if value == 'Transférer':
@@ -741,6 +1018,7 @@ class MicrofinApp(ctk.CTk):
             self.state_label.configure(text=f"Opérations AUTORISÉES\nDate système : {sys_date}\nHeure système : {sys_heure}\nDernière connexion : {last[0]} {last[1]}", text_color="#388e3c")
     def on_closing(self):
         if mbox.askokcancel("Quitter", "Voulez-vous vraiment quitter l'application ?"):
+            self.db.close()
             self.destroy()
     def run(self):
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
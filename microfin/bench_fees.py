@@ -0,0 +1,92 @@
+"""
+Benchmark: admin tab fee total with 5M booked transactions (MicrofinDB from 1.py).
+
+Seeds a temporary database, builds the per-day/per-type summary table, then times:
+- the admin tab query (get_total_fees, read from transactions_resume),
+- booking one transaction (add_transaction, which also updates the summary),
+- the previous approach: SELECT every transaction and recompute the fees in Python.
+
+Usage: python bench_fees.py [--transactions 5000000]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "1.py")
+TYPES = ['Ajouter', 'Retirer', 'Transfert sortant', 'Transfert entrant']
+
+
+def load_microfin():
+    """Imports 1.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("microfin", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"{label:<50}{elapsed_ms:>12.3f} ms")
+    return result
+
+
+def seed(microfin, db, n_transactions, n_clients=1000):
+    db.c.executemany('INSERT INTO clients (nom, prenom, telephone, solde) VALUES (?, ?, ?, ?)',
+                     ((f'Client{i}', 'Test', f'06{i:08d}', 10**12) for i in range(n_clients)))
+    rng = random.Random(1)
+    start = int(datetime(2025, 1, 1).timestamp())
+
+    def rows():
+        for i in range(n_transactions):
+            montant = rng.randint(100 * microfin.MINOR_UNITS, 100000 * microfin.MINOR_UNITS) # centimes
+            date = start + i * 6 # epoch seconds
+            yield rng.randint(1, n_clients), montant, TYPES[i % len(TYPES)], date, montant // 100
+
+    db.c.executemany('INSERT INTO transactions (client_id, montant, type, date, frais) VALUES (?, ?, ?, ?, ?)', rows())
+    db.conn.commit()
+    db.rebuild_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    args = parser.parse_args()
+    microfin = load_microfin()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = microfin.MicrofinDB(os.path.join(work_dir, 'bench_microfin.db'))
+        print(f"Seeding {args.transactions} transactions...")
+        timed("seed + rebuild_summary", lambda: seed(microfin, db, args.transactions))
+
+        total = timed("admin tab: get_total_fees (summary table)", db.get_total_fees, repeat=100)
+        timed("admin tab: today's summary per type", lambda: db.get_day_summary('2025-03-01'), repeat=100)
+        timed("add_transaction (ledger row + summary upsert)", lambda: db.add_transaction(1, 1000, 'Ajouter'), repeat=200)
+
+        def previous_approach():
+            total_fees = 0.0
+            db.c.execute("SELECT montant, type, date, client_id FROM transactions")
+            rows = db.c.fetchall()
+            trans_fee, retrait_fee, versement_fee = db.get_fees()
+            for montant, ttype, date, client_id in rows:
+                if ttype == 'Transfert sortant':
+                    total_fees += round((montant * trans_fee) / (100 + trans_fee), 2)
+                elif ttype == 'Retirer':
+                    total_fees += round((montant * retrait_fee) / (100 + retrait_fee), 2)
+                elif ttype in ['Ajouter', 'Versement']:
+                    total_fees += round((montant * versement_fee) / (100 + versement_fee), 2)
+            return total_fees
+
+        timed("previous approach: scan + Python fee loop", previous_approach)
+        print(f"total fees from summary: {microfin.from_minor(total)} XAF")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
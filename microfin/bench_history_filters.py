@@ -0,0 +1,97 @@
+"""
+Benchmark: history filters and client search on a large Microfin database (MicrofinDB from 1.py).
+
+Seeds a temporary database with epoch-dated transactions spread over a year, then times one history page
+(get_history_page with the [start, end) range that filter_history builds from the selectors) for the usual
+filter combinations, the next page after it, and client search through the FTS5 trigram index against LIKE '%...%'.
+Every filter should stay under 10 ms.
+
+Usage: python bench_history_filters.py [--transactions 1000000] [--clients 100000]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "1.py")
+TYPES = ['Ajouter', 'Retirer', 'Transfert sortant', 'Transfert entrant']
+
+
+def load_microfin():
+    """Imports 1.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("microfin", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(label, func, repeat=20):
+    func() # Warm the page cache
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"{label:<50}{elapsed_ms:>10.3f} ms  ({len(result)} rows)")
+    return result
+
+
+def seed(db, n_transactions, n_clients):
+    rng = random.Random(1)
+    db.c.executemany('INSERT INTO clients (nom, prenom, telephone, solde) VALUES (?, ?, ?, ?)',
+                     ((f'Nom{i}', 'Test', f'06{i:08d}', 0) for i in range(n_clients)))
+    start = int(datetime(2025, 1, 1).timestamp())
+    year_seconds = 365 * 24 * 3600
+
+    def rows():
+        for _ in range(n_transactions):
+            montant = rng.randint(100, 10_000_000)
+            yield rng.randint(1, n_clients), montant, rng.choice(TYPES), start + rng.randrange(year_seconds), montant // 100
+
+    db.c.executemany('INSERT INTO transactions (client_id, montant, type, date, frais) VALUES (?, ?, ?, ?, ?)', rows())
+    db.conn.commit()
+    db.c.execute('ANALYZE')
+    db.conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=100_000)
+    args = parser.parse_args()
+    microfin = load_microfin()
+    date_range = microfin.date_range
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db = microfin.MicrofinDB(os.path.join(work_dir, 'bench_history.db'))
+        print(f"Seeding {args.transactions} transactions for {args.clients} clients...")
+        seed_start = time.perf_counter()
+        seed(db, args.transactions, args.clients)
+        print(f"seeded in {time.perf_counter() - seed_start:.1f}s")
+
+        filters = [
+            ("no filter (latest page)", {}),
+            ("client", {'client_id': 4242}),
+            ("client + year", {'client_id': 4242, 'periode': date_range(2025)}),
+            ("type + month", {'type_': 'Retirer', 'periode': date_range(2025, 3)}),
+            ("year + month + day", {'periode': date_range(2025, 6, 15)}),
+            ("day + hour", {'periode': date_range(2025, 6, 15, 10)}),
+            ("type + day + hour + minute + second", {'type_': 'Ajouter', 'periode': date_range(2025, 6, 15, 10, 30, 5)}),
+        ]
+        for label, params in filters:
+            first_page = timed(label, lambda: db.get_history_page(**params))
+            if len(first_page) == microfin.HISTORY_PAGE_SIZE:
+                cursor = (first_page[-1][5], first_page[-1][0])
+                timed("  next page", lambda: db.get_history_page(avant=cursor, **params))
+
+        timed("client search, FTS5 trigram ('12345')", lambda: db.get_clients('12345'))
+        timed("client search, FTS5 trigram ('Nom9876')", lambda: db.get_clients('Nom9876'))
+        db.fts_enabled = False
+        timed("client search, LIKE '%12345%' (previous)", lambda: db.get_clients('12345'), repeat=5)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
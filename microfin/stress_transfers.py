@@ -0,0 +1,122 @@
+"""
+Stress test: several teller processes transferring money concurrently in one Microfin database (MicrofinDB from 1.py).
+
+Each process opens its own MicrofinDB on the shared file and runs random transfers from several threads,
+so the writer thread groups them into shared commits. Afterwards the test checks that:
+- balances + collected transfer fees == the money put in at the start (nothing created or lost),
+- no balance is negative,
+- every client's balance matches its ledger (initial + 'Transfert entrant' - 'Transfert sortant'),
+- both ledger rows exist for every successful transfer.
+
+Usage: python stress_transfers.py [--processes 4] [--threads 8] [--transfers 2000] [--clients 50]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "1.py")
+INITIAL_BALANCE = 10000 # XAF per client
+
+
+def load_microfin():
+    """Imports 1.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("microfin", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_teller(db_path, n_threads, n_transfers, n_clients, seed, result_queue):
+    microfin = load_microfin()
+    db = microfin.MicrofinDB(db_path)
+    counts = {"ok": 0, "refused": 0}
+    lock = threading.Lock()
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        for _ in range(n_transfers // n_threads):
+            emetteur, beneficiaire = rng.sample(range(1, n_clients + 1), 2)
+            ok, _ = db.transfer(emetteur, beneficiaire, rng.randint(1, 50000) / 100)
+            with lock:
+                counts["ok" if ok else "refused"] += 1
+
+    threads = [threading.Thread(target=worker, args=(seed * 1000 + i,)) for i in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.close()
+    result_queue.put(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent operators per process")
+    parser.add_argument("--transfers", type=int, default=2000, help="Transfers attempted per process")
+    parser.add_argument("--clients", type=int, default=50)
+    args = parser.parse_args()
+    microfin = load_microfin()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "stress_microfin.db")
+        db = microfin.MicrofinDB(db_path)
+        db.set_fees(1.0, 0.5, 0.0)
+        for i in range(args.clients):
+            db.add_client(f"Client{i}", "Test", f"06{i:08d}")
+        initial_minor = microfin.to_minor(INITIAL_BALANCE)
+        db.c.execute('UPDATE clients SET solde=?', (initial_minor,))
+        db.conn.commit()
+        db.close()
+
+        result_queue = multiprocessing.Queue()
+        tellers = [multiprocessing.Process(target=run_teller, args=(db_path, args.threads, args.transfers, args.clients, i, result_queue))
+                   for i in range(args.processes)]
+        start = time.perf_counter()
+        for teller in tellers:
+            teller.start()
+        totals = {"ok": 0, "refused": 0}
+        for _ in tellers:
+            counts = result_queue.get()
+            totals["ok"] += counts["ok"]
+            totals["refused"] += counts["refused"]
+        for teller in tellers:
+            teller.join()
+        elapsed = time.perf_counter() - start
+
+        db = microfin.MicrofinDB(db_path)
+        conn = db.conn
+        total_balance = conn.execute('SELECT SUM(solde) FROM clients').fetchone()[0]
+        total_fees = db.get_total_fees()
+        negative = conn.execute('SELECT COUNT(*) FROM clients WHERE solde < 0').fetchone()[0]
+        mismatched = conn.execute('''SELECT COUNT(*) FROM clients c WHERE c.solde != ? +
+            COALESCE((SELECT SUM(CASE t.type WHEN 'Transfert entrant' THEN t.montant ELSE -t.montant END)
+                      FROM transactions t WHERE t.client_id = c.id), 0)''', (initial_minor,)).fetchone()[0]
+        sortants = conn.execute("SELECT COUNT(*) FROM transactions WHERE type='Transfert sortant'").fetchone()[0]
+        entrants = conn.execute("SELECT COUNT(*) FROM transactions WHERE type='Transfert entrant'").fetchone()[0]
+        db.close()
+
+        expected = initial_minor * args.clients
+        print(f"processes: {args.processes}, threads per process: {args.threads}, clients: {args.clients}")
+        print(f"transfers: {totals['ok']} ok, {totals['refused']} refused in {elapsed:.2f}s -> {totals['ok'] / elapsed:.0f} transfers/sec")
+        print(f"money in: {microfin.from_minor(expected)} XAF, balances + fees: {microfin.from_minor(total_balance + total_fees)} XAF "
+              f"(fees {microfin.from_minor(total_fees)} XAF)")
+        checks = [
+            ("money conserved", total_balance + total_fees == expected),
+            ("no negative balance", negative == 0),
+            ("balances match the ledger", mismatched == 0),
+            ("two ledger rows per transfer", sortants == entrants == totals["ok"]),
+        ]
+        for label, passed in checks:
+            print(f"{label:<32}{'OK' if passed else 'FAILED'}")
+        if not all(passed for _, passed in checks):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
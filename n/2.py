@@ -5,6 +5,7 @@ import subprocess
 import os
 import io
 import time
+import wave
 
 # For real audio capture (using PyAudio)
 import pyaudio
@@ -93,12 +94,63 @@ class CommandRunner:
         thread.start()
         return thread
 
-# --- Real Audio Capture (using PyAudio, Output to Console in Raw Decimal) ---
+# --- Audio ring buffer and batch analysis ---
+AUDIO_BUFFER_SECONDS = 30      # Audio history kept in memory (preallocated once)
+ANALYSIS_INTERVAL = 0.1        # The analysis worker wakes up this often and processes every complete chunk since its last pass
+SUMMARY_INTERVAL = 0.5         # Minimum seconds between two summaries sent to the GUI
+FFT_BANDS = ((0, 250), (250, 500), (500, 1000), (1000, 2000), (2000, 4000), (4000, 8000), (8000, 22050)) # Hz
+
+class AudioRingBuffer:
+    """
+    Preallocated int16 ring buffer filled by the capture thread.
+    Positions are absolute sample counts (they only grow), so readers keep their own position and ask for
+    what was written since; a reader that falls more than `capacity` samples behind has lost the oldest ones.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.samples = np.zeros(capacity, dtype=np.int16)
+        self.written = 0 # Absolute position of the next sample
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        data = data[-self.capacity:]
+        with self.lock:
+            start = self.written % self.capacity
+            first = min(len(data), self.capacity - start)
+            self.samples[start:start + first] = data[:first]
+            self.samples[:len(data) - first] = data[first:]
+            self.written += len(data)
+
+    def _segments(self, start, end):
+        """One or two views of the buffer covering [start, end) (absolute positions, already clamped)."""
+        begin = start % self.capacity
+        count = end - start
+        if begin + count <= self.capacity:
+            return (self.samples[begin:begin + count],)
+        return (self.samples[begin:], self.samples[:begin + count - self.capacity])
+
+    def read(self, start, end):
+        """
+        Copy of the samples between two absolute positions, clamped to what is still in the buffer.
+        Returns (samples, actual start): only the requested range is copied, never the whole buffer.
+        """
+        with self.lock:
+            end = min(end, self.written)
+            start = max(start, end - self.capacity, 0)
+            segments = self._segments(start, end)
+            return (segments[0].copy() if len(segments) == 1 else np.concatenate(segments)), start
+
+    def latest(self, count):
+        with self.lock:
+            end = self.written
+        return self.read(end - count, end)[0]
+
 class AudioRecorder:
     def __init__(self, update_callback=None):
         self.is_recording = False
         self.audio_thread = None
-        self.update_callback = update_callback 
+        self.analysis_thread = None
+        self.update_callback = update_callback # Receives a throttled summary, never the raw samples
         
         self.chunk = 1024  # Record in chunks of 1024 samples
         self.sample_format = pyaudio.paInt16 # 16-bit resolution
@@ -107,6 +159,16 @@ class AudioRecorder:
         self.p = None         # PyAudio object
         self.stream = None    # PyAudio stream object
 
+        self.ring = AudioRingBuffer(int(AUDIO_BUFFER_SECONDS * self.fs))
+        self.analysed = 0     # Absolute ring position up to which the analysis worker has processed audio
+        self.features = None  # Latest batch of per-chunk features (see _analyse)
+        self.analysis_ms = 0.0
+        self.lost_samples = 0 # Samples overwritten before the analysis worker could read them
+        # FFT bin -> band matrix, computed once for the chunk size: band energies are one matrix product
+        frequencies = np.fft.rfftfreq(self.chunk, 1 / self.fs)
+        self.band_matrix = np.array([(frequencies >= low) & (frequencies < high) for low, high in FFT_BANDS], dtype=np.float32).T
+        self.window = np.hanning(self.chunk).astype(np.float32)
+
     def start_recording(self):
         if self.is_recording:
             return
@@ -119,9 +181,12 @@ class AudioRecorder:
                                       frames_per_buffer=self.chunk,
                                       input=True)
             self.is_recording = True
+            self.analysed = self.ring.written # Only analyse what this recording captures
             self.audio_thread = threading.Thread(target=self._record_audio)
             self.audio_thread.start()
-            print("\n--- Real Audio Stream Started (Raw Decimal Output) ---")
+            self.analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
+            self.analysis_thread.start()
+            print("\n--- Real Audio Stream Started (ring buffer, summaries to Console) ---")
         except Exception as e:
             print(f"Error starting audio stream: {e}")
             self.is_recording = False
@@ -132,19 +197,11 @@ class AudioRecorder:
                 self.p.terminate()
 
     def _record_audio(self):
+        # Capture only: one copy of each chunk into the ring buffer, no conversion, printing or GUI call here
         try:
             while self.is_recording:
                 data = self.stream.read(self.chunk, exception_on_overflow=False) 
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                
-                # Print raw decimal values of the audio samples
-                # Only print a slice to avoid console overload, adjust as needed
-                print(f"Raw Audio (first 100 samples): {audio_data[:100].tolist()} ...")
-                # To print ALL samples: print(f"Raw Audio: {audio_data.tolist()}")
-
-                if self.update_callback:
-                    # Pass the raw data string (or a representation) to the callback if needed
-                    self.update_callback(f"Raw Audio: {audio_data.tolist()}\n")
+                self.ring.write(np.frombuffer(data, dtype=np.int16))
                 
         except Exception as e:
             print(f"Error in audio stream thread: {e}")
@@ -157,6 +214,76 @@ class AudioRecorder:
                 self.p.terminate()
             print("--- Real Audio Stream Ended ---")
 
+    def _analysis_loop(self):
+        last_summary = 0.0
+        while self.is_recording:
+            time.sleep(ANALYSIS_INTERVAL)
+            features = self.analyse_pending()
+            if features is None:
+                continue
+            now = time.time()
+            if now - last_summary >= SUMMARY_INTERVAL:
+                last_summary = now
+                summary = self.format_summary(features)
+                print(f"Audio: {summary}")
+                if self.update_callback:
+                    self.update_callback(f"Audio: {summary}\n")
+
+    def analyse_pending(self):
+        """Analyses every complete chunk captured since the previous call, in one vectorized batch."""
+        count = (self.ring.written - self.analysed) // self.chunk * self.chunk
+        if count <= 0:
+            return None
+        samples, start = self.ring.read(self.analysed, self.analysed + count)
+        self.lost_samples += start - self.analysed
+        self.analysed = start + len(samples)
+        if len(samples) < self.chunk:
+            return None
+        started = time.perf_counter()
+        features = self._analyse(samples[:len(samples) // self.chunk * self.chunk].reshape(-1, self.chunk))
+        self.analysis_ms = (time.perf_counter() - started) * 1000
+        self.features = features
+        return features
+
+    def _analyse(self, chunks):
+        """Per-chunk features of a (n, chunk) int16 matrix, all computed at once."""
+        x = chunks.astype(np.float32) / 32768.0
+        signs = np.signbit(chunks)
+        spectrum = np.abs(np.fft.rfft(x * self.window, axis=1)) ** 2
+        return {
+            "rms": np.sqrt(np.mean(x * x, axis=1)),
+            "peak": np.abs(x).max(axis=1),
+            "zcr": np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.chunk - 1),
+            "bands": spectrum.astype(np.float32) @ self.band_matrix, # (n, len(FFT_BANDS))
+        }
+
+    def format_summary(self, features):
+        """One line for the GUI: levels of the latest batch and its dominant frequency band."""
+        rms = float(features["rms"].max())
+        peak = float(features["peak"].max())
+        zcr = float(features["zcr"].mean())
+        bands = features["bands"].sum(axis=0)
+        low, high = FFT_BANDS[int(np.argmax(bands))]
+        level_db = 20 * np.log10(max(rms, 1e-6))
+        text = f"RMS {level_db:.0f} dBFS | peak {peak:.2f} | ZCR {zcr:.3f} | band {low}-{high} Hz | analysis {self.analysis_ms:.1f} ms"
+        if self.lost_samples:
+            text += f" | lost {self.lost_samples / self.fs:.1f} s"
+        return text
+
+    def get_last_seconds(self, seconds):
+        """The last `seconds` of captured audio (int16 array); only that range is copied out of the ring."""
+        return self.ring.latest(int(seconds * self.fs))
+
+    def save_last_seconds(self, path, seconds):
+        """Writes the last `seconds` of captured audio to a WAV file; returns the duration actually written."""
+        samples = self.get_last_seconds(seconds)
+        with wave.open(path, "wb") as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.fs)
+            wav_file.writeframes(memoryview(samples))
+        return len(samples) / self.fs
+
     def stop_recording(self):
         if self.is_recording:
             self.is_recording = False
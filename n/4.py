@@ -4,8 +4,13 @@ import threading
 import subprocess
 import os
 import io
+import signal
 import time
 import datetime # For current time
+import queue
+import wave
+import bisect
+from collections import deque
 
 # For real audio capture (using PyAudio)
 import pyaudio
@@ -14,12 +19,136 @@ import numpy as np
 # For real camera capture
 import cv2
 
+# For the memory used by commands
+import psutil
+
+# --- Command index (exact, prefix and fuzzy lookup in memory) ---
+AUTOCOMPLETE_LIMIT = 5         # Suggestions shown under the prompt
+FUZZY_MAX_DISTANCE = 2         # Edits allowed in a fuzzy match (one per 4 characters typed, up to this)
+FUZZY_CANDIDATES = 50          # Commands sharing the most trigrams with the input that get an edit distance computed
+FUZZY_COMMON_GRAM = 0.02       # Trigrams found in more than this fraction of the commands are not counted...
+FUZZY_MIN_SHARED = 3           # ...while candidates still have to share this many of the others
+HELP_LIMIT = 50                # Commands listed by "help"
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance, capped at max_distance + 1, with the bit-parallel algorithm (Myers/Hyyrö): one column of
+    the DP table per character of b, as bit vectors of the vertical deltas over the characters of a.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if not a:
+        return len(b)
+    peq = {} # Character -> bit mask of its positions in a
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, score = mask, 0, len(a)
+    remaining = len(b)
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        remaining -= 1
+        if score - remaining > max_distance: # Each remaining character lowers the distance by one at most
+            return max_distance + 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return min(score, max_distance + 1)
+
+class CommandIndex:
+    """
+    Snapshot of the commands table for lookups as the user types; CommandDB drops it on every change.
+    Exact match is a dict. Prefix match uses the case-folded names in sorted order: the names starting with a prefix
+    form one run (a trie's subtree, in order) found by bisection. Fuzzy match counts the trigrams each name shares with
+    the input over numpy postings, keeps the names that can be within FUZZY_MAX_DISTANCE edits (each edit breaks at
+    most 3 trigrams), then ranks the best of them by edit distance.
+    """
+    def __init__(self, commands):
+        self.actions = dict(commands)
+        self.names = sorted(self.actions, key=str.casefold)
+        self.keys = [name.casefold() for name in self.names]
+        postings = {}
+        for position, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_action(self, command_text):
+        return self.actions.get(command_text)
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Names starting with prefix (case-insensitive), in alphabetical order."""
+        key = prefix.casefold()
+        start = bisect.bisect_left(self.keys, key)
+        matches = []
+        for position in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[position].startswith(key):
+                break
+            matches.append(self.names[position])
+        return matches
+
+    def count_prefix(self, prefix):
+        key = prefix.casefold()
+        return bisect.bisect_left(self.keys, key + "\U0010ffff") - bisect.bisect_left(self.keys, key)
+
+    def fuzzy(self, text, limit=AUTOCOMPLETE_LIMIT):
+        """[(edit distance, name)] closest first, for names within the allowed distance of the whole input."""
+        key = text.casefold()
+        max_distance = min(FUZZY_MAX_DISTANCE, len(key) // 4)
+        if max_distance == 0:
+            return []
+        # Each edit breaks at most 3 trigrams of any subset of the input's, so the most common ones (long postings,
+        # little information) are left out of the count as long as the filter still needs FUZZY_MIN_SHARED of the rest
+        grams = sorted(trigrams(key), key=lambda gram: len(self.postings.get(gram, ())))
+        common = FUZZY_COMMON_GRAM * len(self.keys)
+        while len(grams) - 1 - 3 * max_distance >= FUZZY_MIN_SHARED and len(self.postings.get(grams[-1], ())) > common:
+            grams.pop()
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        candidates = np.flatnonzero(counts >= max(1, len(grams) - 3 * max_distance))
+        if len(candidates) > FUZZY_CANDIDATES:
+            candidates = candidates[np.argpartition(counts[candidates], -FUZZY_CANDIDATES)[-FUZZY_CANDIDATES:]]
+        candidates = candidates[np.argsort(-counts[candidates], kind="stable")]
+        matches = []
+        for position in candidates:
+            if len(matches) == limit:
+                # Only a closer name can still get in: within d edits it shares at least len(grams) - 3d trigrams
+                max_distance = matches[-1][0] - 1
+                if max_distance < 0 or counts[position] < len(grams) - 3 * max_distance:
+                    break
+            distance = edit_distance(key, self.keys[position], max_distance)
+            if distance <= max_distance:
+                matches.append((distance, self.names[position]))
+                matches.sort()
+                del matches[limit:]
+        return matches
+
 # --- Database Management ---
 class CommandDB:
     def __init__(self, db_name="commands.db"):
         self.db_name = db_name
         self.conn = None
         self.cursor = None
+        self.index = None # CommandIndex, built on first lookup and dropped on every change to the commands
         self.connect()
         self.create_table()
 
@@ -34,6 +163,25 @@ class CommandDB:
                 action_command TEXT
             )
         """)
+        # Voice templates: MFCC matrices (float32, frames x coefficients) recorded for a command
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS voice_templates (
+                command_text TEXT,
+                coefficients INTEGER,
+                features BLOB
+            )
+        """)
+        # One row per command run by CommandRunner
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS command_history (
+                action_command TEXT,
+                started_at REAL,
+                wall_time REAL,
+                peak_rss_kb INTEGER,
+                exit_code INTEGER,
+                status TEXT
+            )
+        """)
         self.conn.commit()
 
     def add_command(self, command_text, action_command):
@@ -41,14 +189,18 @@ class CommandDB:
             self.cursor.execute("INSERT INTO commands (command_text, action_command) VALUES (?, ?)",
                                 (command_text, action_command))
             self.conn.commit()
+            self.index = None
             return True
         except sqlite3.IntegrityError:
             return False
 
+    def get_index(self):
+        if self.index is None:
+            self.index = CommandIndex(self.get_all_commands())
+        return self.index
+
     def get_action(self, command_text):
-        self.cursor.execute("SELECT action_command FROM commands WHERE command_text = ?", (command_text,))
-        result = self.cursor.fetchone()
-        return result[0] if result else None
+        return self.get_index().get_action(command_text)
 
     def get_all_commands(self):
         self.cursor.execute("SELECT command_text, action_command FROM commands")
@@ -58,48 +210,326 @@ class CommandDB:
         try:
             self.cursor.execute("UPDATE commands SET command_text = ?, action_command = ? WHERE command_text = ?",
                                 (new_command_text, new_action_command, old_command_text))
+            updated = self.cursor.rowcount > 0
+            if updated and new_command_text != old_command_text:
+                self.cursor.execute("UPDATE voice_templates SET command_text = ? WHERE command_text = ?",
+                                    (new_command_text, old_command_text))
             self.conn.commit()
-            return self.cursor.rowcount > 0
+            if updated:
+                self.index = None
+            return updated
         except sqlite3.IntegrityError:
             return False
 
     def delete_command(self, command_text):
         self.cursor.execute("DELETE FROM commands WHERE command_text = ?", (command_text,))
+        self.cursor.execute("DELETE FROM voice_templates WHERE command_text = ?", (command_text,))
+        self.conn.commit()
+        self.index = None
+
+    def add_voice_template(self, command_text, features):
+        self.cursor.execute("INSERT INTO voice_templates (command_text, coefficients, features) VALUES (?, ?, ?)",
+                            (command_text, features.shape[1], features.astype(np.float32).tobytes()))
+        self.conn.commit()
+
+    def get_voice_templates(self):
+        """[(command_text, MFCC array)] for the commands that still exist."""
+        self.cursor.execute("""
+            SELECT v.command_text, v.coefficients, v.features FROM voice_templates v
+            JOIN commands c ON c.command_text = v.command_text
+        """)
+        return [(command_text, np.frombuffer(features, dtype=np.float32).reshape(-1, coefficients))
+                for command_text, coefficients, features in self.cursor.fetchall()]
+
+    def delete_voice_templates(self, command_text):
+        self.cursor.execute("DELETE FROM voice_templates WHERE command_text = ?", (command_text,))
+        self.conn.commit()
+
+    def count_voice_templates(self):
+        self.cursor.execute("SELECT command_text, COUNT(*) FROM voice_templates GROUP BY command_text")
+        return dict(self.cursor.fetchall())
+
+    def add_history(self, action_command, started_at, wall_time, peak_rss_kb, exit_code, status):
+        self.cursor.execute("""
+            INSERT INTO command_history (action_command, started_at, wall_time, peak_rss_kb, exit_code, status)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (action_command, started_at, wall_time, peak_rss_kb, exit_code, status))
         self.conn.commit()
 
+    def get_history(self, limit=20):
+        """Latest runs first: [(action_command, started_at, wall_time, peak_rss_kb, exit_code, status)]."""
+        self.cursor.execute("""
+            SELECT action_command, started_at, wall_time, peak_rss_kb, exit_code, status FROM command_history
+            ORDER BY started_at DESC LIMIT ?
+        """, (limit,))
+        return self.cursor.fetchall()
+
     def close(self):
         if self.conn:
             self.conn.close()
 
 # --- Command Execution ---
+COMMAND_WORKERS = 4            # Commands running at the same time
+COMMAND_QUEUE_SIZE = 32        # Commands waiting for a worker; more are refused
+COMMAND_TIMEOUT = 300          # Default seconds before a command (and everything it started) is killed
+OUTPUT_BUFFER_LINES = 1000     # Output lines kept for the GUI between two polls (the oldest are dropped)
+OUTPUT_LINE_LIMIT = 1000       # Characters read at a time: longer lines are split instead of buffered whole
+OUTPUT_POLL_MS = 100           # How often the GUI collects command output
+RSS_SAMPLE_INTERVAL = 0.05     # Memory of a running command's process tree is sampled this often
+
+class CommandOutputBuffer:
+    """Bounded (job id, stream, line) buffer between the output reader threads and the GUI poll."""
+    def __init__(self, max_lines=OUTPUT_BUFFER_LINES):
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, job_id, stream, line):
+        with self.lock:
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append((job_id, stream, line))
+
+    def drain(self):
+        """(lines, number of lines dropped) since the previous call."""
+        with self.lock:
+            lines, dropped = list(self.lines), self.dropped
+            self.lines.clear()
+            self.dropped = 0
+        return lines, dropped
+
+class CommandJob:
+    """One command; status goes queued -> running -> done / failed / timeout / cancelled."""
+    def __init__(self, job_id, command, timeout):
+        self.id = job_id
+        self.command = command
+        self.timeout = timeout
+        self.status = "queued"
+        self.process = None
+        self.started_at = None # time.time() when a worker started it
+        self.wall_time = None
+        self.peak_rss_kb = None
+        self.returncode = None
+        self.lock = threading.Lock()
+
 class CommandRunner:
-    def __init__(self, base_path=None):
+    """
+    Fixed pool of worker threads fed by a bounded queue. Each command runs in its own process group, so a timeout
+    or a cancellation kills the shell and whatever it started. Its stdout/stderr lines go to the console and to
+    `output` as they arrive, while the worker enforces the timeout and samples the RSS of the process tree;
+    on_finished(job) is called from the worker with the wall time and peak RSS (None if it exited before the first
+    sample).
+    """
+    def __init__(self, base_path=None, on_finished=None, workers=COMMAND_WORKERS):
         self.base_path = base_path if base_path else os.getcwd()
+        self.on_finished = on_finished
+        self.output = CommandOutputBuffer()
+        self.queue = queue.Queue(maxsize=COMMAND_QUEUE_SIZE)
+        self.jobs = {} # Job id -> queued or running CommandJob
+        self.jobs_lock = threading.Lock()
+        self.next_id = 1
+        self.workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def execute_command_in_thread(self, command_string, timeout=COMMAND_TIMEOUT):
+        """Queues the command for the pool; returns its CommandJob, or None when the queue is full."""
+        with self.jobs_lock:
+            job = CommandJob(self.next_id, command_string, timeout)
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                print(f"Command queue full ({COMMAND_QUEUE_SIZE} waiting): '{command_string}' refused.")
+                return None
+            self.next_id += 1
+            self.jobs[job.id] = job
+        print(f"Job {job.id} queued: '{command_string}'")
+        return job
+
+    def active_jobs(self):
+        with self.jobs_lock:
+            return sorted(self.jobs.values(), key=lambda job: job.id)
+
+    def cancel(self, job_id):
+        with self.jobs_lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        self._stop(job, "cancelled")
+        return True
 
-    def execute_command_in_thread(self, command_string):
-        def run():
+    def shutdown(self):
+        for job in self.active_jobs():
+            self._stop(job, "cancelled")
+        for _ in self.workers:
             try:
-                process = subprocess.run(command_string, shell=True, cwd=self.base_path, capture_output=True, text=True, check=False)
-                print(f"\n--- Output for command: '{command_string}' ---")
-                if process.stdout:
-                    print(f"STDOUT:\n{process.stdout.strip()}")
-                if process.stderr:
-                    print(f"STDERR:\n{process.stderr.strip()}")
-                if process.returncode != 0:
-                    print(f"Command exited with error code: {process.returncode}")
-                print(f"--- End output for command: '{command_string}' ---\n")
+                self.queue.put_nowait(None)
+            except queue.Full: # Workers are daemon threads and the queued jobs are cancelled anyway
+                break
+
+    def _stop(self, job, status):
+        with job.lock:
+            if job.status not in ("queued", "running"):
+                return
+            job.status = status
+            process = job.process
+        if process is None: # Still queued: the worker will skip it
+            return
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass # Already exited
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
             except Exception as e:
-                print(f"Error executing command '{command_string}': {e}")
-        thread = threading.Thread(target=run)
-        thread.start()
-        return thread
+                print(f"Error executing command '{job.command}': {e}")
+                job.status = "failed"
+                if job.started_at is not None and job.wall_time is None:
+                    job.wall_time = time.time() - job.started_at
+            finally:
+                with self.jobs_lock:
+                    self.jobs.pop(job.id, None)
+            if job.started_at is not None and self.on_finished:
+                try:
+                    self.on_finished(job)
+                except Exception as e:
+                    print(f"Error reporting command '{job.command}': {e}")
+
+    def _run(self, job):
+        with job.lock: # A cancellation either sees the process or finds the job no longer queued
+            if job.status != "queued":
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            started = time.perf_counter()
+            job.process = subprocess.Popen(job.command, shell=True, cwd=self.base_path, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE, text=True, errors="replace", start_new_session=True)
+        print(f"\n--- Job {job.id} started: '{job.command}' ---")
+        readers = [threading.Thread(target=self._read_stream, args=(job, stream, name), daemon=True)
+                   for stream, name in ((job.process.stdout, "stdout"), (job.process.stderr, "stderr"))]
+        for reader in readers:
+            reader.start()
+        try:
+            root = psutil.Process(job.process.pid)
+        except psutil.Error:
+            root = None
+        deadline = started + job.timeout
+        peak_rss = None
+        # The process is waited on first, so a command that closes or redirects its own output is still timed out;
+        # the readers are joined after it exits, still under the deadline, since a background child may hold the pipes
+        while job.returncode is None or any(reader.is_alive() for reader in readers):
+            if job.returncode is None:
+                try:
+                    job.returncode = job.process.wait(timeout=RSS_SAMPLE_INTERVAL)
+                except subprocess.TimeoutExpired:
+                    pass
+            else:
+                next(reader for reader in readers if reader.is_alive()).join(RSS_SAMPLE_INTERVAL)
+            rss = self._tree_rss(root)
+            if rss:
+                peak_rss = max(peak_rss or 0, rss)
+            if time.perf_counter() >= deadline:
+                self._stop(job, "timeout")
+        job.peak_rss_kb = peak_rss // 1024 if peak_rss is not None else None
+        job.wall_time = time.perf_counter() - started
+        with job.lock:
+            if job.status == "running":
+                job.status = "done" if job.returncode == 0 else "failed"
+        rss = f"{job.peak_rss_kb / 1024:.1f} MB" if job.peak_rss_kb is not None else "n/a"
+        print(f"--- Job {job.id} {job.status}: exit code {job.returncode}, {job.wall_time:.2f} s, peak RSS {rss} ---\n")
+
+    def _read_stream(self, job, stream, name):
+        with stream:
+            for line in iter(lambda: stream.readline(OUTPUT_LINE_LIMIT), ""):
+                line = line.rstrip("\n")
+                print(f"[job {job.id} {name}] {line}")
+                self.output.append(job.id, name, line)
+
+    @staticmethod
+    def _tree_rss(root):
+        """Resident memory of the shell and all its descendants, in bytes (0 once they have exited)."""
+        if root is None:
+            return 0
+        try:
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                pass # Exited between the listing and the reading
+        return total
+
+# --- Audio ring buffer and batch analysis ---
+AUDIO_BUFFER_SECONDS = 30      # Audio history kept in memory (preallocated once)
+ANALYSIS_INTERVAL = 0.1        # The analysis worker wakes up this often and processes every complete chunk since its last pass
+SUMMARY_INTERVAL = 0.5         # Minimum seconds between two summaries sent to the GUI
+FFT_BANDS = ((0, 250), (250, 500), (500, 1000), (1000, 2000), (2000, 4000), (4000, 8000), (8000, 22050)) # Hz
+
+class AudioRingBuffer:
+    """
+    Preallocated int16 ring buffer filled by the capture thread.
+    Positions are absolute sample counts (they only grow), so readers keep their own position and ask for
+    what was written since; a reader that falls more than `capacity` samples behind has lost the oldest ones.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.samples = np.zeros(capacity, dtype=np.int16)
+        self.written = 0 # Absolute position of the next sample
+        self.written_at = 0.0 # time.time() of the last write, to date positions (see AudioRecorder.position_time)
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        data = data[-self.capacity:]
+        with self.lock:
+            start = self.written % self.capacity
+            first = min(len(data), self.capacity - start)
+            self.samples[start:start + first] = data[:first]
+            self.samples[:len(data) - first] = data[first:]
+            self.written += len(data)
+            self.written_at = time.time()
+
+    def _segments(self, start, end):
+        """One or two views of the buffer covering [start, end) (absolute positions, already clamped)."""
+        begin = start % self.capacity
+        count = end - start
+        if begin + count <= self.capacity:
+            return (self.samples[begin:begin + count],)
+        return (self.samples[begin:], self.samples[:begin + count - self.capacity])
+
+    def read(self, start, end):
+        """
+        Copy of the samples between two absolute positions, clamped to what is still in the buffer.
+        Returns (samples, actual start): only the requested range is copied, never the whole buffer.
+        """
+        with self.lock:
+            end = min(end, self.written)
+            start = max(start, end - self.capacity, 0)
+            segments = self._segments(start, end)
+            return (segments[0].copy() if len(segments) == 1 else np.concatenate(segments)), start
+
+    def latest(self, count):
+        with self.lock:
+            end = self.written
+        return self.read(end - count, end)[0]
 
-# --- Real Audio Capture (using PyAudio, Output to Console and GUI in Raw Decimal List) ---
 class AudioRecorder:
     def __init__(self, update_callback=None):
         self.is_recording = False
         self.audio_thread = None
-        self.update_callback = update_callback # This callback will now update the GUI
+        self.analysis_thread = None
+        self.update_callback = update_callback # Receives a throttled summary, never the raw samples
         
         self.chunk = 1024  # Record in chunks of 1024 samples
         self.sample_format = pyaudio.paInt16 # 16-bit resolution
@@ -108,6 +538,18 @@ class AudioRecorder:
         self.p = None         # PyAudio object
         self.stream = None    # PyAudio stream object
 
+        self.ring = AudioRingBuffer(int(AUDIO_BUFFER_SECONDS * self.fs))
+        self.analysed = 0     # Absolute ring position up to which the analysis worker has processed audio
+        self.features = None  # Latest batch of per-chunk features (see _analyse)
+        self.analysis_ms = 0.0
+        self.lost_samples = 0 # Samples overwritten before the analysis worker could read them
+        self.feature_listeners = [] # Called as listener(start position, features) from the analysis worker
+        self.previous_magnitude = None # Spectrum of the last analysed chunk, for the spectral flux across batches
+        # FFT bin -> band matrix, computed once for the chunk size: band energies are one matrix product
+        frequencies = np.fft.rfftfreq(self.chunk, 1 / self.fs)
+        self.band_matrix = np.array([(frequencies >= low) & (frequencies < high) for low, high in FFT_BANDS], dtype=np.float32).T
+        self.window = np.hanning(self.chunk).astype(np.float32)
+
     def start_recording(self):
         if self.is_recording:
             return
@@ -120,9 +562,13 @@ class AudioRecorder:
                                       frames_per_buffer=self.chunk,
                                       input=True)
             self.is_recording = True
+            self.analysed = self.ring.written # Only analyse what this recording captures
+            self.previous_magnitude = None
             self.audio_thread = threading.Thread(target=self._record_audio)
             self.audio_thread.start()
-            print("\n--- Real Audio Stream Started (Raw Decimal List Output to Console & GUI) ---")
+            self.analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
+            self.analysis_thread.start()
+            print("\n--- Real Audio Stream Started (ring buffer, summaries to Console & GUI) ---")
         except Exception as e:
             print(f"Error starting audio stream: {e}")
             self.is_recording = False
@@ -133,23 +579,11 @@ class AudioRecorder:
                 self.p.terminate()
 
     def _record_audio(self):
+        # Capture only: one copy of each chunk into the ring buffer, no conversion, printing or GUI call here
         try:
             while self.is_recording:
                 data = self.stream.read(self.chunk, exception_on_overflow=False) 
-                audio_data = np.frombuffer(data, dtype=np.int16)
-                
-                # Convert NumPy array to Python list
-                audio_list = audio_data.tolist()
-                
-                # --- Console Output ---
-                # Print a slice to avoid console overload, adjust as needed for full data
-                print(f"Raw Audio (list, first 10 samples): {audio_list[:10]} ...") 
-
-                # --- GUI Update (highly limited to prevent lag) ---
-                if self.update_callback:
-                    # Only show first 10 samples in GUI
-                    gui_display_string = f"Audio: {audio_list[:10]}..."
-                    self.update_callback("audio", gui_display_string)
+                self.ring.write(np.frombuffer(data, dtype=np.int16))
                 
         except Exception as e:
             print(f"Error in audio stream thread: {e}")
@@ -162,19 +596,350 @@ class AudioRecorder:
                 self.p.terminate()
             print("--- Real Audio Stream Ended ---")
 
+    def _analysis_loop(self):
+        last_summary = 0.0
+        while self.is_recording:
+            time.sleep(ANALYSIS_INTERVAL)
+            features = self.analyse_pending()
+            if features is None:
+                continue
+            now = time.time()
+            if now - last_summary >= SUMMARY_INTERVAL:
+                last_summary = now
+                summary = self.format_summary(features)
+                print(f"Audio: {summary}")
+                if self.update_callback:
+                    self.update_callback("audio", summary)
+
+    def analyse_pending(self):
+        """Analyses every complete chunk captured since the previous call, in one vectorized batch."""
+        count = (self.ring.written - self.analysed) // self.chunk * self.chunk
+        if count <= 0:
+            return None
+        samples, start = self.ring.read(self.analysed, self.analysed + count)
+        self.lost_samples += start - self.analysed
+        self.analysed = start + len(samples)
+        if len(samples) < self.chunk:
+            return None
+        started = time.perf_counter()
+        features = self._analyse(samples[:len(samples) // self.chunk * self.chunk].reshape(-1, self.chunk))
+        self.analysis_ms = (time.perf_counter() - started) * 1000
+        self.features = features
+        for listener in self.feature_listeners:
+            listener(start, features)
+        return features
+
+    def _analyse(self, chunks):
+        """Per-chunk features of a (n, chunk) int16 matrix, all computed at once."""
+        x = chunks.astype(np.float32) / 32768.0
+        signs = np.signbit(chunks)
+        magnitude = np.abs(np.fft.rfft(x * self.window, axis=1)).astype(np.float32)
+        # Spectral flux: positive change of the magnitude spectrum since the previous chunk, relative to its level
+        previous = np.vstack([magnitude[:1] if self.previous_magnitude is None else self.previous_magnitude, magnitude[:-1]])
+        self.previous_magnitude = magnitude[-1:]
+        flux = np.maximum(magnitude - previous, 0).sum(axis=1) / (magnitude.sum(axis=1) + 1e-9)
+        return {
+            "rms": np.sqrt(np.mean(x * x, axis=1)),
+            "peak": np.abs(x).max(axis=1),
+            "zcr": np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.chunk - 1),
+            "bands": (magnitude * magnitude) @ self.band_matrix, # (n, len(FFT_BANDS))
+            "flux": flux,
+        }
+
+    def format_summary(self, features):
+        """One line for the GUI: levels of the latest batch and its dominant frequency band."""
+        rms = float(features["rms"].max())
+        peak = float(features["peak"].max())
+        zcr = float(features["zcr"].mean())
+        bands = features["bands"].sum(axis=0)
+        low, high = FFT_BANDS[int(np.argmax(bands))]
+        level_db = 20 * np.log10(max(rms, 1e-6))
+        text = f"RMS {level_db:.0f} dBFS | peak {peak:.2f} | ZCR {zcr:.3f} | band {low}-{high} Hz | analysis {self.analysis_ms:.1f} ms"
+        if self.lost_samples:
+            text += f" | lost {self.lost_samples / self.fs:.1f} s"
+        return text
+
+    def position_time(self, position):
+        """time.time() at which the sample at an absolute ring position was captured (approximately)."""
+        return self.ring.written_at - (self.ring.written - position) / self.fs
+
+    def get_last_seconds(self, seconds):
+        """The last `seconds` of captured audio (int16 array); only that range is copied out of the ring."""
+        return self.ring.latest(int(seconds * self.fs))
+
+    def save_last_seconds(self, path, seconds):
+        """Writes the last `seconds` of captured audio to a WAV file; returns the duration actually written."""
+        samples = self.get_last_seconds(seconds)
+        with wave.open(path, "wb") as wav_file:
+            wav_file.setnchannels(self.channels)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.fs)
+            wav_file.writeframes(memoryview(samples))
+        return len(samples) / self.fs
+
     def stop_recording(self):
         if self.is_recording:
             self.is_recording = False
             print("Real Audio recording stopped.")
             
-# --- Real Camera Capture (Output to Console and GUI in RGB Matrix) ---
+# --- Voice command detection (VAD + MFCC/DTW keyword spotting) ---
+VAD_ENERGY_RATIO = 3.0     # A chunk is speech when its RMS is this many times the noise floor (about 10 dB)...
+VAD_FLUX_RATIO = 1.5       # ...or when its spectral flux is high (onsets, soft consonants) and its RMS this many times the floor
+VAD_FLUX_THRESHOLD = 0.3
+VAD_MIN_FLOOR = 0.002      # The noise floor is never estimated below this RMS (digital silence)
+VAD_FLOOR_ADAPT = 0.05     # Tracking rate of the noise floor on non-speech chunks
+VAD_HANGOVER = 0.3         # Seconds of non-speech that end an utterance
+VAD_PRE_ROLL = 0.1         # Seconds of audio kept before the first speech chunk
+VAD_MIN_SPEECH = 0.2       # Shorter utterances are ignored (clicks, coughs)
+VAD_MAX_SPEECH = 3.0       # Longer ones are cut here
+MFCC_FRAME = 1024          # Samples per MFCC frame (23 ms at 44.1 kHz)
+MFCC_HOP = 882             # Samples between two frames (20 ms)
+MFCC_FILTERS = 26          # Mel filters between MFCC_LOW_HZ and MFCC_HIGH_HZ
+MFCC_LOW_HZ = 100
+MFCC_HIGH_HZ = 8000
+MFCC_COEFFS = 12           # Cepstral coefficients kept (c1..c12, c0 is the level)
+DTW_BAND = 0.3             # Sakoe-Chiba band, as a fraction of the longer sequence
+DTW_MAX_DISTANCE = 1.5     # Mean per-frame distance above which nothing is recognised
+DTW_MARGIN = 0.9           # The best command must beat the best other command by this factor
+
+def mel_filterbank(fs, n_fft):
+    """(n_fft // 2 + 1, MFCC_FILTERS) triangular mel filters."""
+    def to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+    edges_hz = 700 * (10 ** (np.linspace(to_mel(MFCC_LOW_HZ), to_mel(MFCC_HIGH_HZ), MFCC_FILTERS + 2) / 2595) - 1)
+    frequencies = np.fft.rfftfreq(n_fft, 1 / fs)
+    low, center, high = edges_hz[:-2], edges_hz[1:-1], edges_hz[2:]
+    rising = (frequencies[:, None] - low) / (center - low)
+    falling = (high - frequencies[:, None]) / (high - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+def dct_matrix(n_inputs, n_outputs):
+    """DCT-II rows 1..n_outputs (orthonormal), as a (n_inputs, n_outputs) matrix."""
+    k = np.arange(1, n_outputs + 1)
+    n = np.arange(n_inputs)
+    return (np.sqrt(2 / n_inputs) * np.cos(np.pi * k[None, :] * (2 * n[:, None] + 1) / (2 * n_inputs))).astype(np.float32)
+
+def mfcc(samples, fs, filterbank, dct):
+    """
+    (frames, MFCC_COEFFS) MFCCs of an int16 utterance, normalised per coefficient over the utterance (CMVN),
+    so that templates and live speech compare at any level and with any microphone colouring.
+    """
+    x = samples.astype(np.float32) / 32768.0
+    x = np.append(x[0], x[1:] - 0.97 * x[:-1]) # Pre-emphasis
+    if len(x) < MFCC_FRAME:
+        x = np.pad(x, (0, MFCC_FRAME - len(x)))
+    frames = np.lib.stride_tricks.sliding_window_view(x, MFCC_FRAME)[::MFCC_HOP]
+    power = np.abs(np.fft.rfft(frames * np.hamming(MFCC_FRAME).astype(np.float32), axis=1)) ** 2
+    coefficients = np.log(power @ filterbank + 1e-10) @ dct
+    return (coefficients - coefficients.mean(axis=0)) / (coefficients.std(axis=0) + 1e-6)
+
+def dtw_distance(a, b):
+    """Mean per-frame Euclidean distance along the best DTW alignment of two MFCC sequences (Sakoe-Chiba band)."""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)) # All frame pairs at once
+    n, m = cost.shape
+    band = max(int(DTW_BAND * max(n, m)), abs(n - m) + 1)
+    total = np.full((n + 1, m + 1), np.inf)
+    total[0, 0] = 0.0
+    for i in range(1, n + 1):
+        j_low, j_high = max(1, i * m // n - band), min(m, i * m // n + band)
+        row = total[i]
+        diagonal_or_up = np.minimum(total[i - 1, j_low - 1:j_high], total[i - 1, j_low:j_high + 1]) + cost[i - 1, j_low - 1:j_high]
+        for j in range(j_low, j_high + 1): # Left neighbour: sequential within the row
+            row[j] = min(diagonal_or_up[j - j_low], row[j - 1] + cost[i - 1, j - 1])
+    return total[n, m] / (n + m)
+
+class VoiceCommandDetector:
+    """
+    Turns the AudioRecorder's analysed chunks into voice commands, in its own worker thread.
+    A VAD on the chunk features (RMS against an adaptive noise floor, spectral flux) segments utterances; each
+    one is read back from the ring buffer, converted to MFCCs and compared by DTW to the templates recorded for
+    the commands in CommandDB. on_command(command_text, distance, speech_end, timings) is called from the worker
+    with speech_end the capture time of the end of speech; enroll() hands the next utterance to a callback
+    instead, to record a template.
+    """
+    def __init__(self, recorder, on_command=None):
+        self.recorder = recorder
+        self.on_command = on_command
+        self.templates = [] # (command_text, MFCC array)
+        self.enroll_callback = None
+        self.filterbank = mel_filterbank(recorder.fs, MFCC_FRAME)
+        self.dct = dct_matrix(MFCC_FILTERS, MFCC_COEFFS)
+        self.pending = queue.Queue(maxsize=100) # (start position, features) batches from the analysis worker
+        self.noise_floor = None
+        self.speech_start = None  # Ring position of the first speech chunk of the current utterance
+        self.speech_end = None    # Ring position after its last speech chunk
+        self.last_distance = None
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def set_templates(self, templates):
+        self.templates = list(templates)
+
+    def enroll(self, callback):
+        """The next utterance goes to callback(MFCC array) (from the worker thread) instead of being matched."""
+        self.enroll_callback = callback
+
+    def submit(self, start, features):
+        """AudioRecorder feature listener: never blocks the analysis worker (batches are dropped if this worker is far behind)."""
+        try:
+            self.pending.put_nowait((start, features))
+        except queue.Full:
+            pass
+
+    def _worker(self):
+        while True:
+            start, features = self.pending.get()
+            try:
+                self._process(start, features)
+            except Exception as e:
+                print(f"Error in voice command detection: {e}")
+
+    def _process(self, start, features):
+        chunk, fs = self.recorder.chunk, self.recorder.fs
+        rms, flux = features["rms"], features["flux"]
+        if self.noise_floor is None:
+            self.noise_floor = max(float(np.median(rms)), VAD_MIN_FLOOR)
+        if self.speech_end is not None and start > self.speech_end + int(VAD_HANGOVER * fs):
+            self._end_utterance() # Chunks were lost since the last batch
+        for i in range(len(rms)):
+            position = start + i * chunk
+            speech = (rms[i] > self.noise_floor * VAD_ENERGY_RATIO or
+                      (flux[i] > VAD_FLUX_THRESHOLD and rms[i] > self.noise_floor * VAD_FLUX_RATIO))
+            if speech:
+                if self.speech_start is None:
+                    self.speech_start = position
+                self.speech_end = position + chunk
+                if self.speech_end - self.speech_start >= VAD_MAX_SPEECH * fs:
+                    self._end_utterance()
+            else:
+                self.noise_floor = max(VAD_MIN_FLOOR, (1 - VAD_FLOOR_ADAPT) * self.noise_floor + VAD_FLOOR_ADAPT * float(rms[i]))
+                if self.speech_end is not None and position + chunk - self.speech_end >= VAD_HANGOVER * fs:
+                    self._end_utterance()
+
+    def _end_utterance(self):
+        start, end = self.speech_start, self.speech_end
+        self.speech_start = self.speech_end = None
+        fs = self.recorder.fs
+        if end - start < VAD_MIN_SPEECH * fs:
+            return
+        detected = time.perf_counter()
+        samples, _ = self.recorder.ring.read(start - int(VAD_PRE_ROLL * fs), end)
+        features = mfcc(samples, fs, self.filterbank, self.dct)
+        if self.enroll_callback:
+            callback, self.enroll_callback = self.enroll_callback, None
+            callback(features)
+            return
+        if not self.templates:
+            return
+        matched = time.perf_counter()
+        best = {} # command_text -> smallest distance among its templates
+        for command_text, template in self.templates:
+            distance = dtw_distance(features, template)
+            best[command_text] = min(distance, best.get(command_text, np.inf))
+        ranked = sorted(best.items(), key=lambda item: item[1])
+        command_text, distance = ranked[0]
+        self.last_distance = distance
+        timings = {"mfcc_ms": (matched - detected) * 1000, "dtw_ms": (time.perf_counter() - matched) * 1000,
+                   "speech_s": (end - start) / fs}
+        if distance > DTW_MAX_DISTANCE or (len(ranked) > 1 and distance > ranked[1][1] * DTW_MARGIN):
+            print(f"Voice: utterance of {timings['speech_s']:.2f} s not recognised (closest '{command_text}', distance {distance:.2f})")
+            return
+        if self.on_command:
+            self.on_command(command_text, distance, self.recorder.position_time(end), timings)
+
+# --- Camera capture and motion/scene analysis ---
+MOTION_ANALYSIS_WIDTH = 160     # Frames are analysed on a copy downscaled to this width (aspect kept)
+ANALYSIS_MAX_FPS = 15           # Analysis rate cap: frames captured in between are skipped
+MOTION_PIXEL_THRESHOLD = 25     # Grey-level change for a pixel to count as moving
+MOTION_START_RATIO = 0.02       # Fraction of moving pixels that starts "motion"...
+MOTION_STOP_RATIO = 0.005       # ...and below which it stops, after MOTION_STOP_DELAY seconds
+MOTION_STOP_DELAY = 1.0
+SCENE_CHANGE_THRESHOLD = 0.5    # Bhattacharyya distance between the hue/saturation histogram and the scene reference
+SCENE_REFERENCE_ADAPT = 0.05    # The reference follows slow changes (light) at this rate per analysed frame
+ACTIVITY_GRID = (3, 4)          # Rows x columns of the activity map
+ACTIVITY_DECAY = 0.9            # Per analysed frame; the map is an exponential average of the motion per region
+CAMERA_SUMMARY_INTERVAL = 1.0   # Seconds between two summaries sent to the GUI
+CAMERA_EVENTS = ("motion_started", "motion_stopped", "scene_change")
+CAMERA_EVENT_PREFIX = "on:"     # A command named "on:motion_started" runs its action when the event fires
+CAMERA_EVENT_COOLDOWN = 5.0     # Minimum seconds between two runs of the same event's command
+
+class MotionAnalyzer:
+    """
+    Motion, scene-change and activity analysis of camera frames, all on a small copy of each frame:
+    frame difference of blurred grey levels (motion score = fraction of moving pixels), hue/saturation
+    histogram distance to a slowly adapting reference (scene change), and the motion averaged per region of an
+    ACTIVITY_GRID (activity map). process() returns the events crossed on this frame.
+    """
+    def __init__(self, width=MOTION_ANALYSIS_WIDTH):
+        self.width = width
+        self.previous = None      # Blurred grey levels of the previous analysed frame
+        self.reference = None     # Scene reference histogram
+        self.activity = np.zeros(ACTIVITY_GRID, dtype=np.float32)
+        self.motion = False
+        self.motion_since = 0.0
+        self.last_motion = 0.0
+
+    def process(self, frame, now):
+        """(events, result) for a BGR frame captured at `now`; events are (name, details) tuples."""
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(height * self.width / width))), interpolation=cv2.INTER_AREA)
+        grey = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        histogram = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+        cv2.normalize(histogram, histogram)
+        if self.previous is None or self.previous.shape != grey.shape:
+            self.previous, self.reference = grey, histogram
+            return [], {"motion": 0.0, "scene": 0.0, "activity": self.activity}
+
+        events = []
+        moving = cv2.absdiff(grey, self.previous) > MOTION_PIXEL_THRESHOLD
+        self.previous = grey
+        score = float(np.count_nonzero(moving)) / moving.size
+
+        scene = cv2.compareHist(self.reference, histogram, cv2.HISTCMP_BHATTACHARYYA)
+        if scene > SCENE_CHANGE_THRESHOLD:
+            events.append(("scene_change", {"distance": scene}))
+            self.reference = histogram
+        else:
+            cv2.addWeighted(self.reference, 1 - SCENE_REFERENCE_ADAPT, histogram, SCENE_REFERENCE_ADAPT, 0, dst=self.reference)
+
+        rows, columns = ACTIVITY_GRID
+        h, w = moving.shape[0] // rows * rows, moving.shape[1] // columns * columns
+        regions = moving[:h, :w].reshape(rows, h // rows, columns, w // columns).mean(axis=(1, 3))
+        self.activity *= ACTIVITY_DECAY
+        self.activity += (1 - ACTIVITY_DECAY) * regions
+
+        if score >= MOTION_STOP_RATIO and (self.motion or score >= MOTION_START_RATIO):
+            self.last_motion = now
+            if not self.motion:
+                self.motion = True
+                self.motion_since = now
+                events.append(("motion_started", {"score": score}))
+        elif self.motion and now - self.last_motion >= MOTION_STOP_DELAY:
+            self.motion = False
+            events.append(("motion_stopped", {"duration": self.last_motion - self.motion_since}))
+        return events, {"motion": score, "scene": scene, "activity": self.activity}
+
 class CameraRecorder:
-    def __init__(self, update_callback=None):
+    """
+    Capture and analysis in two threads joined by a one-frame, latest-frame-wins slot: capture never waits for
+    the analysis, which takes the newest frame at most ANALYSIS_MAX_FPS times per second (frames replaced in the
+    slot are counted as skipped). Events go to event_callback(name, details), throttled summaries to
+    update_callback("camera", text).
+    """
+    def __init__(self, update_callback=None, event_callback=None):
         self.is_recording = False
         self.camera_thread = None
+        self.analysis_thread = None
         self.update_callback = update_callback # This callback will now update the GUI
+        self.event_callback = event_callback
         self.cap = None # OpenCV VideoCapture object
         self.frame_counter = 0
+        self.condition = threading.Condition()
+        self.latest = None # (frame, capture time) waiting for the analysis thread
+        self.analyzer = MotionAnalyzer()
+        self.skipped = 0
+        self.analysed = 0
+        self.analysis_ms = 0.0
 
     def start_recording(self):
         if self.is_recording:
@@ -186,9 +951,13 @@ class CameraRecorder:
                 raise IOError("Cannot open webcam. Check if it's connected and not in use, or try a different index (1, 2...).")
             
             self.is_recording = True
+            self.latest = None
+            self.analyzer = MotionAnalyzer()
             self.camera_thread = threading.Thread(target=self._record_camera)
             self.camera_thread.start()
-            print("\n--- Real Camera Stream Started (RGB Matrix Output to Console & GUI) ---")
+            self.analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
+            self.analysis_thread.start()
+            print("\n--- Real Camera Stream Started (motion/scene analysis, summaries to Console & GUI) ---")
         except Exception as e:
             print(f"Error starting camera stream: {e}")
             self.is_recording = False
@@ -196,6 +965,7 @@ class CameraRecorder:
                 self.cap.release() 
 
     def _record_camera(self):
+        # Capture only: cap.read() paces the loop at the camera's frame rate, the frame is handed over as is
         try:
             while self.is_recording:
                 ret, frame = self.cap.read() 
@@ -205,38 +975,60 @@ class CameraRecorder:
                     continue
                 
                 self.frame_counter += 1
-                
-                # Convert BGR (OpenCV default) to RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                # --- Console Output (limited frequency) ---
-                print_every_n_frames_console = 30 # Print approximately once per second at 30 FPS
-                if self.frame_counter % print_every_n_frames_console == 0:
-                    print(f"\n--- Camera Frame {self.frame_counter} (RGB Matrix, Top-Left 2x2 Slice) ---")
-                    # Print a very small slice of the RGB matrix for console readability
-                    print(rgb_frame[0:2, 0:2]) 
-                    print("--------------------------------------------------\n")
-
-                # --- GUI Update (even more limited frequency to prevent lag) ---
-                # Only update GUI every 60 frames (approx. every 2 seconds)
-                # Display only a tiny slice (e.g., 2x2 pixels)
-                print_every_n_frames_gui = 60 
-                if self.update_callback and self.frame_counter % print_every_n_frames_gui == 0:
-                    # Convert the tiny slice to a list for simpler string representation
-                    gui_display_string = f"Camera: {rgb_frame[0:2, 0:2].tolist()}"
-                    self.update_callback("camera", gui_display_string)
-                
-                # A small sleep to prevent 100% CPU usage if `read()` is too fast
-                time.sleep(0.01) 
+                with self.condition:
+                    if self.latest is not None:
+                        self.skipped += 1
+                    self.latest = (frame, time.time())
+                    self.condition.notify()
 
         except Exception as e:
             print(f"Error in camera stream thread: {e}")
         finally:
             self.is_recording = False
+            with self.condition:
+                self.condition.notify()
             if self.cap:
                 self.cap.release() 
             print("--- Real Camera Stream Ended ---")
 
+    def _analysis_loop(self):
+        next_allowed = 0.0
+        last_summary = 0.0
+        while True:
+            time.sleep(max(0.0, next_allowed - time.perf_counter())) # Frame skipping: newer frames replace older ones meanwhile
+            with self.condition:
+                while self.latest is None and self.is_recording:
+                    self.condition.wait(0.5)
+                if self.latest is None:
+                    return
+                frame, captured = self.latest
+                self.latest = None
+            next_allowed = time.perf_counter() + 1 / ANALYSIS_MAX_FPS
+            started = time.perf_counter()
+            events, result = self.analyzer.process(frame, captured)
+            self.analysis_ms = (time.perf_counter() - started) * 1000
+            self.analysed += 1
+
+            for name, details in events:
+                print(f"Camera event: {name} {details}")
+                if self.event_callback:
+                    self.event_callback(name, details)
+
+            if time.time() - last_summary >= CAMERA_SUMMARY_INTERVAL:
+                last_summary = time.time()
+                summary = self.format_summary(result)
+                print(f"Camera: {summary}")
+                if self.update_callback:
+                    self.update_callback("camera", summary)
+
+    def format_summary(self, result):
+        activity = result["activity"]
+        row, column = np.unravel_index(int(np.argmax(activity)), activity.shape)
+        state = "motion" if self.analyzer.motion else "still"
+        return (f"{state} | moving {result['motion'] * 100:.1f}% | scene {result['scene']:.2f} | "
+                f"busiest region r{row}c{column} {activity[row, column] * 100:.0f}% | analysis {self.analysis_ms:.1f} ms | "
+                f"analysed {self.analysed}, skipped {self.skipped} of {self.frame_counter}")
+
     def stop_recording(self):
         if self.is_recording:
             self.is_recording = False
@@ -247,7 +1039,7 @@ class ConfigurationPanel(ctk.CTkToplevel):
     def __init__(self, master, db_manager, main_app):
         super().__init__(master)
         self.title("Configuration des Commandes")
-        self.geometry("600x400")
+        self.geometry("700x400")
         self.db_manager = db_manager
         self.main_app = main_app
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -258,7 +1050,7 @@ class ConfigurationPanel(ctk.CTkToplevel):
         ctk.CTkLabel(self, text="Ajouter/Modifier une Commande", font=("Arial", 16)).grid(row=0, column=0, columnspan=2, pady=10)
 
         ctk.CTkLabel(self, text="Commande:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
-        self.command_entry = ctk.CTkEntry(self, width=200)
+        self.command_entry = ctk.CTkEntry(self, width=200, placeholder_text="ex. date, ou on:motion_started / on:motion_stopped / on:scene_change")
         self.command_entry.grid(row=1, column=1, padx=10, pady=5, sticky="ew")
 
         ctk.CTkLabel(self, text="Action:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
@@ -266,7 +1058,11 @@ class ConfigurationPanel(ctk.CTkToplevel):
         self.action_entry.grid(row=2, column=1, padx=10, pady=5, sticky="ew")
 
         add_button = ctk.CTkButton(self, text="Ajouter/Modifier", command=self.add_or_update_command)
-        add_button.grid(row=3, column=0, columnspan=2, pady=10)
+        add_button.grid(row=3, column=0, pady=10)
+
+        # Voice template: the next utterance heard by the microphone is stored for the command being edited
+        self.voice_button = ctk.CTkButton(self, text="🎙️ Enregistrer la voix", command=self.record_voice_template)
+        self.voice_button.grid(row=3, column=1, pady=10)
 
         ctk.CTkLabel(self, text="Commandes Existantes:", font=("Arial", 14)).grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -294,8 +1090,10 @@ class ConfigurationPanel(ctk.CTkToplevel):
             widget.destroy()
 
         commands = self.db_manager.get_all_commands()
+        voice_counts = self.db_manager.count_voice_templates()
         for i, (cmd, act) in enumerate(commands):
-            cmd_label = ctk.CTkLabel(self.commands_frame, text=f"Commande: {cmd}", anchor="w")
+            voice_text = f"  🎙️ {voice_counts[cmd]}" if cmd in voice_counts else ""
+            cmd_label = ctk.CTkLabel(self.commands_frame, text=f"Commande: {cmd}{voice_text}", anchor="w")
             cmd_label.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
             act_label = ctk.CTkLabel(self.commands_frame, text=f"Action: {act}", anchor="w")
             act_label.grid(row=i, column=1, padx=5, pady=2, sticky="ew")
@@ -308,8 +1106,42 @@ class ConfigurationPanel(ctk.CTkToplevel):
                                         command=lambda c=cmd, a=act: self.load_command_for_edit(c, a))
             edit_button.grid(row=i, column=3, padx=5, pady=2)
 
+            if cmd in voice_counts:
+                clear_voice_button = ctk.CTkButton(self.commands_frame, text="Effacer voix", width=80,
+                                                   command=lambda c=cmd: self.clear_voice_templates(c))
+                clear_voice_button.grid(row=i, column=4, padx=5, pady=2)
+
+    def record_voice_template(self):
+        command = self.command_entry.get().strip()
+        if not command or self.db_manager.get_action(command) is None:
+            self.main_app.show_message("Enregistrez d'abord la commande, puis son exemple vocal.")
+            return
+        if not self.main_app.audio_recorder.is_recording:
+            self.main_app.show_message("Activez le microphone pour enregistrer un exemple vocal.")
+            return
+        self.voice_button.configure(text="Parlez maintenant...", state="disabled")
+        # Called from the detector worker: back to the Tk thread (through the main window, which outlives this panel)
+        self.main_app.voice_detector.enroll(lambda features: self.main_app.after(0, self.save_voice_template, command, features))
+
+    def save_voice_template(self, command_text, features):
+        self.db_manager.add_voice_template(command_text, features)
+        self.main_app.reload_voice_templates()
+        count = self.db_manager.count_voice_templates().get(command_text, 0)
+        self.main_app.show_message(f"Exemple vocal {count} enregistré pour '{command_text}' ({len(features)} trames).")
+        print(f"Voice template {count} recorded for '{command_text}' ({len(features)} frames).") # Log to console
+        if self.winfo_exists():
+            self.voice_button.configure(text="🎙️ Enregistrer la voix", state="normal")
+            self.update_commands_list()
+
+    def clear_voice_templates(self, command_text):
+        self.db_manager.delete_voice_templates(command_text)
+        self.main_app.reload_voice_templates()
+        self.update_commands_list()
+        self.main_app.show_message(f"Exemples vocaux de '{command_text}' effacés.")
+
     def delete_command(self, command_text):
         self.db_manager.delete_command(command_text)
+        self.main_app.reload_voice_templates()
         self.update_commands_list()
         self.main_app.show_message(f"Commande '{command_text}' supprimée.")
         print(f"Command '{command_text}' deleted.") # Log to console
@@ -321,6 +1153,7 @@ class ConfigurationPanel(ctk.CTkToplevel):
         self.action_entry.insert(0, action_command)
 
     def on_closing(self):
+        self.main_app.voice_detector.enroll(None) # Cancels a recording still waiting for speech
         self.destroy()
 
 # --- Main Application ---
@@ -339,18 +1172,23 @@ class AICommanderApp(ctk.CTk):
         
         script_dir = os.path.abspath(os.path.dirname(__file__))
         print(f"Application root directory: {script_dir}")
-        self.command_runner = CommandRunner(base_path=script_dir)
+        self.command_runner = CommandRunner(base_path=script_dir, on_finished=self.on_command_finished)
 
         # Pass a proper update callback that targets the GUI text widget
         self.audio_recorder = AudioRecorder(update_callback=self.update_live_data_display) 
-        self.camera_recorder = CameraRecorder(update_callback=self.update_live_data_display)
+        self.camera_recorder = CameraRecorder(update_callback=self.update_live_data_display, event_callback=self.on_camera_event)
+        self.camera_event_runs = {} # Event name -> time its command last ran
+        # Voice commands: utterances segmented from the microphone stream, matched against recorded templates
+        self.voice_detector = VoiceCommandDetector(self.audio_recorder, on_command=self.on_voice_command)
+        self.audio_recorder.feature_listeners.append(self.voice_detector.submit)
 
         # Configure grid for main window layout
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=0) # Message label
         self.grid_rowconfigure(1, weight=1) # Live data display (new)
         self.grid_rowconfigure(2, weight=0) # Prompt entry
-        self.grid_rowconfigure(3, weight=0) # Buttons frame
+        self.grid_rowconfigure(3, weight=0) # Autocomplete suggestions
+        self.grid_rowconfigure(4, weight=0) # Buttons frame
 
         # Message Panel (GUI feedback)
         self.message_label = ctk.CTkLabel(self, text="Enter a command or use the buttons...", font=("Arial", 18), wraplength=750)
@@ -366,10 +1204,17 @@ class AICommanderApp(ctk.CTk):
         self.prompt_entry = ctk.CTkEntry(self, placeholder_text="Type 'help' for commands...", font=("Arial", 24))
         self.prompt_entry.grid(row=2, column=0, padx=50, pady=10, sticky="ew") # Adjusted row
         self.prompt_entry.bind("<Return>", self.process_prompt)
+        self.prompt_entry.bind("<KeyRelease>", self.update_suggestions)
+        self.prompt_entry.bind("<Tab>", self.accept_suggestion)
+
+        # Autocomplete: commands starting with what is typed, or close to it
+        self.suggestions = []
+        self.suggestion_label = ctk.CTkLabel(self, text="", font=("Arial", 14), anchor="w")
+        self.suggestion_label.grid(row=3, column=0, padx=50, sticky="ew")
 
         # Buttons Frame
         button_frame = ctk.CTkFrame(self)
-        button_frame.grid(row=3, column=0, pady=10) # Adjusted row
+        button_frame.grid(row=4, column=0, pady=10) # Adjusted row
         button_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
 
         self.microphone_button = ctk.CTkButton(button_frame, text="🎙️ Microphone", command=self.toggle_microphone)
@@ -390,6 +1235,67 @@ class AICommanderApp(ctk.CTk):
         self.db_manager.add_command("test", "echo 'This is a test command!'")
         self.db_manager.add_command("date", "date") 
         self.db_manager.add_command("time", "date +%T") 
+        self.reload_voice_templates()
+        self.after(OUTPUT_POLL_MS, self.poll_command_output)
+
+    def on_command_finished(self, job):
+        """Called from a runner worker: the history is written from the Tk thread, which owns the database."""
+        self.after(0, self._record_command, job)
+
+    def _record_command(self, job):
+        self.db_manager.add_history(job.command, job.started_at, job.wall_time, job.peak_rss_kb, job.returncode, job.status)
+        rss = f"{job.peak_rss_kb / 1024:.1f} MB" if job.peak_rss_kb is not None else "n/a"
+        self.update_live_data_display(f"job {job.id}", f"'{job.command}' {job.status} (exit code {job.returncode},"
+                                                       f" {job.wall_time:.2f} s, peak RSS {rss})")
+
+    def poll_command_output(self):
+        """Moves the output collected since the last poll to the live display in one insert."""
+        lines, dropped = self.command_runner.output.drain()
+        if lines or dropped:
+            text = "\n".join(f"  [job {job_id} {stream}] {line}" for job_id, stream, line in lines)
+            if dropped:
+                text = f"  ({dropped} lines dropped)\n" + text
+            current_time = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            self._perform_gui_update("output", "\n" + text, current_time)
+        self.after(OUTPUT_POLL_MS, self.poll_command_output)
+
+    def reload_voice_templates(self):
+        """Hands the detector a fresh copy of the templates (SQLite stays on the Tk thread)."""
+        self.voice_detector.set_templates(self.db_manager.get_voice_templates())
+
+    def on_voice_command(self, command_text, distance, speech_end, timings):
+        """Called from the detector worker: the command runs from the Tk thread, which owns the database."""
+        self.after(0, self._dispatch_voice_command, command_text, distance, speech_end, timings)
+
+    def _dispatch_voice_command(self, command_text, distance, speech_end, timings):
+        action = self.db_manager.get_action(command_text)
+        if not action:
+            return
+        latency_ms = (time.time() - speech_end) * 1000
+        log = (f"'{command_text}' (distance {distance:.2f}) -> '{action}' | dispatched {latency_ms:.0f} ms after end of speech"
+               f" (hangover {VAD_HANGOVER * 1000:.0f} ms, MFCC {timings['mfcc_ms']:.1f} ms, DTW {timings['dtw_ms']:.1f} ms)")
+        print(f"\nVoice: {log}")
+        self.update_live_data_display("voice", log)
+        self.show_message(f"Voice command: executing '{action}'")
+        self.command_runner.execute_command_in_thread(action)
+
+    def on_camera_event(self, name, details):
+        """Called from the camera analysis thread, like on_voice_command."""
+        self.after(0, self._dispatch_camera_event, name, details)
+
+    def _dispatch_camera_event(self, name, details):
+        text = ", ".join(f"{key} {value:.2f}" for key, value in details.items())
+        self.update_live_data_display("camera event", f"{name} ({text})")
+        action = self.db_manager.get_action(CAMERA_EVENT_PREFIX + name)
+        if not action:
+            return
+        now = time.time()
+        if now - self.camera_event_runs.get(name, 0.0) < CAMERA_EVENT_COOLDOWN:
+            return
+        self.camera_event_runs[name] = now
+        print(f"\nCamera event '{name}': executing '{action}'")
+        self.show_message(f"Camera event {name}: executing '{action}'")
+        self.command_runner.execute_command_in_thread(action)
 
     def update_live_data_display(self, source, data_string):
         """
@@ -408,8 +1314,7 @@ class AICommanderApp(ctk.CTk):
             self.live_data_display.configure(state="normal") # Enable for editing
             # Truncate content if it gets too long to prevent performance issues
             if len(self.live_data_display.get("1.0", "end-1c")) > 5000: # Keep last 5000 chars
-                self.live_data_display.delete("1.0", "2.0") # Delete first line, or a larger chunk like:
-                # self.live_data_display.delete("1.0", "end-5000c") # Delete from start to keep only last 5000 chars
+                self.live_data_display.delete("1.0", "end-5000c") # Command output arrives in batches: trim to the limit
             
             self.live_data_display.insert("end", f"[{timestamp}] {source.upper()}: {data_string}\n")
             self.live_data_display.see("end") # Scroll to the end
@@ -425,32 +1330,88 @@ class AICommanderApp(ctk.CTk):
     def process_prompt(self, event=None):
         command_text = self.prompt_entry.get().strip()
         self.prompt_entry.delete(0, ctk.END)
+        self.update_suggestions()
         
         if command_text:
-            if command_text == "help":
-                all_commands = self.db_manager.get_all_commands()
+            if command_text == "help" or command_text.startswith("help "):
+                prefix = command_text[len("help"):].strip() # "help dep" lists the commands starting with "dep"
+                index = self.db_manager.get_index()
+                names = index.complete(prefix, HELP_LIMIT)
                 help_message = "Available Commands:\n"
-                if all_commands:
-                    help_message += "\n".join([f"  - {cmd[0]}" for cmd in all_commands])
+                if names:
+                    help_message += "\n".join([f"  - {name}" for name in names])
+                    total = index.count_prefix(prefix)
+                    if total > len(names):
+                        help_message += f"\n  ... and {total - len(names)} more (help <prefix> to narrow down)"
                 else:
-                    help_message += "  (No commands configured yet)"
-                
+                    help_message += "  (No commands configured yet)" if not len(index) else f"  (None starting with '{prefix}')"
+
+                help_message += "\nBuilt-in: help, jobs (running/queued commands and history), cancel <job id>"
                 self.show_message("Check console for available commands.")
                 print(f"\n--- HELP --- \n{help_message}\n--- END HELP ---")
+            elif command_text == "jobs":
+                self.show_jobs()
+            elif command_text.startswith("cancel "):
+                job_id = command_text.split(maxsplit=1)[1]
+                if job_id.isdigit() and self.command_runner.cancel(int(job_id)):
+                    self.show_message(f"Job {job_id} cancelled.")
+                    print(f"\nGUI: Job {job_id} cancelled.")
+                else:
+                    self.show_message(f"No queued or running job {job_id}.")
             else:
                 action = self.db_manager.get_action(command_text)
                 if action:
-                    self.show_message(f"Executing: '{action}'")
-                    print(f"\nGUI: Executing system command: '{action}'")
-                    self.command_runner.execute_command_in_thread(action)
+                    job = self.command_runner.execute_command_in_thread(action)
+                    if job:
+                        self.show_message(f"Executing: '{action}' (job {job.id})")
+                        print(f"\nGUI: Executing system command: '{action}' (job {job.id})")
+                    else:
+                        self.show_message(f"Command queue full, '{action}' not started.")
                 else:
-                    self.show_message(f"Command '{command_text}' not recognized.")
-                    print(f"\nGUI: Command '{command_text}' not recognized.")
+                    close = [name for _, name in self.db_manager.get_index().fuzzy(command_text)]
+                    hint = f" Did you mean: {', '.join(close)}?" if close else ""
+                    self.show_message(f"Command '{command_text}' not recognized.{hint}")
+                    print(f"\nGUI: Command '{command_text}' not recognized.{hint}")
         else:
             self.show_message("Please enter a command.")
             print("\nGUI: Please enter a command.")
         self.prompt_entry.focus_set()
 
+    def update_suggestions(self, event=None):
+        """Runs on every key release: index lookups only, SQLite is not queried unless the index was dropped."""
+        if event is not None and event.keysym in ("Return", "Tab"):
+            return
+        text = self.prompt_entry.get().strip()
+        if not text:
+            self.suggestions = []
+            self.suggestion_label.configure(text="")
+            return
+        index = self.db_manager.get_index()
+        self.suggestions = index.complete(text)
+        if self.suggestions:
+            self.suggestion_label.configure(text="Tab ⇥ " + "   ".join(self.suggestions))
+        else:
+            self.suggestions = [name for _, name in index.fuzzy(text)]
+            self.suggestion_label.configure(text=f"Did you mean: {'   '.join(self.suggestions)}" if self.suggestions else "")
+
+    def accept_suggestion(self, event=None):
+        if self.suggestions:
+            self.prompt_entry.delete(0, ctk.END)
+            self.prompt_entry.insert(0, self.suggestions[0])
+            self.update_suggestions()
+        return "break" # Keep the focus in the prompt
+
+    def show_jobs(self):
+        active = self.command_runner.active_jobs()
+        lines = [f"  {job.id}: {job.status} '{job.command}'" for job in active] or ["  (none)"]
+        lines.append("Recent runs:")
+        for action, started_at, wall_time, peak_rss_kb, exit_code, status in self.db_manager.get_history(10):
+            started = datetime.datetime.fromtimestamp(started_at).strftime("%H:%M:%S")
+            rss = f"{peak_rss_kb / 1024:.1f} MB" if peak_rss_kb is not None else "n/a"
+            lines.append(f"  {started} {status:<9} {wall_time:7.2f} s  {rss:>9}  exit {exit_code}  '{action}'")
+        self.show_message(f"{len(active)} job(s) queued or running (details in console).")
+        print("\n--- JOBS ---\n" + "\n".join(lines) + "\n--- END JOBS ---")
+
     def toggle_microphone(self):
         if self.audio_recorder.is_recording:
             self.audio_recorder.stop_recording()
@@ -497,6 +1458,7 @@ class AICommanderApp(ctk.CTk):
 
     def on_closing(self):
         print("\nGUI: Window closing event detected. Cleaning up...")
+        self.command_runner.shutdown()
         self.db_manager.close()
         self.audio_recorder.stop_recording()
         self.camera_recorder.stop_recording()
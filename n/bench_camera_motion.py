@@ -0,0 +1,145 @@
+"""
+Benchmark: camera analysis of the AI Commander (MotionAnalyzer and CameraRecorder from 4.py).
+
+A synthetic clip is built per resolution (480p and 1080p by default): a textured room with sensor noise, still for
+a while, then a person-sized shape walking across, still again, then a scene change (lights switched to another
+colour and the camera moved). Each clip goes through:
+  previous   the work the capture loop used to do on every frame (full-resolution BGR to RGB conversion)
+  analysis   MotionAnalyzer as CameraRecorder runs it: downscale to MOTION_ANALYSIS_WIDTH, then motion, histogram
+             and activity map on the small copy
+  full-res   the same analysis without the downscale (MotionAnalyzer with the frame's own width)
+and prints ms/frame and the events reported with their frame number, which should match the clip's script.
+
+The pipeline run then feeds CameraRecorder from a stand-in camera delivering the 1080p clip at --fps: it reports
+the capture interval (the capture thread must never wait for the analysis), the frames analysed and skipped.
+
+Usage: python bench_camera_motion.py [--frames 160] [--fps 30] [--seconds 4] [--sizes 640x480 1920x1080]
+"""
+import argparse
+import importlib.util
+import os
+import time
+
+import cv2
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "4.py")
+
+
+def load_commander_app():
+    """Imports 4.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("commander_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_clip(width, height, count):
+    """Still / walking shape / still / scene change, in quarters of the clip."""
+    rng = np.random.default_rng(0)
+    room = cv2.GaussianBlur(rng.integers(0, 255, (height, width, 3), dtype=np.uint8), (31, 31), 0)
+    cv2.rectangle(room, (width // 12, height // 6), (width // 3, height // 2), (80, 130, 170), -1) # Window, shelf...
+    other_room = cv2.applyColorMap(cv2.cvtColor(np.roll(room, width // 3, axis=1), cv2.COLOR_BGR2GRAY), cv2.COLORMAP_OCEAN)
+    quarter = count // 4
+    frames = []
+    for i in range(count):
+        if i >= 3 * quarter:
+            frame = other_room.copy()
+        else:
+            frame = room.copy()
+        if quarter <= i < 2 * quarter:
+            x = width // 8 + (i - quarter) * (width * 3 // 4) // quarter
+            cv2.rectangle(frame, (x, height // 4), (x + width // 8, height - height // 10), (50, 60, 150), -1)
+            cv2.circle(frame, (x + width // 16, height // 5), height // 12, (140, 170, 215), -1)
+        noise = rng.normal(0, 3, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def previous_work(frames):
+    start = time.perf_counter()
+    for frame in frames:
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return (time.perf_counter() - start) / len(frames) * 1000
+
+
+def analyse(app, frames, fps, width=None):
+    analyzer = app.MotionAnalyzer(width or app.MOTION_ANALYSIS_WIDTH)
+    events = []
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        found, _ = analyzer.process(frame, i / fps) # Clip time, not wall time
+        events += [(i, name) for name, _ in found]
+    return (time.perf_counter() - start) / len(frames) * 1000, events
+
+
+class StandInCapture:
+    """cv2.VideoCapture stand-in: read() returns the next clip frame at the camera's frame rate."""
+    def __init__(self, frames, fps):
+        self.frames = frames
+        self.interval = 1 / fps
+        self.next_frame = time.perf_counter()
+        self.read_times = []
+        self.i = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        self.next_frame += self.interval
+        time.sleep(max(0.0, self.next_frame - time.perf_counter()))
+        self.read_times.append(time.perf_counter())
+        self.i += 1
+        return True, self.frames[self.i % len(self.frames)]
+
+    def release(self):
+        pass
+
+
+def run_pipeline(app, frames, fps, seconds):
+    capture = StandInCapture(frames, fps)
+    app.cv2.VideoCapture = lambda index: capture
+    events = []
+    recorder = app.CameraRecorder(event_callback=lambda name, details: events.append(name))
+    recorder.start_recording()
+    time.sleep(seconds)
+    recorder.stop_recording()
+    recorder.camera_thread.join()
+    recorder.analysis_thread.join()
+    intervals = np.diff(capture.read_times) * 1000
+    return {"interval_mean": intervals.mean(), "interval_max": intervals.max(), "captured": recorder.frame_counter,
+            "analysed": recorder.analysed, "skipped": recorder.skipped, "analysis_ms": recorder.analysis_ms, "events": events}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=160)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1920x1080"])
+    args = parser.parse_args()
+    app = load_commander_app()
+
+    print(f"analysis width {app.MOTION_ANALYSIS_WIDTH}px, grid {app.ACTIVITY_GRID[0]}x{app.ACTIVITY_GRID[1]},"
+          f" clip of {args.frames} frames at {args.fps:.0f} fps (events expected near frames"
+          f" {args.frames // 4}, {args.frames // 2} + {app.MOTION_STOP_DELAY:.0f} s, {3 * (args.frames // 4)})")
+    print(f"{'size':<11}{'previous ms':>12}{'analysis ms':>13}{'full-res ms':>13}  events (frame: name)")
+    clip = None
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        clip = synthetic_clip(width, height, args.frames)
+        previous = previous_work(clip)
+        small_ms, events = analyse(app, clip, args.fps)
+        full_ms, _ = analyse(app, clip, args.fps, width=width)
+        listed = ", ".join(f"{i}: {name}" for i, name in events) or "none"
+        print(f"{size:<11}{previous:>12.2f}{small_ms:>13.2f}{full_ms:>13.2f}  {listed}")
+
+    r = run_pipeline(app, clip, args.fps, args.seconds)
+    print(f"\npipeline at {args.sizes[-1]}, {args.fps:.0f} fps for {args.seconds:.0f} s: capture interval"
+          f" {r['interval_mean']:.1f} ms (max {r['interval_max']:.1f}), captured {r['captured']}, analysed {r['analysed']}"
+          f" (cap {app.ANALYSIS_MAX_FPS} fps), skipped {r['skipped']}, last analysis {r['analysis_ms']:.2f} ms,"
+          f" events {', '.join(r['events']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: command lookups of the AI Commander (CommandDB and CommandIndex from 4.py) with many registered commands.
+
+A temporary commands database is filled with --commands synthetic names ("restart nginx-staging-0421",
+"backup photos-home-0007"...). The index is built through CommandDB.get_index, as on the first keystroke after a
+change. Then every query is typed one character at a time:
+  prefix   CommandIndex.complete on each keystroke (the autocomplete under the prompt)
+  fuzzy    CommandIndex.fuzzy on the whole input with one or two typos (the "Did you mean" suggestions)
+  exact    get_action on Enter, through the index
+For comparison, the same lookups are run as SQLite queries on the same table: exact match on the UNIQUE column,
+and `LIKE 'prefix%' ... LIMIT` for the prefix (LIKE is case-insensitive, so SQLite scans the table).
+
+It prints the build time and the lookup latency per keystroke (median, p99 and max, in microseconds).
+
+Usage: python bench_command_index.py [--commands 100000] [--queries 200]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "4.py")
+VERBS = ["restart", "deploy", "backup", "open", "show", "stop", "start", "sync", "build", "test", "tail", "ping"]
+TARGETS = ["nginx", "postgres", "redis", "photos", "music", "website", "api", "worker", "printer", "router", "nas"]
+PLACES = ["staging", "prod", "home", "office", "lab", "cloud"]
+
+
+def load_commander_app():
+    """Imports 4.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("commander_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_commands(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(VERBS)} {rng.choice(TARGETS)}-{rng.choice(PLACES)}-{rng.randrange(10000):04d}")
+    return [(name, f"echo '{name}'") for name in sorted(names)]
+
+
+def typo(text, rng, edits):
+    chars = list(text)
+    for _ in range(edits):
+        i = rng.randrange(len(chars))
+        kind = rng.choice(("substitute", "delete", "insert"))
+        if kind == "substitute":
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif kind == "delete" and len(chars) > 1:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    return "".join(chars)
+
+
+def timed(function, inputs):
+    times, results = [], []
+    for value in inputs:
+        start = time.perf_counter()
+        results.append(function(value))
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e6, results
+
+
+def report(name, times):
+    print(f"{name:<28}{len(times):>8}{np.median(times):>10.1f}{np.percentile(times, 99):>10.1f}{times.max():>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    app = load_commander_app()
+    rng = random.Random(0)
+
+    commands = synthetic_commands(args.commands, rng)
+    with tempfile.TemporaryDirectory() as directory:
+        db = app.CommandDB(os.path.join(directory, "commands.db"))
+        db.cursor.executemany("INSERT INTO commands (command_text, action_command) VALUES (?, ?)", commands)
+        db.conn.commit()
+
+        start = time.perf_counter()
+        index = db.get_index()
+        build = time.perf_counter() - start
+        print(f"{len(index)} commands, index built in {build * 1000:.0f} ms ({len(index.postings)} trigrams)")
+
+        targets = [name for name, _ in rng.sample(commands, args.queries)]
+        keystrokes = [target[:i] for target in targets for i in range(1, len(target) + 1)]
+        typos = [typo(target, rng, 1 + i % 2) for i, target in enumerate(targets)]
+
+        print(f"\n{'lookup':<28}{'calls':>8}{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+        prefix_times, completions = timed(index.complete, keystrokes)
+        report("index prefix (keystroke)", prefix_times)
+        fuzzy_times, suggestions = timed(index.fuzzy, typos)
+        report("index fuzzy (1-2 typos)", fuzzy_times)
+        exact_times, _ = timed(db.get_action, targets)
+        report("index exact (Enter)", exact_times)
+
+        def sqlite_prefix(prefix):
+            db.cursor.execute("SELECT command_text FROM commands WHERE command_text LIKE ? ORDER BY command_text LIMIT ?",
+                              (prefix.replace("%", "").replace("_", "") + "%", app.AUTOCOMPLETE_LIMIT))
+            return db.cursor.fetchall()
+
+        def sqlite_exact(name):
+            db.cursor.execute("SELECT action_command FROM commands WHERE command_text = ?", (name,))
+            return db.cursor.fetchone()
+
+        report("SQLite LIKE prefix", timed(sqlite_prefix, keystrokes[::10])[0])
+        report("SQLite exact (UNIQUE)", timed(sqlite_exact, targets)[0])
+
+        found = sum(target in [name for _, name in matches] for target, matches in zip(targets, suggestions))
+        typed, position = [], 0
+        for target in targets: # Characters typed before Tab (first suggestion) gives the intended command
+            prefixes = completions[position:position + len(target)]
+            typed.append(next(i for i, completion in enumerate(prefixes, 1) if completion[0] == target))
+            position += len(target)
+        print(f"\nfuzzy: intended command among the suggestions for {found}/{len(targets)} inputs with typos;"
+              f" prefix: Tab completes it after {np.mean(typed):.1f} of {np.mean([len(t) for t in targets]):.1f} characters")
+
+        start = time.perf_counter()
+        db.add_command("zz new command", "echo new")
+        db.get_index()
+        print(f"add_command + index rebuild on the next keystroke: {(time.perf_counter() - start) * 1000:.0f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
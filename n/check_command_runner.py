@@ -0,0 +1,70 @@
+"""
+Check: timeouts of the AI Commander's CommandRunner (4.py), including commands that close their own output.
+
+Each case runs one shell command through a CommandRunner with a short timeout and checks the final status and the
+wall time of the job:
+  echo            prints a line and exits: "done", output captured
+  sleep           keeps its output open past the timeout: "timeout"
+  closed-output   `exec sleep ... >/dev/null 2>&1` closes stdout/stderr at once, so the output readers finish
+                  immediately while the process keeps running: it must still be killed at the timeout
+  background      the shell exits but a background child keeps the pipes open: killed at the timeout
+
+It prints one line per case and exits with status 1 if any case fails.
+
+Usage: python check_command_runner.py [--timeout 1.0]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import threading
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "4.py")
+
+
+def load_commander_app():
+    """Imports 4.py as a module (its file name is not a valid identifier); the GUI only starts under __main__."""
+    spec = importlib.util.spec_from_file_location("commander_app", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_case(app, command, timeout):
+    """Runs one command on a single-worker runner; returns the finished CommandJob and the output lines."""
+    finished = threading.Event()
+    runner = app.CommandRunner(on_finished=lambda job: finished.set(), workers=1)
+    job = runner.execute_command_in_thread(command, timeout=timeout)
+    if not finished.wait(timeout * 3 + 5):
+        runner.shutdown()
+        raise RuntimeError(f"'{command}' did not finish within {timeout * 3 + 5:.1f} s")
+    lines, _ = runner.output.drain()
+    runner.shutdown()
+    return job, [line for _, _, line in lines]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+    app = load_commander_app()
+    limit = args.timeout + 1.0 # Killing the process group and joining the readers takes a few sampling intervals
+    sleep = args.timeout * 4
+    cases = [
+        ("echo", "echo hello", "done", lambda job, lines: lines == ["hello"]),
+        ("sleep", f"sleep {sleep}", "timeout", lambda job, lines: job.wall_time < limit),
+        ("closed-output", f"exec sleep {sleep} >/dev/null 2>&1", "timeout", lambda job, lines: job.wall_time < limit),
+        ("background", f"sleep {sleep} & echo started", "timeout", lambda job, lines: job.wall_time < limit),
+    ]
+    failures = 0
+    for name, command, expected, check in cases:
+        job, lines = run_case(app, command, args.timeout)
+        ok = job.status == expected and check(job, lines)
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<14} status={job.status:<8} expected={expected:<8} "
+              f"wall={job.wall_time:.2f} s  exit={job.returncode}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
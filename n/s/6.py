@@ -5,6 +5,17 @@ import queue
 import os
 import struct
 import sqlite3
+import time
+import zlib
+import hashlib
+import random
+import select
+import heapq
+import bisect
+import selectors
+from collections import deque
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox
 from datetime import datetime
 
@@ -13,10 +24,926 @@ MSG_TYPE_TEXT = 1
 MSG_TYPE_FILE = 2
 FILE_HEADER_FORMAT = "!BHL"
 FILE_HEADER_SIZE = struct.calcsize(FILE_HEADER_FORMAT)
+
+# Resumable file protocol (v2): 64-bit sizes, CRC32-checked chunks and a resume handshake.
+# v1 peers never send MSG_TYPE_FILE_V2, and a v1 server closes the connection on it, so both versions coexist.
+MSG_TYPE_FILE_V2 = 3
+FILE_PROTOCOL_VERSION = 2
+FILE_V2_HEADER_FORMAT = "!BBHQI16s" # Type, protocol version, name length, file size, chunk size, transfer ID
+FILE_V2_HEADER_SIZE = struct.calcsize(FILE_V2_HEADER_FORMAT)
+FILE_V2_CHUNK_FORMAT = "!QII" # Chunk offset, chunk length, CRC32 of the chunk
+FILE_V2_CHUNK_HEADER_SIZE = struct.calcsize(FILE_V2_CHUNK_FORMAT)
+FILE_V2_REPLY_FORMAT = "!BQ" # Status, verified offset
+FILE_V2_REPLY_SIZE = struct.calcsize(FILE_V2_REPLY_FORMAT)
+FILE_V2_CHUNK_SIZE = 1024 * 1024
+FILE_V2_MAX_CHUNK_SIZE = 16 * 1024 * 1024
+FILE_STATUS_READY = 0 # Send chunks starting at the verified offset
+FILE_STATUS_COMPLETE = 1
+FILE_STATUS_CHECKSUM_ERROR = 2 # Resend from the verified offset
+FILE_STATUS_ERROR = 3
+FILE_TRANSFER_MAX_RETRIES = 5
+FILE_TRANSFER_RETRY_DELAY = 2.0 # Seconds between resume attempts
 TCP_CHUNK_SIZE = 4096
+TCP_MAX_CONNECTIONS = 2000 # Accepting pauses above this many open connections
+TCP_READ_SIZE = 64 * 1024 # Bytes read per readable event by the server event loop
+TCP_MAX_PENDING_OUTPUT = 1024 * 1024 # Stop reading from a peer while this many response bytes are waiting for it
+TCP_FILE_WORKERS = 8 # Threads receiving files; the event loop hands file connections over to them
+TCP_POOL_IDLE_TIMEOUT = 60.0 # Seconds without traffic before a pooled client connection is closed
+TCP_POOL_MAX_BATCH = 256 # Queued messages written with a single sendall()
+FILE_STREAM_CHUNK_SIZE = 1024 * 1024 # Bytes handed to sendfile() between progress callbacks
+FILE_RECV_BUFFER_SIZE = 256 * 1024 # Size of the reusable receive buffer for incoming files
+
+# Reliable UDP file transfer: MTU-sized segments, a sliding window, NACK-based selective retransmission and paced sending.
+# Old UDP peers still get the single-datagram MSG_TYPE_FILE format.
+MSG_TYPE_UDP_FILE_START = 4
+MSG_TYPE_UDP_FILE_DATA = 5
+MSG_TYPE_UDP_FILE_FEEDBACK = 6
+UDP_FILE_START_FORMAT = "!BIQHH" # Type, session ID, file size, segment size, name length (followed by the name)
+UDP_FILE_START_SIZE = struct.calcsize(UDP_FILE_START_FORMAT)
+UDP_FILE_DATA_FORMAT = "!BII" # Type, session ID, sequence number (followed by the segment)
+UDP_FILE_DATA_SIZE = struct.calcsize(UDP_FILE_DATA_FORMAT)
+UDP_FILE_FEEDBACK_FORMAT = "!BIIIH" # Type, session ID, cumulative ack, highest sequence covered, NACK count (followed by NACKed sequences)
+UDP_FILE_FEEDBACK_SIZE = struct.calcsize(UDP_FILE_FEEDBACK_FORMAT)
+UDP_SEGMENT_SIZE = 1400 # Fits a 1500-byte MTU with IP/UDP and our own header
+UDP_MAX_SEGMENT_SIZE = 65507 - UDP_FILE_DATA_SIZE # Largest segment that fits in one UDP datagram
+UDP_MAX_FILE_SIZE = 64 * 1024 ** 3 # Larger transfers are refused: the receiver preallocates the whole file
+UDP_MAX_SEGMENTS = 64 * 1024 * 1024 # The receiver keeps one byte of state per segment
+UDP_WINDOW_SEGMENTS = 8192 # Unacknowledged segments allowed in flight (~11 MB)
+UDP_MAX_NACKS = 256 # Missing segments reported per feedback datagram
+UDP_FEEDBACK_INTERVAL = 0.02 # Seconds between receiver feedback while data is arriving
+UDP_FEEDBACK_EVERY = 128 # Also send feedback after this many new segments
+UDP_INITIAL_RATE = 10 * 1024 * 1024 # Bytes/s, adjusted by the sender from feedback
+UDP_MIN_RATE = 256 * 1024
+UDP_MAX_RATE = 1024 * 1024 * 1024
+UDP_LOSS_TOLERANCE = 0.05 # Loss fraction per feedback interval above which the sender slows down
+UDP_HANDSHAKE_TIMEOUT = 2.0 # Seconds without a reply before falling back to the single-datagram format
+UDP_SESSION_TIMEOUT = 15.0 # Seconds of silence after which a transfer is abandoned
+UDP_SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
 
 # Database configuration
 DB_NAME = "conversation.db"
+DB_BATCH_INTERVAL = 0.05 # Seconds the writer thread waits to group inserts into one transaction
+DB_MAX_BATCH = 1000
+HISTORY_PAGE_SIZE = 200 # Messages loaded per page in the history window
+
+# GUI update pump
+UI_PUMP_INTERVAL_MS = 50
+UI_FRAME_BUDGET = 0.015 # Seconds per pump tick spent draining worker-thread queues
+UI_DRAIN_BATCH = 200 # Items taken from each queue in turn, so no queue starves the others
+LOG_MAX_LINES = 2000 # Older lines are dropped from the server/client log boxes
+CHAT_VISIBLE_BUBBLES = 12 # Bubble widgets in the chat view; they are reused as the view scrolls
+CHAT_VIEW_LIMIT = 5000 # Messages kept in memory for scrolling; the full history is in the database
+STRESS_MESSAGES_PER_SECOND = 10000
+STRESS_CONVERSATION_ID = "stress-test" # Messages injected by the UI stress test are shown but not saved
+
+# --- Chat History Persistence (no GUI dependencies) ---
+
+class MessageStore:
+    """
+    Chat history in SQLite. One long-lived WAL-mode connection does all writes. insert_message() only queues the row,
+    and a writer thread commits queued rows in batches every DB_BATCH_INTERVAL.
+    Reads use a second connection, which WAL lets run alongside the writer, and are paginated by message id.
+    """
+    COLUMNS = "id, timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id"
+
+    def __init__(self, db_name=DB_NAME):
+        self.db_name = db_name
+        self.write_conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.write_conn.execute("PRAGMA journal_mode=WAL")
+        self.write_conn.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; only the last batches can be lost on power failure
+        self._create_schema()
+        self.read_conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.write_lock = threading.Lock()
+        self.read_lock = threading.Lock()
+        self.write_queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._write_loop, daemon=True, name="DB_Writer_Thread")
+        self.writer_thread.start()
+
+    def _create_schema(self):
+        cursor = self.write_conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                content TEXT NOT NULL,
+                is_self INTEGER NOT NULL,
+                is_file INTEGER NOT NULL,
+                protocol TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                conversation_id TEXT
+            )
+        ''')
+        # Add conversation_id column if it doesn't exist (for existing DBs)
+        try:
+            cursor.execute("SELECT conversation_id FROM messages LIMIT 1;")
+        except sqlite3.OperationalError:
+            cursor.execute("ALTER TABLE messages ADD COLUMN conversation_id TEXT;")
+            print("Added 'conversation_id' column to 'messages' table.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id);")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp ON messages (timestamp);")
+        self.write_conn.commit()
+
+    def insert_message(self, timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id="N/A"):
+        """Queues a message for the writer thread; never blocks on disk."""
+        self.write_queue.put((timestamp, sender, content, int(is_self), int(is_file), protocol, direction, conversation_id))
+
+    def _write_loop(self):
+        running = True
+        while running:
+            row = self.write_queue.get()
+            if row is None:
+                self.write_queue.task_done()
+                break
+            batch = [row]
+            deadline = time.monotonic() + DB_BATCH_INTERVAL
+            while len(batch) < DB_MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = self.write_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if row is None:
+                    running = False
+                    self.write_queue.task_done()
+                    break
+                batch.append(row)
+            with self.write_lock:
+                try:
+                    with self.write_conn: # One transaction per batch
+                        self.write_conn.executemany('''
+                            INSERT INTO messages (timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', batch)
+                except sqlite3.Error as e:
+                    print(f"Error saving {len(batch)} message(s) to database: {e}")
+            for _ in batch:
+                self.write_queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued message is committed."""
+        self.write_queue.join()
+
+    def get_messages_page(self, before_id=None, limit=HISTORY_PAGE_SIZE, conversation_id=None):
+        """
+        Returns up to limit messages older than before_id (the newest ones if None), newest first.
+        Pass the id of the last row returned as before_id to get the next (older) page.
+        """
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if conversation_id is not None:
+            conditions.append("conversation_id = ?")
+            params.append(conversation_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.read_lock:
+            return self.read_conn.execute(f"SELECT {self.COLUMNS} FROM messages {where} ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+
+    def delete_conversation(self, conversation_id):
+        """Deletes every message of a conversation (including ones still queued). Returns the number of rows deleted."""
+        self.flush()
+        with self.write_lock, self.write_conn:
+            return self.write_conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,)).rowcount
+
+    def clear(self):
+        """Deletes the whole history and gives the space back to the filesystem."""
+        self.flush()
+        with self.write_lock:
+            with self.write_conn:
+                self.write_conn.execute("DELETE FROM messages")
+                self.write_conn.execute("DELETE FROM sqlite_sequence WHERE name = 'messages'")
+            self.write_conn.execute("VACUUM")
+
+    def close(self):
+        self.write_queue.put(None)
+        self.writer_thread.join(timeout=5)
+        with self.write_lock: # Let a running delete or VACUUM finish first
+            self.read_conn.close()
+            self.write_conn.close()
+
+# --- Streaming File Transfer (no GUI dependencies) ---
+
+def send_file_stream(sock, file_path, file_size, progress_callback=None, chunk_size=FILE_STREAM_CHUNK_SIZE):
+    """
+    Streams file_size bytes of file_path over a connected TCP socket without reading the file into memory.
+    socket.sendfile() uses os.sendfile() (zero-copy) where the platform supports it and falls back to send() otherwise.
+    :param progress_callback: Called as progress_callback(sent_bytes, file_size) after every chunk.
+    :return: Number of bytes sent.
+    """
+    sent_bytes = 0
+    with open(file_path, 'rb') as f:
+        while sent_bytes < file_size:
+            count = min(chunk_size, file_size - sent_bytes)
+            sent_now = sock.sendfile(f, sent_bytes, count)
+            if sent_now == 0:
+                raise ConnectionError(f"File '{file_path}' ended after {sent_bytes}/{file_size} bytes.")
+            sent_bytes += sent_now
+            if progress_callback:
+                progress_callback(sent_bytes, file_size)
+    return sent_bytes
+
+def preallocate_file(f, file_size):
+    """Reserves file_size bytes on disk for f, so a large transfer fails early instead of midway on a full disk."""
+    if file_size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, file_size)
+            return
+        except OSError:
+            pass # Filesystem without fallocate support (e.g. some network mounts)
+    f.truncate(file_size)
+
+def receive_file_stream(sock, output_filepath, file_size, progress_callback=None, buffer=None):
+    """
+    Receives file_size bytes from sock directly into a preallocated output_filepath.
+    Data goes through recv_into() on a single reusable memoryview, so memory use stays flat whatever the file size.
+    :param buffer: Optional writable memoryview to reuse across transfers on the same connection.
+    :param progress_callback: Called as progress_callback(received_bytes, file_size) after every write.
+    :return: Number of bytes received (less than file_size if the peer disconnected).
+    """
+    if buffer is None:
+        buffer = memoryview(bytearray(FILE_RECV_BUFFER_SIZE))
+    received_bytes = 0
+    with open(output_filepath, 'wb') as f:
+        preallocate_file(f, file_size)
+        while received_bytes < file_size:
+            n_bytes = sock.recv_into(buffer, min(len(buffer), file_size - received_bytes))
+            if n_bytes == 0:
+                break
+            f.write(buffer[:n_bytes])
+            received_bytes += n_bytes
+            if progress_callback:
+                progress_callback(received_bytes, file_size)
+        if received_bytes < file_size:
+            f.truncate(received_bytes) # Drop the preallocated tail of an interrupted transfer
+    return received_bytes
+
+def receive_exact_into(sock, view):
+    """Fills the whole memoryview from sock. Returns False if the peer disconnected first."""
+    received_bytes = 0
+    while received_bytes < len(view):
+        n_bytes = sock.recv_into(view[received_bytes:])
+        if n_bytes == 0:
+            return False
+        received_bytes += n_bytes
+    return True
+
+def make_transfer_id(file_path, file_size):
+    """Identifies one version of a file, so the receiver only resumes a partial file that belongs to the same source."""
+    stat = os.stat(file_path)
+    key = f"{os.path.basename(file_path)}:{file_size}:{stat.st_mtime_ns}".encode('utf-8')
+    return hashlib.sha1(key).digest()[:16]
+
+def partial_file_paths(directory, transfer_id):
+    """Returns (part file, verified-offset file) paths for a transfer in progress."""
+    part_path = os.path.join(directory, f".{transfer_id.hex()}.part")
+    return part_path, part_path + ".offset"
+
+def read_verified_offset(part_path, offset_path, file_size):
+    """Returns the offset up to which part_path holds checksum-verified data, or 0 if there is nothing to resume."""
+    try:
+        with open(offset_path, 'rb') as f:
+            verified_offset = struct.unpack("!Q", f.read(8))[0]
+        if verified_offset <= file_size and os.path.getsize(part_path) >= verified_offset:
+            return verified_offset
+    except (OSError, struct.error):
+        pass
+    return 0
+
+def send_file_chunks(sock, file_path, file_size, chunk_size, offset=0, progress_callback=None):
+    """
+    Sends file_path from offset onwards as v2 chunks (offset, length, CRC32 header followed by the data).
+    Each chunk is read into one reusable buffer, so memory use stays flat whatever the file size.
+    """
+    buffer = memoryview(bytearray(chunk_size))
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        while offset < file_size:
+            length = f.readinto(buffer[:min(chunk_size, file_size - offset)])
+            if length == 0:
+                raise ConnectionError(f"File '{file_path}' ended after {offset}/{file_size} bytes.")
+            chunk = buffer[:length]
+            sock.sendall(struct.pack(FILE_V2_CHUNK_FORMAT, offset, length, zlib.crc32(chunk)))
+            sock.sendall(chunk)
+            offset += length
+            if progress_callback:
+                progress_callback(offset, file_size)
+    return offset
+
+def receive_file_chunks(sock, part_path, offset_path, file_size, chunk_size, offset, progress_callback=None):
+    """
+    Receives v2 chunks into part_path starting at offset, checking each chunk's CRC32 before writing it.
+    The verified offset is recorded in offset_path after every chunk so an interrupted transfer can resume there.
+    :return: (status, verified_offset) where status is FILE_STATUS_COMPLETE, FILE_STATUS_CHECKSUM_ERROR,
+             FILE_STATUS_ERROR (protocol violation) or None if the peer disconnected.
+    """
+    buffer = memoryview(bytearray(chunk_size))
+    chunk_header = memoryview(bytearray(FILE_V2_CHUNK_HEADER_SIZE))
+    mode = 'r+b' if offset > 0 and os.path.exists(part_path) else 'wb'
+    with open(part_path, mode) as f, open(offset_path, 'r+b' if os.path.exists(offset_path) else 'wb') as offset_file:
+        if mode == 'wb':
+            preallocate_file(f, file_size)
+        os.pwrite(offset_file.fileno(), struct.pack("!Q", offset), 0)
+        f.seek(offset)
+        while offset < file_size:
+            if not receive_exact_into(sock, chunk_header):
+                return None, offset
+            chunk_offset, length, crc = struct.unpack(FILE_V2_CHUNK_FORMAT, chunk_header)
+            if chunk_offset != offset or length != min(chunk_size, file_size - offset):
+                return FILE_STATUS_ERROR, offset
+            chunk = buffer[:length]
+            if not receive_exact_into(sock, chunk):
+                return None, offset
+            if zlib.crc32(chunk) != crc:
+                return FILE_STATUS_CHECKSUM_ERROR, offset
+            f.write(chunk)
+            f.flush()
+            offset += length
+            os.pwrite(offset_file.fileno(), struct.pack("!Q", offset), 0) # Only after the data itself is written
+            if progress_callback:
+                progress_callback(offset, file_size)
+    return FILE_STATUS_COMPLETE, offset
+
+# --- Reliable UDP File Transfer (no GUI dependencies) ---
+
+class LossyDatagramSocket:
+    """
+    Wraps a UDP socket and randomly drops and/or delays outgoing datagrams.
+    Used to exercise the reliable UDP transfer on loopback as if it ran over a lossy, high-latency link.
+    Everything except sendto() is passed through to the wrapped socket.
+    """
+    def __init__(self, sock, loss_rate=0.0, delay=0.0, jitter=0.0, seed=None):
+        self.sock = sock
+        self.loss_rate = loss_rate
+        self.delay = delay
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.dropped = 0
+        self._pending = [] # Heap of (send_time, counter, data, addr)
+        self._counter = 0
+        self._condition = threading.Condition()
+        if delay > 0 or jitter > 0:
+            threading.Thread(target=self._deliver_delayed, daemon=True, name="Lossy_Socket_Delay_Thread").start()
+
+    def sendto(self, data, addr):
+        if self.rng.random() < self.loss_rate:
+            self.dropped += 1
+            return len(data)
+        if self.delay <= 0 and self.jitter <= 0:
+            return self.sock.sendto(data, addr)
+        send_time = time.monotonic() + self.delay + self.rng.uniform(0, self.jitter)
+        with self._condition:
+            self._counter += 1
+            heapq.heappush(self._pending, (send_time, self._counter, bytes(data), addr))
+            self._condition.notify()
+        return len(data)
+
+    def _deliver_delayed(self):
+        while True:
+            with self._condition:
+                while not self._pending or self._pending[0][0] > time.monotonic():
+                    self._condition.wait(self._pending[0][0] - time.monotonic() if self._pending else None)
+                _, _, data, addr = heapq.heappop(self._pending)
+            try:
+                self.sock.sendto(data, addr)
+            except OSError:
+                pass # Socket closed or buffer full: the datagram is lost, like on a real link
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+class UdpFileSender:
+    """
+    Sends one file over UDP in sequenced segments. Up to window segments may be unacknowledged at a time,
+    sending is paced to self.rate bytes/s, and segments reported missing (NACKed) by the receiver are resent selectively.
+    The rate grows while feedback reports little loss and backs off when loss exceeds UDP_LOSS_TOLERANCE.
+    """
+    def __init__(self, sock, addr, file_path, file_size, file_name, rate=UDP_INITIAL_RATE, window=UDP_WINDOW_SEGMENTS, segment_size=UDP_SEGMENT_SIZE):
+        self.sock = sock
+        self.addr = addr
+        self.file_path = file_path
+        self.file_size = file_size
+        self.file_name = file_name
+        self.rate = rate
+        self.window = window
+        self.segment_size = segment_size
+        self.session_id = random.getrandbits(32)
+        self.total_segments = (file_size + segment_size - 1) // segment_size
+        self.acked = bytearray(self.total_segments) # 1 once the receiver confirmed the segment
+        self.cum_ack = 0 # Every segment below this one has been received
+        self.next_seq = 0 # Next never-sent segment
+        self.sent_at = {} # In-flight sequence -> last send time
+        self.retransmit_queue = deque()
+        self.srtt = None
+        self.segments_sent = 0
+        self.retransmissions = 0
+        self._sent_since_feedback = 0
+        self._last_rate_decrease = 0.0
+        self._recv_buffer = bytearray(65535)
+
+    def _send_start(self):
+        name_bytes = self.file_name.encode('utf-8')
+        self.sock.sendto(struct.pack(UDP_FILE_START_FORMAT, MSG_TYPE_UDP_FILE_START, self.session_id, self.file_size,
+                                     self.segment_size, len(name_bytes)) + name_bytes, self.addr)
+
+    def _send_segment(self, fd, seq, now):
+        payload = os.pread(fd, self.segment_size, seq * self.segment_size)
+        self.sock.sendto(struct.pack(UDP_FILE_DATA_FORMAT, MSG_TYPE_UDP_FILE_DATA, self.session_id, seq) + payload, self.addr)
+        self.sent_at[seq] = now
+        self.segments_sent += 1
+        self._sent_since_feedback += 1
+        return len(payload) + UDP_FILE_DATA_SIZE
+
+    def _read_feedback(self, now):
+        """Processes every feedback datagram waiting on the socket. Returns True if at least one was for this session."""
+        got_feedback = False
+        while True:
+            try:
+                n_bytes, _ = self.sock.recvfrom_into(self._recv_buffer)
+            except (BlockingIOError, socket.timeout):
+                return got_feedback
+            if n_bytes < UDP_FILE_FEEDBACK_SIZE or self._recv_buffer[0] != MSG_TYPE_UDP_FILE_FEEDBACK:
+                continue
+            # Feedback comes from the network: a truncated or inconsistent datagram is dropped, stray NACKs are ignored
+            try:
+                _, session_id, cum_ack, highest, nack_count = struct.unpack_from(UDP_FILE_FEEDBACK_FORMAT, self._recv_buffer)
+                if session_id != self.session_id or n_bytes < UDP_FILE_FEEDBACK_SIZE + 4 * nack_count:
+                    continue
+                nacks = struct.unpack_from(f"!{nack_count}I", self._recv_buffer, UDP_FILE_FEEDBACK_SIZE)
+            except struct.error:
+                continue
+            if cum_ack > self.total_segments or highest > self.total_segments:
+                continue
+            nacks = [seq for seq in nacks if seq < self.total_segments]
+            self._apply_feedback(cum_ack, highest, nacks, now)
+            got_feedback = True
+
+    def _apply_feedback(self, cum_ack, highest, nacks, now):
+        # Everything below highest that is not NACKed has arrived
+        if highest > self.cum_ack:
+            self.acked[self.cum_ack:highest] = b'\x01' * (highest - self.cum_ack)
+            for seq in nacks:
+                self.acked[seq] = 0
+        if cum_ack > self.cum_ack:
+            newest_acked = self.sent_at.get(cum_ack - 1)
+            if newest_acked is not None:
+                sample = now - newest_acked
+                self.srtt = sample if self.srtt is None else 0.875 * self.srtt + 0.125 * sample
+            self.cum_ack = cum_ack
+        for seq in [seq for seq in self.sent_at if self.acked[seq]]:
+            del self.sent_at[seq]
+
+        # Resend NACKed segments, unless they were (re)sent too recently to have arrived yet
+        min_age = (self.srtt or 0.05) * 1.5
+        new_losses = 0
+        for seq in nacks:
+            if now - self.sent_at.get(seq, 0.0) > min_age:
+                self.retransmit_queue.append(seq)
+                self.sent_at[seq] = now # Reserved, so a later NACK doesn't queue it twice
+                new_losses += 1
+
+        # Rate control: multiplicative decrease on heavy loss (at most once per RTT), additive increase otherwise
+        loss_fraction = new_losses / max(self._sent_since_feedback, 1)
+        self._sent_since_feedback = 0
+        if loss_fraction > UDP_LOSS_TOLERANCE:
+            if now - self._last_rate_decrease > (self.srtt or 0.05):
+                self.rate = max(UDP_MIN_RATE, self.rate * 0.7)
+                self._last_rate_decrease = now
+        else:
+            self.rate = min(UDP_MAX_RATE, self.rate + max(self.rate * 0.05, 64 * 1024))
+
+    def run(self, progress_callback=None):
+        """
+        Performs the whole transfer. Returns False if the peer never answered the handshake (e.g. an old server),
+        True once every segment is acknowledged. Raises TimeoutError if the peer goes silent mid-transfer.
+        """
+        self.sock.setblocking(False)
+        deadline = time.monotonic() + UDP_HANDSHAKE_TIMEOUT
+        start_sent_at = 0.0
+        while True:
+            now = time.monotonic()
+            if now > deadline:
+                return False
+            if now - start_sent_at > 0.2:
+                self._send_start()
+                start_sent_at = now
+            select.select([self.sock], [], [], 0.05)
+            if self._read_feedback(time.monotonic()):
+                self.srtt = time.monotonic() - start_sent_at
+                break
+
+        burst_bytes = 64 * (self.segment_size + UDP_FILE_DATA_SIZE)
+        tokens = burst_bytes
+        last_refill = last_feedback = time.monotonic()
+        fd = os.open(self.file_path, os.O_RDONLY)
+        try:
+            while self.cum_ack < self.total_segments:
+                now = time.monotonic()
+                if self._read_feedback(now):
+                    last_feedback = now
+                    if progress_callback:
+                        progress_callback(min(self.cum_ack * self.segment_size, self.file_size), self.file_size)
+                elif now - last_feedback > UDP_SESSION_TIMEOUT:
+                    raise TimeoutError(f"No feedback from {self.addr} for {UDP_SESSION_TIMEOUT:.0f}s.")
+
+                # Nothing heard for a while (e.g. the tail of the file was lost): probe with the oldest missing segment
+                rto = max(4 * (self.srtt or 0.05), 0.2)
+                if now - last_feedback > rto and now - self.sent_at.get(self.cum_ack, 0.0) > rto:
+                    self.retransmit_queue.appendleft(self.cum_ack)
+                    self.sent_at[self.cum_ack] = 0.0
+
+                tokens = min(burst_bytes, tokens + (now - last_refill) * self.rate)
+                last_refill = now
+                while tokens > 0:
+                    if self.retransmit_queue:
+                        seq = self.retransmit_queue.popleft()
+                        if self.acked[seq]:
+                            continue
+                        self.retransmissions += 1
+                    elif self.next_seq < min(self.total_segments, self.cum_ack + self.window):
+                        seq = self.next_seq
+                        self.next_seq += 1
+                    else:
+                        break
+                    try:
+                        tokens -= self._send_segment(fd, seq, now)
+                    except BlockingIOError:
+                        self.retransmit_queue.appendleft(seq) # Socket buffer full, try again shortly
+                        break
+
+                wait = max(0.0, -tokens / self.rate) if tokens <= 0 else 0.005
+                select.select([self.sock], [], [], min(wait, 0.005))
+        finally:
+            os.close(fd)
+        if progress_callback:
+            progress_callback(self.file_size, self.file_size)
+        return True
+
+class _UdpReceiveSession:
+    """State of one incoming reliable UDP transfer."""
+    def __init__(self, addr, session_id, file_name, file_size, segment_size, part_path, output_path):
+        self.addr = addr
+        self.session_id = session_id
+        self.file_name = file_name
+        self.file_size = file_size
+        self.segment_size = segment_size
+        self.total_segments = (file_size + segment_size - 1) // segment_size
+        self.received = bytearray(self.total_segments)
+        self.cum_ack = 0
+        self.highest = 0 # One past the highest sequence received
+        self.part_path = part_path
+        self.output_path = output_path
+        self.f = open(part_path, 'wb')
+        preallocate_file(self.f, file_size)
+        self.new_segments = 0
+        self.last_feedback = 0.0
+        self.last_activity = time.monotonic()
+        self.completed = False
+
+class UdpFileReceiver:
+    """
+    Receiving side of the reliable UDP transfer, driven by the UDP server loop: handle_datagram() for every
+    file datagram and tick() regularly so feedback (cumulative ack + NACKs) keeps flowing while data arrives.
+    Segments are written straight to their offset in a preallocated file.
+    event_callback(event, addr, file_name, detail) is called with "started", "completed", "failed" or "rejected"
+    (sizes above UDP_MAX_FILE_SIZE / UDP_MAX_SEGMENTS or a segment size outside 1..UDP_MAX_SEGMENT_SIZE).
+    Data segments whose length does not match their position in the file are dropped.
+    """
+    def __init__(self, sock, output_dir, event_callback=None):
+        self.sock = sock
+        self.output_dir = output_dir
+        self.event_callback = event_callback
+        self.sessions = {} # (addr, session_id) -> _UdpReceiveSession
+
+    def handle_datagram(self, data, addr):
+        msg_type = data[0]
+        if msg_type == MSG_TYPE_UDP_FILE_START:
+            self._handle_start(data, addr)
+        elif msg_type == MSG_TYPE_UDP_FILE_DATA and len(data) >= UDP_FILE_DATA_SIZE:
+            _, session_id, seq = struct.unpack_from(UDP_FILE_DATA_FORMAT, data)
+            session = self.sessions.get((addr, session_id))
+            if session:
+                self._handle_segment(session, seq, memoryview(data)[UDP_FILE_DATA_SIZE:])
+
+    def _handle_start(self, data, addr):
+        if len(data) < UDP_FILE_START_SIZE:
+            return
+        _, session_id, file_size, segment_size, name_len = struct.unpack_from(UDP_FILE_START_FORMAT, data)
+        session = self.sessions.get((addr, session_id))
+        if session is None:
+            file_name = os.path.basename(bytes(data[UDP_FILE_START_SIZE:UDP_FILE_START_SIZE + name_len]).decode('utf-8'))
+            if not file_name:
+                return
+            if not 0 < segment_size <= UDP_MAX_SEGMENT_SIZE or file_size > UDP_MAX_FILE_SIZE \
+                    or (file_size + segment_size - 1) // segment_size > UDP_MAX_SEGMENTS:
+                if self.event_callback:
+                    self.event_callback("rejected", addr, file_name, f"{file_size} bytes in {segment_size}-byte segments")
+                return
+            os.makedirs(self.output_dir, exist_ok=True)
+            part_path = os.path.join(self.output_dir, f".udp-{session_id:08x}.part")
+            session = _UdpReceiveSession(addr, session_id, file_name, file_size, segment_size, part_path, os.path.join(self.output_dir, file_name))
+            self.sessions[(addr, session_id)] = session
+            self._emit("started", session, file_size)
+            if session.total_segments == 0:
+                self._complete(session)
+        self._send_feedback(session) # Also answers a retransmitted START
+
+    def _handle_segment(self, session, seq, payload):
+        if seq < session.total_segments and len(payload) != min(session.segment_size, session.file_size - seq * session.segment_size):
+            return # Malformed: writing it would overlap the next segment or leave a hole
+        session.last_activity = time.monotonic()
+        if session.completed or seq >= session.total_segments or session.received[seq]:
+            if session.completed:
+                self._send_feedback(session) # The sender missed our final ack
+            return
+        os.pwrite(session.f.fileno(), payload, seq * session.segment_size)
+        session.received[seq] = 1
+        session.highest = max(session.highest, seq + 1)
+        session.new_segments += 1
+        if seq == session.cum_ack:
+            next_missing = session.received.find(0, seq)
+            session.cum_ack = session.total_segments if next_missing == -1 else next_missing
+        if session.cum_ack == session.total_segments:
+            self._complete(session)
+            self._send_feedback(session)
+        elif session.new_segments >= UDP_FEEDBACK_EVERY:
+            self._send_feedback(session)
+
+    def _complete(self, session):
+        session.completed = True
+        session.f.close()
+        os.replace(session.part_path, session.output_path)
+        self._emit("completed", session, session.output_path)
+
+    def _send_feedback(self, session):
+        # Report NACKs from the cumulative ack upwards; 'highest' stops where the NACK list had to stop
+        nacks = []
+        highest = session.highest
+        seq = session.cum_ack
+        while seq < session.highest:
+            seq = session.received.find(0, seq, session.highest)
+            if seq == -1:
+                break
+            if len(nacks) == UDP_MAX_NACKS:
+                highest = seq
+                break
+            nacks.append(seq)
+            seq += 1
+        packet = struct.pack(UDP_FILE_FEEDBACK_FORMAT, MSG_TYPE_UDP_FILE_FEEDBACK, session.session_id, session.cum_ack, max(highest, session.cum_ack), len(nacks))
+        try:
+            self.sock.sendto(packet + struct.pack(f"!{len(nacks)}I", *nacks), session.addr)
+        except OSError:
+            pass
+        session.new_segments = 0
+        session.last_feedback = time.monotonic()
+
+    def tick(self):
+        """Sends due feedback and drops transfers that went silent. Call at least every UDP_FEEDBACK_INTERVAL."""
+        now = time.monotonic()
+        for key, session in list(self.sessions.items()):
+            if now - session.last_activity > UDP_SESSION_TIMEOUT:
+                del self.sessions[key]
+                if not session.completed:
+                    session.f.close()
+                    os.remove(session.part_path)
+                    self._emit("failed", session, session.cum_ack * session.segment_size)
+            elif not session.completed and session.new_segments and now - session.last_feedback >= UDP_FEEDBACK_INTERVAL:
+                self._send_feedback(session)
+
+    def has_active_sessions(self):
+        return bool(self.sessions)
+
+    def _emit(self, event, session, detail):
+        if self.event_callback:
+            self.event_callback(event, session.addr, session.file_name, detail)
+
+class PrefetchedSocket:
+    """
+    Blocking view of a socket whose first bytes were already read by the server event loop.
+    recv()/recv_into() return those bytes before reading from the socket again; everything else is passed through.
+    """
+    def __init__(self, sock, prefetched):
+        self.sock = sock
+        self.prefetched = memoryview(bytes(prefetched))
+
+    def recv(self, n_bytes, flags=0):
+        if not self.prefetched:
+            return self.sock.recv(n_bytes, flags)
+        data = self.prefetched[:n_bytes].tobytes()
+        self.prefetched = self.prefetched[len(data):]
+        return data
+
+    def recv_into(self, buffer, n_bytes=0):
+        if not self.prefetched:
+            return self.sock.recv_into(buffer, n_bytes)
+        n_bytes = min(n_bytes or len(buffer), len(self.prefetched))
+        buffer[:n_bytes] = self.prefetched[:n_bytes]
+        self.prefetched = self.prefetched[n_bytes:]
+        return n_bytes
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sock.close()
+
+class _TcpConnection:
+    """Per-peer state of the server event loop: unparsed input and unsent responses."""
+    __slots__ = ("sock", "addr", "in_buffer", "out_buffer", "events")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.in_buffer = bytearray()
+        self.out_buffer = bytearray()
+        self.events = selectors.EVENT_READ # 0 while unregistered, waiting for a file worker
+
+class _TcpFileWorkers:
+    """
+    File workers of the server event loop. submit() hands a connection over only when a worker is free: the executor
+    never queues connections, which would sit unread there. Connections refused meanwhile wait in `waiting`.
+    """
+    def __init__(self, handler, max_workers=TCP_FILE_WORKERS):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="TCP_File_Receiver")
+        self.free_workers = threading.BoundedSemaphore(max_workers)
+        self.waiting = deque() # _TcpConnection objects whose next frame is a file, oldest first
+
+    def submit(self, connection):
+        """
+        Starts handler(conn, addr, pending_output) on a free worker, with the connection's buffered input and unsent
+        responses. Returns False, leaving the connection untouched, when every worker is busy.
+        """
+        if not self.free_workers.acquire(blocking=False):
+            return False
+        connection.sock.setblocking(True)
+        future = self.executor.submit(self.handler, PrefetchedSocket(connection.sock, connection.in_buffer),
+                                      connection.addr, bytes(connection.out_buffer))
+        future.add_done_callback(lambda _: self.free_workers.release())
+        return True
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+# --- Client Connection Pool ---
+
+class TcpPeerConnection:
+    """
+    Persistent client connection to one (ip, port). Frames are queued by send() and written by a single writer thread,
+    which batches everything queued into one write and never waits for responses: a separate reader thread logs them.
+    The socket is opened on first use, reopened after an error and closed after TCP_POOL_IDLE_TIMEOUT without traffic.
+    When the peer closes the connection the reader drops the socket, so the next write reconnects instead of failing.
+    After a reconnect the batch is resent from the first frame that was not completely written, so the peer does not
+    receive the frames before it twice.
+    """
+    def __init__(self, ip, port, log_queue):
+        self.ip = ip
+        self.port = port
+        self.log_queue = log_queue
+        self.send_queue = queue.Queue()
+        self.sock = None
+        self.lock = threading.Lock() # Guards self.sock between the writer and the reader
+        self.messages_sent = 0
+        self.writer_thread = threading.Thread(target=self._write_loop, daemon=True, name=f"TCP_Pool_Writer_{ip}:{port}")
+        self.writer_thread.start()
+
+    def send(self, frame):
+        self.send_queue.put(frame)
+
+    def close(self):
+        self.send_queue.put(None)
+
+    def _connect(self):
+        sock = socket.create_connection((self.ip, self.port), timeout=10.0)
+        sock.settimeout(None)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.lock:
+            self.sock = sock
+        threading.Thread(target=self._read_loop, args=(sock,), daemon=True, name=f"TCP_Pool_Reader_{self.ip}:{self.port}").start()
+        self.log_queue.put(f"Client TCP: Connected to {self.ip}:{self.port}")
+        return sock
+
+    def _disconnect(self, sock=None):
+        """Closes sock (by default the current socket) if it is still the connection's socket. Returns True if it was."""
+        with self.lock:
+            if self.sock is None or (sock is not None and self.sock is not sock):
+                return False
+            sock, self.sock = self.sock, None
+            try:
+                sock.shutdown(socket.SHUT_RDWR) # Also wakes up a thread blocked on the socket
+            except OSError:
+                pass
+            sock.close()
+        return True
+
+    def _write_loop(self):
+        while True:
+            try:
+                frame = self.send_queue.get(timeout=TCP_POOL_IDLE_TIMEOUT)
+            except queue.Empty:
+                if self.sock:
+                    self.log_queue.put(f"Client TCP: Closing idle connection to {self.ip}:{self.port}.")
+                    self._disconnect()
+                continue
+            if frame is None:
+                break
+
+            batch = [frame]
+            try:
+                while len(batch) < TCP_POOL_MAX_BATCH:
+                    frame = self.send_queue.get_nowait()
+                    if frame is None:
+                        self.send_queue.put(None) # Finish this batch, then stop
+                        break
+                    batch.append(frame)
+            except queue.Empty:
+                pass
+
+            ends = list(accumulate(len(frame) for frame in batch)) # Byte offset where each frame ends
+            written = 0 # Frames completely handed to the socket; only the rest is resent after a reconnect
+            for attempt in range(2): # A pooled connection may have been dropped by the peer: reconnect once
+                sock = self.sock
+                try:
+                    if sock is None:
+                        sock = self._connect()
+                    start = ends[written - 1] if written else 0
+                    data = memoryview(b"".join(batch[written:]))
+                    sent = 0
+                    while sent < len(data):
+                        sent += sock.send(data[sent:])
+                        written = bisect.bisect_right(ends, start + sent)
+                    self.messages_sent += len(batch)
+                    break
+                except OSError as e:
+                    if sock is not None:
+                        self._disconnect(sock)
+                    if attempt == 1:
+                        self.messages_sent += written
+                        self.log_queue.put(f"Client TCP: Could not send {len(batch) - written} message(s) to {self.ip}:{self.port}: {e}")
+        self._disconnect()
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                response_data = sock.recv(4096)
+                if not response_data:
+                    break
+                response_message = response_data.decode('utf-8', errors='replace')
+                if len(response_message) > 200: # Several pipelined responses arrived together
+                    self.log_queue.put(f"Client TCP: Received {len(response_data)} bytes of responses: '{response_message[:200]}...'")
+                else:
+                    self.log_queue.put(f"Client TCP: Received response: '{response_message}'")
+        except OSError:
+            pass # Reset by the peer, or closed locally (idle timeout, error or shutdown)
+        if self._disconnect(sock): # Not closed locally: drop it so the writer reconnects
+            self.log_queue.put(f"Client TCP: {self.ip}:{self.port} closed the connection.")
+
+class TcpConnectionPool:
+    """One TcpPeerConnection per destination, created on first send."""
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+        self.connections = {}
+        self.lock = threading.Lock()
+
+    def send(self, ip, port, frame):
+        with self.lock:
+            connection = self.connections.get((ip, port))
+            if connection is None:
+                connection = TcpPeerConnection(ip, port, self.log_queue)
+                self.connections[(ip, port)] = connection
+        connection.send(frame)
+
+    def close_all(self):
+        with self.lock:
+            connections = list(self.connections.values())
+            self.connections.clear()
+        for connection in connections:
+            connection.close()
+        return len(connections)
+
+def make_progress_reporter(message_queue, label, step_percent=10):
+    """Returns a progress callback that posts a log line to message_queue every step_percent, with the average throughput."""
+    start_time = time.monotonic()
+    next_report = [step_percent]
+
+    def report(done_bytes, total_bytes):
+        percent = 100 if total_bytes == 0 else done_bytes * 100 // total_bytes
+        if percent < next_report[0] and done_bytes < total_bytes:
+            return
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        message_queue.put(f"{label}: {percent}% ({done_bytes}/{total_bytes} bytes, {done_bytes / elapsed / 1e6:.1f} MB/s)")
+        next_report[0] = (percent // step_percent + 1) * step_percent
+
+    return report
 
 class NetApp(customtkinter.CTk):
     def __init__(self):
@@ -67,6 +994,9 @@ class NetApp(customtkinter.CTk):
         self.server_log_text = customtkinter.CTkTextbox(self.server_frame, height=150)
         self.server_log_text.grid(row=5, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
 
+        self.stress_test_button = customtkinter.CTkButton(self.server_frame, text=f"UI Stress Test ({STRESS_MESSAGES_PER_SECOND} msg/s)", command=self.toggle_stress_test)
+        self.stress_test_button.grid(row=6, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
+
         # --- Client Frame ---
         self.client_frame = customtkinter.CTkFrame(self)
         self.client_frame.grid(row=0, column=1, padx=10, pady=10, sticky="nsew")
@@ -95,9 +1025,25 @@ class NetApp(customtkinter.CTk):
         self.client_protocol_optionmenu.grid(row=3, column=1, padx=10, pady=5, sticky="ew")
 
         # --- Chat Display Area ---
-        self.chat_display_frame = customtkinter.CTkScrollableFrame(self.client_frame, label_text="Conversation")
+        # Virtualized: a fixed set of bubble widgets shows the visible slice of self.chat_messages
+        self.chat_display_frame = customtkinter.CTkFrame(self.client_frame)
         self.chat_display_frame.grid(row=4, column=0, columnspan=2, padx=10, pady=10, sticky="nsew")
         self.chat_display_frame.grid_columnconfigure(0, weight=1)
+        self.chat_title_label = customtkinter.CTkLabel(self.chat_display_frame, text="Conversation")
+        self.chat_title_label.grid(row=0, column=0, columnspan=2, pady=(5, 0))
+        self.chat_scrollbar = customtkinter.CTkScrollbar(self.chat_display_frame, command=self.on_chat_scroll)
+        self.chat_scrollbar.grid(row=1, column=1, rowspan=CHAT_VISIBLE_BUBBLES, padx=(0, 5), sticky="ns")
+        self.chat_sender_font = customtkinter.CTkFont(size=10)
+        self.chat_text_font = customtkinter.CTkFont(size=12)
+        self.chat_file_font = customtkinter.CTkFont(size=12, weight="bold")
+        self.chat_messages = deque(maxlen=CHAT_VIEW_LIMIT) # (sequence, sender, content, is_self, is_file, time)
+        self.chat_message_count = 0
+        self.chat_view_start = 0 # Index in chat_messages of the top bubble
+        self.chat_follow_latest = True # Stick to the newest message until the user scrolls up
+        self.chat_bubbles = [self._create_chat_bubble(row) for row in range(1, CHAT_VISIBLE_BUBBLES + 1)]
+        self.chat_display_frame.bind("<MouseWheel>", self._on_chat_mousewheel)
+        self.chat_display_frame.bind("<Button-4>", self._on_chat_mousewheel)
+        self.chat_display_frame.bind("<Button-5>", self._on_chat_mousewheel)
 
         # --- Message Input Area ---
         self.message_input_frame = customtkinter.CTkFrame(self.client_frame)
@@ -162,160 +1108,176 @@ class NetApp(customtkinter.CTk):
         self.server_message_queue = queue.Queue() # For server system logs
 
         # Client
-        self.client_socket_tcp = None # Persistent TCP client socket
+        self.client_socket_tcp = None # TCP client socket used for file transfers
         self.client_message_queue = queue.Queue() # For client system logs
+        self.tcp_pool = TcpConnectionPool(self.client_message_queue) # Persistent per-destination connections for text messages
         self.client_socket_lock = threading.Lock() # Protects access to client_socket_tcp
+        self.peer_file_protocol = {} # (ip, port) -> file protocol version, once a peer is known to be v1
 
         # Chat Message Queue (for messages to display in the chat bubble area)
         self.chat_message_queue = queue.Queue()
 
-        # Start periodic checks for message queues (GUI updates from other threads)
-        self.after(100, self.check_server_message_queue)
-        self.after(100, self.check_client_message_queue)
-        self.after(100, self.check_chat_message_queue)
+        # UI stress test
+        self.stress_running = threading.Event()
+        self.ui_stats = {"items": 0, "max_frame": 0.0, "since": time.monotonic()}
+
+        # Single pump for all GUI updates coming from other threads
+        self.after(UI_PUMP_INTERVAL_MS, self.pump_ui_queues)
 
         self.on_client_protocol_change(self.client_protocol_optionmenu.get())
+        self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
     def init_db(self):
-        """Initializes the SQLite database and creates the messages table.
-           Adds conversation_id column if it doesn't exist.
-        """
+        """Opens the chat history store (SQLite in WAL mode with a batching writer thread)."""
         try:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    sender TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    is_self INTEGER NOT NULL,
-                    is_file INTEGER NOT NULL,
-                    protocol TEXT NOT NULL,
-                    direction TEXT NOT NULL,
-                    conversation_id TEXT -- New column
-                )
-            ''')
-            conn.commit()
-            
-            # Add conversation_id column if it doesn't exist (for existing DBs)
-            try:
-                cursor.execute("SELECT conversation_id FROM messages LIMIT 1;")
-            except sqlite3.OperationalError:
-                cursor.execute("ALTER TABLE messages ADD COLUMN conversation_id TEXT;")
-                conn.commit()
-                print("Added 'conversation_id' column to 'messages' table.")
-
-            conn.close()
+            self.message_store = MessageStore(DB_NAME)
             print(f"Database '{DB_NAME}' initialized successfully.")
         except sqlite3.Error as e:
+            self.message_store = None
             print(f"Error initializing database: {e}")
 
     def insert_message_to_db(self, timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id="N/A"):
-        """Inserts a chat message into the SQLite database."""
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO messages (timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (timestamp, sender, content, int(is_self), int(is_file), protocol, direction, conversation_id))
-            conn.commit()
-            conn.close()
-            # print(f"Message saved to DB: {content}") # Uncomment for debugging
-        except sqlite3.Error as e:
-            print(f"Error saving message to database: {e}")
+        """Queues a chat message for the database writer thread."""
+        if self.message_store:
+            self.message_store.insert_message(timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id)
 
-    def get_all_messages_from_db(self):
-        """Fetches all messages from the database."""
-        messages = []
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("SELECT timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id FROM messages ORDER BY timestamp ASC;")
-            messages = cursor.fetchall()
-            conn.close()
-        except sqlite3.Error as e:
-            self.log_client_message(f"Erreur lors de la lecture de la base de données : {e}")
-        return messages
+    def run_history_query(self, query, on_result):
+        """
+        Runs query() on a background thread, so flushing the batching writer, reading, deleting and VACUUM never block
+        the Tk thread, then calls on_result(rows, error) back on the Tk thread with after().
+        rows is what query() returned; error is None or the sqlite3.Error raised.
+        """
+        def worker():
+            try:
+                rows, error = query(), None
+            except sqlite3.Error as e:
+                rows, error = None, e
+            self.after(0, on_result, rows, error)
+
+        threading.Thread(target=worker, daemon=True, name="DB_History_Thread").start()
 
     def save_conversation_to_db(self):
         """
         This function now explicitly states that saving is automatic and shows last 5 entries.
         """
+        if not self.message_store:
+            self.log_client_message("Historique indisponible : la base de données n'a pas pu être ouverte.")
+            return
         self.log_client_message("La conversation est enregistrée automatiquement dans la DB.")
         self.log_client_message(f"Vérifiez le fichier '{DB_NAME}' pour l'historique.")
-        
+
         # For demonstration purposes:
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM messages ORDER BY id DESC LIMIT 5;")
-            last_5_messages = cursor.fetchall()
-            conn.close()
+        def read_last_5():
+            self.message_store.flush()
+            return self.message_store.get_messages_page(limit=5)
+
+        def show_last_5(last_5_messages, error):
+            if error:
+                self.log_client_message(f"Erreur lors de la lecture de la DB : {error}")
+                return
             self.log_client_message("--- Derniers 5 messages de la DB (pour vérification) ---")
             for msg in last_5_messages:
-                # Adjust index if `conversation_id` is the 8th column (index 7)
-                conv_id_display = msg[8] if len(msg) > 8 else "N/A"
-                self.log_client_message(f"[{msg[1]}] {msg[2]} ({'Moi' if msg[4] else 'Autre'}, {'Fichier' if msg[5] else 'Texte'}) [{msg[6]}-{msg[7]}] (Conv ID: {conv_id_display}): {msg[3]}")
+                msg_id, timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id = msg
+                self.log_client_message(f"[{timestamp}] {sender} ({'Moi' if is_self else 'Autre'}, {'Fichier' if is_file else 'Texte'}) [{protocol}-{direction}] (Conv ID: {conversation_id}): {content}")
             self.log_client_message("-------------------------------------------------")
 
-        except sqlite3.Error as e:
-            self.log_client_message(f"Erreur lors de la lecture de la DB : {e}")
+        self.run_history_query(read_last_5, show_last_5)
 
     def view_conversation_history(self):
-        """Opens a new window to display the full conversation history from the DB."""
+        """
+        Opens a new window with the most recent page of the conversation history.
+        Older messages are loaded one page at a time with the "Charger plus ancien" button.
+        Pages are read off the Tk thread; the first read also waits for messages still queued for the writer thread.
+        """
+        if not self.message_store:
+            messagebox.showerror("Erreur", "Historique indisponible : la base de données n'a pas pu être ouverte.")
+            return
         history_window = customtkinter.CTkToplevel(self)
         history_window.title("Historique de Conversation")
         history_window.geometry("700x700") # Slightly wider for new column
         history_window.grid_columnconfigure(0, weight=1)
-        history_window.grid_rowconfigure(0, weight=1)
+        history_window.grid_rowconfigure(1, weight=1)
 
         history_text_display = customtkinter.CTkTextbox(history_window, wrap="word", width=680)
-        history_text_display.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        history_text_display.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
 
-        messages = self.get_all_messages_from_db()
+        oldest_loaded_id = [None] # Cursor: id of the oldest message shown so far
 
-        if not messages:
-            history_text_display.insert("end", "Aucun message enregistré dans l'historique.")
-        else:
-            for msg in messages:
-                # Unpack with conversation_id
-                timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id = msg
-                
-                # Format for display:
-                line = f"[{timestamp}] <{sender}> ({protocol}/{direction}) [Conv ID: {conversation_id}]: "
-                if is_file:
-                    line += f"[FICHIER] {content}\n"
-                else:
-                    line += f"{content}\n"
-                history_text_display.insert("end", line)
-                history_text_display.see("end") # Scroll to bottom
+        def format_message(msg):
+            msg_id, timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id = msg
+            line = f"[{timestamp}] <{sender}> ({protocol}/{direction}) [Conv ID: {conversation_id}]: "
+            if is_file:
+                line += f"[FICHIER] {content}\n"
+            else:
+                line += f"{content}\n"
+            return line
+
+        def show_page(messages, error):
+            if not history_window.winfo_exists(): # Closed while the page was being read
+                return
+            if error:
+                self.log_client_message(f"Erreur lors de la lecture de la base de données : {error}")
+                load_older_button.configure(state="normal", text="Charger plus ancien")
+                return
+            if not messages:
+                load_older_button.configure(state="disabled", text="Début de l'historique")
+                if oldest_loaded_id[0] is None:
+                    history_text_display.insert("end", "Aucun message enregistré dans l'historique.")
+                    history_text_display.configure(state="disabled")
+                return
+            first_page = oldest_loaded_id[0] is None
+            oldest_loaded_id[0] = messages[-1][0]
+            # Rows come newest first; one insert at the top keeps the display in chronological order
+            history_text_display.configure(state="normal")
+            history_text_display.insert("1.0", "".join(format_message(msg) for msg in reversed(messages)))
+            history_text_display.configure(state="disabled") # Make it read-only
+            if first_page:
+                history_text_display.see("end") # Scroll to the most recent message
+            if len(messages) < HISTORY_PAGE_SIZE:
+                load_older_button.configure(state="disabled", text="Début de l'historique")
+            else:
+                load_older_button.configure(state="normal", text="Charger plus ancien")
+
+        def load_older_page():
+            load_older_button.configure(state="disabled", text="Chargement...")
+            before_id = oldest_loaded_id[0]
+
+            def read_page():
+                if before_id is None:
+                    self.message_store.flush() # Include messages still waiting for the writer thread
+                return self.message_store.get_messages_page(before_id=before_id)
+
+            self.run_history_query(read_page, show_page)
 
-        history_text_display.configure(state="disabled") # Make it read-only
+        load_older_button = customtkinter.CTkButton(history_window, text="Charger plus ancien", command=load_older_page)
+        load_older_button.grid(row=0, column=0, pady=5)
+
+        load_older_page()
 
         close_button = customtkinter.CTkButton(history_window, text="Fermer", command=history_window.destroy)
-        close_button.grid(row=1, column=0, pady=5)
+        close_button.grid(row=2, column=0, pady=5)
 
 
     def clear_database(self):
-        """Deletes the SQLite database file and re-initializes it."""
-        if messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir effacer TOUT l'historique de conversation ? Cette action est irréversible."):
-            try:
-                if os.path.exists(DB_NAME):
-                    os.remove(DB_NAME)
-                    self.log_client_message(f"Base de données '{DB_NAME}' supprimée.")
-                
-                self.init_db() # Re-initialize an empty database
-                self.log_client_message("Base de données réinitialisée. L'historique est maintenant vide.")
-                
-                # Clear the current chat display
-                for widget in self.chat_display_frame.winfo_children():
-                    widget.destroy()
-                self.display_chat_message("Système", "Historique de conversation effacé.", False, False, "N/A", "N/A", "N/A") # Updated for conversation_id
+        """Deletes every message from the database."""
+        if not self.message_store:
+            self.log_client_message("Historique indisponible : la base de données n'a pas pu être ouverte.")
+            return
+        if not messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir effacer TOUT l'historique de conversation ? Cette action est irréversible."):
+            return
 
-            except Exception as e:
-                self.log_client_message(f"Erreur lors de l'effacement de la base de données : {e}")
+        def on_cleared(_, error):
+            if error:
+                self.log_client_message(f"Erreur lors de l'effacement de la base de données : {error}")
+                return
+            self.log_client_message(f"Base de données '{DB_NAME}' vidée. L'historique est maintenant vide.")
+            # Clear the current chat display
+            self.chat_messages.clear()
+            self.chat_follow_latest = True
+            self.display_chat_message("Système", "Historique de conversation effacé.", False, False, "N/A", "N/A", "N/A") # Updated for conversation_id
+
+        self.log_client_message("Effacement de l'historique en cours...")
+        self.run_history_query(self.message_store.clear, on_cleared)
 
     def delete_specific_conversation(self):
         """Deletes all messages associated with a specific conversation ID."""
@@ -323,39 +1285,42 @@ class NetApp(customtkinter.CTk):
         if not conv_id_to_delete:
             messagebox.showerror("Erreur", "Veuillez entrer un ID de conversation à supprimer.")
             return
+        if not self.message_store:
+            self.log_client_message("Historique indisponible : la base de données n'a pas pu être ouverte.")
+            return
 
-        if messagebox.askyesno("Confirmation", f"Êtes-vous sûr de vouloir effacer tous les messages pour la conversation '{conv_id_to_delete}' ? Cette action est irréversible."):
-            try:
-                conn = sqlite3.connect(DB_NAME)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id_to_delete,))
-                conn.commit()
-                deleted_rows = cursor.rowcount
-                conn.close()
-                
-                if deleted_rows > 0:
-                    self.log_client_message(f"{deleted_rows} messages pour la conversation '{conv_id_to_delete}' ont été effacés.")
-                    # Optionally, refresh the chat display (could be slow for large history)
-                    # For simplicity, we just log and recommend viewing history.
-                    self.log_client_message("Veuillez rafraîchir l'historique ou redémarrer l'application pour voir les changements.")
-                    # A more robust solution might involve reloading messages into the chat_display_frame if it was intended to show full history live.
-                    # For now, we rely on the "Afficher Historique" button.
-                else:
-                    self.log_client_message(f"Aucun message trouvé pour la conversation '{conv_id_to_delete}'.")
+        if not messagebox.askyesno("Confirmation", f"Êtes-vous sûr de vouloir effacer tous les messages pour la conversation '{conv_id_to_delete}' ? Cette action est irréversible."):
+            return
 
-            except sqlite3.Error as e:
-                self.log_client_message(f"Erreur lors de la suppression de la conversation : {e}")
+        def on_deleted(deleted_rows, error):
+            if error:
+                self.log_client_message(f"Erreur lors de la suppression de la conversation : {error}")
+            elif deleted_rows > 0:
+                self.log_client_message(f"{deleted_rows} messages pour la conversation '{conv_id_to_delete}' ont été effacés.")
+                # Optionally, refresh the chat display (could be slow for large history)
+                # For simplicity, we just log and recommend viewing history.
+                self.log_client_message("Veuillez rafraîchir l'historique ou redémarrer l'application pour voir les changements.")
+            else:
+                self.log_client_message(f"Aucun message trouvé pour la conversation '{conv_id_to_delete}'.")
+
+        self.run_history_query(lambda: self.message_store.delete_conversation(conv_id_to_delete), on_deleted)
+
+    def on_closing(self):
+        """Commits pending history and closes connections before the window is destroyed."""
+        self.tcp_pool.close_all()
+        if self.message_store:
+            self.message_store.close()
+        self.destroy()
 
 
     def on_client_protocol_change(self, choice):
         """Adjusts client behavior based on selected protocol."""
         if choice == "TCP":
-            with self.client_socket_lock:
-                if self.client_socket_tcp:
-                    self.log_client_message("Existing TCP connection can be used to send text/file.")
-                else:
-                    self.log_client_message("No active TCP connection. Sending text/file will attempt to connect.")
+            self.log_client_message("TCP text messages reuse one persistent connection per destination, opened on first send.")
         elif choice == "UDP":
+            closed = self.tcp_pool.close_all()
+            if closed:
+                self.log_client_message(f"{closed} pooled TCP connection(s) closed as protocol changed to UDP.")
             with self.client_socket_lock:
                 if self.client_socket_tcp:
                     try:
@@ -366,14 +1331,33 @@ class NetApp(customtkinter.CTk):
                         self.log_client_message(f"Error closing TCP socket: {e}")
 
     def log_server_message(self, message):
-        """Displays a message in the server log area."""
-        self.server_log_text.insert("end", message + "\n")
-        self.server_log_text.see("end")
+        """Displays a message (one or more lines) in the server log area."""
+        self._append_to_log(self.server_log_text, message)
 
     def log_client_message(self, message):
-        """Displays a message in the client log area."""
-        self.client_log_text.insert("end", message + "\n")
-        self.client_log_text.see("end")
+        """Displays a message (one or more lines) in the client log area."""
+        self._append_to_log(self.client_log_text, message)
+
+    def _append_to_log(self, log_text, message):
+        """Inserts text at the end of a log box, dropping the oldest lines beyond LOG_MAX_LINES."""
+        log_text.insert("end", message + "\n")
+        line_count = int(log_text.index("end-1c").split(".")[0])
+        if line_count > LOG_MAX_LINES:
+            log_text.delete("1.0", f"{line_count - LOG_MAX_LINES}.0")
+        log_text.see("end")
+
+    def _create_chat_bubble(self, row):
+        """Creates one reusable bubble widget of the virtualized chat view (hidden until it shows a message)."""
+        bubble_frame = customtkinter.CTkFrame(self.chat_display_frame, corner_radius=10)
+        sender_info_label = customtkinter.CTkLabel(bubble_frame, text="", font=self.chat_sender_font, text_color="gray")
+        sender_info_label.pack(anchor="nw", padx=8, pady=(5, 0))
+        message_label = customtkinter.CTkLabel(bubble_frame, text="", font=self.chat_text_font, wraplength=300, justify="left")
+        message_label.pack(anchor="nw", padx=8, pady=(0, 5))
+        for widget in (bubble_frame, sender_info_label, message_label):
+            widget.bind("<MouseWheel>", self._on_chat_mousewheel)
+            widget.bind("<Button-4>", self._on_chat_mousewheel)
+            widget.bind("<Button-5>", self._on_chat_mousewheel)
+        return {"frame": bubble_frame, "sender": sender_info_label, "message": message_label, "row": row, "shown": None}
 
     def display_chat_message(self, sender, message_content, is_self=False, is_file=False, protocol="N/A", direction="N/A", conversation_id="N/A"):
         """
@@ -386,78 +1370,151 @@ class NetApp(customtkinter.CTk):
         :param direction: 'sent' or 'received'.
         :param conversation_id: ID of the conversation this message belongs to (e.g., target IP).
         """
-        timestamp_db = datetime.now().strftime("%Y-%m-%d %H:%M:%S") # More precise timestamp for DB
-        timestamp_display = datetime.now().strftime("%H:%M") # Shorter timestamp for GUI
+        self._add_chat_message(sender, message_content, is_self, is_file, protocol, direction, conversation_id)
+        self.render_chat_view()
 
-        bubble_frame = customtkinter.CTkFrame(self.chat_display_frame, corner_radius=10)
-        
-        if is_self:
-            bubble_frame.configure(fg_color=("#D9FDD3", "#226B52")) # Light green for sent
-            bubble_frame.grid(row=len(self.chat_display_frame.winfo_children()), column=1, pady=2, padx=5, sticky="e")
-            self.chat_display_frame.grid_columnconfigure(0, weight=1)
-            self.chat_display_frame.grid_columnconfigure(1, weight=0)
-        else:
-            bubble_frame.configure(fg_color=("#F0F0F0", "#333333")) # Light gray for received
-            bubble_frame.grid(row=len(self.chat_display_frame.winfo_children()), column=0, pady=2, padx=5, sticky="w")
-            self.chat_display_frame.grid_columnconfigure(0, weight=0)
-            self.chat_display_frame.grid_columnconfigure(1, weight=1)
-
-        sender_info_label = customtkinter.CTkLabel(bubble_frame, 
-                                                 text=f"{sender} - {timestamp_display}", 
-                                                 font=customtkinter.CTkFont(size=10),
-                                                 text_color="gray")
-        sender_info_label.pack(anchor="nw", padx=8, pady=(5, 0))
-
-        if is_file:
-            message_label = customtkinter.CTkLabel(bubble_frame, 
-                                                   text=f"Fichier: {message_content}", 
-                                                   font=customtkinter.CTkFont(size=12, weight="bold"),
-                                                   wraplength=300)
-        else:
-            message_label = customtkinter.CTkLabel(bubble_frame, 
-                                                   text=message_content, 
-                                                   font=customtkinter.CTkFont(size=12),
-                                                   wraplength=300)
-
-        message_label.pack(anchor="nw", padx=8, pady=(0, 5))
-        
-        self.chat_display_frame.update_idletasks()
-        self.chat_display_frame._parent_canvas.yview_moveto(1.0)
+    def _add_chat_message(self, sender, message_content, is_self, is_file, protocol, direction, conversation_id):
+        """Adds a message to the chat view model and queues it for the DB, without touching any widget."""
+        now = datetime.now()
+        if len(self.chat_messages) == self.chat_messages.maxlen and not self.chat_follow_latest:
+            self.chat_view_start = max(0, self.chat_view_start - 1) # The oldest message is about to drop off
+        self.chat_message_count += 1
+        self.chat_messages.append((self.chat_message_count, sender, message_content, is_self, is_file, now.strftime("%H:%M")))
 
         # Save message to DB
-        self.insert_message_to_db(timestamp_db, sender, message_content, is_self, is_file, protocol, direction, conversation_id)
-
-
-    def check_server_message_queue(self):
-        """Periodically checks the server system log message queue."""
-        try:
-            while True:
-                message = self.server_message_queue.get_nowait()
-                self.log_server_message(message)
-        except queue.Empty:
-            pass
-        self.after(100, self.check_server_message_queue)
+        if conversation_id != STRESS_CONVERSATION_ID:
+            self.insert_message_to_db(now.strftime("%Y-%m-%d %H:%M:%S"), sender, message_content, is_self, is_file, protocol, direction, conversation_id)
+
+    def render_chat_view(self):
+        """Shows the visible slice of chat_messages in the bubble widgets, only reconfiguring bubbles whose message changed."""
+        total = len(self.chat_messages)
+        if self.chat_follow_latest:
+            self.chat_view_start = max(0, total - CHAT_VISIBLE_BUBBLES)
+
+        for offset, bubble in enumerate(self.chat_bubbles):
+            index = self.chat_view_start + offset
+            if index >= total:
+                if bubble["shown"] is not None:
+                    bubble["frame"].grid_remove()
+                    bubble["shown"] = None
+                continue
+
+            sequence, sender, message_content, is_self, is_file, timestamp_display = self.chat_messages[index]
+            if bubble["shown"] == sequence:
+                continue
+            bubble["shown"] = sequence
+            if is_self:
+                bubble["frame"].configure(fg_color=("#D9FDD3", "#226B52")) # Light green for sent
+            else:
+                bubble["frame"].configure(fg_color=("#F0F0F0", "#333333")) # Light gray for received
+            bubble["sender"].configure(text=f"{sender} - {timestamp_display}")
+            if is_file:
+                bubble["message"].configure(text=f"Fichier: {message_content}", font=self.chat_file_font)
+            else:
+                bubble["message"].configure(text=message_content, font=self.chat_text_font)
+            bubble["frame"].grid(row=bubble["row"], column=0, pady=2, padx=5, sticky="e" if is_self else "w")
 
-    def check_client_message_queue(self):
-        """Periodically checks the client system log message queue."""
+        if total:
+            self.chat_scrollbar.set(self.chat_view_start / total, min(1.0, (self.chat_view_start + CHAT_VISIBLE_BUBBLES) / total))
+        else:
+            self.chat_scrollbar.set(0.0, 1.0)
+
+    def _scroll_chat_to(self, start):
+        last_start = max(0, len(self.chat_messages) - CHAT_VISIBLE_BUBBLES)
+        self.chat_view_start = min(max(0, start), last_start)
+        self.chat_follow_latest = self.chat_view_start >= last_start
+        self.render_chat_view()
+
+    def on_chat_scroll(self, action, amount, unit="units"):
+        """Scrollbar command: 'moveto' a fraction of the messages, or 'scroll' by messages ('units') or screens ('pages')."""
+        if action == "moveto":
+            self._scroll_chat_to(int(float(amount) * len(self.chat_messages)))
+        elif action == "scroll":
+            step = int(float(amount)) * (CHAT_VISIBLE_BUBBLES if unit == "pages" else 1)
+            self._scroll_chat_to(self.chat_view_start + step)
+
+    def _on_chat_mousewheel(self, event):
+        scroll_up = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+        self._scroll_chat_to(self.chat_view_start + (-3 if scroll_up else 3))
+
+    def _drain_queue(self, message_queue, max_items):
+        items = []
         try:
-            while True:
-                message = self.client_message_queue.get_nowait()
-                self.log_client_message(message)
+            while len(items) < max_items:
+                items.append(message_queue.get_nowait())
         except queue.Empty:
             pass
-        self.after(100, self.check_client_message_queue)
+        return items
 
-    def check_chat_message_queue(self):
-        """Periodically checks the chat message queue for displaying in bubbles."""
-        try:
-            while True:
-                # Unpack with conversation_id
-                sender, message_content, is_self, is_file, protocol, direction, conversation_id = self.chat_message_queue.get_nowait()
-                self.display_chat_message(sender, message_content, is_self, is_file, protocol, direction, conversation_id)
-        except queue.Empty:
-            pass
-        self.after(100, self.check_chat_message_queue)
+    def pump_ui_queues(self):
+        """
+        Single GUI update loop for the server log, client log and chat queues.
+        Drains them in turn for at most UI_FRAME_BUDGET, then writes each log with one insert and redraws the chat view once.
+        Anything left over is handled on the next tick, which comes sooner when there is a backlog.
+        """
+        frame_start = time.perf_counter()
+        deadline = frame_start + UI_FRAME_BUDGET
+        server_lines, client_lines = [], []
+        chat_added = False
+        backlog = True
+        while time.perf_counter() < deadline:
+            server_batch = self._drain_queue(self.server_message_queue, UI_DRAIN_BATCH)
+            client_batch = self._drain_queue(self.client_message_queue, UI_DRAIN_BATCH)
+            chat_batch = self._drain_queue(self.chat_message_queue, UI_DRAIN_BATCH)
+            if not (server_batch or client_batch or chat_batch):
+                backlog = False
+                break
+            server_lines.extend(server_batch)
+            client_lines.extend(client_batch)
+            for sender, message_content, is_self, is_file, protocol, direction, conversation_id in chat_batch:
+                self._add_chat_message(sender, message_content, is_self, is_file, protocol, direction, conversation_id)
+            chat_added = chat_added or bool(chat_batch)
+            self.ui_stats["items"] += len(server_batch) + len(client_batch) + len(chat_batch)
+
+        if server_lines:
+            self.log_server_message("\n".join(server_lines))
+        if client_lines:
+            self.log_client_message("\n".join(client_lines))
+        if chat_added:
+            self.render_chat_view()
+
+        self.ui_stats["max_frame"] = max(self.ui_stats["max_frame"], time.perf_counter() - frame_start)
+        self._report_ui_stats()
+        self.after(10 if backlog else UI_PUMP_INTERVAL_MS, self.pump_ui_queues)
+
+    def _report_ui_stats(self):
+        """While the stress test runs, logs once per second how much the pump handled and its slowest frame."""
+        elapsed = time.monotonic() - self.ui_stats["since"]
+        if elapsed < 1.0:
+            return
+        if self.stress_running.is_set():
+            backlog = self.server_message_queue.qsize() + self.client_message_queue.qsize() + self.chat_message_queue.qsize()
+            self.log_server_message(f"UI pump: {self.ui_stats['items'] / elapsed:.0f} items/s, slowest frame {self.ui_stats['max_frame'] * 1000:.1f} ms, backlog {backlog}")
+        self.ui_stats = {"items": 0, "max_frame": 0.0, "since": time.monotonic()}
+
+    def toggle_stress_test(self):
+        """Starts/stops a thread that floods the chat and server log queues to check that the window stays responsive."""
+        if self.stress_running.is_set():
+            self.stress_running.clear()
+            self.stress_test_button.configure(text=f"UI Stress Test ({STRESS_MESSAGES_PER_SECOND} msg/s)")
+        else:
+            self.stress_running.set()
+            threading.Thread(target=self._inject_stress_messages, daemon=True, name="UI_Stress_Test_Thread").start()
+            self.stress_test_button.configure(text="Stop UI Stress Test")
+
+    def _inject_stress_messages(self):
+        tick = 0.01
+        per_tick = int(STRESS_MESSAGES_PER_SECOND * tick)
+        next_tick = time.monotonic()
+        count = 0
+        while self.stress_running.is_set():
+            for _ in range(per_tick):
+                count += 1
+                self.chat_message_queue.put(("Stress", f"Message de test {count}", count % 2 == 0, False, "TCP", "received", STRESS_CONVERSATION_ID))
+                if count % 10 == 0:
+                    self.server_message_queue.put(f"[Stress] {count} messages injected")
+            next_tick += tick
+            time.sleep(max(0.0, next_tick - time.monotonic()))
 
     # --- Server Logic ---
 
@@ -506,41 +1563,165 @@ class NetApp(customtkinter.CTk):
         self.stop_server_button.configure(state="disabled")
 
     def run_tcp_server(self, ip, port):
-        """TCP server listener logic."""
+        """
+        TCP server event loop: one thread multiplexes every connection with selectors.
+        Text messages are framed from a per-connection buffer and answered through a per-connection output buffer.
+        A peer whose unsent responses exceed TCP_MAX_PENDING_OUTPUT is not read until it catches up (backpressure),
+        and accepting pauses at TCP_MAX_CONNECTIONS. File transfers, which block on disk I/O, are handed to a small worker pool;
+        while every worker is busy, further transfers stay unread in the event loop until one is free.
+        """
         sock = None
+        selector = selectors.DefaultSelector()
+        file_workers = _TcpFileWorkers(self.handle_tcp_client)
+        connections = {} # socket -> _TcpConnection
+        read_buffer = memoryview(bytearray(TCP_READ_SIZE))
+        accepting = False
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             sock.bind((ip, port))
-            sock.listen(5)
+            sock.listen(socket.SOMAXCONN)
+            sock.setblocking(False)
             self.server_message_queue.put(f"TCP Server listening on {ip}:{port}")
-            sock.settimeout(1.0)
 
             while self.server_running.is_set():
-                try:
-                    conn, addr = sock.accept()
-                    self.server_message_queue.put(f"TCP connection accepted from {addr}")
-                    client_handler_thread = threading.Thread(target=self.handle_tcp_client, args=(conn, addr))
-                    client_handler_thread.daemon = True
-                    client_handler_thread.start()
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    self.server_message_queue.put(f"TCP Server Listener Error: {e}")
-                    break
+                if not accepting and len(connections) < TCP_MAX_CONNECTIONS:
+                    selector.register(sock, selectors.EVENT_READ, None)
+                    accepting = True
+                while file_workers.waiting and file_workers.submit(file_workers.waiting[0]):
+                    del connections[file_workers.waiting.popleft().sock]
+
+                for key, mask in selector.select(timeout=0.05 if file_workers.waiting else 0.5):
+                    if key.data is None:
+                        accepting = self._accept_tcp_connections(sock, selector, connections)
+                        continue
+                    connection = key.data
+                    try:
+                        if mask & selectors.EVENT_WRITE:
+                            self._flush_tcp_connection(connection)
+                        if mask & selectors.EVENT_READ:
+                            n_bytes = connection.sock.recv_into(read_buffer)
+                            if n_bytes == 0:
+                                self.server_message_queue.put(f"TCP Client {connection.addr} disconnected.")
+                                self._close_tcp_connection(connection, selector, connections)
+                                continue
+                            connection.in_buffer += read_buffer[:n_bytes]
+                        if connection.in_buffer:
+                            # Also resumes frames left unparsed while the peer was too slow to read responses
+                            self._process_tcp_frames(connection, selector, connections, file_workers)
+                        if connection.sock in connections and connection.events:
+                            self._update_tcp_interest(connection, selector)
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                    except Exception as e:
+                        self.server_message_queue.put(f"Error handling TCP client {connection.addr}: {e}")
+                        self._close_tcp_connection(connection, selector, connections)
 
         except Exception as e:
             self.server_message_queue.put(f"Failed to start TCP Server: {e}")
         finally:
+            for connection in list(connections.values()):
+                self._close_tcp_connection(connection, selector, connections)
+            selector.close()
+            file_workers.shutdown()
             if sock:
                 sock.close()
                 self.server_message_queue.put("TCP Server socket closed.")
             self.server_running.clear()
 
-    def handle_tcp_client(self, conn, addr):
-        """Handles a single TCP client connection."""
+    def _accept_tcp_connections(self, sock, selector, connections):
+        """Accepts every pending connection. Returns False (and stops listening) once TCP_MAX_CONNECTIONS is reached."""
+        while len(connections) < TCP_MAX_CONNECTIONS:
+            try:
+                conn, addr = sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return True
+            conn.setblocking(False)
+            connection = _TcpConnection(conn, addr)
+            connections[conn] = connection
+            selector.register(conn, selectors.EVENT_READ, connection)
+            self.server_message_queue.put(f"TCP connection accepted from {addr}")
+        self.server_message_queue.put(f"TCP Server: {TCP_MAX_CONNECTIONS} connections open, new connections wait in the backlog.")
+        selector.unregister(sock)
+        return False
+
+    def _process_tcp_frames(self, connection, selector, connections, file_workers):
+        """Handles every complete message in connection.in_buffer, queuing responses in connection.out_buffer."""
+        in_buffer = connection.in_buffer
+        consumed = 0
+        while consumed < len(in_buffer) and len(connection.out_buffer) < TCP_MAX_PENDING_OUTPUT:
+            msg_type = in_buffer[consumed]
+            if msg_type == MSG_TYPE_TEXT:
+                if len(in_buffer) - consumed < 3:
+                    break
+                msg_len = struct.unpack_from("!H", in_buffer, consumed + 1)[0]
+                if len(in_buffer) - consumed < 3 + msg_len:
+                    break
+                message_received = in_buffer[consumed + 3:consumed + 3 + msg_len].decode('utf-8')
+                consumed += 3 + msg_len
+                connection.out_buffer += self._on_tcp_text_message(connection.addr, message_received)
+            elif msg_type in (MSG_TYPE_FILE, MSG_TYPE_FILE_V2):
+                # File bodies are streamed to disk by a blocking worker, starting with the bytes already buffered here
+                # and after the responses still unsent
+                del in_buffer[:consumed]
+                self._flush_tcp_connection(connection)
+                selector.unregister(connection.sock)
+                connection.events = 0
+                if file_workers.submit(connection):
+                    del connections[connection.sock]
+                else:
+                    self.server_message_queue.put(f"TCP Server: all {file_workers.max_workers} file workers busy, file from {connection.addr} waits.")
+                    file_workers.waiting.append(connection)
+                return
+            else:
+                self.server_message_queue.put(f"Unknown message type ({msg_type}) from {connection.addr}")
+                self._close_tcp_connection(connection, selector, connections)
+                return
+        del in_buffer[:consumed]
+        self._flush_tcp_connection(connection)
+
+    def _flush_tcp_connection(self, connection):
+        """Sends as much of connection.out_buffer as the socket accepts without blocking."""
+        if connection.out_buffer:
+            try:
+                sent = connection.sock.send(connection.out_buffer)
+                del connection.out_buffer[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+
+    def _update_tcp_interest(self, connection, selector):
+        """Waits for writability while responses are pending, and stops reading while too many are (backpressure)."""
+        events = selectors.EVENT_READ
+        if connection.out_buffer:
+            events |= selectors.EVENT_WRITE
+            if len(connection.out_buffer) >= TCP_MAX_PENDING_OUTPUT:
+                events = selectors.EVENT_WRITE
+        if events != connection.events:
+            selector.modify(connection.sock, events, connection)
+            connection.events = events
+
+    def _close_tcp_connection(self, connection, selector, connections):
+        if connections.pop(connection.sock, None) is not None and connection.events:
+            selector.unregister(connection.sock)
+        connection.sock.close()
+        self.server_message_queue.put(f"TCP client handler for {connection.addr} terminated.")
+
+    def _on_tcp_text_message(self, addr, message_received):
+        """Logs and displays a received text message. Returns the response to send back."""
+        self.server_message_queue.put(f"[TCP] Received text from {addr}: '{message_received}'")
+        self.chat_message_queue.put((f"Client {addr[0]}:{addr[1]}", message_received, False, False, "TCP", "received", addr[0]))
+        return f"Serveur TCP a reçu texte: '{message_received}'".encode('utf-8')
+
+    def handle_tcp_client(self, conn, addr, pending_output=b""):
+        """
+        Handles a single TCP client connection with blocking I/O. Runs on a file worker once a file transfer starts;
+        pending_output holds the responses the event loop had not sent yet.
+        """
+        recv_buffer = memoryview(bytearray(FILE_RECV_BUFFER_SIZE)) # Reused for every file received on this connection
         try:
             with conn:
+                if pending_output:
+                    conn.sendall(pending_output)
                 while self.server_running.is_set():
                     msg_type_byte = conn.recv(1)
                     if not msg_type_byte:
@@ -563,10 +1744,7 @@ class NetApp(customtkinter.CTk):
                             break
                         
                         message_received = data.decode('utf-8')
-                        self.server_message_queue.put(f"[TCP] Received text from {addr}: '{message_received}'")
-                        self.chat_message_queue.put((f"Client {addr[0]}:{addr[1]}", message_received, False, False, "TCP", "received", conversation_id)) # Added conversation_id
-                        response = f"Serveur TCP a reçu texte: '{message_received}'".encode('utf-8')
-                        conn.sendall(response)
+                        conn.sendall(self._on_tcp_text_message(addr, message_received))
 
                     elif msg_type == MSG_TYPE_FILE:
                         file_header_rest = self.receive_all(conn, FILE_HEADER_SIZE - 1)
@@ -585,25 +1763,18 @@ class NetApp(customtkinter.CTk):
                         self.server_message_queue.put(f"[TCP] Receiving file '{file_name}' ({file_size} bytes) from {addr}...")
                         self.chat_message_queue.put((f"Client {addr[0]}:{addr[1]}", file_name, False, True, "TCP", "received", conversation_id)) # Added conversation_id
 
-                        received_bytes = 0
                         output_filepath = os.path.join("received_files", os.path.basename(file_name))
                         os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
 
                         try:
-                            with open(output_filepath, 'wb') as f:
-                                while received_bytes < file_size:
-                                    chunk_size = min(file_size - received_bytes, TCP_CHUNK_SIZE)
-                                    chunk = conn.recv(chunk_size)
-                                    if not chunk:
-                                        self.server_message_queue.put(f"Error: Connection interrupted while receiving '{file_name}' from {addr}")
-                                        break
-                                    f.write(chunk)
-                                    received_bytes += len(chunk)
+                            progress = make_progress_reporter(self.server_message_queue, f"[TCP] Receiving '{file_name}'")
+                            received_bytes = receive_file_stream(conn, output_filepath, file_size, progress, recv_buffer)
                             
                             if received_bytes == file_size:
                                 self.server_message_queue.put(f"[TCP] File '{file_name}' received and saved to '{output_filepath}'.")
                                 conn.sendall(b"File received successfully.")
                             else:
+                                self.server_message_queue.put(f"Error: Connection interrupted while receiving '{file_name}' from {addr}")
                                 self.server_message_queue.put(f"Error: Incomplete file '{file_name}' from {addr}. Received {received_bytes}/{file_size} bytes.")
                                 conn.sendall(b"Error: Incomplete file received.")
                         except Exception as file_e:
@@ -611,6 +1782,10 @@ class NetApp(customtkinter.CTk):
                             conn.sendall(b"Server error during file reception.")
                         break
 
+                    elif msg_type == MSG_TYPE_FILE_V2:
+                        self.receive_file_v2(conn, addr, conversation_id)
+                        break
+
                     else:
                         self.server_message_queue.put(f"Unknown message type ({msg_type}) from {addr}")
                         conn.recv(4096)
@@ -621,6 +1796,60 @@ class NetApp(customtkinter.CTk):
         finally:
             self.server_message_queue.put(f"TCP client handler for {addr} terminated.")
 
+    def receive_file_v2(self, conn, addr, conversation_id):
+        """
+        Handles a resumable v2 file transfer: replies with the last verified offset of any partial copy,
+        receives CRC32-checked chunks from there and moves the completed file into received_files.
+        """
+        file_header_rest = self.receive_all(conn, FILE_V2_HEADER_SIZE - 1)
+        if not file_header_rest:
+            self.server_message_queue.put(f"Error: Incomplete file header from {addr}")
+            return
+
+        version, file_name_len, file_size, chunk_size, transfer_id = struct.unpack("!BHQI16s", file_header_rest)
+        file_name_bytes = self.receive_all(conn, file_name_len)
+        if not file_name_bytes:
+            self.server_message_queue.put(f"Error: Incomplete filename from {addr}")
+            return
+        file_name = file_name_bytes.decode('utf-8')
+
+        if version > FILE_PROTOCOL_VERSION or not 0 < chunk_size <= FILE_V2_MAX_CHUNK_SIZE:
+            self.server_message_queue.put(f"Error: Unsupported file transfer (v{version}, chunk {chunk_size} bytes) from {addr}")
+            conn.sendall(struct.pack(FILE_V2_REPLY_FORMAT, FILE_STATUS_ERROR, 0))
+            return
+
+        output_filepath = os.path.join("received_files", os.path.basename(file_name))
+        os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
+        part_path, offset_path = partial_file_paths(os.path.dirname(output_filepath), transfer_id)
+        verified_offset = read_verified_offset(part_path, offset_path, file_size)
+
+        if verified_offset > 0:
+            self.server_message_queue.put(f"[TCP] Resuming file '{file_name}' from {addr} at {verified_offset}/{file_size} bytes...")
+        else:
+            self.server_message_queue.put(f"[TCP] Receiving file '{file_name}' ({file_size} bytes) from {addr}...")
+            self.chat_message_queue.put((f"Client {addr[0]}:{addr[1]}", file_name, False, True, "TCP", "received", conversation_id))
+        conn.sendall(struct.pack(FILE_V2_REPLY_FORMAT, FILE_STATUS_READY, verified_offset))
+
+        try:
+            progress = make_progress_reporter(self.server_message_queue, f"[TCP] Receiving '{file_name}'")
+            status, verified_offset = receive_file_chunks(conn, part_path, offset_path, file_size, chunk_size, verified_offset, progress)
+
+            if status == FILE_STATUS_COMPLETE:
+                os.replace(part_path, output_filepath)
+                os.remove(offset_path)
+                self.server_message_queue.put(f"[TCP] File '{file_name}' received and saved to '{output_filepath}'.")
+            elif status is None:
+                self.server_message_queue.put(f"Connection interrupted while receiving '{file_name}' from {addr}. Kept {verified_offset}/{file_size} verified bytes for resume.")
+                return
+            elif status == FILE_STATUS_CHECKSUM_ERROR:
+                self.server_message_queue.put(f"Error: Checksum mismatch in '{file_name}' from {addr} at offset {verified_offset}. Asking for a resend.")
+            else:
+                self.server_message_queue.put(f"Error: Unexpected chunk in '{file_name}' from {addr} at offset {verified_offset}.")
+            conn.sendall(struct.pack(FILE_V2_REPLY_FORMAT, status, verified_offset))
+        except Exception as file_e:
+            self.server_message_queue.put(f"Error saving file '{file_name}': {file_e}")
+            conn.sendall(struct.pack(FILE_V2_REPLY_FORMAT, FILE_STATUS_ERROR, verified_offset))
+
     def receive_all(self, sock, n_bytes):
         """Helper to ensure all n_bytes are received from a TCP socket."""
         data = b''
@@ -636,9 +1865,11 @@ class NetApp(customtkinter.CTk):
         sock = None
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_SOCKET_BUFFER_SIZE)
             sock.bind((ip, port))
             self.server_message_queue.put(f"UDP Server listening on {ip}:{port}")
-            sock.settimeout(1.0)
+            sock.settimeout(UDP_FEEDBACK_INTERVAL) # Short, so tick() keeps transfer feedback flowing
+            file_receiver = UdpFileReceiver(sock, "received_files", self.on_udp_file_event)
 
             while self.server_running.is_set():
                 try:
@@ -649,6 +1880,11 @@ class NetApp(customtkinter.CTk):
                         continue
 
                     msg_type = struct.unpack("!B", data[0:1])[0]
+
+                    if msg_type in (MSG_TYPE_UDP_FILE_START, MSG_TYPE_UDP_FILE_DATA):
+                        file_receiver.handle_datagram(data, addr)
+                        file_receiver.tick()
+                        continue
                     payload = data[1:]
 
                     # For received messages, conversation_id can be the sender's IP
@@ -703,6 +1939,7 @@ class NetApp(customtkinter.CTk):
                         self.server_message_queue.put(f"Unknown UDP message type ({msg_type}) from {addr}")
 
                 except socket.timeout:
+                    file_receiver.tick()
                     continue
                 except Exception as e:
                     self.server_message_queue.put(f"UDP Server Error: {e}")
@@ -716,6 +1953,18 @@ class NetApp(customtkinter.CTk):
                 self.server_message_queue.put("UDP Server socket closed.")
             self.server_running.clear()
 
+    def on_udp_file_event(self, event, addr, file_name, detail):
+        """Reports reliable UDP transfer events from UdpFileReceiver to the server log and the chat."""
+        if event == "started":
+            self.server_message_queue.put(f"[UDP] Receiving file '{file_name}' ({detail} bytes) from {addr}...")
+            self.chat_message_queue.put((f"Client {addr[0]}:{addr[1]}", file_name, False, True, "UDP", "received", addr[0]))
+        elif event == "completed":
+            self.server_message_queue.put(f"[UDP] File '{file_name}' received and saved to '{detail}'.")
+        elif event == "failed":
+            self.server_message_queue.put(f"Error: UDP transfer of '{file_name}' from {addr} timed out after {detail} bytes.")
+        elif event == "rejected":
+            self.server_message_queue.put(f"Error: UDP transfer of '{file_name}' from {addr} refused ({detail}).")
+
     # --- Client Logic ---
 
     def browse_file(self):
@@ -753,8 +2002,11 @@ class NetApp(customtkinter.CTk):
         self.message_to_send_entry.delete(0, customtkinter.END) # Clear input field
 
         if client_type == "TCP":
-            thread_args = (target_ip, target_port, message.encode('utf-8'), MSG_TYPE_TEXT)
-            threading.Thread(target=self._send_tcp_data_with_header, args=thread_args, daemon=True, name="TCP_Client_Send_Text_Thread").start()
+            text_bytes = message.encode('utf-8')
+            if len(text_bytes) > 65535:
+                self.log_client_message("Error: Text message too long for protocol (>65535 bytes).")
+                return
+            self.tcp_pool.send(target_ip, target_port, struct.pack("!BH", MSG_TYPE_TEXT, len(text_bytes)) + text_bytes)
         elif client_type == "UDP":
             thread_args = (target_ip, target_port, message.encode('utf-8'), MSG_TYPE_TEXT)
             threading.Thread(target=self._send_udp_data_with_header, args=thread_args, daemon=True, name="UDP_Client_Send_Text_Thread").start()
@@ -771,8 +2023,7 @@ class NetApp(customtkinter.CTk):
         client_type = self.client_protocol_optionmenu.get()
 
         try:
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
+            file_size = os.path.getsize(file_path) # The file itself is streamed later, never read whole
             file_name = os.path.basename(file_path)
             
             # Determine sender label and protocol for DB
@@ -793,69 +2044,168 @@ class NetApp(customtkinter.CTk):
             if len(file_name_bytes) > 65535:
                 self.log_client_message("Error: Filename too long.")
                 return
-            if len(file_content) > 0xFFFFFFFF:
-                 self.client_message_queue.put("Error: File too large for current protocol (>4GB).")
-                 return
-
-            file_header = struct.pack(FILE_HEADER_FORMAT, MSG_TYPE_FILE, len(file_name_bytes), len(file_content))
-            data_to_send = file_header + file_name_bytes + file_content
 
             if client_type == "TCP":
-                thread_args = (target_ip, target_port, data_to_send, MSG_TYPE_FILE, file_name)
-                threading.Thread(target=self._send_tcp_data_with_header, args=thread_args, daemon=True, name="TCP_Client_Send_File_Thread").start()
+                thread_args = (target_ip, target_port, file_path, file_size, file_name)
+                threading.Thread(target=self._send_tcp_file_stream, args=thread_args, daemon=True, name="TCP_Client_Send_File_Thread").start()
             elif client_type == "UDP":
-                thread_args = (target_ip, target_port, data_to_send, MSG_TYPE_FILE, file_name)
-                threading.Thread(target=self._send_udp_data_with_header, args=thread_args, daemon=True, name="UDP_Client_Send_File_Thread").start()
+                thread_args = (target_ip, target_port, file_path, file_size, file_name)
+                threading.Thread(target=self._send_udp_file, args=thread_args, daemon=True, name="UDP_Client_Send_File_Thread").start()
 
         except Exception as e:
             self.log_client_message(f"Error preparing file: {e}")
 
 
-    def _send_tcp_data_with_header(self, ip, port, data_to_send, msg_type, file_name=None):
-        """Handles sending data via TCP (text or file) including connection management."""
+    def _connect_tcp_client(self, ip, port):
+        """Opens self.client_socket_tcp if needed. Must be called with client_socket_lock held. Returns True when connected."""
+        if self.client_socket_tcp is not None:
+            return True
+        try:
+            self.client_socket_tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.client_socket_tcp.settimeout(10.0)
+            self.client_message_queue.put(f"Client TCP: Attempting to connect to {ip}:{port}...")
+            self.client_socket_tcp.connect((ip, port))
+            self.client_message_queue.put(f"Client TCP: Connected to {ip}:{port}")
+            return True
+        except socket.timeout:
+            self.client_message_queue.put(f"Client TCP: Connection failed (timeout) to {ip}:{port}")
+        except Exception as e:
+            self.client_message_queue.put(f"Client TCP: Connection error: {e}")
+        self.client_socket_tcp = None
+        return False
+
+    def _send_tcp_file_stream(self, ip, port, file_path, file_size, file_name):
+        """Sends a file over TCP with the resumable v2 protocol, falling back to v1 for peers that don't support it."""
         with self.client_socket_lock:
-            if self.client_socket_tcp is None:
-                try:
-                    self.client_socket_tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    self.client_socket_tcp.settimeout(10.0)
-                    self.client_message_queue.put(f"Client TCP: Attempting to connect to {ip}:{port}...")
-                    self.client_socket_tcp.connect((ip, port))
-                    self.client_message_queue.put(f"Client TCP: Connected to {ip}:{port}")
-                except socket.timeout:
-                    self.client_message_queue.put(f"Client TCP: Connection failed (timeout) to {ip}:{port}")
-                    self.client_socket_tcp = None
-                    return
-                except Exception as e:
-                    self.client_message_queue.put(f"Client TCP: Connection error: {e}")
-                    self.client_socket_tcp = None
+            peer = (ip, port)
+            if self.peer_file_protocol.get(peer, FILE_PROTOCOL_VERSION) >= 2:
+                if self._send_file_v2(ip, port, file_path, file_size, file_name):
                     return
-            
-            try:
-                if msg_type == MSG_TYPE_TEXT:
-                    text_len = len(data_to_send)
-                    if text_len > 65535:
-                        self.client_message_queue.put("Error: Text message too long for protocol (>65535 bytes).")
-                        return
-                    header = struct.pack("!BH", MSG_TYPE_TEXT, text_len)
-                    self.client_socket_tcp.sendall(header + data_to_send)
-                elif msg_type == MSG_TYPE_FILE:
-                    self.client_socket_tcp.sendall(data_to_send)
-                
-                response_data = self.client_socket_tcp.recv(1024)
-                if response_data:
-                    response_message = response_data.decode('utf-8')
-                    self.client_message_queue.put(f"Client TCP: Received response: '{response_message}'")
-                else:
-                    self.client_message_queue.put("Client TCP: Server closed the connection.")
-                    self.client_socket_tcp.close()
-                    self.client_socket_tcp = None
+                self.peer_file_protocol[peer] = 1
+                self.client_message_queue.put(f"Client TCP: {ip}:{port} does not support resumable transfers, using protocol v1.")
+            self._send_file_v1(ip, port, file_path, file_size, file_name)
+
+    def _close_tcp_client(self):
+        """Closes self.client_socket_tcp if open. Must be called with client_socket_lock held."""
+        if self.client_socket_tcp:
+            self.client_socket_tcp.close()
+            self.client_socket_tcp = None
+
+    def _send_file_v1(self, ip, port, file_path, file_size, file_name):
+        """Sends the v1 header, then streams the file body from disk with sendfile() and progress logging."""
+        file_name_bytes = file_name.encode('utf-8')
+        if file_size > 0xFFFFFFFF:
+            self.client_message_queue.put("Error: File too large for protocol v1 (>4GB).")
+            return
+        if not self._connect_tcp_client(ip, port):
+            return
 
-            except Exception as e:
-                self.client_message_queue.put(f"Client TCP: Send/Receive Error: {e}")
-                if self.client_socket_tcp:
-                    self.client_socket_tcp.close()
-                    self.client_socket_tcp = None
+        try:
+            self.client_socket_tcp.sendall(struct.pack(FILE_HEADER_FORMAT, MSG_TYPE_FILE, len(file_name_bytes), file_size) + file_name_bytes)
+            progress = make_progress_reporter(self.client_message_queue, f"Client TCP: Sending '{file_name}'")
+            send_file_stream(self.client_socket_tcp, file_path, file_size, progress)
+
+            response_data = self.client_socket_tcp.recv(1024)
+            if response_data:
+                self.client_message_queue.put(f"Client TCP: Received response: '{response_data.decode('utf-8')}'")
+            else:
+                self.client_message_queue.put("Client TCP: Server closed the connection.")
+        except Exception as e:
+            self.client_message_queue.put(f"Client TCP: File send error for '{file_name}': {e}")
+        # The server ends the connection after each file, so don't keep this socket around
+        self._close_tcp_client()
+
+    def _send_file_v2(self, ip, port, file_path, file_size, file_name):
+        """
+        Sends a file with the v2 protocol. Every attempt starts with a handshake in which the server reports
+        the last verified offset, so after a dropped connection or a checksum error only the missing part is resent.
+        Returns False if the peer turned out to be a v1 server, True otherwise (whether or not the transfer succeeded).
+        """
+        file_name_bytes = file_name.encode('utf-8')
+        header = struct.pack(FILE_V2_HEADER_FORMAT, MSG_TYPE_FILE_V2, FILE_PROTOCOL_VERSION, len(file_name_bytes),
+                             file_size, FILE_V2_CHUNK_SIZE, make_transfer_id(file_path, file_size))
+        reply = memoryview(bytearray(FILE_V2_REPLY_SIZE))
+        handshake_done = False
+
+        for attempt in range(FILE_TRANSFER_MAX_RETRIES + 1):
+            if attempt > 0:
+                self.client_message_queue.put(f"Client TCP: Retrying '{file_name}' in {FILE_TRANSFER_RETRY_DELAY:.0f}s (attempt {attempt}/{FILE_TRANSFER_MAX_RETRIES})...")
+                time.sleep(FILE_TRANSFER_RETRY_DELAY)
+            if not self._connect_tcp_client(ip, port):
+                continue
 
+            try:
+                self.client_socket_tcp.sendall(header + file_name_bytes)
+                try:
+                    got_reply = receive_exact_into(self.client_socket_tcp, reply)
+                except ConnectionResetError:
+                    got_reply = False
+                if not got_reply:
+                    if not handshake_done:
+                        self._close_tcp_client()
+                        return False # v1 servers drop the connection on an unknown message type
+                    raise ConnectionError("Server closed the connection during the handshake.")
+                handshake_done = True
+                status, verified_offset = struct.unpack(FILE_V2_REPLY_FORMAT, reply)
+                if status != FILE_STATUS_READY:
+                    self.client_message_queue.put(f"Client TCP: Server refused '{file_name}' (status {status}).")
+                    self._close_tcp_client()
+                    return True
+                if verified_offset > 0:
+                    self.client_message_queue.put(f"Client TCP: Resuming '{file_name}' at {verified_offset}/{file_size} bytes.")
+
+                progress = make_progress_reporter(self.client_message_queue, f"Client TCP: Sending '{file_name}'")
+                send_file_chunks(self.client_socket_tcp, file_path, file_size, FILE_V2_CHUNK_SIZE, verified_offset, progress)
+
+                if not receive_exact_into(self.client_socket_tcp, reply):
+                    raise ConnectionError("Server closed the connection before confirming the file.")
+                status, verified_offset = struct.unpack(FILE_V2_REPLY_FORMAT, reply)
+                self._close_tcp_client()
+                if status == FILE_STATUS_COMPLETE:
+                    self.client_message_queue.put(f"Client TCP: File '{file_name}' delivered ({file_size} bytes).")
+                    return True
+                if status == FILE_STATUS_ERROR:
+                    self.client_message_queue.put(f"Client TCP: Server rejected '{file_name}' at offset {verified_offset}.")
+                    return True
+                self.client_message_queue.put(f"Client TCP: Checksum error in '{file_name}' at offset {verified_offset}.")
+
+            except (OSError, ConnectionError) as e:
+                self.client_message_queue.put(f"Client TCP: Transfer of '{file_name}' interrupted: {e}")
+                self._close_tcp_client()
+
+        self.client_message_queue.put(f"Client TCP: Giving up on '{file_name}' after {FILE_TRANSFER_MAX_RETRIES} retries. Sending it again will resume where it stopped.")
+        return True
+
+
+    def _send_udp_file(self, ip, port, file_path, file_size, file_name):
+        """Sends a file with the reliable UDP engine, falling back to a single datagram for servers that don't answer its handshake."""
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UDP_SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_SOCKET_BUFFER_SIZE)
+            sender = UdpFileSender(sock, (ip, port), file_path, file_size, file_name)
+            progress = make_progress_reporter(self.client_message_queue, f"Client UDP: Sending '{file_name}'")
+            start_time = time.monotonic()
+            if sender.run(progress):
+                elapsed = max(time.monotonic() - start_time, 1e-6)
+                self.client_message_queue.put(f"Client UDP: File '{file_name}' delivered ({file_size} bytes, {file_size / elapsed / 1e6:.1f} MB/s, {sender.retransmissions} segments resent).")
+                return
+        except Exception as e:
+            self.client_message_queue.put(f"Client UDP: File send error for '{file_name}': {e}")
+            return
+        finally:
+            if sock:
+                sock.close()
+
+        self.client_message_queue.put(f"Client UDP: {ip}:{port} does not support reliable UDP transfers, sending '{file_name}' as a single datagram.")
+        file_name_bytes = file_name.encode('utf-8')
+        if FILE_HEADER_SIZE + len(file_name_bytes) + file_size > 65507:
+            self.client_message_queue.put(f"Error: '{file_name}' is too large for a single UDP datagram.")
+            return
+        with open(file_path, 'rb') as f:
+            data_to_send = struct.pack(FILE_HEADER_FORMAT, MSG_TYPE_FILE, len(file_name_bytes), file_size) + file_name_bytes + f.read()
+        self._send_udp_data_with_header(ip, port, data_to_send, MSG_TYPE_FILE, file_name)
 
     def _send_udp_data_with_header(self, ip, port, data_to_send, msg_type, file_name=None):
         """Handles sending data via UDP (text or file)."""
@@ -0,0 +1,82 @@
+"""
+Benchmark: chat history with 1M stored messages (MessageStore from 6.py).
+
+Seeds a temporary database through MessageStore's batching writer, then times:
+- opening the store and loading the first history page (what view_conversation_history does),
+- paging back through older pages and filtering one conversation,
+- the previous approach of loading the whole table (SELECT ... ORDER BY timestamp, fetchall()) for comparison.
+
+Usage: python bench_history.py [--messages 1000000]
+"""
+import argparse
+import importlib.util
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "6.py")
+
+
+def load_netapp():
+    """Imports 6.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("netapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    print(f"{label:<45}{elapsed_ms:>10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    args = parser.parse_args()
+    netapp = load_netapp()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "bench_conversation.db")
+        store = netapp.MessageStore(db_path)
+        start_time = datetime(2025, 1, 1)
+        print(f"Seeding {args.messages} messages...")
+        seed_start = time.perf_counter()
+        for i in range(args.messages):
+            timestamp = (start_time + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")
+            store.insert_message(timestamp, f"Client 10.0.0.{i % 50}", f"Message number {i}", i % 2 == 0, i % 97 == 0,
+                                 "TCP", "received", f"10.0.0.{i % 50}")
+        store.flush()
+        seed_elapsed = time.perf_counter() - seed_start
+        print(f"{'insert + commit (batched writer)':<45}{args.messages / seed_elapsed:>10.0f} msg/s")
+        store.close()
+
+        store = timed("open store (schema + indexes check)", lambda: netapp.MessageStore(db_path))
+        first_page = timed("first history page", lambda: store.get_messages_page(), repeat=20)
+        before_id = [first_page[-1][0]]
+
+        def older_page():
+            page = store.get_messages_page(before_id=before_id[0])
+            before_id[0] = page[-1][0]
+
+        timed("older page (paging back)", older_page, repeat=50)
+        timed("one conversation, first page", lambda: store.get_messages_page(conversation_id="10.0.0.7"), repeat=20)
+        store.close()
+
+        def load_everything():
+            conn = sqlite3.connect(db_path)
+            rows = conn.execute("SELECT timestamp, sender, content, is_self, is_file, protocol, direction, conversation_id FROM messages ORDER BY timestamp ASC;").fetchall()
+            conn.close()
+            return rows
+
+        timed("previous approach: load the whole table", load_everything)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: pushes a large file between two local NetApp transfer endpoints over loopback.
+
+The sender and the receiver run in separate processes and use the same streaming helpers as 6.py
+(send_file_stream / receive_file_stream) and the same wire format (FILE_HEADER_FORMAT + name + body).
+Each side reports its throughput and peak RSS, which should stay flat whatever the file size.
+
+Usage: python bench_transfer.py [--size-mb 1024]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import resource
+import socket
+import struct
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "6.py")
+
+
+def load_netapp():
+    """Imports 6.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("netapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # ru_maxrss is in KiB on Linux
+
+
+def create_test_file(path, size_mb):
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def run_receiver(port_queue, result_queue, output_dir):
+    netapp = load_netapp()
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        port_queue.put(server.getsockname()[1])
+        conn, _ = server.accept()
+        with conn:
+            header = conn.recv(netapp.FILE_HEADER_SIZE, socket.MSG_WAITALL)
+            _, file_name_len, file_size = struct.unpack(netapp.FILE_HEADER_FORMAT, header)
+            file_name = conn.recv(file_name_len, socket.MSG_WAITALL).decode('utf-8')
+            start = time.perf_counter()
+            received = netapp.receive_file_stream(conn, os.path.join(output_dir, file_name), file_size)
+            elapsed = time.perf_counter() - start
+            conn.sendall(b"File received successfully.")
+    result_queue.put(("receiver", received, elapsed, peak_rss_mb()))
+
+
+def run_sender(port, file_path, result_queue):
+    netapp = load_netapp()
+    file_size = os.path.getsize(file_path)
+    file_name_bytes = b"bench_received.bin"
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        sock.sendall(struct.pack(netapp.FILE_HEADER_FORMAT, netapp.MSG_TYPE_FILE, len(file_name_bytes), file_size) + file_name_bytes)
+        start = time.perf_counter()
+        sent = netapp.send_file_stream(sock, file_path, file_size)
+        sock.recv(1024)
+        elapsed = time.perf_counter() - start
+    result_queue.put(("sender", sent, elapsed, peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024, help="Size of the file to transfer, in MiB (default: 1024)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_path = os.path.join(work_dir, "bench_source.bin")
+        output_dir = os.path.join(work_dir, "received_files")
+        os.makedirs(output_dir)
+        print(f"Creating {args.size_mb} MiB test file...")
+        create_test_file(source_path, args.size_mb)
+
+        port_queue = multiprocessing.Queue()
+        result_queue = multiprocessing.Queue()
+        receiver = multiprocessing.Process(target=run_receiver, args=(port_queue, result_queue, output_dir))
+        receiver.start()
+        port = port_queue.get(timeout=30)
+        sender = multiprocessing.Process(target=run_sender, args=(port, source_path, result_queue))
+        sender.start()
+        sender.join()
+        receiver.join()
+
+        print(f"{'side':<10}{'bytes':>16}{'seconds':>10}{'MB/s':>10}{'peak RSS (MB)':>16}")
+        for _ in range(2):
+            side, n_bytes, elapsed, rss = result_queue.get(timeout=5)
+            print(f"{side:<10}{n_bytes:>16}{elapsed:>10.2f}{n_bytes / elapsed / 1e6:>10.1f}{rss:>16.1f}")
+
+        received_path = os.path.join(output_dir, "bench_received.bin")
+        if os.path.getsize(received_path) != os.path.getsize(source_path):
+            print("ERROR: received file size does not match the source.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmark: reliable UDP file transfer (UdpFileSender / UdpFileReceiver from 6.py) over loopback.
+
+Each scenario wraps both sockets in LossyDatagramSocket to simulate packet loss and one-way latency,
+then checks the received file byte for byte and reports throughput and retransmissions.
+Each scenario also sends the same file with the TCP v2 chunk protocol through DelayedTcpProxy, which adds the same
+one-way delay in both directions, so the two rows compare at the same RTT. The proxy sits above TCP and cannot drop
+segments, so the TCP row sees the latency but not the loss: it is a best case for TCP.
+
+Usage: python bench_udp_transfer.py [--size-mb 64]
+"""
+import argparse
+import collections
+import hashlib
+import importlib.util
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "6.py")
+
+# (label, loss rate, one-way delay in seconds, jitter in seconds)
+SCENARIOS = [
+    ("loopback", 0.0, 0.0, 0.0),
+    ("1% loss", 0.01, 0.0, 0.0),
+    ("25 ms, 0.5% loss", 0.005, 0.025, 0.002),
+    ("50 ms, 2% loss", 0.02, 0.05, 0.005),
+]
+
+TCP_PROXY_WINDOW = 4 * 1024 * 1024 # Bytes in flight per direction through the proxy, about a tuned TCP window on Linux
+TCP_PROXY_READ_SIZE = 64 * 1024
+
+
+def load_netapp():
+    """Imports 6.py as a module (its file name is not a valid identifier)."""
+    spec = importlib.util.spec_from_file_location("netapp", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_udp_scenario(netapp, source_path, output_dir, loss_rate, delay, jitter):
+    receiver_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, netapp.UDP_SOCKET_BUFFER_SIZE)
+    receiver_sock.bind(("127.0.0.1", 0))
+    receiver_sock.settimeout(netapp.UDP_FEEDBACK_INTERVAL)
+    address = receiver_sock.getsockname()
+    done = threading.Event()
+    received = {}
+
+    def on_event(event, addr, file_name, detail):
+        if event in ("completed", "failed"):
+            received[event] = detail
+            done.set()
+
+    receiver = netapp.UdpFileReceiver(netapp.LossyDatagramSocket(receiver_sock, loss_rate, delay, jitter, seed=1), output_dir, on_event)
+
+    def receive_loop():
+        while not done.is_set():
+            try:
+                data, addr = receiver_sock.recvfrom(65535)
+                receiver.handle_datagram(data, addr)
+            except socket.timeout:
+                pass
+            receiver.tick()
+        end = time.monotonic() + 0.5 # Keep answering so the sender sees the final ack
+        while time.monotonic() < end:
+            try:
+                data, addr = receiver_sock.recvfrom(65535)
+                receiver.handle_datagram(data, addr)
+            except socket.timeout:
+                pass
+
+    receiver_thread = threading.Thread(target=receive_loop, daemon=True)
+    receiver_thread.start()
+
+    sender_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sender_sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, netapp.UDP_SOCKET_BUFFER_SIZE)
+    sender_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, netapp.UDP_SOCKET_BUFFER_SIZE)
+    lossy_sender_sock = netapp.LossyDatagramSocket(sender_sock, loss_rate, delay, jitter, seed=2)
+    file_size = os.path.getsize(source_path)
+    sender = netapp.UdpFileSender(lossy_sender_sock, address, source_path, file_size, "bench_udp.bin")
+    start = time.perf_counter()
+    ok = sender.run()
+    elapsed = time.perf_counter() - start
+    receiver_thread.join()
+    sender_sock.close()
+    receiver_sock.close()
+    if not ok or "completed" not in received:
+        return None
+    return elapsed, sender.retransmissions, sender.segments_sent, received["completed"]
+
+
+class DelayedTcpProxy:
+    """
+    Loopback TCP proxy for one connection that delivers each direction after a fixed one-way delay.
+    At most TCP_PROXY_WINDOW bytes are in flight per direction, and that space only reopens one RTT after the bytes
+    were read, as the peer's acks would reopen a TCP window. Without that bound the proxy would absorb the whole file
+    at loopback speed and TCP would never see the latency.
+    """
+    def __init__(self, target, delay):
+        self.target = target
+        self.delay = delay
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.address = self.listener.getsockname()
+        self.sockets = [self.listener]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        try:
+            client, _ = self.listener.accept()
+            upstream = socket.create_connection(self.target)
+        except OSError:
+            return
+        self.sockets += [client, upstream]
+        for source, destination in ((client, upstream), (upstream, client)):
+            pending = queue.Queue()
+            threading.Thread(target=self._read, args=(source, pending), daemon=True).start()
+            threading.Thread(target=self._write, args=(destination, pending), daemon=True).start()
+
+    def _read(self, source, pending):
+        """Stamps each block with its delivery time; an empty block marks the end of the stream."""
+        in_flight = collections.deque() # (time the window space reopens, n_bytes)
+        in_flight_bytes = 0
+        try:
+            while True:
+                now = time.monotonic()
+                while in_flight and in_flight[0][0] <= now:
+                    in_flight_bytes -= in_flight.popleft()[1]
+                if in_flight_bytes >= TCP_PROXY_WINDOW:
+                    time.sleep(in_flight[0][0] - now)
+                    continue
+                data = source.recv(min(TCP_PROXY_READ_SIZE, TCP_PROXY_WINDOW - in_flight_bytes))
+                now = time.monotonic()
+                pending.put((now + self.delay, data))
+                if not data:
+                    return
+                in_flight.append((now + 2 * self.delay, len(data)))
+                in_flight_bytes += len(data)
+        except OSError:
+            pending.put((time.monotonic(), b""))
+
+    def _write(self, destination, pending):
+        try:
+            while True:
+                due, data = pending.get()
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                if not data:
+                    destination.shutdown(socket.SHUT_WR)
+                    return
+                destination.sendall(data)
+        except OSError:
+            pass
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+
+
+def run_tcp_scenario(netapp, source_path, output_dir, delay):
+    """Sends the file as TCP v2 chunks through a DelayedTcpProxy; returns (elapsed, part file) or None on failure."""
+    file_size = os.path.getsize(source_path)
+    part_path, offset_path = netapp.partial_file_paths(output_dir, b"\0" * 16)
+    result = {}
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        proxy = DelayedTcpProxy(server.getsockname(), delay)
+
+        def receive():
+            conn, _ = server.accept()
+            with conn:
+                result["status"], _ = netapp.receive_file_chunks(conn, part_path, offset_path, file_size, netapp.FILE_V2_CHUNK_SIZE, 0)
+
+        receiver_thread = threading.Thread(target=receive)
+        receiver_thread.start()
+        start = time.perf_counter()
+        with socket.create_connection(proxy.address) as sock:
+            netapp.send_file_chunks(sock, source_path, file_size, netapp.FILE_V2_CHUNK_SIZE)
+            receiver_thread.join()
+        elapsed = time.perf_counter() - start
+        proxy.close()
+    os.remove(offset_path)
+    if result.get("status") != netapp.FILE_STATUS_COMPLETE:
+        os.remove(part_path)
+        return None
+    return elapsed, part_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the file to transfer, in MiB (default: 64)")
+    args = parser.parse_args()
+    netapp = load_netapp()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_path = os.path.join(work_dir, "bench_source.bin")
+        with open(source_path, 'wb') as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        source_digest = file_digest(source_path)
+        size = os.path.getsize(source_path)
+
+        print(f"{'scenario':<20}{'transport':<10}{'seconds':>10}{'MB/s':>10}{'resent':>10}{'sent':>10}  result")
+        for label, loss_rate, delay, jitter in SCENARIOS:
+            result = run_udp_scenario(netapp, source_path, work_dir, loss_rate, delay, jitter)
+            if result is None:
+                print(f"{label:<20}{'UDP':<10}{'-':>10}{'-':>10}{'-':>10}{'-':>10}  FAILED")
+            else:
+                elapsed, resent, sent, output_path = result
+                status = "ok" if file_digest(output_path) == source_digest else "CORRUPTED"
+                os.remove(output_path)
+                print(f"{label:<20}{'UDP':<10}{elapsed:>10.2f}{size / elapsed / 1e6:>10.1f}{resent:>10}{sent:>10}  {status}")
+
+            result = run_tcp_scenario(netapp, source_path, work_dir, delay)
+            if result is None:
+                print(f"{'':<20}{'TCP v2':<10}{'-':>10}{'-':>10}{'-':>10}{'-':>10}  FAILED")
+                continue
+            elapsed, output_path = result
+            status = "ok" if file_digest(output_path) == source_digest else "CORRUPTED"
+            os.remove(output_path)
+            print(f"{'':<20}{'TCP v2':<10}{elapsed:>10.2f}{size / elapsed / 1e6:>10.1f}{'-':>10}{'-':>10}  {status}")
+
+
+if __name__ == "__main__":
+    main()
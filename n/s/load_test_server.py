@@ -0,0 +1,90 @@
+"""
+Load test for the NetApp TCP server (6.py): opens many concurrent clients and measures text message round trips.
+
+Start a TCP server in NetApp first, then run for example:
+    python load_test_server.py --host 127.0.0.1 --port 12345 --clients 1000 --messages 50
+
+Every client connects, then sends its messages one at a time with the MSG_TYPE_TEXT framing and waits
+for the server's response before sending the next. Reports connect failures, messages/sec and latency percentiles.
+"""
+import argparse
+import asyncio
+import resource
+import struct
+import time
+
+MSG_TYPE_TEXT = 1
+RESPONSE_TEMPLATE = "Serveur TCP a reçu texte: '{}'" # Must match NetApp._on_tcp_text_message
+
+
+def raise_fd_limit(needed):
+    """Each client needs a file descriptor; raise the soft limit towards the hard limit if necessary."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        new_soft = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+
+
+async def run_client(client_id, host, port, n_messages, start_event, latencies, errors):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError as e:
+        errors.append(f"connect: {e}")
+        return
+    await start_event.wait()
+    try:
+        for i in range(n_messages):
+            text = f"load {client_id}:{i}"
+            payload = text.encode('utf-8')
+            expected = len(RESPONSE_TEMPLATE.format(text).encode('utf-8'))
+            sent_at = time.perf_counter()
+            writer.write(struct.pack("!BH", MSG_TYPE_TEXT, len(payload)) + payload)
+            await reader.readexactly(expected)
+            latencies.append(time.perf_counter() - sent_at)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(f"client {client_id}: {e!r}")
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def main_async(args):
+    start_event = asyncio.Event()
+    latencies = []
+    errors = []
+    clients = [asyncio.ensure_future(run_client(i, args.host, args.port, args.messages, start_event, latencies, errors))
+               for i in range(args.clients)]
+    await asyncio.sleep(args.connect_wait) # Let every client connect before the clock starts
+    start = time.perf_counter()
+    start_event.set()
+    await asyncio.gather(*clients)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"clients: {args.clients}, messages per client: {args.messages}")
+    print(f"completed round trips: {len(latencies)} in {elapsed:.2f}s -> {len(latencies) / elapsed:.0f} messages/sec")
+    print(f"latency p50: {percentile(latencies, 0.50) * 1000:.2f} ms, p99: {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max: {percentile(latencies, 1.0) * 1000:.2f} ms")
+    if errors:
+        print(f"{len(errors)} errors, first: {errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=50, help="Messages sent by each client")
+    parser.add_argument("--connect-wait", type=float, default=2.0, help="Seconds allowed for all clients to connect")
+    args = parser.parse_args()
+    raise_fd_limit(args.clients + 64)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()